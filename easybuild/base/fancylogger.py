@@ -81,6 +81,7 @@ import inspect
 import logging
 import logging.handlers
 import os
+import queue
 import sys
 import threading
 import traceback
@@ -529,6 +530,62 @@ def getRootLoggerName():
         return OPTIMIZED_ANSWER
 
 
+class FancyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Handler that hands off log records to a background thread via a queue,
+    which passes them on to the wrapped handler (for example to write them to a log file).
+    """
+
+    def __init__(self, handler, queue_size=0):
+        """
+        Create queue handler, and start listener thread that forwards log records to specified handler.
+
+        :param handler: handler to pass log records to in listener thread
+        :param queue_size: maximum number of log records in queue (0 implies unlimited)
+        """
+        logging.handlers.QueueHandler.__init__(self, queue.Queue(queue_size))
+        self.handler = handler
+        self.listener = logging.handlers.QueueListener(self.queue, handler, respect_handler_level=True)
+        self.listener.start()
+
+    def prepare(self, record):
+        """
+        Prepare log record for being put on the queue:
+        resolve message with its arguments (which may be changed after the logging call),
+        but leave formatting of the record to the handler in the listener thread.
+        """
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # traceback objects can not be kept around, so render exception info now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def setFormatter(self, fmt):
+        """Set formatter for wrapped handler, which does the actual formatting."""
+        self.handler.setFormatter(fmt)
+
+    def flush(self):
+        """Wait until all queued log records are handled, and flush wrapped handler."""
+        if self.listener._thread is not None:
+            self.queue.join()
+        self.handler.flush()
+
+    def close(self):
+        """Stop listener thread (after handling all queued log records), and close wrapped handler."""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.handler.close()
+        logging.handlers.QueueHandler.close(self)
+
+
+def _asyncRotatingFileHandler(**handleropts):
+    """Create rotating file handler that is fed from a queue by a listener thread."""
+    return FancyQueueHandler(logging.handlers.RotatingFileHandler(**handleropts))
+
+
 def logToScreen(enable=True, handler=None, name=None, stdout=False, colorize=Colorize.NEVER):
     """
     enable (or disable) logging to screen
@@ -560,7 +617,8 @@ def logToScreen(enable=True, handler=None, name=None, stdout=False, colorize=Col
                            )
 
 
-def logToFile(filename, enable=True, filehandler=None, name=None, max_bytes=MAX_BYTES, backup_count=BACKUPCOUNT):
+def logToFile(filename, enable=True, filehandler=None, name=None, max_bytes=MAX_BYTES, backup_count=BACKUPCOUNT,
+              asynchronous=False):
     """
     enable (or disable) logging to file
     given filename
@@ -568,6 +626,9 @@ def logToFile(filename, enable=True, filehandler=None, name=None, max_bytes=MAX_
     this will let the file grow to MAX_BYTES and then rotate it
     saving the last BACKUPCOUNT files.
 
+    if asynchronous is True, log records are written to the file in a separate thread,
+    so logging calls do not block on writing to the file (see FancyQueueHandler)
+
     returns the filehandler (this can be used to later disable logging to file)
 
     if you want to disable logging to file, pass the earlier obtained filehandler
@@ -588,8 +649,13 @@ def logToFile(filename, enable=True, filehandler=None, name=None, max_bytes=MAX_
             exc, detail, tb = sys.exc_info()
             raise exc("Cannot create logdirectory %s: %s \n detail: %s" % (directory, ex, detail)).with_traceback(tb)
 
+    if asynchronous:
+        handlerclass = _asyncRotatingFileHandler
+    else:
+        handlerclass = logging.handlers.RotatingFileHandler
+
     return _logToSomething(
-        logging.handlers.RotatingFileHandler,
+        handlerclass,
         handleropts,
         loggeroption='logtofile_%s' % filename,
         name=name,
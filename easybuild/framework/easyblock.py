@@ -61,7 +61,7 @@ import tempfile
 import time
 import traceback
 from concurrent.futures import ThreadPoolExecutor
-from contextlib import contextmanager
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from string import ascii_letters
 from textwrap import indent
@@ -80,8 +80,10 @@ from easybuild.framework.easyconfig.templates import TEMPLATE_NAMES_EASYBLOCK_RU
 from easybuild.framework.extension import Extension, resolve_exts_filter_template
 from easybuild.tools import LooseVersion, config
 from easybuild.tools.build_details import get_build_stats
+from easybuild.tools.build_history import record_build
 from easybuild.tools.build_log import EasyBuildError, EasyBuildExit, dry_run_msg, dry_run_warning, dry_run_set_dirs
 from easybuild.tools.build_log import print_error_and_exit, print_msg, print_warning
+from easybuild.tools.build_profile import start_build_profile, stop_build_profile
 from easybuild.tools.config import CHECKSUM_PRIORITY_JSON, DEFAULT_ENVVAR_USERS_MODULES
 from easybuild.tools.config import EASYBUILD_SOURCES_URL, EBPYTHONPREFIXES  # noqa
 from easybuild.tools.config import FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_PATCHES, FORCE_DOWNLOAD_SOURCES
@@ -95,7 +97,7 @@ from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256
 from easybuild.tools.filetools import adjust_permissions, apply_patch, back_up_file, change_dir, check_lock, clean_dir
 from easybuild.tools.filetools import compute_checksum, convert_name, copy_dir, copy_file, create_lock
 from easybuild.tools.filetools import create_non_existing_paths, create_patch_info, derive_alt_pypi_url, diff_files
-from easybuild.tools.filetools import download_file, encode_class_name, extract_file
+from easybuild.tools.filetools import det_checksum_types, download_file, encode_class_name, extract_file
 from easybuild.tools.filetools import find_backup_name_candidate, get_cwd, get_source_tarball_from_git, is_alt_pypi_url
 from easybuild.tools.filetools import is_binary, is_parent_path, is_sha256_checksum, mkdir, move_file, move_logs
 from easybuild.tools.filetools import read_file, remove_dir, remove_file, remove_lock, symlink, verify_checksum
@@ -117,6 +119,8 @@ from easybuild.tools.output import PROGRESS_BAR_DOWNLOAD_ALL, PROGRESS_BAR_EASYC
 from easybuild.tools.output import show_progress_bars, start_progress_bar, stop_progress_bar, update_progress_bar
 from easybuild.tools.package.utilities import package
 from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.structured_log import LOG_SECTION_EXTENSION, LOG_SECTION_STEP, get_structured_log, log_section
+from easybuild.tools.structured_log import start_structured_log, stop_structured_log
 from easybuild.tools.systemtools import check_linked_shared_libs, det_parallelism
 from easybuild.tools.systemtools import get_cuda_architectures
 from easybuild.tools.systemtools import get_linked_libs_raw, get_shared_lib_ext, pick_system_specific_value, use_group
@@ -284,6 +288,9 @@ class EasyBlock:
         self.postmsg = ''  # allow a post message to be set, which can be shown as last output
         self.current_step = None
 
+        # profile of installation (wall time, CPU time, peak memory usage per step/extension/command)
+        self.build_profile = None
+
         # Create empty progress bar
         self.progress_bar = None
         self.pbar_task = None
@@ -374,7 +381,10 @@ class EasyBlock:
 
         if self.logfile is None:
             self.logfile = get_log_filename(self.name, self.version, add_salt=True)
-            fancylogger.logToFile(self.logfile, max_bytes=0)
+            fancylogger.logToFile(self.logfile, max_bytes=0, asynchronous=build_option('async_logging'))
+            structured_log_format = build_option('structured_log')
+            if structured_log_format:
+                start_structured_log(self.logfile, log_format=structured_log_format)
 
         self.log = fancylogger.getLogger(name=self.__class__.__name__, fname=False)
         self.log.info(this_is_easybuild())
@@ -396,6 +406,9 @@ class EasyBlock:
         if self.external_logfile:
             return
         self.log.info("Closing log for application name %s version %s" % (self.name, self.version))
+        structured_log = get_structured_log()
+        if structured_log and structured_log.path.startswith(self.logfile):
+            stop_structured_log()
         fancylogger.logToFile(self.logfile, enable=False)
 
     #
@@ -537,7 +550,8 @@ class EasyBlock:
         force_download = build_option('force_download') in [FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_SOURCES]
         path = self.obtain_file(filename, extension=extension, download_filename=download_filename,
                                 force_download=force_download, urls=source_urls, git_config=git_config,
-                                download_instructions=download_instructions, alt_location=alt_location)
+                                download_instructions=download_instructions, alt_location=alt_location,
+                                checksum=checksum)
         if path is None:
             raise EasyBuildError('No file found for source %s', filename)
 
@@ -612,12 +626,13 @@ class EasyBlock:
 
             force_download = build_option('force_download') in [FORCE_DOWNLOAD_ALL, FORCE_DOWNLOAD_PATCHES]
             alt_location = patch_info.pop('alt_location', None)
+            checksum = self.get_checksum_for(checksums, filename=patch_info['name'], index=index)
             path = self.obtain_file(patch_info['name'], extension=extension, force_download=force_download,
-                                    alt_location=alt_location)
+                                    alt_location=alt_location, checksum=checksum)
             if path:
                 self.log.debug('File %s found for patch %s', path, patch_spec)
                 patch_info['path'] = path
-                patch_info['checksum'] = self.get_checksum_for(checksums, filename=patch_info['name'], index=index)
+                patch_info['checksum'] = checksum
 
                 self.all_patches_paths.add(path)
                 if extension:
@@ -756,7 +771,7 @@ class EasyBlock:
                             src_path = self.obtain_file(src_fn, extension=True, urls=source_urls,
                                                         force_download=force_download,
                                                         download_instructions=download_instructions,
-                                                        warning_only=is_pypi_source)
+                                                        warning_only=is_pypi_source, checksum=checksums)
                             if not src_path and is_pypi_source:
                                 # retry with alternative download_filename
                                 alt_name = resolve_template('%(name)s', template_values).replace("-", "_")
@@ -765,7 +780,7 @@ class EasyBlock:
                                 src_path = self.obtain_file(src_fn, extension=True, urls=source_urls,
                                                             force_download=force_download,
                                                             download_instructions=download_instructions,
-                                                            download_filename=alt_download_fn)
+                                                            download_filename=alt_download_fn, checksum=checksums)
                             if src_path:
                                 ext_src.update({'src': src_path})
                             else:
@@ -852,7 +867,7 @@ class EasyBlock:
     @_obtain_file_update_progress_bar_on_return
     def obtain_file(self, filename, extension=False, urls=None, download_filename=None, force_download=False,
                     git_config=None, no_download=False, download_instructions=None, alt_location=None,
-                    warning_only=False):
+                    warning_only=False, checksum=None):
         """
         Locate the file with the given name
         - searches in different subdirectories of source path
@@ -866,6 +881,7 @@ class EasyBlock:
         :param no_download: do not try to download the file
         :param download_instructions: instructions to manually add source (used for complex cases)
         :param alt_location: alternative location to use instead of self.name
+        :param checksum: checksum(s) for file, used to determine which checksums to compute while downloading
         """
         if self.cfg['data_sources']:
             srcpaths = source_paths_data()
@@ -906,7 +922,7 @@ class EasyBlock:
                         self.log.info("Found file %s at %s, no need to download it", filename, filepath)
                         return fullpath
 
-                if download_file(filename, url, fullpath):
+                if download_file(filename, url, fullpath, checksum_types=det_checksum_types(checksum)):
                     return fullpath
 
             except IOError as err:
@@ -1066,7 +1082,8 @@ class EasyBlock:
                     self.log.debug("Trying to download file %s from %s to %s ..." % (filename, fullurl, targetpath))
                     downloaded = False
                     try:
-                        if download_file(filename, fullurl, targetpath):
+                        if download_file(filename, fullurl, targetpath,
+                                         checksum_types=det_checksum_types(checksum)):
                             downloaded = True
 
                     except IOError as err:
@@ -2155,12 +2172,14 @@ class EasyBlock:
                                           rpath_include_dirs=self.rpath_include_dirs,
                                           rpath_wrappers_dir=self.rpath_wrappers_dir)
                     try:
-                        ext.install_extension_substep("pre_install_extension")
-                        with self.module_generator.start_module_creation():
-                            txt = ext.install_extension_substep("install_extension")
-                        if txt:
-                            self.module_extra_extensions += txt
-                        ext.install_extension_substep("post_install_extension")
+                        with self.build_profile.extension(ext.name) if self.build_profile else nullcontext():
+                            with log_section(LOG_SECTION_EXTENSION, ext.name):
+                                ext.install_extension_substep("pre_install_extension")
+                                with self.module_generator.start_module_creation():
+                                    txt = ext.install_extension_substep("install_extension")
+                                if txt:
+                                    self.module_extra_extensions += txt
+                                ext.install_extension_substep("post_install_extension")
                     finally:
                         ext_duration = datetime.now() - start_time
                         if ext_duration.total_seconds() >= 1:
@@ -4912,6 +4931,9 @@ class EasyBlock:
                 create_lock(lock_name)
                 lock_created = True
 
+            if not self.dry_run:
+                self.build_profile = start_build_profile(self.full_mod_name)
+
             # run post-initialization tasks first, before running any steps
             self.post_init()
 
@@ -4929,7 +4951,9 @@ class EasyBlock:
                     self.current_step = step_name
                     start_time = datetime.now()
                     try:
-                        self.run_step(step_name, step_methods)
+                        with self.build_profile.step(step_name) if self.build_profile else nullcontext():
+                            with log_section(LOG_SECTION_STEP, step_name):
+                                self.run_step(step_name, step_methods)
                     except RunShellCmdError as err:
                         err.print()
                         msg = (
@@ -4959,6 +4983,9 @@ class EasyBlock:
             if lock_created:
                 remove_lock(lock_name)
 
+            if self.build_profile:
+                stop_build_profile()
+
             stop_progress_bar(PROGRESS_BAR_EASYCONFIG)
 
         # return True for successfull build (or stopped build)
@@ -5152,6 +5179,20 @@ def build_and_install_one(ecdict, init_env):
 
     application_log = app.logfile
 
+    build_profile = app.build_profile
+
+    def write_build_profile(log_path):
+        """Write build profile next to specified log file (if a build profile was collected)."""
+        if build_profile:
+            try:
+                build_profile.write(re.sub(r'\.log$', '', log_path))
+            except EasyBuildError as err:
+                _log.warning("Failed to write build profile: %s", err)
+            return True
+        return False
+
+    build_profile_written = False
+
     # successful (non-dry-run) build
     if result and not dry_run:
         def ensure_writable_log_dir(log_dir):
@@ -5189,6 +5230,10 @@ def build_and_install_one(ecdict, init_env):
             buildstats = get_build_stats(app, start_time, build_option('command_line'))
             _log.info("Build stats: %s" % buildstats)
 
+            # record build in build history, which is used to predict resources required for future builds
+            if not module_only:
+                record_build(app, buildstats)
+
             new_log_dir = os.path.join(app.installdir, config.log_path(ec=app.cfg))
             try:
                 ensure_writable_log_dir(new_log_dir)
@@ -5225,13 +5270,17 @@ def build_and_install_one(ecdict, init_env):
                 # upload easyconfig (and patch files) to central repository
                 currentbuildstats = app.cfg['buildstats']
                 repo = init_repository(get_repository(), get_repositorypath())
+                repo_paths = []
                 if 'original_spec' in ecdict:
                     block = det_full_ec_version(app.cfg) + ".block"
-                    repo.add_easyconfig(ecdict['original_spec'], app.name, block, buildstats, currentbuildstats)
-                repo.add_easyconfig(spec, app.name, det_full_ec_version(app.cfg), buildstats, currentbuildstats)
+                    repo_paths.append(repo.add_easyconfig(ecdict['original_spec'], app.name, block, buildstats,
+                                                          currentbuildstats))
+                repo_paths.append(repo.add_easyconfig(spec, app.name, det_full_ec_version(app.cfg), buildstats,
+                                                      currentbuildstats))
                 for patch_path in app.all_patches_paths:
-                    repo.add_patch(patch_path, app.name)
-                repo.commit("Built %s" % app.full_mod_name)
+                    repo_paths.append(repo.add_patch(patch_path, app.name))
+                # commit may be postponed (see --repository-commit-interval)
+                repo.queue_commit("Built %s" % app.full_mod_name, repo_paths)
                 del repo
             except EasyBuildError as err:
                 _log.warning("Unable to commit easyconfig to repository: %s", err)
@@ -5246,6 +5295,7 @@ def build_and_install_one(ecdict, init_env):
                 new_application_log = os.path.join(new_log_dir, log_fn)
                 move_logs(application_log, new_application_log)
                 application_log = new_application_log
+                build_profile_written = write_build_profile(application_log)
 
                 newspec = os.path.join(new_log_dir, app.cfg.filename())
                 copy_file(spec, newspec)
@@ -5290,6 +5340,9 @@ def build_and_install_one(ecdict, init_env):
     if app.postmsg:
         print_msg("\nWARNING: %s\n" % app.postmsg, log=_log, silent=silent)
 
+    if build_option('profile_report') and build_profile:
+        print_msg('\n' + build_profile.report() + '\n', log=_log, silent=silent, prefix=False)
+
     if dry_run:
         # print note on interpreting dry run output (argument is reference to location of dry run messages)
         print_dry_run_note('above', silent=silent)
@@ -5299,6 +5352,9 @@ def build_and_install_one(ecdict, init_env):
         else:
             dry_run_msg("(no ignored errors during dry run)\n", silent=silent)
 
+    if application_log and not build_profile_written:
+        write_build_profile(application_log)
+
     if application_log:
         # there may be multiple log files, or the file name may be different due to zipping
         logs = glob.glob('%s*' % application_log)
@@ -44,9 +44,12 @@ Authors:
 import copy
 import difflib
 import functools
+import itertools
+import multiprocessing
 import os
 import re
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from contextlib import contextmanager
 
 import easybuild.tools.filetools as filetools
@@ -59,11 +62,13 @@ from easybuild.framework.easyconfig.format.convert import Dependency
 from easybuild.framework.easyconfig.format.format import DEPENDENCY_PARAMETERS
 from easybuild.framework.easyconfig.format.one import EB_FORMAT_EXTENSION, retrieve_blocks_in_spec
 from easybuild.framework.easyconfig.licenses import EASYCONFIG_LICENSES_DICT
+from easybuild.framework.easyconfig.parameters import EasyConfigParameters
 from easybuild.framework.easyconfig.parser import ALTERNATIVE_EASYCONFIG_PARAMETERS, DEPRECATED_EASYCONFIG_PARAMETERS
 from easybuild.framework.easyconfig.parser import REPLACED_PARAMETERS, EasyConfigParser
 from easybuild.framework.easyconfig.parser import fetch_parameters_from_easyconfig
 from easybuild.framework.easyconfig.templates import ALTERNATIVE_EASYCONFIG_TEMPLATES, DEPRECATED_EASYCONFIG_TEMPLATES
-from easybuild.framework.easyconfig.templates import TEMPLATE_CONSTANTS, TEMPLATE_NAMES_DYNAMIC, template_constant_dict
+from easybuild.framework.easyconfig.templates import TEMPLATE_CONSTANTS, TEMPLATE_NAMES_DYNAMIC, TemplateValues
+from easybuild.framework.easyconfig.templates import template_constant_dict
 from easybuild.tools import LooseVersion
 from easybuild.tools.build_log import EasyBuildError, EasyBuildExit, print_warning, print_msg
 from easybuild.tools.config import GENERIC_EASYBLOCK_PKG, LOCAL_VAR_NAMING_CHECK_ERROR, LOCAL_VAR_NAMING_CHECK_LOG
@@ -72,13 +77,14 @@ from easybuild.tools.config import Singleton, build_option, get_module_naming_sc
 from easybuild.tools.filetools import convert_name, copy_file, create_index, decode_class_name, encode_class_name
 from easybuild.tools.filetools import find_backup_name_candidate, find_easyconfigs, load_index
 from easybuild.tools.filetools import read_file, write_file
-from easybuild.tools.hooks import PARSE, EXTRACT_STEP, STEP_NAMES, load_hooks, run_hook
+from easybuild.tools.hooks import PARSE, EXTRACT_STEP, STEP_NAMES, find_hook, load_hooks, run_hook
 from easybuild.tools.module_naming_scheme.mns import DEVEL_MODULE_SUFFIX
 from easybuild.tools.module_naming_scheme.utilities import avail_module_naming_schemes, det_full_ec_version
 from easybuild.tools.module_naming_scheme.utilities import det_hidden_modname, is_valid_module_name
 from easybuild.tools.modules import modules_tool, NoModulesTool
-from easybuild.tools.systemtools import check_os_dependency, pick_dep_version
+from easybuild.tools.systemtools import check_os_dependency, get_avail_core_count, pick_dep_version
 from easybuild.tools.toolchain.toolchain import SYSTEM_TOOLCHAIN_NAME, is_system_toolchain
+from easybuild.tools.toolchain.hierarchy import get_toolchain_hierarchy_table, mk_toolchain_hierarchy_context
 from easybuild.tools.toolchain.toolchain import TOOLCHAIN_CAPABILITIES, TOOLCHAIN_CAPABILITY_CUDA
 from easybuild.tools.toolchain.utilities import get_toolchain, search_toolchain
 from easybuild.tools.utilities import flatten, get_class_for, nub, quote_py_str, remove_unwanted_chars
@@ -87,6 +93,9 @@ from easybuild.toolchains.compiler.cuda import Cuda
 
 _log = fancylogger.getLogger('easyconfig.easyconfig', fname=False)
 
+# regex to escape '%' characters that are not part of a template, see resolve_template
+TEMPLATE_ESCAPE_REGEX = re.compile(r'(%)(?!%*\(\w+\)s)')
+
 # add license here to make it really MANDATORY (remove comment in default)
 MANDATORY_PARAMS = ['name', 'version', 'homepage', 'description', 'toolchain']
 
@@ -333,6 +342,27 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
     optional_toolchains = {tc_class.NAME for tc_class in all_tc_classes if getattr(tc_class, 'OPTIONAL', False)}
     composite_toolchains = {tc_class.NAME for tc_class in all_tc_classes if len(tc_class.__bases__) > 1}
 
+    # check whether toolchain hierarchy is available in (persistent) toolchain hierarchy table
+    tc_hierarchy_table = get_toolchain_hierarchy_table()
+    if tc_hierarchy_table is not None:
+        tcs_spec = sorted('%s:%s:%s:%s' % (name, subtcs, name in optional_toolchains, name in composite_toolchains)
+                          for (name, subtcs) in subtoolchains.items())
+        context = mk_toolchain_hierarchy_context(tcs_spec)
+        toolchain_hierarchy = tc_hierarchy_table.get(parent_toolchain, incl_capabilities, context,
+                                                     robot_find_easyconfig)
+        if toolchain_hierarchy is not None:
+            _log.info("Found toolchain hierarchy for toolchain %s in toolchain hierarchy table: %s",
+                      parent_toolchain, toolchain_hierarchy)
+            return toolchain_hierarchy
+
+    # keep track of lookups of easyconfig files, to determine whether entry in toolchain hierarchy table is valid
+    ec_lookups = {}
+
+    def find_ec(name, version):
+        """Find easyconfig file for specified name/version, and keep track of result."""
+        ec_lookups[(name, version)] = robot_find_easyconfig(name, version)
+        return ec_lookups[(name, version)]
+
     # the parent toolchain is at the top of the hierarchy,
     # we need a copy so that adding capabilities (below) doesn't affect the original object
     toolchain_hierarchy = [copy.copy(parent_toolchain)]
@@ -352,7 +382,7 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
         if not isinstance(subtoolchain_names, list):
             subtoolchain_names = [subtoolchain_names]
         # grab the easyconfig of the current toolchain and search the dependencies for a version of the subtoolchain
-        path = robot_find_easyconfig(current_tc_name, current_tc_version)
+        path = find_ec(current_tc_name, current_tc_version)
         if path is None:
             raise EasyBuildError("Could not find easyconfig for %s toolchain version %s",
                                  current_tc_name, current_tc_version)
@@ -376,7 +406,7 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
             ])
 
             # find easyconfig file for this dep and parse it
-            ecfile = robot_find_easyconfig(dep['name'], det_full_ec_version(dep))
+            ecfile = find_ec(dep['name'], det_full_ec_version(dep))
             if ecfile is None:
                 raise EasyBuildError("Could not find easyconfig for dependency %s with version %s",
                                      dep['name'], det_full_ec_version(dep))
@@ -395,7 +425,7 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
             # only do this for composite toolchains, not single-compiler toolchains, whose
             # versions match those of the component instead of being e.g. "2018a".
             if dep in composite_toolchains:
-                ecfile = robot_find_easyconfig(dep, current_tc_version)
+                ecfile = find_ec(dep, current_tc_version)
                 if ecfile is not None:
                     cands.append({'name': dep, 'version': current_tc_version})
 
@@ -431,6 +461,10 @@ def get_toolchain_hierarchy(parent_toolchain, incl_capabilities=False):
                     toolchain[capability] = getattr(tc, capability)()
 
     _log.info("Found toolchain hierarchy for toolchain %s: %s", parent_toolchain, toolchain_hierarchy)
+
+    if tc_hierarchy_table is not None:
+        tc_hierarchy_table.add(parent_toolchain, incl_capabilities, context, ec_lookups, toolchain_hierarchy)
+
     return toolchain_hierarchy
 
 
@@ -454,6 +488,8 @@ class EasyConfig:
         :param local_var_naming_check: mode to use when checking if local variables use the recommended naming scheme
         """
         self.template_values = None
+        # cache for values of easyconfig parameters with templates resolved, see _get_resolved_value
+        self._resolved_values = {}
         # a boolean to control templating, can be (temporarily) disabled via disable_templating context manager
         self._templating_enabled = True
         # boolean to control whether all template values must be resolvable on access,
@@ -475,7 +511,7 @@ class EasyConfig:
                 raise EasyBuildError('Easyconfig file is empty')
         else:
             self.rawtxt = rawtxt
-            self.log.debug("Supplied raw easyconfig contents: %s" % self.rawtxt)
+            self.log.debug("Supplied raw easyconfig contents: %s", self.rawtxt)
 
         # constructing easyconfig parser object includes a "raw" parse,
         # which serves as a check to see whether supplied easyconfig file is an actual easyconfig...
@@ -490,7 +526,7 @@ class EasyConfig:
         if self.valid_module_classes is not None:
             self.log.info("Obtained list of valid module classes: %s" % self.valid_module_classes)
 
-        self._config = copy.deepcopy(DEFAULT_CONFIG)
+        self._config = EasyConfigParameters()
 
         # obtain name and easyblock specifications from raw easyconfig contents
         self.software_name, self.easyblock = fetch_parameters_from_easyconfig(self.rawtxt, ['name', 'easyblock'])
@@ -508,8 +544,8 @@ class EasyConfig:
 
         self.mandatory = MANDATORY_PARAMS[:]
 
-        # deep copy to make sure self.extra_options remains unchanged
-        self.extend_params(copy.deepcopy(self.extra_options))
+        # no need to copy, self.extra_options remains unchanged since default values are only copied when needed
+        self.extend_params(self.extra_options)
 
         # set valid stops
         self.valid_stops = build_option('valid_stops')
@@ -616,6 +652,18 @@ class EasyConfig:
         finally:
             self._expect_resolved_template_values = old_expect_resolved_template_values
 
+    @property
+    def template_values(self):
+        """Template values for this easyconfig (TemplateValues instance, or None if not generated yet)."""
+        return self._template_values
+
+    @template_values.setter
+    def template_values(self, template_values):
+        """Set template values, which are tracked for changes so resolved values can be cached."""
+        if template_values is not None and not isinstance(template_values, TemplateValues):
+            template_values = TemplateValues(template_values)
+        self._template_values = template_values
+
     @property
     def expect_resolved_template_values(self):
         """Check whether resolving all template values on access is enforced."""
@@ -659,21 +707,36 @@ class EasyConfig:
     def copy(self, validate=None):
         """
         Return a copy of this EasyConfig instance.
+
+        The easyconfig file is not parsed again, the state of this instance is copied directly instead.
+        Values of easyconfig parameters are shared between this instance and the copy until they are accessed
+        in a way that allows modifying them in place (copy-on-write), see EasyConfigParameters.
         """
         if validate is None:
             validate = self.validation
 
-        # create a new EasyConfig instance
-        ec = EasyConfig(self.path, validate=validate, hidden=self.hidden, rawtxt=self.rawtxt)
-        # take a copy of the actual config dictionary (which already contains the extra options)
-        ec._config = copy.deepcopy(self._config)
-        ec._parallel = self._parallel  # Might be already set, e.g. for extensions
-        # since rawtxt is defined, self.path may not get inherited, make sure it does
-        if self.path:
-            ec.path = self.path
+        # create a new EasyConfig instance without calling __init__, to avoid re-parsing the easyconfig file
+        ec = self.__class__.__new__(self.__class__)
+        ec.__dict__.update(self.__dict__)
+
+        ec._config = self._config.copy()
+
+        # copy template values, since re-generating them may not give the same set of template values straight away
+        if self.template_values is not None:
+            ec.template_values = copy.copy(self.template_values)
+        ec._resolved_values = {}
 
-        # also copy template values, since re-generating them may not give the same set of template values straight away
-        ec.template_values = copy.deepcopy(self.template_values)
+        for attr in ('iterate_options', 'mandatory'):
+            setattr(ec, attr, getattr(self, attr)[:])
+        ec.validations = self.validations.copy()
+
+        # toolchain instance and list of all dependencies are (re)created on demand
+        ec._toolchain = None
+        ec._all_dependencies = None
+
+        ec.validation = build_option('validate') and validate
+        if ec.validation and not self.validation:
+            ec.validate(check_osdeps=build_option('check_osdeps'))
 
         return ec
 
@@ -740,7 +803,7 @@ class EasyConfig:
                 # validations are skipped, just set in the config
                 if any(key in x.keys() for x in (self._config, ALTERNATIVE_EASYCONFIG_PARAMETERS,
                                                  DEPRECATED_EASYCONFIG_PARAMETERS)):
-                    self[key] = params[key]
+                    self.set_value(key, params[key], owned=True)
                     self.log.info("setting easyconfig parameter %s: value %s (type: %s)",
                                   key, self[key], type(self[key]))
                 else:
@@ -759,12 +822,12 @@ class EasyConfig:
         else:
             raise EasyBuildError("Specifications should be specified using a dictionary, got %s",
                                  type(self.build_specs))
-        self.log.debug("Obtained specs dict %s" % arg_specs)
+        self.log.debug("Obtained specs dict %s", arg_specs)
 
         self.log.info("Parsing easyconfig file %s with rawcontent: %s", self.path, self.rawtxt)
         self.parser.set_specifications(arg_specs)
         ec_vars = self.parser.get_config_dict()
-        self.log.debug("Parsed easyconfig as a dictionary: %s" % ec_vars)
+        self.log.debug("Parsed easyconfig as a dictionary: %s", ec_vars)
 
         # make sure all mandatory parameters are defined
         # this includes both generic mandatory parameters and software-specific parameters defined via extra_options
@@ -814,9 +877,10 @@ class EasyConfig:
             def remove_false_versions(deps):
                 return [dep for dep in deps if not (isinstance(dep, dict) and dep['version'] is False)]
 
-            self['dependencies'] = remove_false_versions(self._parse_dependency(dep) for dep in self['dependencies'])
-            self['hiddendependencies'] = remove_false_versions(self._parse_dependency(dep, hidden=True) for dep in
-                                                               self['hiddendependencies'])
+            deps = remove_false_versions(self._parse_dependency(dep) for dep in self['dependencies'])
+            self.set_value('dependencies', deps, owned=True)
+            hiddendeps = [self._parse_dependency(dep, hidden=True) for dep in self['hiddendependencies']]
+            self.set_value('hiddendependencies', remove_false_versions(hiddendeps), owned=True)
 
             # need to take into account that builddependencies may need to be iterated over,
             # i.e. when the value is a list of lists of tuples
@@ -826,7 +890,7 @@ class EasyConfig:
                 builddeps = [[self._parse_dependency(dep, build_only=True) for dep in x] for x in builddeps]
             else:
                 builddeps = [self._parse_dependency(dep, build_only=True) for dep in builddeps]
-            self['builddependencies'] = remove_false_versions(builddeps)
+            self.set_value('builddependencies', remove_false_versions(builddeps), owned=True)
 
             # keep track of parsed multi deps, they'll come in handy during sanity check & module steps...
             self.multi_deps = self.get_parsed_multi_deps()
@@ -1776,6 +1840,7 @@ class EasyConfig:
                 deps = flatten(deps)
                 deps_ref = flatten(deps_ref)
 
+            deps_to_finalise = []
             for idx, dep in enumerate(deps):
 
                 # reference to original dep dict, this is the one we should be updating
@@ -1785,23 +1850,38 @@ class EasyConfig:
                     self.log.debug("Skipping filtered dependency %s when finalising dependencies", orig_dep['name'])
                     continue
 
-                # handle dependencies with inherited (non-system) toolchain
-                # this *must* be done after parsing all dependencies, to avoid problems with templates like %(pyver)s
-                if dep['toolchain_inherited'] and not is_system_toolchain(dep['toolchain']['name']):
-                    tc = None
+                deps_to_finalise.append((dep, orig_dep))
+
+            # handle dependencies with inherited (non-system) toolchain,
+            # subtoolchains are determined for all of them at once;
+            # this *must* be done after parsing all dependencies, to avoid problems with templates like %(pyver)s
+            minimal_toolchains = build_option('minimal_toolchains')
+            tc_inherited_deps = [dep for (dep, _) in deps_to_finalise
+                                 if dep['toolchain_inherited'] and not is_system_toolchain(dep['toolchain']['name'])]
+            if tc_inherited_deps:
+                self.log.debug("Figuring out toolchain to use for deps %s...", tc_inherited_deps)
+                if minimal_toolchains:
+                    # determine 'smallest' subtoolchain for which a matching easyconfig file is available
+                    self.log.debug("Looking for minimal toolchain for dependencies %s...",
+                                   ', '.join(dep['name'] for dep in tc_inherited_deps))
+                    subtcs = robot_find_subtoolchains_for_deps(tc_inherited_deps, self.modules_tool)
+                else:
+                    # try to determine subtoolchain for deps;
+                    # this is done considering both available modules and easyconfigs (in that order)
+                    subtcs = robot_find_subtoolchains_for_deps(tc_inherited_deps, self.modules_tool, parent_first=True)
+                subtcs = dict(zip([id(dep) for dep in tc_inherited_deps], subtcs))
+            else:
+                subtcs = {}
+
+            for dep, orig_dep in deps_to_finalise:
+
+                if id(dep) in subtcs:
+                    tc = subtcs[id(dep)]
                     dep_str = '%s %s%s' % (dep['name'], dep['version'], dep['versionsuffix'])
-                    self.log.debug("Figuring out toolchain to use for dep %s...", dep)
-                    if build_option('minimal_toolchains'):
-                        # determine 'smallest' subtoolchain for which a matching easyconfig file is available
-                        self.log.debug("Looking for minimal toolchain for dependency %s (parent toolchain: %s)...",
-                                       dep_str, dep['toolchain'])
-                        tc = robot_find_subtoolchain_for_dep(dep, self.modules_tool)
+                    if minimal_toolchains:
                         if tc is None:
                             raise EasyBuildError("Failed to determine minimal toolchain for dep %s", dep_str)
                     else:
-                        # try to determine subtoolchain for dep;
-                        # this is done considering both available modules and easyconfigs (in that order)
-                        tc = robot_find_subtoolchain_for_dep(dep, self.modules_tool, parent_first=True)
                         self.log.debug("Using subtoolchain %s for dep %s", tc, dep_str)
 
                     if tc is None:
@@ -1891,15 +1971,45 @@ class EasyConfig:
     def __getitem__(self, key):
         """Return value of specified easyconfig parameter (without help text, etc.)"""
         try:
-            value = self._config[key][0]
+            if self.templating_enabled:
+                # resolving templates yields a copy of the value, so no need to copy default/shared values
+                value = self._get_resolved_value(key)
+            else:
+                # untemplated value may get modified in place,
+                # so make sure it's not a default value or a value shared with copies of this instance
+                value = self._config.get_ref(key)
         except KeyError:
             raise EasyBuildError("Use of unknown easyconfig parameter '%s' when getting parameter value", key)
 
-        if self.templating_enabled:
-            value = self.resolve_template(value)
-
         return value
 
+    def _get_resolved_value(self, key):
+        """
+        Return (copy of) value of specified easyconfig parameter with templates resolved.
+
+        Resolved values are cached until either the value of the easyconfig parameter or the template values change;
+        values for which a reference was handed out (see get_ref) are not cached, since they may be modified in place.
+        """
+        value = self._config.get_value(key)
+        if not self.template_values:
+            self.generate_template_values()
+
+        tmpl_values = self.template_values
+        expect_resolved = self.expect_resolved_template_values
+        stamp = (tmpl_values.version, expect_resolved)
+        cacheable = not self._config.is_referenced(key)
+
+        cached = self._resolved_values.get(key) if cacheable else None
+        if cached and cached[0] is value and cached[1] is tmpl_values and cached[2] == stamp:
+            resolved_value = cached[3]
+        else:
+            resolved_value = resolve_template(value, tmpl_values, expect_resolved=expect_resolved)
+            if cacheable:
+                self._resolved_values[key] = (value, tmpl_values, stamp, resolved_value)
+
+        # cached value must not be modified, so hand out a copy
+        return copy_resolved_value(resolved_value)
+
     def is_mandatory_param(self, key):
         """Check whether specified easyconfig parameter is mandatory."""
         return key in self.mandatory
@@ -1917,11 +2027,20 @@ class EasyConfig:
 
         return ref
 
-    @handle_deprecated_or_replaced_easyconfig_parameters
     def __setitem__(self, key, value):
         """Set value of specified easyconfig parameter (help text & co is left untouched)"""
+        self.set_value(key, value)
+
+    @handle_deprecated_or_replaced_easyconfig_parameters
+    def set_value(self, key, value, owned=False):
+        """
+        Set value of specified easyconfig parameter (help text & co is left untouched)
+
+        :param owned: whether no other references to the value are kept (by the caller),
+                      so it is safe to cache the value with resolved templates
+        """
         if key in self._config:
-            self._config[key][0] = value
+            self._config.set_value(key, value, owned=owned)
         else:
             raise EasyBuildError("Use of unknown easyconfig parameter '%s' when setting parameter value to '%s'",
                                  key, value)
@@ -1975,11 +2094,11 @@ class EasyConfig:
         res = {}
         # Not all values can be resolved, e.g. %(installdir)s
         with self.allow_unresolved_templates():
-            for key, tup in self._config.items():
-                value = tup[0]
+            for key in self._config:
                 if self.templating_enabled:
-                    value = self.resolve_template(value)
-                res[key] = value
+                    res[key] = self._get_resolved_value(key)
+                else:
+                    res[key] = self._config.get_value(key)
         return res
 
     def get_cuda_cc_template_value(self, key, required=True):
@@ -2153,6 +2272,36 @@ def get_module_path(name, generic=None, decode=True):
     return '.'.join(modpath + [module_name])
 
 
+def extended_template_dict(tmpl_dict):
+    """
+    Extend given template dictionary with alternative and deprecated templates.
+    Returns extended template dictionary, and dictionary with values for deprecated templates.
+    """
+    # map old templates to new values for alternative and deprecated templates
+    alt_map = {old_tmpl: tmpl_dict[new_tmpl] for (old_tmpl, new_tmpl) in
+               ALTERNATIVE_EASYCONFIG_TEMPLATES.items() if new_tmpl in tmpl_dict}
+    alt_map2 = {new_tmpl: tmpl_dict[old_tmpl] for (old_tmpl, new_tmpl) in
+                ALTERNATIVE_EASYCONFIG_TEMPLATES.items() if old_tmpl in tmpl_dict}
+    depr_map = {old_tmpl: tmpl_dict[new_tmpl] for (old_tmpl, (new_tmpl, _)) in
+                DEPRECATED_EASYCONFIG_TEMPLATES.items() if new_tmpl in tmpl_dict}
+
+    return {**tmpl_dict, **alt_map, **alt_map2, **depr_map}, depr_map
+
+
+def copy_resolved_value(value):
+    """
+    Return copy of given value with resolved templates (see resolve_template),
+    without copying strings or other values that are not modified by resolving templates.
+    """
+    if isinstance(value, list):
+        value = [copy_resolved_value(val) for val in value]
+    elif isinstance(value, tuple):
+        value = tuple(copy_resolved_value(val) for val in value)
+    elif isinstance(value, dict):
+        value = {key: copy_resolved_value(val) for key, val in value.items()}
+    return value
+
+
 def resolve_template(value, tmpl_dict, expect_resolved=True):
     """Given a value, try to susbstitute the templated strings with actual values.
         - value: some python object (supported are string, tuple/list, dict or some mix thereof)
@@ -2184,7 +2333,7 @@ def resolve_template(value, tmpl_dict, expect_resolved=True):
         # '%%(name)s' -> '%%(name)s'
         if '%' in value:
             raw_value = value
-            value = re.sub(re.compile(r'(%)(?!%*\(\w+\)s)'), r'\1\1', value)
+            value = TEMPLATE_ESCAPE_REGEX.sub(r'\1\1', value)
 
             try:
                 value = value % tmpl_dict
@@ -2193,15 +2342,13 @@ def resolve_template(value, tmpl_dict, expect_resolved=True):
                 try:
                     orig_value = value
                     # map old templates to new values for alternative and deprecated templates
-                    alt_map = {old_tmpl: tmpl_dict[new_tmpl] for (old_tmpl, new_tmpl) in
-                               ALTERNATIVE_EASYCONFIG_TEMPLATES.items() if new_tmpl in tmpl_dict.keys()}
-                    alt_map2 = {new_tmpl: tmpl_dict[old_tmpl] for (old_tmpl, new_tmpl) in
-                                ALTERNATIVE_EASYCONFIG_TEMPLATES.items() if old_tmpl in tmpl_dict.keys()}
-                    depr_map = {old_tmpl: tmpl_dict[new_tmpl] for (old_tmpl, (new_tmpl, ver)) in
-                                DEPRECATED_EASYCONFIG_TEMPLATES.items() if new_tmpl in tmpl_dict.keys()}
+                    if isinstance(tmpl_dict, TemplateValues):
+                        ext_tmpl_dict, depr_map = tmpl_dict.derived(extended_template_dict)
+                    else:
+                        ext_tmpl_dict, depr_map = extended_template_dict(tmpl_dict)
 
                     # try templating with alternative and deprecated templates included
-                    value = value % {**tmpl_dict, **alt_map, **alt_map2, **depr_map}
+                    value = value % ext_tmpl_dict
 
                     for old_tmpl, val in depr_map.items():
                         # check which deprecated templates were replaced, and issue deprecation warnings
@@ -2327,6 +2474,78 @@ def process_easyconfig(path, build_specs=None, validate=True, parse_only=False,
     return easyconfigs
 
 
+def _process_easyconfig_in_worker(path, build_specs, validate):
+    """
+    Process easyconfig in worker process, see process_easyconfigs.
+    The result of process_easyconfig can be pickled, so it can be passed back to the main process as is.
+    """
+    return process_easyconfig(path, build_specs=build_specs, validate=validate)
+
+
+def process_easyconfigs(paths, build_specs=None, validate=True):
+    """
+    Process multiple easyconfig files, using a pool of worker processes if possible, see process_easyconfig.
+
+    The result for each of the easyconfig files is yielded as soon as it is available (in the order of the paths),
+    including the EasyConfig instances that were reconstructed in the current process.
+    An error that occurred while processing an easyconfig file in a worker process is raised
+    when the result for that easyconfig file is requested.
+
+    Easyconfig files are processed in the current process if a parse hook is defined
+    (since hooks may rely on running in the main EasyBuild process), if asynchronous logging is enabled,
+    or if worker processes can not be forked.
+
+    :param paths: list of paths to easyconfig files
+    :param build_specs: dictionary specifying build specifications (e.g. version, toolchain, ...)
+    :param validate: whether or not to perform validation
+    """
+    # easyconfig files for which a result is cached already are not passed to worker processes
+    hidden = build_option('hidden')
+    if build_specs:
+        todo = nub(paths)
+    else:
+        todo = nub(path for path in paths if (path, validate, hidden, False) not in _easyconfigs_cache)
+
+    max_workers = min(len(todo), get_avail_core_count())
+
+    use_workers = max_workers > 1
+    if use_workers and find_hook(PARSE, load_hooks(build_option('hooks'))):
+        _log.info("Parse hook is defined, so processing easyconfigs in main process")
+        use_workers = False
+    if use_workers and build_option('async_logging', default=False):
+        _log.info("Asynchronous logging is enabled, so processing easyconfigs in main process")
+        use_workers = False
+    if use_workers and 'fork' not in multiprocessing.get_all_start_methods():
+        _log.info("Worker processes can not be forked, so processing easyconfigs in main process")
+        use_workers = False
+
+    if not use_workers:
+        for path in paths:
+            yield process_easyconfig(path, build_specs=build_specs, validate=validate)
+        return
+
+    _log.info("Processing %d easyconfigs using %d worker processes", len(todo), max_workers)
+    # worker processes are forked, so they inherit EasyBuild configuration
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'))
+    try:
+        # use multiple chunks per worker process, to balance the load
+        chunksize = max(1, len(todo) // (max_workers * 4))
+        todo_results = pool.map(_process_easyconfig_in_worker, todo, itertools.repeat(build_specs),
+                                itertools.repeat(validate), chunksize=chunksize)
+        todo = set(todo)
+        for path in paths:
+            if path in todo:
+                easyconfigs = next(todo_results)
+                if not build_specs:
+                    _easyconfigs_cache[(path, validate, hidden, False)] = [e.copy() for e in easyconfigs]
+                todo.remove(path)
+                yield easyconfigs
+            else:
+                yield process_easyconfig(path, build_specs=build_specs, validate=validate)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
 def letter_dir_for(name):
     """
     Determine 'letter' directory for specified software name.
@@ -2472,64 +2691,110 @@ def robot_find_subtoolchain_for_dep(dep, modtool, parent_tc=None, parent_first=F
     :param parent_first: reverse order in which subtoolchains are considered: parent toolchain, then subtoolchains
     :return: minimal toolchain for which an easyconfig exists for this dependency (and matches build_options)
     """
-    if parent_tc is None:
-        parent_tc = dep['toolchain']
+    return robot_find_subtoolchains_for_deps([dep], modtool, parent_tc=parent_tc, parent_first=parent_first)[0]
+
+
+def robot_find_subtoolchains_for_deps(deps, modtool, parent_tc=None, parent_first=False):
+    """
+    Find the subtoolchain to use for each of the specified dependencies (see robot_find_subtoolchain_for_dep).
+
+    Available modules are only determined once, and the existence of the modules for candidate subtoolchains
+    is checked for all dependencies at once.
 
+    :param deps: list of dependency target dicts (long and short module names may not exist yet)
+    :param parent_tc: toolchain from which to derive the toolchain hierarchy to search (default: use dep's toolchain)
+    :param parent_first: reverse order in which subtoolchains are considered: parent toolchain, then subtoolchains
+    :return: list with minimal toolchain for each dependency for which an easyconfig exists (and matches build_options)
+    """
     retain_all_deps = build_option('retain_all_deps')
     use_existing_modules = build_option('use_existing_modules') and not retain_all_deps
+    check_modules = parent_first or use_existing_modules
 
-    if parent_first or use_existing_modules:
+    if check_modules:
         avail_modules = modtool.available()
     else:
         avail_modules = []
 
-    newdep = copy.deepcopy(dep)
-
-    # try to determine toolchain hierarchy
-    # this may fail if not all easyconfig files that define this toolchain are available,
-    # but that's not always fatal: it's mostly irrelevant under --review-pr for example
-    try:
-        toolchain_hierarchy = get_toolchain_hierarchy(parent_tc)
-    except EasyBuildError as err:
-        warning_msg = "Failed to determine toolchain hierarchy for %(name)s/%(version)s when determining " % parent_tc
-        warning_msg += "subtoolchain for dependency '%s': %s" % (dep['name'], err)
-        _log.warning(warning_msg)
-        print_warning(warning_msg, silent=build_option('silent'))
-        toolchain_hierarchy = []
-
-    # start with subtoolchains first, i.e. first (system or) compiler-only toolchain, etc.,
-    # unless parent toolchain should be considered first
-    if parent_first:
-        toolchain_hierarchy = toolchain_hierarchy[::-1]
-
-    cand_subtcs = []
-
-    for tc in toolchain_hierarchy:
-        # try to determine module name using this particular subtoolchain;
-        # this may fail if no easyconfig is available in robot search path
-        # and the module naming scheme requires an easyconfig file
-        newdep['toolchain'] = tc
-        mod_name = ActiveMNS().det_full_module_name(newdep, require_result=False)
-
-        # if the module name can be determined, subtoolchain is an actual candidate
-        if mod_name:
-            # check whether module already exists or not (but only if that info will actually be used)
-            mod_exists = None
-            if parent_first or use_existing_modules:
-                mod_exists = mod_name in avail_modules
-                # fallback to checking with modtool.exist is required,
-                # for hidden modules and external modules where module name may be partial
-                if not mod_exists:
-                    maybe_partial = dep.get('external_module', True)
-                    mod_exists = modtool.exist([mod_name], skip_avail=True, maybe_partial=maybe_partial)[0]
-
-            # add the subtoolchain to list of candidates
-            cand_subtcs.append({'toolchain': tc, 'mod_exists': mod_exists})
+    # determine candidate subtoolchains for all dependencies
+    toolchain_hierarchies = {}
+    cand_subtcs_for_deps = []
+    for dep in deps:
+        dep_parent_tc = dep['toolchain'] if parent_tc is None else parent_tc
+
+        # try to determine toolchain hierarchy
+        # this may fail if not all easyconfig files that define this toolchain are available,
+        # but that's not always fatal: it's mostly irrelevant under --review-pr for example
+        tc_key = (dep_parent_tc['name'], dep_parent_tc['version'])
+        if tc_key not in toolchain_hierarchies:
+            try:
+                toolchain_hierarchies[tc_key] = (get_toolchain_hierarchy(dep_parent_tc), None)
+            except EasyBuildError as err:
+                toolchain_hierarchies[tc_key] = ([], err)
+
+        toolchain_hierarchy, err = toolchain_hierarchies[tc_key]
+        if err is not None:
+            warning_msg = "Failed to determine toolchain hierarchy for %(name)s/%(version)s " % dep_parent_tc
+            warning_msg += "when determining subtoolchain for dependency '%s': %s" % (dep['name'], err)
+            _log.warning(warning_msg)
+            print_warning(warning_msg, silent=build_option('silent'))
+
+        # start with subtoolchains first, i.e. first (system or) compiler-only toolchain, etc.,
+        # unless parent toolchain should be considered first
+        if parent_first:
+            toolchain_hierarchy = toolchain_hierarchy[::-1]
+
+        newdep = copy.deepcopy(dep)
+        cand_subtcs = []
+        for tc in toolchain_hierarchy:
+            # try to determine module name using this particular subtoolchain;
+            # this may fail if no easyconfig is available in robot search path
+            # and the module naming scheme requires an easyconfig file
+            newdep['toolchain'] = tc
+            mod_name = ActiveMNS().det_full_module_name(newdep, require_result=False)
+
+            # if the module name can be determined, subtoolchain is an actual candidate
+            if mod_name:
+                # whether module already exists or not is determined below (but only if that info will actually be used)
+                mod_exists = None
+                if check_modules:
+                    mod_exists = mod_name in avail_modules
+                cand_subtcs.append({'toolchain': tc, 'mod_exists': mod_exists, 'mod_name': mod_name})
+
+        cand_subtcs_for_deps.append(cand_subtcs)
+
+    # fallback to checking with modtool.exist is required,
+    # for hidden modules and external modules where module name may be partial;
+    # this is done for all candidates at once (grouped by whether module name may be partial)
+    if check_modules:
+        for maybe_partial in (True, False):
+            to_check = [cand for (dep, cand_subtcs) in zip(deps, cand_subtcs_for_deps) for cand in cand_subtcs
+                        if not cand['mod_exists'] and dep.get('external_module', True) == maybe_partial]
+            if to_check:
+                mod_names = nub([cand['mod_name'] for cand in to_check])
+                mods_exist = dict(zip(mod_names, modtool.exist(mod_names, skip_avail=True,
+                                                               maybe_partial=maybe_partial)))
+                for cand in to_check:
+                    cand['mod_exists'] = mods_exist[cand['mod_name']]
+
+    return [select_subtoolchain_for_dep(dep, cand_subtcs, parent_first, use_existing_modules)
+            for (dep, cand_subtcs) in zip(deps, cand_subtcs_for_deps)]
+
+
+def select_subtoolchain_for_dep(dep, cand_subtcs, parent_first, use_existing_modules):
+    """
+    Select subtoolchain to use for dependency, from list of candidate subtoolchains.
 
+    :param dep: dependency target dict
+    :param cand_subtcs: list of dicts for candidate subtoolchains (toolchain, whether module exists)
+    :param parent_first: whether candidate subtoolchains are ordered starting with the parent toolchain
+    :param use_existing_modules: whether existing modules should be considered
+    """
     _log.debug("List of possible subtoolchains for %s: %s", dep, cand_subtcs)
 
     cand_subtcs_with_mod = [tc for tc in cand_subtcs if tc.get('mod_exists', False)]
 
+    newdep = copy.deepcopy(dep)
+
     # scenario I:
     # - regardless of whether minimal toolchains mode is enabled or not
     # - try to pick subtoolchain based on available easyconfigs (first hit wins)
@@ -0,0 +1,250 @@
+# #
+# Copyright 2026-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+
+
+"""
+Easyconfig module that provides a compact store for the values of easyconfig parameters.
+
+Metadata of easyconfig parameters (default value, help text, category) is shared between all stores,
+only values that were set explicitly (or that were obtained in a way that allows modifying them in place)
+are stored per instance.
+"""
+import copy
+from collections.abc import MutableMapping
+
+from easybuild.framework.easyconfig.default import DEFAULT_CONFIG
+from easybuild.tools.build_log import EasyBuildError
+
+
+# metadata for default easyconfig parameters, shared by all stores: name -> (default value, help text, category)
+DEFAULT_PARAMETERS = {key: tuple(val) for key, val in DEFAULT_CONFIG.items()}
+
+
+class EasyConfigParameter:
+    """
+    View on an easyconfig parameter in an EasyConfigParameters store,
+    which behaves like a [value, help text, category] list.
+    """
+    __slots__ = ('_store', '_key')
+
+    def __init__(self, store, key):
+        """Create view on specified easyconfig parameter in specified store."""
+        self._store = store
+        self._key = key
+
+    def __getitem__(self, idx):
+        """Get value (index 0), help text (index 1) or category (index 2) of easyconfig parameter."""
+        if isinstance(idx, slice):
+            # only copy value if it's included in the slice
+            return (list(self) if 0 in range(3)[idx] else self._as_list())[idx]
+        if idx in (0, -3):
+            return self._store.get_ref(self._key)
+        return self._store.get_metadata(self._key)[idx]
+
+    def __setitem__(self, idx, value):
+        """Set value of easyconfig parameter (help text and category can not be changed)."""
+        if idx in (0, -3):
+            self._store.set_value(self._key, value)
+        else:
+            raise EasyBuildError("Only value of easyconfig parameter '%s' can be changed", self._key)
+
+    def __iter__(self):
+        """Iterate over value, help text and category of easyconfig parameter."""
+        _, help_txt, category = self._store.get_metadata(self._key)
+        return iter([self[0], help_txt, category])
+
+    def __len__(self):
+        """Easyconfig parameters always have a value, help text and category."""
+        return 3
+
+    def _as_list(self):
+        """Return [value, help text, category] list, without copying the value (so it must not be modified)."""
+        _, help_txt, category = self._store.get_metadata(self._key)
+        return [self._store.get_value(self._key), help_txt, category]
+
+    def __eq__(self, other):
+        """Compare with other easyconfig parameter, or list/tuple with value, help text and category."""
+        if isinstance(other, EasyConfigParameter):
+            other = other._as_list()
+        return self._as_list() == list(other)
+
+    def __repr__(self):
+        """Return string representation of easyconfig parameter."""
+        return repr(self._as_list())
+
+
+class EasyConfigParameters(MutableMapping):
+    """
+    Store for easyconfig parameters, which behaves like a dict that maps the name of easyconfig parameters
+    to [value, help text, category] lists.
+
+    Default values are only copied into the store (materialised) when they are obtained in a way
+    that allows modifying them in place (see get_ref), values are never copied when they're just read (see get_value).
+    Values can be shared with copies of a store (see copy) until they're modified (copy-on-write).
+    """
+    __slots__ = ('_defaults', '_extra', '_values', '_shared', '_refs')
+
+    def __init__(self, defaults=None):
+        """
+        Create new store of easyconfig parameters.
+
+        :param defaults: dict with metadata for easyconfig parameters (name -> (default value, help text, category));
+                         metadata for default easyconfig parameters is used if not specified (see DEFAULT_PARAMETERS)
+        """
+        # metadata for (default) easyconfig parameters, which is shared with other stores, so never modified
+        self._defaults = DEFAULT_PARAMETERS if defaults is None else defaults
+        # metadata for easyconfig parameters that were added to this store, see __setitem__
+        self._extra = {}
+        # values of easyconfig parameters that were set or materialised
+        self._values = {}
+        # names of easyconfig parameters for which the value is shared with other stores
+        self._shared = set()
+        # names of easyconfig parameters for which a reference to the value was handed out (see get_ref),
+        # so the value may be modified in place at any time
+        self._refs = set()
+
+    def get_metadata(self, key):
+        """Return (default value, help text, category) tuple for specified easyconfig parameter."""
+        try:
+            return self._extra[key]
+        except KeyError:
+            return self._defaults[key]
+
+    def get_value(self, key):
+        """
+        Return value of specified easyconfig parameter, which must *not* be modified in place
+        (it may be a default value or a value that is shared with other stores).
+        """
+        try:
+            return self._values[key]
+        except KeyError:
+            return self.get_metadata(key)[0]
+
+    def get_ref(self, key):
+        """
+        Return value of specified easyconfig parameter, which can be modified in place:
+        default values are copied into the store first, as are values that are shared with other stores.
+        """
+        if key in self._values:
+            value = self._values[key]
+            if key in self._shared:
+                value = self._values[key] = copy.deepcopy(value)
+                self._shared.discard(key)
+        else:
+            value = self._values[key] = copy.deepcopy(self.get_metadata(key)[0])
+        self._refs.add(key)
+        return value
+
+    def set_value(self, key, value, owned=False):
+        """
+        Set value of specified (known) easyconfig parameter.
+
+        :param owned: whether the store becomes the owner of the value, i.e. no other references to it are kept;
+                      if not, (potentially) mutable values are treated like values for which a reference was
+                      handed out, since they may be modified in place by the caller at any time
+        """
+        if key not in self:
+            raise KeyError(key)
+        self._values[key] = value
+        self._shared.discard(key)
+        if owned or isinstance(value, (bool, float, int, str, type(None))):
+            self._refs.discard(key)
+        else:
+            self._refs.add(key)
+
+    def is_set(self, key):
+        """Check whether value of specified easyconfig parameter is stored in this store (rather than the default)."""
+        return key in self._values
+
+    def is_referenced(self, key):
+        """
+        Check whether a reference to the value of specified easyconfig parameter was handed out (see get_ref),
+        which implies that the value may have been modified in place.
+        """
+        return key in self._refs
+
+    def copy(self):
+        """
+        Return copy of this store: values are shared between both stores until they're modified (copy-on-write).
+        Values for which a reference was handed out are copied straight away, since they may be modified at any time.
+        """
+        res = EasyConfigParameters(defaults=self._defaults)
+        res._extra = self._extra.copy()
+        res._values = {key: copy.deepcopy(value) if key in self._refs else value for key, value in self._values.items()}
+        shared = set(self._values) - self._refs
+        self._shared.update(shared)
+        res._shared = shared
+        return res
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        """Return deep copy of this store."""
+        res = EasyConfigParameters(defaults=self._defaults)
+        res._extra = self._extra.copy()
+        res._values = copy.deepcopy(self._values, memo)
+        return res
+
+    def __contains__(self, key):
+        """Check whether specified easyconfig parameter is known."""
+        return key in self._extra or key in self._defaults
+
+    def __getitem__(self, key):
+        """Return [value, help text, category] view for specified easyconfig parameter."""
+        if key not in self:
+            raise KeyError(key)
+        return EasyConfigParameter(self, key)
+
+    def __setitem__(self, key, entry):
+        """Define easyconfig parameter, using [value, help text, category] list."""
+        value, help_txt, category = entry
+        self._extra[key] = (value, help_txt, category)
+        # specified value becomes default value for this easyconfig parameter, so it's only copied when needed
+        self._values.pop(key, None)
+        self._shared.discard(key)
+        self._refs.discard(key)
+
+    def __delitem__(self, key):
+        """Remove easyconfig parameter that was added to this store."""
+        if key in self._extra:
+            del self._extra[key]
+            self._values.pop(key, None)
+            self._shared.discard(key)
+            self._refs.discard(key)
+        elif key in self._defaults:
+            raise EasyBuildError("Can not remove default easyconfig parameter '%s'", key)
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        """Iterate over names of known easyconfig parameters."""
+        yield from self._defaults
+        for key in self._extra:
+            if key not in self._defaults:
+                yield key
+
+    def __len__(self):
+        """Return number of known easyconfig parameters."""
+        return len(self._defaults) + len([key for key in self._extra if key not in self._defaults])
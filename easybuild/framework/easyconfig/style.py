@@ -30,13 +30,25 @@ Authors:
 
 * Ward Poelmans (Ghent University)
 """
+import hashlib
+import io
+import json
+import multiprocessing
+import os
 import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from importlib import reload
 
 from easybuild.base import fancylogger
 from easybuild.framework.easyconfig.easyconfig import EasyConfig
 from easybuild.tools.build_log import EasyBuildError, print_msg
+from easybuild.tools.config import build_option
+from easybuild.tools.filetools import det_cache_path, prune_cache_dir, read_file, write_json_file
+from easybuild.tools.systemtools import get_avail_core_count
 from easybuild.tools.utilities import only_if_module_is_available
+from easybuild.tools.version import VERSION
 
 try:
     import pycodestyle
@@ -53,6 +65,19 @@ PARAM_DEF_REGEX = re.compile(r"^(?P<key>[a-z_]+)\s*=\s*")
 
 MAX_LINE_LENGTH = 120
 
+# style checks that are ignored
+IGNORED_CHECKS = (
+    'W291',  # replaced by W299
+    'E741',  # 'l' is considered an ambiguous name, but we use it often for 'lib'
+)
+
+STYLE_CHECK_CACHE_DIRNAME = 'style_check_cache'
+# location of easyconfig file in output of style check is replaced with this placeholder in style check cache
+STYLE_CHECK_CACHE_PATH_PLACEHOLDER = '<EASYCONFIG_PATH>'
+
+# style guide used to check easyconfig files in current process, see _init_style_guide
+_STYLE_GUIDE = None
+
 
 # Any function starting with _eb_check_ (see EB_CHECK variable) will be
 # added to the tests if the test number is added to the select list.
@@ -100,14 +125,13 @@ def _eb_check_trailing_whitespace(physical_line, lines, line_number, checker_sta
     return result
 
 
-@only_if_module_is_available('pycodestyle')
-def check_easyconfigs_style(easyconfigs, verbose=False):
+def _init_style_guide(verbose=False):
     """
-    Check the given list of easyconfigs for style
-    :param easyconfigs: list of file paths to easyconfigs
-    :param verbose: print our statistics and be verbose about the errors and warning
-    :return: the number of warnings and errors
+    Set up style guide to check easyconfig files in current process (also used to initialise worker processes)
+    :param verbose: be verbose about the errors and warnings
     """
+    global _STYLE_GUIDE
+
     reload(pycodestyle)
 
     # register the extra checks before using pep8:
@@ -124,18 +148,174 @@ def check_easyconfigs_style(easyconfigs, verbose=False):
     options.max_line_length = MAX_LINE_LENGTH
     # we ignore some tests
     # note that W291 has been replaced by our custom W299
-    options.ignore = (
-        'W291',  # replaced by W299
-        'E741',  # 'l' is considered an ambiguous name, but we use it often for 'lib'
-    )
+    options.ignore = IGNORED_CHECKS
     options.verbose = int(verbose)
 
-    result = styleguide.check_files(easyconfigs)
+    _STYLE_GUIDE = styleguide
+
+
+def _check_easyconfig_style(path):
+    """
+    Check style of specified easyconfig file, using the style guide that was set up in the current process
+    :param path: path to easyconfig file
+    :return: dict with number of errors, output of style check, and counters and messages for reported error codes
+    """
+    report = _STYLE_GUIDE.init_report()
+    with redirect_stdout(io.StringIO()) as out:
+        _STYLE_GUIDE.check_files([path])
+
+    return {
+        'errors': report.total_errors,
+        'output': out.getvalue(),
+        'counters': {code: report.counters[code] for code in report.messages},
+        'messages': dict(report.messages),
+    }
+
+
+def det_style_check_cache_path():
+    """
+    Determine location of style check cache directory:
+    value for --style-check-cache-path if specified (an empty value disables the style check cache),
+    or in the EasyBuild cache directory (see det_cache_path).
+    """
+    return det_cache_path('style_check_cache_path', STYLE_CHECK_CACHE_DIRNAME)
+
+
+def style_check_cache_key(path, verbose=False):
+    """
+    Determine key for result of style check for specified easyconfig file in style check cache,
+    based on contents of the easyconfig file, and on the style check configuration
+    (the location of the easyconfig file is not taken into account, so results can be reused for copies of it,
+    like easyconfig files that are downloaded from a pull request).
+    Returns None if the easyconfig file can not be read.
+    """
+    txt = read_file(path, log_error=False, mode='rb')
+    if txt is None:
+        return None
+
+    config = [str(VERSION), pycodestyle.__version__, MAX_LINE_LENGTH, IGNORED_CHECKS, int(verbose)]
+    key = hashlib.sha256(json.dumps(config).encode('utf-8'))
+    key.update(txt)
+    return key.hexdigest()
+
+
+def _read_style_check_cache(cache_dir, key, path):
+    """
+    Return result of style check for specified easyconfig file from style check cache,
+    or None if there's no (valid) entry for it.
+
+    :param cache_dir: location of style check cache
+    :param key: key for easyconfig file in style check cache (see style_check_cache_key)
+    :param path: path to easyconfig file
+    """
+    cache_file = os.path.join(cache_dir, key + '.json')
+    try:
+        with open(cache_file) as fp:
+            res = json.load(fp)
+        # touch cache file, so it doesn't get removed while it's still being used (see prune_cache_dir)
+        os.utime(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    res['output'] = res['output'].replace(STYLE_CHECK_CACHE_PATH_PLACEHOLDER, path)
+    return res
+
+
+def _write_style_check_cache(cache_dir, key, path, res):
+    """
+    Add result of style check for specified easyconfig file to style check cache.
+
+    :param cache_dir: location of style check cache
+    :param key: key for easyconfig file in style check cache (see style_check_cache_key)
+    :param path: path to easyconfig file
+    :param res: result of style check (see _check_easyconfig_style)
+    """
+    entry = dict(res, output=res['output'].replace(path, STYLE_CHECK_CACHE_PATH_PLACEHOLDER))
+    try:
+        write_json_file(os.path.join(cache_dir, key + '.json'), entry, sort_keys=True)
+    except EasyBuildError as err:
+        _log.warning("Failed to add entry for %s to style check cache %s: %s", path, cache_dir, err)
+
+
+@only_if_module_is_available('pycodestyle')
+def check_easyconfigs_style_per_file(easyconfigs, verbose=False):
+    """
+    Check the given list of easyconfigs for style, using multiple processes;
+    results for easyconfig files that were checked before with the same contents (and style check configuration)
+    are taken from the style check cache.
+
+    :param easyconfigs: list of file paths to easyconfigs
+    :param verbose: be verbose about the errors and warnings
+    :return: list with result of style check for each of the easyconfigs (in order), see _check_easyconfig_style
+    """
+    cache_dir = det_style_check_cache_path()
+    if cache_dir:
+        keys = [style_check_cache_key(ec, verbose=verbose) for ec in easyconfigs]
+        results = [_read_style_check_cache(cache_dir, key, ec) if key else None for (ec, key) in zip(easyconfigs, keys)]
+    else:
+        keys = [None] * len(easyconfigs)
+        results = [None] * len(easyconfigs)
+
+    todo = [ec for (ec, res) in zip(easyconfigs, results) if res is None]
+    _log.info("Running style check on %d easyconfig(s) (results for %d easyconfig(s) found in cache)",
+              len(todo), len(easyconfigs) - len(todo))
+
+    if todo:
+        max_workers = min(len(todo), get_avail_core_count())
+        use_workers = max_workers > 1
+        if use_workers and build_option('async_logging', default=False):
+            _log.info("Asynchronous logging is enabled, so checking style of easyconfigs in main process")
+            use_workers = False
+        if use_workers and 'fork' not in multiprocessing.get_all_start_methods():
+            _log.info("Worker processes can not be forked, so checking style of easyconfigs in main process")
+            use_workers = False
+
+        if use_workers:
+            # use multiple chunks per worker process, to balance the load
+            chunksize = max(1, len(todo) // (max_workers * 4))
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'),
+                                     initializer=_init_style_guide, initargs=(verbose,)) as pool:
+                todo_results = list(pool.map(_check_easyconfig_style, todo, chunksize=chunksize))
+        else:
+            _init_style_guide(verbose=verbose)
+            todo_results = [_check_easyconfig_style(ec) for ec in todo]
+
+        todo_results = iter(todo_results)
+        for idx, (ec, key) in enumerate(zip(easyconfigs, keys)):
+            if results[idx] is None:
+                results[idx] = next(todo_results)
+                if key:
+                    _write_style_check_cache(cache_dir, key, ec, results[idx])
+
+        if cache_dir:
+            prune_cache_dir(cache_dir)
+
+    return results
+
+
+@only_if_module_is_available('pycodestyle')
+def check_easyconfigs_style(easyconfigs, verbose=False):
+    """
+    Check the given list of easyconfigs for style
+    :param easyconfigs: list of file paths to easyconfigs
+    :param verbose: print our statistics and be verbose about the errors and warning
+    :return: the number of warnings and errors
+    """
+    results = check_easyconfigs_style_per_file(easyconfigs, verbose=verbose)
+
+    counters, messages = {}, {}
+    for res in results:
+        sys.stdout.write(res['output'])
+        for code, cnt in res['counters'].items():
+            counters[code] = counters.get(code, 0) + cnt
+        messages.update(res['messages'])
 
     if verbose:
-        result.print_statistics()
+        # same format as used by pycodestyle.StandardReport.print_statistics
+        for code in sorted(messages):
+            print('%-7s %s %s' % (counters[code], code, messages[code]))
 
-    return result.total_errors
+    return sum(res['errors'] for res in results)
 
 
 def cmdline_easyconfigs_style_check(ecs):
@@ -146,7 +326,7 @@ def cmdline_easyconfigs_style_check(ecs):
     :return: True when style check passed on all easyconfig files, False otherwise
     """
     print_msg("\nRunning style check on %d easyconfig(s)...\n" % len(ecs), prefix=False)
-    style_check_passed = True
+    paths = []
     for ec in ecs:
         # if an EasyConfig instance is provided, just grab the corresponding file path
         if isinstance(ec, EasyConfig):
@@ -156,8 +336,12 @@ def cmdline_easyconfigs_style_check(ecs):
         else:
             raise EasyBuildError("Value of unknown type encountered in cmdline_easyconfigs_style_check: %s (type: %s)",
                                  ec, type(ec))
+        paths.append(path)
 
-        if check_easyconfigs_style([path]) == 0:
+    style_check_passed = True
+    for path, res in zip(paths, check_easyconfigs_style_per_file(paths)):
+        sys.stdout.write(res['output'])
+        if res['errors'] == 0:
             res = 'PASS'
         else:
             res = 'FAIL'
@@ -33,6 +33,7 @@ Authors:
 * Fotis Georgatos (Uni.Lu, NTUA)
 * Kenneth Hoste (Ghent University)
 """
+import copy
 import os
 import platform
 import re
@@ -303,6 +304,88 @@ for pyver in ('py2.py3', 'py2', 'py3'):
 # versionmajor, versionminor, versionmajorminor (eg '.'.join(version.split('.')[:2])) )
 
 
+class TemplateValues(dict):
+    """
+    Dictionary of template values that keeps track of changes being made to it (see 'version' attribute),
+    so results that are derived from the template values can be cached (see derived method).
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Create dictionary of template values."""
+        super().__init__(*args, **kwargs)
+        # incremented every time the template values are changed
+        self.version = 0
+        self._derived = {}
+
+    def _changed(self):
+        """Keep track of change to template values."""
+        self.version += 1
+        self._derived = {}
+
+    def derived(self, func):
+        """Return result of func(self), which is cached until template values are changed."""
+        try:
+            res = self._derived[func]
+        except KeyError:
+            res = self._derived[func] = func(self)
+        return res
+
+    def __setitem__(self, key, value):
+        """Set template value."""
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        """Remove template value."""
+        super().__delitem__(key)
+        self._changed()
+
+    def __ior__(self, other):
+        """Update template values (|= operator)."""
+        self.update(other)
+        return self
+
+    def clear(self):
+        """Remove all template values."""
+        super().clear()
+        self._changed()
+
+    def pop(self, *args):
+        """Remove template value, and return it."""
+        res = super().pop(*args)
+        self._changed()
+        return res
+
+    def popitem(self):
+        """Remove last template value, and return (key, value) tuple."""
+        res = super().popitem()
+        self._changed()
+        return res
+
+    def setdefault(self, key, default=None):
+        """Set template value if it's not set yet, and return it."""
+        res = super().setdefault(key, default)
+        self._changed()
+        return res
+
+    def update(self, *args, **kwargs):
+        """Update template values."""
+        super().update(*args, **kwargs)
+        self._changed()
+
+    def __copy__(self):
+        """Return (shallow) copy of template values."""
+        return TemplateValues(self)
+
+    def __deepcopy__(self, memo):
+        """Return deep copy of template values."""
+        return TemplateValues(copy.deepcopy(dict(self), memo))
+
+    def __reduce__(self):
+        """Support for pickling: only template values themselves are retained."""
+        return (TemplateValues, (dict(self),))
+
+
 def template_constant_dict(config, ignore=None, toolchain=None):
     """Create a dict for templating the values in the easyconfigs.
         - config -- Dict with the structure of EasyConfig._config
@@ -51,7 +51,7 @@ from easybuild.base import fancylogger
 from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
 from easybuild.framework.easyconfig.easyconfig import EASYCONFIGS_ARCHIVE_DIR, ActiveMNS, EasyConfig
 from easybuild.framework.easyconfig.easyconfig import create_paths, det_file_info, get_easyblock_class
-from easybuild.framework.easyconfig.easyconfig import process_easyconfig
+from easybuild.framework.easyconfig.easyconfig import process_easyconfig, process_easyconfigs  # noqa
 from easybuild.framework.easyconfig.style import cmdline_easyconfigs_style_check
 from easybuild.tools import LooseVersion
 from easybuild.tools.build_log import EasyBuildError, EasyBuildExit, print_error_and_exit, print_msg, print_warning
@@ -61,7 +61,7 @@ from easybuild.tools.filetools import EASYBLOCK_CLASS_PREFIX, get_cwd, find_easy
 from easybuild.tools.filetools import locate_files, read_file, resolve_path, which, write_file
 from easybuild.tools.github import GITHUB_EASYCONFIGS_REPO
 from easybuild.tools.github import det_pr_labels, det_pr_title, download_repo, fetch_easyconfigs_from_commit
-from easybuild.tools.github import fetch_easyconfigs_from_pr, fetch_pr_data
+from easybuild.tools.github import fetch_easyconfigs_from_pr, fetch_easyconfigs_from_prs, fetch_pr_data
 from easybuild.tools.github import fetch_files_from_commit, fetch_files_from_pr
 from easybuild.tools.multidiff import multidiff
 from easybuild.tools.toolchain.toolchain import is_system_toolchain
@@ -94,9 +94,9 @@ def skip_available(easyconfigs, modtool):
     retained_easyconfigs = []
     for ec, mod_name, mod_exists in zip(easyconfigs, module_names, modules_exist):
         if mod_exists:
-            _log.info("%s is already installed (module found), skipping" % mod_name)
+            _log.info("%s is already installed (module found), skipping", mod_name)
         else:
-            _log.debug("%s is not installed yet, so retaining it" % mod_name)
+            _log.debug("%s is not installed yet, so retaining it", mod_name)
             retained_easyconfigs.append(ec)
     return retained_easyconfigs
 
@@ -153,7 +153,7 @@ def find_resolved_modules(easyconfigs, avail_modules, modtool, retain_all_deps=F
 
         # if all dependencies have been resolved, add module for this easyconfig in the list of available modules
         if not easyconfig['dependencies']:
-            _log.debug("Adding easyconfig %s to final list" % easyconfig['spec'])
+            _log.debug("Adding easyconfig %s to final list", easyconfig['spec'])
             ordered_ecs.append(easyconfig)
             mod_name = easyconfig['full_mod_name']
             avail_modules.append(mod_name)
@@ -358,11 +358,12 @@ def det_easyconfig_paths(orig_paths):
 
     commit_files, pr_files = [], []
     if from_prs:
-        for pr in from_prs:
-            # path to where easyconfig files should be downloaded is determined
-            # via 'extra_ec_paths' build options,
-            # which corresponds to the list of commit/PR paths returned by alt_easyconfig_paths
-            pr_files.extend(fetch_easyconfigs_from_pr(pr))
+        # path to where easyconfig files should be downloaded is determined
+        # via 'extra_ec_paths' build options,
+        # which corresponds to the list of commit/PR paths returned by alt_easyconfig_paths;
+        # files for multiple PRs are fetched concurrently
+        for files in fetch_easyconfigs_from_prs(from_prs):
+            pr_files.extend(files)
     elif from_commit:
         commit_files = fetch_easyconfigs_from_commit(from_commit, files=ec_files)
 
@@ -398,6 +399,8 @@ def parse_easyconfigs(paths, validate=True):
     easyconfigs = []
     generated_ecs = False
     parsed_paths = []
+    # list of tuples with path and easyconfig file found in that path
+    ec_files = []
 
     for (path, generated) in paths:
         if not os.path.exists(path):
@@ -411,18 +414,27 @@ def parse_easyconfigs(paths, validate=True):
         # keep track of whether any files were generated
         generated_ecs |= generated
         try:
-            ec_files = find_easyconfigs(path, ignore_dirs=build_option('ignore_dirs'))
-            for ec_file in ec_files:
-                kwargs = {'validate': validate}
-                # only pass build specs when not generating easyconfig files
-                if not build_option('try_to_generate'):
-                    kwargs['build_specs'] = build_option('build_specs')
-
-                easyconfigs.extend(process_easyconfig(ec_file, **kwargs))
-
+            for ec_file in find_easyconfigs(path, ignore_dirs=build_option('ignore_dirs')):
+                ec_files.append((path, ec_file))
         except IOError as err:
             raise EasyBuildError("Processing easyconfigs in path %s failed: %s", path, err)
 
+    kwargs = {'validate': validate}
+    # only pass build specs when not generating easyconfig files
+    if not build_option('try_to_generate'):
+        kwargs['build_specs'] = build_option('build_specs')
+
+    # easyconfig files are processed in parallel, results are obtained in order
+    results = process_easyconfigs([ec_file for (_, ec_file) in ec_files], **kwargs)
+    try:
+        for (path, _) in ec_files:
+            try:
+                easyconfigs.extend(next(results))
+            except IOError as err:
+                raise EasyBuildError("Processing easyconfigs in path %s failed: %s", path, err)
+    finally:
+        results.close()
+
     return easyconfigs, generated_ecs
 
 
@@ -626,6 +626,7 @@ def process_eb_args(eb_args, eb_go, cfg_settings, modtool, testing, init_session
     success_msg += f"(total: {time2str(datetime.now() - start_time)})"
 
     repo = init_repository(get_repository(), get_repositorypath())
+    repo.flush_commits()
     repo.cleanup()
 
     # dump/upload overall test report
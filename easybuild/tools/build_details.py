@@ -57,4 +57,9 @@ def get_build_stats(app, start_time, command_line):
     for key, val in sorted(get_system_info().items()):
         buildstats.update({key: val})
 
+    # include summary of build profile (wall time, CPU time, peak memory usage per step), if available
+    build_profile = getattr(app, 'build_profile', None)
+    if build_profile is not None:
+        buildstats['build_profile'] = build_profile.summary()
+
     return buildstats
@@ -0,0 +1,276 @@
+# Copyright 2014-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Database with history of builds (build time, cores, peak memory usage),
+used to predict resource requirements for new builds.
+
+The build history is stored in a SQLite database, and is indexed by name, version, toolchain,
+CPU architecture of the host and number of cores used for the build.
+"""
+import math
+import os
+import sqlite3
+import time
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import det_cache_path, mkdir
+from easybuild.tools.systemtools import get_cpu_architecture
+
+
+BUILD_HISTORY_FILENAME = 'build_history.db'
+
+# columns used as key to look up builds, in order of relevance;
+# predictions are based on the most specific key for which there is history available
+BUILD_HISTORY_KEY = ('name', 'version', 'versionsuffix', 'toolchain', 'arch', 'cores')
+BUILD_HISTORY_LOOKUP_KEYS = [
+    BUILD_HISTORY_KEY,
+    ('name', 'version', 'versionsuffix', 'toolchain', 'arch'),
+    ('name', 'version', 'versionsuffix', 'toolchain'),
+    ('name', 'version'),
+    ('name',),
+]
+
+# number of most recent builds to take into account for predictions
+BUILD_HISTORY_PREDICTION_SAMPLES = 5
+
+_log = fancylogger.getLogger('build_history', fname=False)
+
+
+class BuildHistory:
+    """
+    History of builds, stored in a SQLite database.
+    """
+
+    def __init__(self, path):
+        """
+        Open (and initialise, if needed) build history database at specified location.
+
+        :param path: path to SQLite database file
+        """
+        self.path = path
+
+        mkdir(os.path.dirname(os.path.abspath(path)), parents=True)
+        try:
+            self.conn = sqlite3.connect(path, timeout=60)
+            with self.conn:
+                self.conn.execute("""CREATE TABLE IF NOT EXISTS builds (
+                    name TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    versionsuffix TEXT NOT NULL DEFAULT '',
+                    toolchain TEXT NOT NULL,
+                    arch TEXT NOT NULL,
+                    cores INTEGER,
+                    timestamp INTEGER NOT NULL,
+                    build_time REAL NOT NULL,
+                    peak_rss_kb INTEGER
+                )""")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS builds_key ON builds (%s)" % ', '.join(BUILD_HISTORY_KEY))
+        except sqlite3.Error as err:
+            raise EasyBuildError("Failed to open build history database %s: %s", path, err)
+
+    def close(self):
+        """Close connection to build history database."""
+        self.conn.close()
+
+    def add_build(self, name, version, toolchain, build_time, versionsuffix='', arch=None, cores=None,
+                  peak_rss_kb=None, timestamp=None):
+        """
+        Add build to history.
+
+        :param name: software name
+        :param version: software version
+        :param toolchain: toolchain used for build, as '<name>/<version>'
+        :param build_time: build time (in seconds)
+        :param versionsuffix: version suffix
+        :param arch: CPU architecture of host (default: CPU architecture of current host)
+        :param cores: number of cores used for build
+        :param peak_rss_kb: peak memory usage (resident set size, in kB)
+        :param timestamp: time at which build was completed (default: now)
+        """
+        if arch is None:
+            arch = get_cpu_architecture()
+        if timestamp is None:
+            timestamp = int(time.time())
+
+        values = (name, version, versionsuffix or '', toolchain, arch, cores, timestamp, build_time, peak_rss_kb)
+        try:
+            with self.conn:
+                self.conn.execute("INSERT INTO builds VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+        except sqlite3.Error as err:
+            raise EasyBuildError("Failed to add build to build history database %s: %s", self.path, err)
+
+        _log.info("Added build to build history in %s: %s", self.path, values)
+
+    def get_builds(self, limit=None, **key):
+        """
+        Get builds from history that match specified key (most recent first).
+
+        :param limit: maximum number of builds to return
+        :param key: values for (subset of) key columns (name, version, versionsuffix, toolchain, arch, cores)
+        """
+        unknown = [k for k in key if k not in BUILD_HISTORY_KEY]
+        if unknown:
+            raise EasyBuildError("Unknown key(s) for build history: %s", ', '.join(sorted(unknown)))
+
+        query = "SELECT * FROM builds"
+        if key:
+            query += " WHERE " + ' AND '.join('%s = ?' % k for k in sorted(key))
+        query += " ORDER BY timestamp DESC, rowid DESC"
+        if limit:
+            query += " LIMIT %d" % limit
+
+        try:
+            self.conn.row_factory = sqlite3.Row
+            return [dict(row) for row in self.conn.execute(query, [key[k] for k in sorted(key)])]
+        except sqlite3.Error as err:
+            raise EasyBuildError("Failed to query build history database %s: %s", self.path, err)
+
+    def predict(self, name, version, toolchain, versionsuffix='', arch=None, cores=None):
+        """
+        Predict build time and peak memory usage for specified build, based on build history.
+
+        Predictions are based on the most recent builds that match the most specific key for which
+        there are builds in the history (see BUILD_HISTORY_LOOKUP_KEYS).
+        Build times of builds that used more cores are scaled up (linearly) to the specified number of cores,
+        build times are never scaled down since builds rarely scale perfectly.
+
+        :param name: software name
+        :param version: software version
+        :param toolchain: toolchain used for build, as '<name>/<version>'
+        :param versionsuffix: version suffix
+        :param arch: CPU architecture of host (default: CPU architecture of current host)
+        :param cores: number of cores that will be used for build (if known)
+        :return: dict with predicted build time (in seconds) and peak memory usage (in kB, None if unknown),
+                 or None if no matching builds are found in history
+        """
+        if arch is None:
+            arch = get_cpu_architecture()
+
+        values = {
+            'name': name,
+            'version': version,
+            'versionsuffix': versionsuffix or '',
+            'toolchain': toolchain,
+            'arch': arch,
+            'cores': cores,
+        }
+
+        for lookup_key in BUILD_HISTORY_LOOKUP_KEYS:
+            if cores is None and 'cores' in lookup_key:
+                continue
+
+            key = {k: values[k] for k in lookup_key}
+            builds = self.get_builds(limit=BUILD_HISTORY_PREDICTION_SAMPLES, **key)
+            if builds:
+                build_times = []
+                for build in builds:
+                    build_time = build['build_time']
+                    if cores and build['cores'] and build['cores'] > cores:
+                        build_time = build_time * build['cores'] / cores
+                    build_times.append(build_time)
+
+                peak_rss_kbs = [b['peak_rss_kb'] for b in builds if b['peak_rss_kb']]
+
+                res = {
+                    'build_time': max(build_times),
+                    'peak_rss_kb': max(peak_rss_kbs) if peak_rss_kbs else None,
+                    'key': lookup_key,
+                    'samples': len(builds),
+                }
+                _log.info("Predicted build time & memory usage for %s: %s", values, res)
+                return res
+
+        _log.info("No builds found in build history for %s", values)
+        return None
+
+
+def det_build_history_path():
+    """
+    Determine location of build history database:
+    value for --build-history-path if specified (an empty value disables the build history),
+    or in the EasyBuild cache directory (see det_cache_path).
+    """
+    return det_cache_path('build_history_path', BUILD_HISTORY_FILENAME)
+
+
+def get_build_history():
+    """
+    Return BuildHistory instance for build history database (or None if build history is disabled).
+    """
+    path = det_build_history_path()
+    if path:
+        return BuildHistory(path)
+    return None
+
+
+def ec_build_history_key(ec):
+    """
+    Determine values for name, version, versionsuffix and toolchain to use as key in build history for an easyconfig.
+    """
+    return {
+        'name': ec['name'],
+        'version': ec['version'],
+        'versionsuffix': ec['versionsuffix'] or '',
+        'toolchain': '%s/%s' % (ec['toolchain']['name'], ec['toolchain']['version']),
+    }
+
+
+def record_build(app, buildstats):
+    """
+    Record build by specified EasyBlock instance in build history (if enabled),
+    using build time from specified build statistics, and peak memory usage from build profile (if available).
+    """
+    try:
+        build_history = get_build_history()
+        if build_history is not None:
+            peak_rss_kb = None
+            build_profile = getattr(app, 'build_profile', None)
+            if build_profile is not None:
+                peak_rss_kbs = [s['peak_rss_kb'] for s in build_profile.summary().values() if s['peak_rss_kb']]
+                peak_rss_kb = max(peak_rss_kbs) if peak_rss_kbs else None
+
+            build_history.add_build(build_time=buildstats['build_time'], cores=app.cfg.parallel,
+                                    peak_rss_kb=peak_rss_kb, **ec_build_history_key(app.cfg))
+            build_history.close()
+    except EasyBuildError as err:
+        _log.warning("Failed to record build in build history: %s", err)
+
+
+def job_resources(prediction, walltime_factor=2, mem_factor=2):
+    """
+    Determine resources to request for a job (walltime in hours, memory in MB),
+    based on predicted build time and memory usage.
+
+    :param prediction: prediction for build time and memory usage, see BuildHistory.predict
+    :param walltime_factor: factor to apply on predicted build time
+    :param mem_factor: factor to apply on predicted peak memory usage
+    :return: dict with 'hours' and (if peak memory usage is known) 'mem' values
+    """
+    res = {}
+    if prediction:
+        res['hours'] = max(1, int(math.ceil(prediction['build_time'] * walltime_factor / 3600)))
+        if prediction['peak_rss_kb']:
+            res['mem'] = int(math.ceil(prediction['peak_rss_kb'] * mem_factor / 1024))
+    return res
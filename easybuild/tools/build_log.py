@@ -261,8 +261,13 @@ fancylogger.logToFile(filename=os.devnull, max_bytes=0)
 _init_easybuildlog = fancylogger.getLogger(fname=False)
 
 
-def init_logging(logfile, logtostdout=False, silent=False, colorize=fancylogger.Colorize.AUTO, tmp_logdir=None):
-    """Initialize logging."""
+def init_logging(logfile, logtostdout=False, silent=False, colorize=fancylogger.Colorize.AUTO, tmp_logdir=None,
+                 asynchronous=False):
+    """
+    Initialize logging.
+
+    :param asynchronous: write log records to log file in a separate thread
+    """
     if logtostdout:
         fancylogger.logToScreen(enable=True, stdout=True, colorize=colorize)
     else:
@@ -278,7 +283,7 @@ def init_logging(logfile, logtostdout=False, silent=False, colorize=fancylogger.
             fd, logfile = tempfile.mkstemp(suffix='.log', prefix='easybuild-', dir=tmp_logdir)
             os.close(fd)
 
-        fancylogger.logToFile(logfile, max_bytes=0)
+        fancylogger.logToFile(logfile, max_bytes=0, asynchronous=asynchronous)
         print_msg('Temporary log file in case of crash %s' % (logfile), log=None, silent=silent)
 
     log = fancylogger.getLogger(fname=False)
@@ -0,0 +1,259 @@
+# Copyright 2014-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Tools to collect a profile of an installation: wall time, CPU time and peak memory usage,
+for every step, every extension and every shell command that is run.
+
+CPU time and memory usage of processes spawned by EasyBuild is determined via resource.getrusage(RUSAGE_CHILDREN),
+which only covers child processes that have terminated (and have been waited for).
+Since the maximum resident set size reported for child processes is a high-water mark,
+peak memory usage is only reported for an entry if it exceeds the peak observed so far (None otherwise).
+"""
+import csv
+import datetime
+import io
+import json
+import resource
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from easybuild.base import fancylogger
+from easybuild.tools.utilities import time2str
+
+
+_log = fancylogger.getLogger('build_profile', fname=False)
+
+PROFILE_CSV_SUFFIX = '.profile.csv'
+PROFILE_JSON_SUFFIX = '.profile.json'
+
+PROFILE_ENTRY_COMMAND = 'command'
+PROFILE_ENTRY_EXTENSION = 'extension'
+PROFILE_ENTRY_STEP = 'step'
+
+PROFILE_CSV_FIELDS = ['type', 'name', 'step', 'extension', 'start_time', 'wall_time', 'cpu_time',
+                      'cpu_time_children', 'peak_rss_kb', 'exit_code', 'work_dir']
+
+# build profile that is currently being collected (if any)
+_active_build_profile = None
+
+
+def rusage_snapshot():
+    """
+    Return snapshot of current time, CPU time used so far (by EasyBuild itself, and by terminated child processes),
+    and peak memory usage of child processes so far.
+    """
+    self_rusage = resource.getrusage(resource.RUSAGE_SELF)
+    children_rusage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'time': time.time(),
+        'cpu_self': self_rusage.ru_utime + self_rusage.ru_stime,
+        'cpu_children': children_rusage.ru_utime + children_rusage.ru_stime,
+        'maxrss_children': children_rusage.ru_maxrss,
+    }
+
+
+class BuildProfile:
+    """Profile (wall time, CPU time, peak memory usage) of an installation."""
+
+    def __init__(self, name):
+        """
+        Constructor for BuildProfile instance
+
+        :param name: name of installation (typically full module name)
+        """
+        self.name = name
+        self.entries = []
+
+        self.current_step = None
+        self.current_extension = None
+
+    def _add_entry(self, entry_type, name, start, end, **extra):
+        """Add profile entry of specified type for specified snapshots taken at start/end."""
+        cpu_children = end['cpu_children'] - start['cpu_children']
+        peak_rss = end['maxrss_children'] if end['maxrss_children'] > start['maxrss_children'] else None
+
+        entry = OrderedDict([
+            ('type', entry_type),
+            ('name', name),
+            ('step', self.current_step),
+            ('extension', self.current_extension),
+            ('start_time', round(start['time'], 3)),
+            ('wall_time', round(end['time'] - start['time'], 3)),
+            ('cpu_time', round(end['cpu_self'] - start['cpu_self'] + cpu_children, 3)),
+            ('cpu_time_children', round(cpu_children, 3)),
+            ('peak_rss_kb', peak_rss),
+        ])
+        entry.update(extra)
+        self.entries.append(entry)
+
+        return entry
+
+    @contextmanager
+    def step(self, name):
+        """Context manager to profile step with specified name."""
+        prev_step, self.current_step = self.current_step, name
+        start = rusage_snapshot()
+        try:
+            yield
+        finally:
+            self._add_entry(PROFILE_ENTRY_STEP, name, start, rusage_snapshot())
+            self.current_step = prev_step
+
+    @contextmanager
+    def extension(self, name):
+        """Context manager to profile installation of extension with specified name."""
+        prev_ext, self.current_extension = self.current_extension, name
+        start = rusage_snapshot()
+        try:
+            yield
+        finally:
+            self._add_entry(PROFILE_ENTRY_EXTENSION, name, start, rusage_snapshot())
+            self.current_extension = prev_ext
+
+    def add_command(self, cmd, start, end=None, exit_code=None, work_dir=None, asynchronous=False):
+        """
+        Add profile entry for shell command that was run.
+
+        :param cmd: command that was run (string)
+        :param start: snapshot taken right before command was started (see rusage_snapshot)
+        :param end: snapshot taken right after command completed (taken now if None)
+        :param exit_code: exit code of command
+        :param work_dir: working directory in which command was run
+        :param asynchronous: command was run asynchronously (so CPU time/memory usage may include other commands)
+        """
+        if end is None:
+            end = rusage_snapshot()
+        extra = {'exit_code': exit_code, 'work_dir': work_dir}
+        if asynchronous:
+            extra['asynchronous'] = True
+        return self._add_entry(PROFILE_ENTRY_COMMAND, cmd, start, end, **extra)
+
+    def get_entries(self, entry_type):
+        """Return list of profile entries of specified type."""
+        return [e for e in self.entries if e['type'] == entry_type]
+
+    def summary(self):
+        """
+        Return summary of profile: wall time, CPU time and peak memory usage per step
+        (accumulated over iterations for steps that are run multiple times).
+        """
+        res = OrderedDict()
+        for entry in self.get_entries(PROFILE_ENTRY_STEP):
+            step_summary = res.setdefault(entry['name'], {'wall_time': 0, 'cpu_time': 0, 'peak_rss_kb': None})
+            step_summary['wall_time'] = round(step_summary['wall_time'] + entry['wall_time'], 3)
+            step_summary['cpu_time'] = round(step_summary['cpu_time'] + entry['cpu_time'], 3)
+            if entry['peak_rss_kb'] is not None:
+                step_summary['peak_rss_kb'] = max(step_summary['peak_rss_kb'] or 0, entry['peak_rss_kb'])
+        return res
+
+    def to_dict(self):
+        """Return profile as a dictionary."""
+        return OrderedDict([
+            ('name', self.name),
+            ('summary', self.summary()),
+            ('entries', self.entries),
+        ])
+
+    def to_csv(self):
+        """Return profile entries in CSV format."""
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=PROFILE_CSV_FIELDS, extrasaction='ignore', lineterminator='\n')
+        writer.writeheader()
+        for entry in self.entries:
+            writer.writerow(entry)
+        return out.getvalue()
+
+    def write(self, path_prefix):
+        """
+        Write profile to file in JSON and CSV format.
+
+        :param path_prefix: prefix for paths of files to write (usually location of log file)
+        :return: list of paths to files that were written
+        """
+        # local import to avoid cyclic import (filetools imports run, which imports this module)
+        from easybuild.tools.filetools import write_file
+
+        json_path = path_prefix + PROFILE_JSON_SUFFIX
+        write_file(json_path, json.dumps(self.to_dict(), indent=4))
+        csv_path = path_prefix + PROFILE_CSV_SUFFIX
+        write_file(csv_path, self.to_csv())
+
+        _log.info("Build profile for %s written to %s and %s", self.name, json_path, csv_path)
+
+        return [json_path, csv_path]
+
+    def report(self, top=10):
+        """
+        Return (human-readable) report for this profile.
+
+        :param top: number of most expensive extensions/commands to include
+        """
+        def fmt(entry):
+            """Format wall time, CPU time and peak memory usage for specified entry."""
+            peak_rss = entry['peak_rss_kb']
+            peak_rss = '-' if peak_rss is None else '%.1f MiB' % (peak_rss / 1024.)
+            wall_time = _format_secs(entry['wall_time'])
+            return "%s wall, %s CPU, peak RSS %s" % (wall_time, _format_secs(entry['cpu_time']), peak_rss)
+
+        lines = ["Build profile for %s:" % self.name, '', "* steps:"]
+        for step_name, step_summary in self.summary().items():
+            lines.append("  - %s: %s" % (step_name, fmt(step_summary)))
+
+        for entry_type, label in [(PROFILE_ENTRY_EXTENSION, 'extensions'), (PROFILE_ENTRY_COMMAND, 'commands')]:
+            entries = sorted(self.get_entries(entry_type), key=lambda e: e['wall_time'], reverse=True)
+            if entries:
+                header = "* most expensive %s (top %d of %d):" % (label, min(top, len(entries)), len(entries))
+                lines.extend(['', header])
+                for entry in entries[:top]:
+                    name = entry['name'] if len(entry['name']) <= 80 else entry['name'][:77] + '...'
+                    lines.append("  - %s [%s step]: %s" % (name, entry['step'], fmt(entry)))
+
+        return '\n'.join(lines)
+
+
+def _format_secs(secs):
+    """Return string representation for specified amount of seconds."""
+    if secs < 1:
+        return '%.2f secs' % secs
+    return time2str(datetime.timedelta(seconds=secs))
+
+
+def start_build_profile(name):
+    """Start collecting build profile with specified name, and return it."""
+    global _active_build_profile
+    _active_build_profile = BuildProfile(name)
+    return _active_build_profile
+
+
+def get_build_profile():
+    """Return build profile that is currently being collected (None if no profile is being collected)."""
+    return _active_build_profile
+
+
+def stop_build_profile():
+    """Stop collecting build profile, and return it."""
+    global _active_build_profile
+    profile, _active_build_profile = _active_build_profile, None
+    return profile
@@ -104,6 +104,7 @@ DEFAULT_ENVVAR_USERS_MODULES = 'HOME'
 DEFAULT_INDEX_MAX_AGE = 7 * 24 * 60 * 60  # 1 week (in seconds)
 DEFAULT_JOB_BACKEND = 'Slurm'
 DEFAULT_JOB_EB_CMD = 'eb'
+DEFAULT_JOB_SUBMIT_WORKERS = 8
 DEFAULT_LOGFILE_FORMAT = ("easybuild", "easybuild-%(name)s-%(version)s-%(date)s.%(time)s.log")
 DEFAULT_MAX_FAIL_RATIO_PERMS = 0.5
 DEFAULT_MAX_PARALLEL = 16
@@ -130,6 +131,7 @@ DEFAULT_PNS = 'EasyBuildPNS'
 DEFAULT_PR_TARGET_ACCOUNT = 'easybuilders'
 DEFAULT_PREFIX = os.path.join(os.path.expanduser('~'), ".local", "easybuild")
 DEFAULT_REPOSITORY = 'FileRepository'
+DEFAULT_REPOSITORY_COMMIT_INTERVAL = 1
 EASYBUILD_SOURCES_URL = 'https://sources.easybuild.io'
 DEFAULT_EXTRA_SOURCE_URLS = (EASYBUILD_SOURCES_URL,)
 # Filter these CUDA libraries by default from the RPATH sanity check.
@@ -231,6 +233,7 @@ BUILD_OPTIONS_CMDLINE = {
         'amdgcn_capabilities',
         'backup_modules',
         'banned_linked_shared_libs',
+        'build_history_path',
         'checksum_priority',
         'container_config',
         'container_image_format',
@@ -250,7 +253,9 @@ BUILD_OPTIONS_CMDLINE = {
         'filter_rpath_sanity_libs',
         'force_download',
         'from_commit',
+        'git_mirror_path',
         'git_working_dirs_path',
+        'github_files_cache_path',
         'github_user',
         'github_org',
         'group',
@@ -271,6 +276,7 @@ BUILD_OPTIONS_CMDLINE = {
         'job_target_resource',
         'locks_dir',
         'module_cache_suffix',
+        'module_show_cache_path',
         'modules_footer',
         'modules_header',
         'mpi_cmd_template',
@@ -278,6 +284,7 @@ BUILD_OPTIONS_CMDLINE = {
         'optarch',
         'package_tool_options',
         'parallel',
+        'patch_index_path',
         'pr_branch_name',
         'pr_commit_msg',
         'pr_descr',
@@ -286,16 +293,21 @@ BUILD_OPTIONS_CMDLINE = {
         'regtest_output_dir',
         'rpath_filter',
         'rpath_override_dirs',
+        'repository_commit_interval',
+        'repository_journal_path',
         'required_linked_shared_libs',
         'search_path_cpp_headers',
         'search_path_linker',
         'skip',
         'software_commit',
         'stop',
+        'structured_log',
+        'style_check_cache_path',
         'subdir_user_modules',
         'sysroot',
         'test_report_env_filter',
         'testoutput',
+        'toolchain_hierarchy_path',
         'umask',
         'zip_logs',
     ],
@@ -303,6 +315,7 @@ BUILD_OPTIONS_CMDLINE = {
         'add_system_to_minimal_toolchains',
         'allow_modules_tool_mismatch',
         'allow_unresolved_templates',
+        'async_logging',
         'backup_patched_files',
         'consider_archived_easyconfigs',
         'container_build_image',
@@ -332,9 +345,11 @@ BUILD_OPTIONS_CMDLINE = {
         'keep_going',
         'logtostdout',
         'minimal_toolchains',
+        'module_load_cache',
         'module_only',
         'package',
         'parallel_extensions_install',
+        'profile_report',
         'read_only_installdir',
         'rebuild',
         'remove_ghost_install_dirs',
@@ -409,6 +424,9 @@ BUILD_OPTIONS_CMDLINE = {
     DEFAULT_JOB_EB_CMD: [
         'job_eb_cmd',
     ],
+    DEFAULT_JOB_SUBMIT_WORKERS: [
+        'job_submit_workers',
+    ],
     DEFAULT_MAX_FAIL_RATIO_PERMS: [
         'max_fail_ratio_adjust_permissions',
     ],
@@ -0,0 +1,231 @@
+# Copyright 2014-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Extraction of relevant error excerpts from (potentially huge) command output and log files.
+
+Lines are matched against a set of error patterns (compiler/linker errors, CMake/Meson failures, Python tracebacks, ...)
+in a single pass over the input; all patterns are compiled into a single regular expression to quickly skip lines
+that don't match any pattern, only lines that do match are checked against the individual patterns.
+Each match results in an excerpt that includes a bounded number of context lines before and after the matching line
+(matches in the context after an excerpt are merged into it); only the highest ranked excerpts are retained,
+so memory usage does not depend on the size of the input.
+"""
+import heapq
+import re
+from collections import deque
+from functools import lru_cache
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+
+
+_log = fancylogger.getLogger('error_excerpts', fname=False)
+
+# error patterns: (category, regular expression, weight);
+# excerpts for patterns with a higher weight are ranked higher
+ERROR_PATTERNS = [
+    # GCC/Clang/Intel compilers: <file>:<line>[:<col>]: [fatal] error: ...
+    ('compiler', r'^\S+?:\d+(:\d+)?:\s+(fatal\s+)?error\b', 10),
+    # gfortran reports location on a separate line, followed by "Error: ..."
+    ('compiler', r'^\s*(Fatal\s+)?Error:\s', 8),
+    ('configure', r'^configure: error:', 10),
+    ('cmake', r'^CMake Error\b', 10),
+    ('meson', r'^(\S+:\d+:\d+:\s+)?ERROR:\s', 9),
+    ('linker', r'undefined reference to|undefined symbol:|\bld(\.\w+)?:\s+(error\b|cannot find)|collect2: error', 9),
+    ('python', r'^\s*([\w.]+\.)?\w*(Error|Exception):\s', 8),
+    ('python', r'^Traceback \(most recent call last\):', 7),
+    # errors reported by make are usually a consequence of an earlier error
+    ('make', r'\bmake(\[\d+\])?: \*\*\*', 3),
+    ('generic', r'(?i:\berror\b)', 1),
+]
+
+DEFAULT_CONTEXT_LINES = 3
+DEFAULT_MAX_EXCERPTS = 3
+DEFAULT_MAX_EXCERPT_LINES = 25
+
+
+class ErrorExcerpt:
+    """Excerpt of command output or log file that (probably) contains relevant error messages."""
+
+    def __init__(self, line_nr, category, weight, first_line_nr, lines):
+        """
+        Constructor for ErrorExcerpt instance
+
+        :param line_nr: line number of (first) matching line
+        :param category: category of error pattern that matched
+        :param weight: weight of error pattern that matched
+        :param first_line_nr: line number of first line in excerpt (incl. context)
+        :param lines: lines of excerpt
+        """
+        self.line_nr = line_nr
+        self.category = category
+        self.score = weight
+        self.first_line_nr = first_line_nr
+        self.lines = lines
+        self.matches = 1
+
+    def add_match(self, weight):
+        """Take into account additional matching line in this excerpt."""
+        self.matches += 1
+        self.score = max(self.score, weight)
+
+    def rank_key(self):
+        """Key to rank excerpts: higher score first, earlier excerpts first for same score."""
+        return (self.score, -self.line_nr)
+
+    def __str__(self):
+        """Return string representation of excerpt, with line numbers."""
+        width = len(str(self.first_line_nr + len(self.lines) - 1))
+        return '\n'.join("%*d: %s" % (width, self.first_line_nr + idx, line) for idx, line in enumerate(self.lines))
+
+    def __repr__(self):
+        return "ErrorExcerpt(line_nr=%s, category=%s, score=%s)" % (self.line_nr, self.category, self.score)
+
+
+@lru_cache(maxsize=None)
+def compile_error_patterns(patterns):
+    """
+    Compile specified error patterns, individually and into a single regular expression.
+
+    :param patterns: tuple of (category, regular expression, weight) tuples
+    :return: compiled regular expression that matches any of the patterns,
+             and list of (category, weight, compiled regular expression) tuples, sorted by weight (highest first)
+    """
+    try:
+        regex = re.compile('|'.join('(?:%s)' % pattern for (_, pattern, _) in patterns))
+        ranked = [(category, weight, re.compile(pattern)) for (category, pattern, weight) in patterns]
+    except re.error as err:
+        raise EasyBuildError("Failed to compile error patterns: %s", err)
+
+    # sort is stable, so order of patterns is retained for patterns with same weight
+    ranked.sort(key=lambda x: x[1], reverse=True)
+
+    return regex, ranked
+
+
+def match_error_pattern(line, ranked):
+    """
+    Determine category and weight for highest weighted error pattern that matches specified line.
+
+    :param line: line to check
+    :param ranked: list of (category, weight, compiled regular expression) tuples, sorted by weight (highest first)
+    :return: (category, weight) tuple, or None if none of the patterns match
+    """
+    for category, weight, regex in ranked:
+        if regex.search(line):
+            return category, weight
+    return None
+
+
+def extract_error_excerpts(lines, patterns=None, max_excerpts=DEFAULT_MAX_EXCERPTS, context=DEFAULT_CONTEXT_LINES,
+                           max_lines=DEFAULT_MAX_EXCERPT_LINES):
+    """
+    Extract highest ranked error excerpts from specified lines, in a single pass.
+
+    :param lines: iterable of lines (for example an open file)
+    :param patterns: list of (category, regular expression, weight) tuples (default: ERROR_PATTERNS)
+    :param max_excerpts: maximum number of excerpts to return
+    :param context: number of context lines to include before and after matching lines
+    :param max_lines: maximum number of lines per excerpt
+    :return: list of ErrorExcerpt instances, sorted by rank (highest first)
+    """
+    if patterns is None:
+        patterns = ERROR_PATTERNS
+    regex, ranked = compile_error_patterns(tuple(tuple(p) for p in patterns))
+
+    # heap with highest ranked excerpts so far (lowest ranked excerpt first)
+    top_excerpts = []
+
+    def retain(excerpt):
+        """Retain specified excerpt if it is ranked high enough."""
+        entry = (excerpt.rank_key(), excerpt.line_nr, excerpt)
+        if len(top_excerpts) < max_excerpts:
+            heapq.heappush(top_excerpts, entry)
+        else:
+            heapq.heappushpop(top_excerpts, entry)
+
+    before = deque(maxlen=context)
+    excerpt, after = None, 0
+
+    for line_nr, line in enumerate(lines, start=1):
+        line = line.rstrip('\n')
+        res = regex.search(line) and match_error_pattern(line, ranked)
+        if res:
+            category, weight = res
+            if excerpt is not None and len(excerpt.lines) < max_lines:
+                excerpt.lines.append(line)
+                excerpt.add_match(weight)
+            else:
+                if excerpt is not None:
+                    retain(excerpt)
+                    # current excerpt is full, so last lines of it are the context before the matching line
+                    before.extend(excerpt.lines[max(len(excerpt.lines) - context, 0):])
+                excerpt = ErrorExcerpt(line_nr, category, weight, line_nr - len(before), list(before) + [line])
+                before.clear()
+            after = context
+
+        elif excerpt is not None:
+            if after > 0 and len(excerpt.lines) < max_lines:
+                excerpt.lines.append(line)
+                after -= 1
+            else:
+                retain(excerpt)
+                excerpt = None
+                before.append(line)
+        else:
+            before.append(line)
+
+    if excerpt is not None:
+        retain(excerpt)
+
+    return [entry[-1] for entry in sorted(top_excerpts, key=lambda x: x[:2], reverse=True)]
+
+
+def extract_error_excerpts_from_file(path, **kwargs):
+    """
+    Extract highest ranked error excerpts from specified file (see extract_error_excerpts).
+
+    The file is read line by line, so memory usage does not depend on the size of the file.
+    """
+    try:
+        with open(path, errors='replace') as fh:
+            return extract_error_excerpts(fh, **kwargs)
+    except (IOError, OSError) as err:
+        raise EasyBuildError("Failed to extract error excerpts from %s: %s", path, err)
+
+
+def format_error_excerpts(excerpts, path=None):
+    """
+    Format specified error excerpts into a (human-readable) string.
+
+    :param excerpts: list of ErrorExcerpt instances
+    :param path: path to file excerpts were extracted from (if any)
+    """
+    res = []
+    for excerpt in excerpts:
+        header = "%s error at line %d" % (excerpt.category, excerpt.line_nr)
+        if path:
+            header += " of %s" % path
+        res.extend([header + ':', str(excerpt), ''])
+    return '\n'.join(res).rstrip('\n')
@@ -42,11 +42,15 @@ Authors:
 """
 import datetime
 import difflib
+import fcntl
 import filecmp
+import fnmatch
 import glob
 import hashlib
+import http.client
 import inspect
 import itertools
+import json
 import os
 import pathlib
 import re
@@ -72,6 +76,7 @@ from easybuild.tools.config import ERROR, GENERIC_EASYBLOCK_PKG, IGNORE, WARN, b
 from easybuild.tools.output import PROGRESS_BAR_DOWNLOAD_ONE, start_progress_bar, stop_progress_bar, update_progress_bar
 from easybuild.tools.hooks import load_source
 from easybuild.tools.run import run_shell_cmd
+from easybuild.tools.structured_log import is_structured_log_file
 from easybuild.tools.utilities import natural_keys, nub, remove_unwanted_chars, trace_msg
 
 try:
@@ -140,6 +145,16 @@ def _hashlib_md5():
     return hashlib.md5(**kwargs)
 
 
+# map of checksum types to functions that create a (hashlib-like) object to incrementally compute a checksum
+CHECKSUM_HASHERS = {
+    'adler32': lambda: ZlibChecksum(zlib.adler32),
+    'crc32': lambda: ZlibChecksum(zlib.crc32),
+    CHECKSUM_TYPE_MD5: _hashlib_md5,
+    'sha1': hashlib.sha1,
+    CHECKSUM_TYPE_SHA256: hashlib.sha256,
+    'sha512': hashlib.sha512,
+}
+
 # map of checksum types to checksum functions
 CHECKSUM_FUNCTIONS = {
     'adler32': lambda p: calc_block_checksum(p, ZlibChecksum(zlib.adler32)),
@@ -152,6 +167,22 @@ CHECKSUM_FUNCTIONS = {
 }
 CHECKSUM_TYPES = sorted(CHECKSUM_FUNCTIONS.keys())
 
+# suffix for partially downloaded files (+ corresponding metadata file), which are used to resume downloads
+DOWNLOAD_PART_SUFFIX = '.part'
+DOWNLOAD_PART_METADATA_SUFFIX = '.part.json'
+DOWNLOAD_PART_LOCK_SUFFIX = '.part.lock'
+
+# name of subdirectory for EasyBuild in $XDG_CACHE_HOME (or ~/.cache)
+CACHE_DIRNAME = 'easybuild'
+# entries in persistent caches which were not used for 30 days are removed (see prune_cache_dir)
+DEFAULT_CACHE_MAX_AGE = 30 * 24 * 3600
+CACHE_PRUNE_INTERVAL = 24 * 3600
+CACHE_PRUNED_STAMP = '.last_pruned'
+
+# checksums computed while downloading files, indexed by path of downloaded file
+# values are 2-tuples with file stats (size, mtime) and a dict of checksums indexed by checksum type
+_downloaded_files_checksums = {}
+
 EXTRACT_CMDS = {
     # gzipped or gzipped tarball
     '.gtgz': "tar xzf %(filepath)s",
@@ -311,6 +342,30 @@ def write_file(path, data, append=False, forced=False, backup=False, always_over
         raise EasyBuildError("Failed to write to %s: %s", path, err)
 
 
+def write_json_file(path, data, **kwargs):
+    """
+    Write given data to file at given path in JSON format,
+    atomically (so concurrent EasyBuild sessions don't see a partial file):
+    data is first written to a temporary file in the same directory, which then replaces the file at given path.
+
+    :param path: location of file
+    :param data: data to write to file (must be serializable to JSON)
+    :param kwargs: named arguments to pass down to json.dump
+    """
+    dirpath = os.path.dirname(path)
+    mkdir(dirpath, parents=True)
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=dirpath, prefix='.' + os.path.basename(path))
+        with os.fdopen(fd, 'w') as fp:
+            json.dump(data, fp, **kwargs)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError) as err:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise EasyBuildError("Failed to write to %s: %s", path, err)
+
+
 def is_binary(contents):
     """
     Check whether given bytestring represents the contents of a binary file or not.
@@ -808,10 +863,130 @@ def det_file_size(http_header):
     return res
 
 
-def download_file(filename, url, path, forced=False, trace=True, max_attempts=None, initial_wait_time=None):
+def _remove_partial_download(part_path, metadata_path=None):
+    """Remove partially downloaded file (and corresponding metadata file, if specified), if any."""
+    for fp in (part_path, metadata_path):
+        try:
+            if fp and os.path.exists(fp):
+                os.remove(fp)
+        except OSError as err:
+            raise EasyBuildError("Failed to remove partially downloaded file %s: %s", fp, err)
+
+
+def _lock_partial_download(path):
+    """
+    Try to obtain an exclusive lock on the partially downloaded file for specified path,
+    so concurrent EasyBuild sessions that download the same file don't write to the same partially downloaded file.
+
+    :param path: path to download file to
+    :return: file object for lock file if lock was obtained, None otherwise
+    """
+    lock_path = path + DOWNLOAD_PART_LOCK_SUFFIX
+    try:
+        lock_fh = open(lock_path, 'a')
+    except OSError as err:
+        _log.warning("Failed to open lock file %s: %s", lock_path, err)
+        return None
+
+    try:
+        fcntl.flock(lock_fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # lock file may have been removed (by a session that completed the download) before it was locked
+        if os.fstat(lock_fh.fileno()).st_ino != os.stat(lock_path).st_ino:
+            raise OSError("lock file was removed")
+    except OSError as err:
+        _log.info("Failed to lock %s, another session is probably downloading the same file: %s", lock_path, err)
+        lock_fh.close()
+        lock_fh = None
+
+    return lock_fh
+
+
+def _unlock_partial_download(path, lock_fh):
+    """Release lock on partially downloaded file for specified path (if it was obtained)."""
+    if lock_fh is not None:
+        lock_path = path + DOWNLOAD_PART_LOCK_SUFFIX
+        try:
+            # remove lock file while still holding the lock, see also _lock_partial_download
+            os.remove(lock_path)
+        except OSError as err:
+            _log.warning("Failed to remove lock file %s: %s", lock_path, err)
+        lock_fh.close()
+
+
+def _init_partial_download(url, part_path, metadata_path, checksum_types):
+    """
+    Prepare for (resuming) download of file from specified URL to specified partially downloaded file.
+
+    If a partially downloaded file from a previous (interrupted) download of the same URL is available,
+    the checksums for the data downloaded so far are computed, so the download can be resumed.
+
+    :param url: URL of file to download
+    :param part_path: path to partially downloaded file
+    :param metadata_path: path to metadata file for partially downloaded file (None if download can't be resumed)
+    :param checksum_types: list of types of checksums to compute for downloaded data
+    :return: 3-tuple with dict of objects to incrementally compute checksums (indexed by checksum type),
+             size of partially downloaded file, and validator (ETag or Last-Modified value) to use to resume download
+    """
+    hashers = {typ: CHECKSUM_HASHERS[typ]() for typ in checksum_types if typ in CHECKSUM_HASHERS}
+    offset, validator = 0, None
+
+    metadata = {}
+    if metadata_path and os.path.exists(part_path) and os.path.exists(metadata_path):
+        try:
+            metadata = json.loads(read_file(metadata_path))
+        except ValueError as err:
+            _log.warning("Failed to parse metadata for partially downloaded file %s: %s", part_path, err)
+
+    if metadata.get('url') == url:
+        offset = os.path.getsize(part_path)
+        validator = metadata.get('validator')
+        _log.info("Found partially downloaded file %s (%d bytes) for %s", part_path, offset, url)
+        with open(part_path, 'rb') as fh:
+            for chunk in iter(partial(fh.read, 16 * 1024 ** 2), b''):
+                for hasher in hashers.values():
+                    hasher.update(chunk)
+    else:
+        _remove_partial_download(part_path, metadata_path)
+
+    return hashers, offset, validator
+
+
+def get_downloaded_file_checksum(path, checksum_type):
+    """
+    Return checksum of specified type that was computed while downloading the file at specified path,
+    or None if no such checksum is available (or if the file was changed after it was downloaded).
+
+    :param path: path to (downloaded) file
+    :param checksum_type: type of checksum
+    """
+    res = None
+
+    path = os.path.abspath(path)
+    if path in _downloaded_files_checksums:
+        file_stats, checksums = _downloaded_files_checksums[path]
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is not None and (st.st_size, st.st_mtime_ns) == file_stats:
+            res = checksums.get(checksum_type)
+        else:
+            _log.debug("File %s changed since it was downloaded, ignoring checksums computed during download", path)
+            del _downloaded_files_checksums[path]
+
+    return res
+
+
+def download_file(filename, url, path, forced=False, trace=True, max_attempts=None, initial_wait_time=None,
+                  checksum_types=None):
     """
     Download a file from the given URL, to the specified path.
 
+    Data is first downloaded to a '.part' file, and checksums are computed while downloading.
+    If a download attempt is interrupted, the download is resumed (if supported by the server),
+    also across different EasyBuild sessions.
+    If another EasyBuild session is downloading the same file concurrently, a uniquely named '.part' file is used.
+
     :param filename: name of file to download
     :param url: URL of file to download
     :param path: path to download file to
@@ -819,12 +994,15 @@ def download_file(filename, url, path, forced=False, trace=True, max_attempts=No
     :param trace: boolean to indicate whether trace output should be printed
     :param max_attempts: max. number of attempts to download file from specified URL
     :param initial_wait_time: wait time (in seconds) after first attempt (doubled at each attempt)
+    :param checksum_types: list of types of checksums to compute while downloading (default: sha256)
     """
 
     if max_attempts is None:
         max_attempts = DEFAULT_DOWNLOAD_MAX_ATTEMPTS
     if initial_wait_time is None:
         initial_wait_time = DEFAULT_DOWNLOAD_INITIAL_WAIT_TIME
+    if checksum_types is None:
+        checksum_types = [DEFAULT_CHECKSUM]
 
     insecure = build_option('insecure_download')
 
@@ -864,43 +1042,128 @@ def download_file(filename, url, path, forced=False, trace=True, max_attempts=No
                     _log.debug("Custom HTTP header field set: %s (value omitted from log)", key)
 
     # for backward compatibility, and to avoid relying on 3rd party Python library 'requests'
-    url_req = std_urllib.Request(url, headers=headers)
     used_urllib = std_urllib
     switch_to_requests = False
 
     wait = False
     wait_time = initial_wait_time
 
+    dry_run = not forced and build_option('extended_dry_run')
+
+    part_path = path + DOWNLOAD_PART_SUFFIX
+    metadata_path = path + DOWNLOAD_PART_METADATA_SUFFIX
+    part_lock = None
+    if dry_run:
+        hashers, offset, validator = {}, 0, None
+    else:
+        part_lock = _lock_partial_download(path)
+        if part_lock is None:
+            # use uniquely named partially downloaded file, which can not be resumed in a later session
+            fd, part_path = tempfile.mkstemp(dir=basedir, prefix=os.path.basename(path) + '.',
+                                             suffix=DOWNLOAD_PART_SUFFIX)
+            os.close(fd)
+            metadata_path = None
+        hashers, offset, validator = _init_partial_download(url, part_path, metadata_path, checksum_types)
+
     while not downloaded and attempt_cnt < max_attempts:
         attempt_cnt += 1
+
+        # request remainder of file if it was already partially downloaded;
+        # only if the file was not changed since (according to the validator), the server will honor the request
+        req_headers = headers.copy()
+        if offset:
+            req_headers['Range'] = 'bytes=%d-' % offset
+            if validator:
+                req_headers['If-Range'] = validator
+
         try:
             if insecure:
                 print_warning("Not checking server certificates while downloading %s from %s." % (filename, url))
             if used_urllib is std_urllib:
                 # urllib2 (Python 2) / urllib.request (Python 3) does the right thing for http proxy setups,
                 # urllib does not!
+                url_req = std_urllib.Request(url, headers=req_headers)
                 if insecure:
                     url_fd = std_urllib.urlopen(url_req, timeout=timeout, context=ssl._create_unverified_context())
                 else:
                     url_fd = std_urllib.urlopen(url_req, timeout=timeout)
                 status_code = url_fd.getcode()
-                size = det_file_size(url_fd.info())
+                resp_headers = url_fd.info()
             else:
-                response = requests.get(url, headers=headers, stream=True, timeout=timeout, verify=(not insecure))
+                response = requests.get(url, headers=req_headers, stream=True, timeout=timeout,
+                                        verify=(not insecure))
                 status_code = response.status_code
                 response.raise_for_status()
-                size = det_file_size(response.headers)
+                resp_headers = response.headers
                 url_fd = response.raw
                 url_fd.decode_content = True
+            size = det_file_size(resp_headers)
 
             _log.debug("HTTP response code for given url %s: %s", url, status_code)
             _log.info("File size for %s: %s", url, size)
 
-            # note: we pass the file object to write_file rather than reading the file first,
-            # to ensure the data is read in chunks (which prevents problems in Python 3.9+);
-            # cfr. https://github.com/easybuilders/easybuild-framework/issues/3455
-            # and https://bugs.python.org/issue42853
-            write_file(path, url_fd, forced=forced, backup=True, show_progress=True, size=size)
+            if offset and status_code == 206:
+                _log.info("Resuming download of %s to %s at byte %d", url, path, offset)
+                if size is not None:
+                    size += offset
+            elif offset:
+                _log.info("Server did not accept request to resume download of %s, starting over", url)
+                _remove_partial_download(part_path, metadata_path)
+                hashers = {typ: CHECKSUM_HASHERS[typ]() for typ in hashers}
+                offset = 0
+
+            # only strong ETag values can be used to resume downloads
+            etag = resp_headers.get('ETag')
+            if etag and etag.startswith('W/'):
+                etag = None
+            validator = etag or resp_headers.get('Last-Modified')
+
+            if dry_run:
+                write_file(path, url_fd, size=size)
+            else:
+                if metadata_path:
+                    write_file(metadata_path, json.dumps({'url': url, 'validator': validator}), forced=True)
+
+                # don't bother showing a progress bar for small files (< 10MB)
+                show_progress = not size or size >= 10 * (1024 ** 2)
+                if show_progress:
+                    start_progress_bar(PROGRESS_BAR_DOWNLOAD_ONE, size, label=os.path.basename(path))
+                    if offset:
+                        update_progress_bar(PROGRESS_BAR_DOWNLOAD_ONE, progress_size=offset)
+                try:
+                    # note: data is read in chunks (which prevents problems in Python 3.9+);
+                    # cfr. https://github.com/easybuilders/easybuild-framework/issues/3455
+                    # and https://bugs.python.org/issue42853;
+                    # offset and checksums are updated for every chunk, so an interrupted download can be resumed
+                    with open(part_path, 'ab') as fh:
+                        for chunk in iter(partial(url_fd.read, 1024 ** 2), b''):
+                            fh.write(chunk)
+                            offset += len(chunk)
+                            for hasher in hashers.values():
+                                hasher.update(chunk)
+                            if show_progress:
+                                update_progress_bar(PROGRESS_BAR_DOWNLOAD_ONE, progress_size=len(chunk))
+                finally:
+                    if show_progress:
+                        stop_progress_bar(PROGRESS_BAR_DOWNLOAD_ONE)
+
+                if size is not None and offset < size:
+                    raise IOError("Download was interrupted after %d of %d bytes" % (offset, size))
+
+                if os.path.exists(path):
+                    backed_up_fp = back_up_file(path)
+                    _log.info("Existing file %s backed up to %s", path, backed_up_fp)
+                try:
+                    os.replace(part_path, path)
+                except OSError as err:
+                    raise EasyBuildError("Failed to move %s to %s: %s", part_path, path, err)
+                _remove_partial_download(part_path, metadata_path)
+
+                st = os.stat(path)
+                checksums = {typ: hasher.hexdigest() for typ, hasher in hashers.items()}
+                _downloaded_files_checksums[os.path.abspath(path)] = ((st.st_size, st.st_mtime_ns), checksums)
+                _log.info("Checksums computed while downloading %s: %s", path, checksums)
+
             _log.info("Downloaded file %s from url %s to %s", filename, url, path)
             downloaded = True
             url_fd.close()
@@ -909,6 +1172,11 @@ def download_file(filename, url, path, forced=False, trace=True, max_attempts=No
                 status_code = err.code
             if status_code == 403 and attempt_cnt == 1:
                 switch_to_requests = True
+            elif status_code == 416 and offset:  # range not satisfiable
+                _log.warning(f"Failed to resume download of {url} at byte {offset}, starting over")
+                _remove_partial_download(part_path, metadata_path)
+                hashers = {typ: CHECKSUM_HASHERS[typ]() for typ in hashers}
+                offset = 0
             elif status_code == 429:  # too many requests
                 _log.warning(f"Downloading of {url} failed with HTTP status code 429 (Too many requests)")
                 wait = True
@@ -917,13 +1185,14 @@ def download_file(filename, url, path, forced=False, trace=True, max_attempts=No
                 break
             else:
                 _log.warning("HTTPError occurred while trying to download %s to %s: %s" % (url, path, err))
-        except IOError as err:
-            _log.warning("IOError occurred while trying to download %s to %s: %s" % (url, path, err))
+        except (IOError, http.client.HTTPException) as err:
+            _log.warning("%s occurred while trying to download %s to %s: %s", type(err).__name__, url, path, err)
             error_re = re.compile(r"<urlopen error \[Errno 1\] _ssl.c:.*: error:.*:"
                                   "SSL routines:SSL23_GET_SERVER_HELLO:sslv3 alert handshake failure>")
             if error_re.match(str(err)):
                 switch_to_requests = True
         except Exception as err:
+            _unlock_partial_download(path, part_lock)
             raise EasyBuildError(
                 "Unexpected error occurred when trying to download %s to %s: %s", url, path, err,
                 exit_code=EasyBuildExit.FAIL_DOWNLOAD
@@ -933,6 +1202,7 @@ def download_file(filename, url, path, forced=False, trace=True, max_attempts=No
             _log.info("Attempt %d of downloading %s to %s failed, trying again..." % (attempt_cnt, url, path))
             if used_urllib is std_urllib and switch_to_requests:
                 if not HAVE_REQUESTS:
+                    _unlock_partial_download(path, part_lock)
                     raise EasyBuildError("SSL issues with urllib2. If you are using RHEL/CentOS 6.x please "
                                          "install the python-requests and pyOpenSSL RPM packages and try again.")
                 _log.info("Downloading using requests package instead of urllib2")
@@ -944,6 +1214,11 @@ def download_file(filename, url, path, forced=False, trace=True, max_attempts=No
                 # exponential backoff
                 wait_time *= 2
 
+    _unlock_partial_download(path, part_lock)
+    if not downloaded and not dry_run and metadata_path is None:
+        # uniquely named partially downloaded file can not be resumed later, so clean it up
+        _remove_partial_download(part_path)
+
     if downloaded:
         _log.info("Successful download of file %s from url %s to path %s" % (filename, url, path))
         if trace:
@@ -1312,6 +1587,12 @@ def compute_checksum(path, checksum_type=DEFAULT_CHECKSUM):
         _log.deprecated("Checksum type %s is deprecated. Use sha256 (default) or sha512 instead" % checksum_type,
                         '6.0')
 
+    # use checksum computed while downloading file, if available (avoids reading file again)
+    checksum = get_downloaded_file_checksum(path, checksum_type)
+    if checksum is not None:
+        _log.debug("Using %s checksum for %s computed during download: %s", checksum_type, path, checksum)
+        return checksum
+
     try:
         checksum = CHECKSUM_FUNCTIONS[checksum_type](path)
     except IOError as err:
@@ -1427,6 +1708,41 @@ def verify_checksum(path, checksums, computed_checksums=None):
     return True
 
 
+def det_checksum_types(checksums):
+    """
+    Determine types of checksums used in specified checksum specification(s).
+
+    :param checksums: checksum specification(s), in any format supported by verify_checksum
+    :return: sorted list of checksum types (only containing default checksum type if no checksums are specified)
+    """
+    res = set()
+
+    if isinstance(checksums, dict):
+        checksums = list(checksums.values())
+    elif not isinstance(checksums, list):
+        checksums = [checksums]
+
+    for checksum in checksums:
+        if isinstance(checksum, (dict, list)):
+            res.update(det_checksum_types(checksum))
+        elif isinstance(checksum, str):
+            if len(checksum) == 64:
+                res.add(CHECKSUM_TYPE_SHA256)
+            elif len(checksum) == 32:
+                res.add(CHECKSUM_TYPE_MD5)
+        elif isinstance(checksum, tuple):
+            if len(checksum) == 2 and checksum[0] in CHECKSUM_FUNCTIONS:
+                res.add(checksum[0])
+            else:
+                # tuple of alternative checksums
+                res.update(det_checksum_types(list(checksum)))
+
+    # only types of checksums that can be computed incrementally while downloading are relevant
+    res = sorted(typ for typ in res if typ in CHECKSUM_HASHERS)
+
+    return res or [DEFAULT_CHECKSUM]
+
+
 def is_sha256_checksum(value):
     """Check whether provided string is a SHA256 checksum."""
     res = False
@@ -2084,6 +2400,73 @@ def mkdir(path, parents=False, set_gid=None, sticky=None):
         _log.debug("Not creating existing path %s" % path)
 
 
+def det_cache_dir():
+    """
+    Determine location of directory for persistent caches (and indices) of EasyBuild:
+    'easybuild' subdirectory of $XDG_CACHE_HOME, or of $HOME/.cache if $XDG_CACHE_HOME is not set.
+    """
+    xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg_cache_home, CACHE_DIRNAME)
+
+
+def det_cache_path(option_name, name):
+    """
+    Determine location of persistent cache (or index):
+    value for specified configuration option if specified (an empty value disables the cache),
+    or specified file/directory name in EasyBuild cache directory (see det_cache_dir).
+
+    :param option_name: name of configuration option that specifies location of cache
+    :param name: name of file or directory for cache in EasyBuild cache directory
+    :return: location of cache, or None if it is disabled
+    """
+    # build option is not defined if EasyBuild configuration was not set up, persistent cache is not used then
+    path = build_option(option_name, default=False)
+    if path is None:
+        path = os.path.join(det_cache_dir(), name)
+
+    return path or None
+
+
+def prune_cache_dir(path, max_age=DEFAULT_CACHE_MAX_AGE, depth=1):
+    """
+    Remove entries (files or directories) in specified cache directory that were not used for a while,
+    based on their modification time (so cache entries that are used should be touched).
+    This is done at most once a day, to avoid that a large cache directory is scanned in every EasyBuild session.
+
+    :param path: location of cache directory
+    :param max_age: maximum age (in seconds) of cache entries to retain
+    :param depth: depth in directory tree at which cache entries are located (1 means directly in cache directory)
+    :return: list of paths to cache entries that were removed
+    """
+    removed = []
+
+    stamp_path = os.path.join(path, CACHE_PRUNED_STAMP)
+    now = time.time()
+    try:
+        if now - os.path.getmtime(stamp_path) < CACHE_PRUNE_INTERVAL:
+            return removed
+    except OSError:
+        # no cache directory (yet), or cache directory was never pruned
+        if not os.path.isdir(path):
+            return removed
+
+    try:
+        write_file(stamp_path, '', forced=True)
+        entries = glob.glob(os.path.join(path, *(['*'] * depth)))
+        for entry in entries:
+            if now - os.path.getmtime(entry) > max_age:
+                if os.path.isdir(entry) and not os.path.islink(entry):
+                    shutil.rmtree(entry)
+                else:
+                    os.remove(entry)
+                removed.append(entry)
+    except (OSError, EasyBuildError) as err:
+        _log.warning("Failed to remove outdated entries from cache %s: %s", path, err)
+
+    _log.info("Removed %d outdated entries from cache %s", len(removed), path)
+    return removed
+
+
 def det_lock_path(lock_name):
     """
     Determine full path for lock with specifed name.
@@ -2306,7 +2689,8 @@ def move_logs(src_logfile, target_logfile):
             move_file(app_log, new_log_path)
             _log.info(f"Moved log file {src_logfile} to {new_log_path}")
 
-            if zip_log_cmd:
+            # structured logs are already compressed, and are read via their index
+            if zip_log_cmd and not is_structured_log_file(new_log_path):
                 run_shell_cmd(f"{zip_log_cmd} {new_log_path}")
                 _log.info(f"Zipped log {new_log_path} using '{zip_log_cmd}'")
 
@@ -2765,10 +3149,154 @@ def copy(paths, target_path, force_in_dry_run=False, **kwargs):
             raise EasyBuildError("Specified path to copy is not an existing file or directory: %s", path)
 
 
+def git_mirror_dir(url, mirror_path=None):
+    """
+    Determine location of bare mirror for Git repository at specified URL
+
+    :param url: URL of Git repository
+    :param mirror_path: path to directory that holds Git mirrors (--git-mirror-path if None)
+    """
+    if mirror_path is None:
+        mirror_path = build_option('git_mirror_path')
+    if not mirror_path:
+        return None
+
+    # strip off scheme and trailing '.git', and use remainder as (unique) subdirectory;
+    # the ':' in SSH-style URLs like git@github.com:easybuilders/repo.git is treated as a separator
+    url = re.sub(r'^[a-z+]+://', '', url.rstrip('/'))
+    if url.endswith('.git'):
+        url = url[:-len('.git')]
+    subdirs = [re.sub(r'[^\w.-]', '_', x) for x in re.split(r'[/:]+', url) if x]
+
+    return os.path.join(mirror_path, *subdirs) + '.git'
+
+
+def update_git_mirror(url, git_cmd='git', ref=None, mirror_path=None):
+    """
+    Create or update bare mirror for Git repository at specified URL, and return its location.
+
+    If a specific commit or tag is specified via 'ref', an existing mirror is only updated if it does not include it
+    yet, and for tags only the tag itself is fetched.
+
+    :param url: URL of Git repository
+    :param git_cmd: base 'git' command to use (may include '-c <param>' options)
+    :param ref: commit or tag (as 'refs/tags/<tag>') that should be available in the mirror
+    :param mirror_path: path to directory that holds Git mirrors (--git-mirror-path if None)
+    """
+    mirror_dir = git_mirror_dir(url, mirror_path=mirror_path)
+    if mirror_dir is None:
+        raise EasyBuildError("No path to Git mirrors available to mirror %s", url)
+
+    dry_run = build_option('extended_dry_run')
+
+    if os.path.exists(os.path.join(mirror_dir, 'HEAD')):
+        fetch = True
+        if ref and not dry_run:
+            verify_cmd = f"{git_cmd} rev-parse --verify --quiet {ref}^{{commit}}"
+            res = run_shell_cmd(verify_cmd, work_dir=mirror_dir, hidden=True, fail_on_error=False)
+            if res.exit_code == 0:
+                _log.info("Git mirror %s for %s already includes %s, no need to fetch", mirror_dir, url, ref)
+                fetch = False
+
+        if fetch:
+            fetch_cmd = [git_cmd, 'fetch', '--prune', 'origin']
+            if ref and ref.startswith('refs/tags/'):
+                fetch_cmd.append(f'+{ref}:{ref}')
+            run_shell_cmd(' '.join(fetch_cmd), work_dir=mirror_dir, hidden=True, verbose_dry_run=True)
+    else:
+        _log.info("Creating Git mirror for %s in %s", url, mirror_dir)
+        mkdir(os.path.dirname(mirror_dir), parents=True)
+        mirror_cmd = [git_cmd, 'clone', '--mirror', url, mirror_dir]
+        run_shell_cmd(' '.join(mirror_cmd), hidden=True, verbose_dry_run=True)
+
+    return mirror_dir
+
+
+def _resolve_git_submodule_url(url, parent_url):
+    """Resolve (relative) URL of Git submodule w.r.t. the URL of the parent repository."""
+    if not url.startswith(('./', '../')):
+        return url
+
+    base, sep = parent_url.rstrip('/'), '/'
+    while url.startswith(('./', '../')):
+        if url.startswith('../'):
+            # strip off last component of parent URL, taking into account SSH-style URLs (git@host:org/repo)
+            idx = max(base.rfind('/'), base.rfind(':'))
+            if idx >= 0:
+                base, sep = base[:idx], base[idx]
+        url = url.split('/', 1)[1]
+
+    return base + sep + url
+
+
+def _git_submodule_selected(path, pathspec):
+    """Check whether Git submodule at specified path is selected by (list of) pathspecs (like ':!path')."""
+    if not pathspec:
+        return True
+
+    def match(pattern):
+        return fnmatch.fnmatch(path, pattern) or path.startswith(pattern.rstrip('/') + '/')
+
+    includes = [x for x in pathspec if not x.startswith('!')]
+    excludes = [x[1:] for x in pathspec if x.startswith('!')]
+
+    return (not includes or any(match(x) for x in includes)) and not any(match(x) for x in excludes)
+
+
+def _update_git_submodules_from_mirrors(repo_dir, repo_url, git_cmd, recursive=False, pathspec=None):
+    """
+    Initialise and update submodules of Git repository in specified directory,
+    using (updated) bare mirrors for each of the submodules.
+
+    :param repo_dir: path to Git working directory
+    :param repo_url: URL of Git repository (used to resolve relative submodule URLs)
+    :param git_cmd: base 'git' command to use (may include '-c <param>' options)
+    :param recursive: also update nested submodules
+    :param pathspec: list of pathspecs to limit which submodules are updated
+    """
+    if not os.path.exists(os.path.join(repo_dir, '.gitmodules')):
+        return
+
+    config_cmd = f"{git_cmd} config --file .gitmodules --get-regexp '^submodule\\..*\\.(url|path)$'"
+    res = run_shell_cmd(config_cmd, work_dir=repo_dir, hidden=True, fail_on_error=False)
+    submodules = {}
+    for line in res.output.strip().splitlines():
+        key, value = line.split(None, 1)
+        name, attr = key[len('submodule.'):].rsplit('.', 1)
+        submodules.setdefault(name, {})[attr] = value.strip()
+
+    # submodules are cloned from local mirrors, so the (by default disallowed) file protocol must be allowed
+    submodule_cmd = [git_cmd, '-c protocol.file.allow=always']
+    for name, submodule in sorted(submodules.items()):
+        if 'url' not in submodule or not _git_submodule_selected(submodule.get('path', name), pathspec):
+            continue
+        submodule['url'] = _resolve_git_submodule_url(submodule['url'], repo_url)
+        # determine commit recorded for submodule, so mirror is only updated when needed
+        res = run_shell_cmd(f"{git_cmd} rev-parse HEAD:{submodule.get('path', name)}", work_dir=repo_dir,
+                            hidden=True, fail_on_error=False)
+        ref = res.output.strip() if res.exit_code == 0 else None
+        mirror_dir = update_git_mirror(submodule['url'], git_cmd=git_cmd, ref=ref)
+        submodule_cmd.append(f"-c url.{mirror_dir}.insteadOf={submodule['url']}")
+    submodule_cmd.extend(['submodule', 'update', '--init'])
+    if pathspec:
+        submodule_cmd.extend(['--'] + [f"':{path}'" for path in pathspec])
+
+    run_shell_cmd(' '.join(submodule_cmd), work_dir=repo_dir, hidden=True, verbose_dry_run=True)
+
+    if recursive:
+        for submodule in submodules.values():
+            subrepo_dir = os.path.join(repo_dir, submodule.get('path', ''))
+            if 'url' in submodule and os.path.exists(os.path.join(subrepo_dir, '.git')):
+                _update_git_submodules_from_mirrors(subrepo_dir, submodule['url'], git_cmd, recursive=True)
+
+
 def get_source_tarball_from_git(filename, target_dir, git_config):
     """
     Downloads a git repository, at a specific tag or commit, recursively or not, and make an archive with it
 
+    If a path to Git mirrors is configured (--git-mirror-path), the repository (and its submodules) are cloned
+    from a (incrementally updated) local bare mirror rather than from the remote repository.
+
     :param filename: name of the archive file to save the code to (including extension)
     :param target_dir: target directory where to save the archive to
     :param git_config: dictionary containing url, repo_name, recursive, and one of tag or commit
@@ -2814,14 +3342,26 @@ def get_source_tarball_from_git(filename, target_dir, git_config):
         git_cmd_params = [f"-c {param}" for param in extra_config_params]
         git_cmd += f" {' '.join(git_cmd_params)}"
 
+    # Ensure URL is also processed correctly by tools that don't collapse double slashes
+    url = url.rstrip('/')
+    repo_url = f'{url}/{repo_name}.git'
+
+    if commit:
+        ref = commit
+    else:
+        ref = f"refs/tags/{tag}"
+
+    # if a path to Git mirrors is specified, clone from (updated) local mirror rather than from remote repository
+    mirror_dir = None
+    if build_option('git_mirror_path'):
+        mirror_dir = update_git_mirror(repo_url, git_cmd=git_cmd, ref=ref)
+
     # compose 'git clone' command, and run it
     clone_cmd = [git_cmd, 'clone']
     # checkout is done separately below for specific commits
     clone_cmd.append('--no-checkout')
 
-    # Ensure URL is also processed correctly by tools that don't collapse double slashes
-    url = url.rstrip('/')
-    clone_cmd.append(f'{url}/{repo_name}.git')
+    clone_cmd.append(mirror_dir or repo_url)
 
     if clone_into:
         clone_cmd.append(clone_into)
@@ -2836,17 +3376,20 @@ def get_source_tarball_from_git(filename, target_dir, git_config):
 
     repo_dir = os.path.join(tmpdir, repo_name)
 
-    # compose checkout command
-    checkout_cmd = [git_cmd, 'checkout']
-    # if a specific commit is asked for, check it out
-    if commit:
-        checkout_cmd.append(f"{commit}")
-    elif tag:
-        checkout_cmd.append(f"refs/tags/{tag}")
+    if mirror_dir:
+        # make sure 'origin' remote points to actual repository rather than to local mirror
+        set_url_cmd = f"{git_cmd} remote set-url origin {repo_url}"
+        run_shell_cmd(set_url_cmd, work_dir=repo_dir, hidden=True, verbose_dry_run=True)
+
+    # compose checkout command, to check out specific commit or tag
+    checkout_cmd = [git_cmd, 'checkout', ref]
 
     run_shell_cmd(' '.join(checkout_cmd), work_dir=repo_dir, hidden=True, verbose_dry_run=True)
 
-    if recursive or recurse_submodules:
+    if (recursive or recurse_submodules) and mirror_dir and not build_option('extended_dry_run'):
+        _update_git_submodules_from_mirrors(repo_dir, repo_url, git_cmd, recursive=recursive,
+                                            pathspec=recurse_submodules)
+    elif recursive or recurse_submodules:
         submodule_cmd = [git_cmd, 'submodule', 'update', '--init']
         if recursive:
             submodule_cmd.append('--recursive')
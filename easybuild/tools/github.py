@@ -36,6 +36,8 @@ import getpass
 import glob
 import functools
 import itertools
+import json
+import multiprocessing
 import os
 import random
 import re
@@ -44,6 +46,7 @@ import sys
 import tempfile
 import time
 import urllib.error
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from http.client import HTTPException
@@ -59,8 +62,9 @@ from easybuild.tools import LooseVersion
 from easybuild.tools.build_log import EasyBuildError, EasyBuildExit, print_msg, print_warning
 from easybuild.tools.config import build_option
 from easybuild.tools.filetools import apply_patch, copy_dir, copy_easyblocks, copy_file, copy_framework_files
-from easybuild.tools.filetools import det_patched_files, download_file, extract_file
-from easybuild.tools.filetools import get_easyblock_class_name, mkdir, read_file, symlink, which, write_file
+from easybuild.tools.filetools import det_cache_path, det_patched_files, download_file, extract_file
+from easybuild.tools.filetools import get_easyblock_class_name, mkdir, read_file, remove_dir, symlink, which
+from easybuild.tools.filetools import prune_cache_dir, write_file, write_json_file
 from easybuild.tools.systemtools import UNKNOWN, get_tool_version
 from easybuild.tools.utilities import nub, only_if_module_is_available
 from easybuild.tools.version import FRAMEWORK_VERSION, different_major_versions
@@ -118,6 +122,17 @@ HTTP_STATUS_NO_CONTENT = 204
 KEYRING_GITHUB_TOKEN = 'github_token'
 URL_SEPARATOR = '/'
 
+# name of (JSON) file with index of patch files used in easyconfig files (see update_patch_index)
+PATCH_INDEX_FILENAME = 'patch_index.json'
+# in-memory patch index, with paths to easyconfig files as keys
+PATCH_INDEX = {}
+
+# name of directory (in repository path) in which files fetched from GitHub are cached, per commit
+GITHUB_FILES_CACHE_DIRNAME = 'github_files_cache'
+GITHUB_FILES_CACHE_METADATA = 'cache.json'
+# maximum number of PRs for which files are fetched concurrently
+GITHUB_MAX_CONCURRENT_FETCHES = 4
+
 STATUS_PENDING = 'pending'
 STATUS_SUCCESS = 'success'
 
@@ -462,6 +477,99 @@ def download_repo(repo=GITHUB_EASYCONFIGS_REPO, branch=None, commit=None, accoun
     return extracted_path
 
 
+def det_github_files_cache_path():
+    """
+    Determine location of directory in which files fetched from GitHub (for PRs & commits) are cached:
+    value for --github-files-cache-path if specified (an empty value disables the cache),
+    or in the EasyBuild cache directory (see det_cache_path).
+    """
+    return det_cache_path('github_files_cache_path', GITHUB_FILES_CACHE_DIRNAME)
+
+
+def det_github_files_cache_dir(account, repo, sha, base_sha=None):
+    """
+    Determine cache directory for files fetched from specified GitHub repository at specified commit
+    (None if cache is disabled)
+
+    :param sha: SHA of commit (head commit for PRs)
+    :param base_sha: SHA of commit in target branch on top of which the PR patch is applied (only for PRs)
+    """
+    cache_path = det_github_files_cache_path()
+    if cache_path:
+        name = sha if base_sha is None else '%s-%s' % (sha, base_sha)
+        return os.path.join(cache_path, account, repo, name)
+    return None
+
+
+def _create_github_files_download_dir(cache_dir):
+    """
+    Create temporary directory next to specified cache directory to download files from GitHub into,
+    so they can be moved in place (atomically) once they are complete (see _write_github_files_cache).
+    """
+    mkdir(os.path.dirname(cache_dir), parents=True)
+    return tempfile.mkdtemp(dir=os.path.dirname(cache_dir), prefix='.%s-' % os.path.basename(cache_dir))
+
+
+def _mark_github_files_cache_used(cache_dir):
+    """
+    Mark specified cache directory for files fetched from GitHub as used (by touching it),
+    and remove cache directories which were not used for a while (see prune_cache_dir).
+    """
+    try:
+        os.utime(cache_dir)
+    except OSError as err:
+        _log.warning("Failed to touch cache directory %s: %s", cache_dir, err)
+
+    # cache directories are located in <cache path>/<account>/<repo>/<sha>
+    prune_cache_dir(det_github_files_cache_path(), depth=3)
+
+
+def _read_github_files_cache(cache_dir):
+    """Return location of cached repository in specified cache directory, or None if it is not available."""
+    metadata_path = os.path.join(cache_dir, GITHUB_FILES_CACHE_METADATA)
+    res = None
+    if os.path.exists(metadata_path):
+        try:
+            res = os.path.join(cache_dir, json.loads(read_file(metadata_path))['path'])
+        except (EasyBuildError, KeyError, TypeError, ValueError) as err:
+            _log.warning("Ignoring corrupt cache for files fetched from GitHub in %s: %s", cache_dir, err)
+        if res and not os.path.isdir(res):
+            res = None
+    if res:
+        _mark_github_files_cache_used(cache_dir)
+    return res
+
+
+def _write_github_files_cache(cache_dir, download_path, repo_path, diff_path=None):
+    """
+    Move downloaded repository into cache (atomically, so concurrent EasyBuild sessions don't see partial results)
+
+    :param cache_dir: cache directory to use
+    :param download_path: location of (temporary) directory in which repository was downloaded
+    :param repo_path: location of repository in download path
+    :param diff_path: location of diff file for PR (if any)
+    :return: location of repository in cache directory (or original location if caching failed)
+    """
+    if diff_path:
+        copy_file(diff_path, os.path.join(download_path, os.path.basename(diff_path)))
+    write_file(os.path.join(download_path, GITHUB_FILES_CACHE_METADATA),
+               json.dumps({'path': os.path.relpath(repo_path, download_path)}))
+    try:
+        os.rename(download_path, cache_dir)
+    except OSError as err:
+        # another EasyBuild session may have cached the same files in the meantime
+        cached_path = _read_github_files_cache(cache_dir)
+        if cached_path:
+            remove_dir(download_path)
+            return cached_path
+        _log.info("Failed to move %s to %s, keeping it in place: %s", download_path, cache_dir, err)
+        return repo_path
+
+    _mark_github_files_cache_used(cache_dir)
+
+    return os.path.join(cache_dir, os.path.relpath(repo_path, download_path))
+
+
 def pr_files_cache(func):
     """
     Decorator to cache result of fetch_files_from_pr.
@@ -554,37 +662,65 @@ def fetch_files_from_pr(pr, path=None, github_user=None, github_account=None, gi
         pr_target_branch = GITHUB_DEVELOP_BRANCH
         _log.info(f"Using {pr_target_branch} instead of 5.0.x branch (since that branch was removed)")
 
-    # download target branch of PR so we can try and apply the PR patch on top of it
-    repo_target_branch = download_repo(repo=github_repo, account=github_account, branch=pr_target_branch,
-                                       github_user=github_user)
-
     # determine list of changed files via diff
     diff_url = pr_data['diff_url']
     diff_fn = os.path.basename(diff_url)
     diff_filepath = os.path.join(path, diff_fn)
 
-    def pr_request_fn(gh):
-        return gh.repos[github_account][github_repo].pulls[pr]
+    # target branch with PR patch applied may be available in cache,
+    # if neither the PR nor the target branch were changed since it was cached
+    cache_dir, cached_path, target_sha = None, None, None
+    if det_github_files_cache_path() and not pr_closed:
+        target_sha = fetch_latest_commit_sha(github_repo, github_account, pr_target_branch, github_user=github_user)
+        cache_dir = det_github_files_cache_dir(github_account, github_repo, pr_data['head']['sha'],
+                                               base_sha=target_sha)
+        cached_path = _read_github_files_cache(cache_dir)
+
+    download_path = None
+    if cached_path:
+        _log.info("Using cached files for %s/%s PR #%s (head commit %s, target branch commit %s) from %s",
+                  github_account, github_repo, pr, pr_data['head']['sha'], target_sha, cached_path)
+        diff_txt = read_file(os.path.join(cache_dir, diff_fn))
+        write_file(diff_filepath, diff_txt)
+        repo_target_branch = cached_path
+    elif cache_dir:
+        # download target branch of PR (at the commit that the cache directory corresponds to)
+        # into temporary directory, so it can be moved in place (atomically) once PR patch is applied
+        download_path = _create_github_files_download_dir(cache_dir)
+        try:
+            repo_target_branch = download_repo(repo=github_repo, account=github_account, commit=target_sha,
+                                               path=download_path, github_user=github_user)
+        except EasyBuildError:
+            remove_dir(download_path)
+            raise
+    else:
+        # download target branch of PR so we can try and apply the PR patch on top of it
+        repo_target_branch = download_repo(repo=github_repo, account=github_account, branch=pr_target_branch,
+                                           github_user=github_user)
 
-    # see also https://docs.github.com/en/rest/pulls/pulls#get-a-pull-request,
-    # in particular part about media types
-    error_msg = None
-    accept_diff = {'Accept': 'application/vnd.github.diff'}
-    try:
-        status, data = github_api_get_request(pr_request_fn, github_user=github_user, headers=accept_diff)
-        if status == HTTP_STATUS_OK:
-            # decode from bytes to text
-            diff_txt = data.decode()
-            _log.debug("Diff for PR #%s:\n%s", pr, diff_txt)
-            write_file(diff_filepath, diff_txt)
-        else:
-            error_msg = f"HTTP status code: {status}"
-    except HTTPError as err:
-        error_msg = str(err)
+    if not cached_path:
+        def pr_request_fn(gh):
+            return gh.repos[github_account][github_repo].pulls[pr]
 
-    if error_msg:
-        error_msg = f"Failed to download diff for {github_account}/{github_repo} PR #{pr}! ({error_msg})"
-        raise EasyBuildError(error_msg, exit_code=EasyBuildExit.FAIL_GITHUB)
+        # see also https://docs.github.com/en/rest/pulls/pulls#get-a-pull-request,
+        # in particular part about media types
+        error_msg = None
+        accept_diff = {'Accept': 'application/vnd.github.diff'}
+        try:
+            status, data = github_api_get_request(pr_request_fn, github_user=github_user, headers=accept_diff)
+            if status == HTTP_STATUS_OK:
+                # decode from bytes to text
+                diff_txt = data.decode()
+                _log.debug("Diff for PR #%s:\n%s", pr, diff_txt)
+                write_file(diff_filepath, diff_txt)
+            else:
+                error_msg = f"HTTP status code: {status}"
+        except HTTPError as err:
+            error_msg = str(err)
+
+        if error_msg:
+            error_msg = f"Failed to download diff for {github_account}/{github_repo} PR #{pr}! ({error_msg})"
+            raise EasyBuildError(error_msg, exit_code=EasyBuildExit.FAIL_GITHUB)
 
     patched_files = det_patched_files(txt=diff_txt, omit_ab_prefix=True, github=True, filter_deleted=True)
     _log.debug("List of patched files for PR #%s: %s", pr, patched_files)
@@ -592,7 +728,10 @@ def fetch_files_from_pr(pr, path=None, github_user=None, github_account=None, gi
     final_path = None
 
     # try to apply PR patch on top of target branch, unless the PR is closed or already merged
-    if pr_merged:
+    if cached_path:
+        final_path = cached_path
+
+    elif pr_merged:
         _log.info("PR is already merged, so using current version of PR target branch")
         final_path = repo_target_branch
 
@@ -606,6 +745,12 @@ def fetch_files_from_pr(pr, path=None, github_user=None, github_account=None, gi
         except EasyBuildError as err:
             _log.warning("Ignoring problem that occured when applying PR patch: %s", err)
 
+    if download_path:
+        if final_path == repo_target_branch:
+            final_path = _write_github_files_cache(cache_dir, download_path, final_path, diff_path=diff_filepath)
+        else:
+            remove_dir(download_path)
+
     if final_path is None:
 
         if pr_closed:
@@ -689,6 +834,56 @@ def fetch_easyconfigs_from_pr(pr, path=None, github_user=None):
     return fetch_files_from_pr(pr, path, github_user, github_repo=GITHUB_EASYCONFIGS_REPO)
 
 
+def _fetch_files_from_pr_in_worker(pr, github_user, github_account, github_repo):
+    """Fetch patched files for a particular PR in worker process, see fetch_files_from_prs."""
+    return fetch_files_from_pr(pr, github_user=github_user, github_account=github_account, github_repo=github_repo)
+
+
+def fetch_files_from_prs(prs, github_user=None, github_account=None, github_repo=None):
+    """
+    Fetch patched files for multiple PRs, concurrently using a bounded pool of worker processes
+    (worker processes rather than threads are used, since extracting files involves changing the working directory).
+
+    :param prs: list of PR numbers
+    :return: list with list of patched files for each of the PRs (in order)
+    """
+    def key(pr):
+        """Determine key for specified PR in cache of fetch_files_from_pr (see pr_files_cache)."""
+        return (pr, github_account, github_repo, None)
+
+    todo = nub(pr for pr in prs if key(pr) not in fetch_files_from_pr._cache)
+    max_workers = min(len(todo), GITHUB_MAX_CONCURRENT_FETCHES)
+
+    use_workers = max_workers > 1
+    if use_workers and build_option('async_logging', default=False):
+        _log.info("Asynchronous logging is enabled, so fetching files for PRs in main process")
+        use_workers = False
+    if use_workers and 'fork' not in multiprocessing.get_all_start_methods():
+        _log.info("Worker processes can not be forked, so fetching files for PRs in main process")
+        use_workers = False
+
+    if use_workers:
+        _log.info("Fetching files for %d PRs using %d worker processes", len(todo), max_workers)
+        # worker processes are forked, so they inherit EasyBuild configuration
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork')) as pool:
+            results = pool.map(_fetch_files_from_pr_in_worker, todo, itertools.repeat(github_user),
+                               itertools.repeat(github_account), itertools.repeat(github_repo))
+            fetch_files_from_pr.update_cache({key(pr): res for (pr, res) in zip(todo, results)})
+
+    return [fetch_files_from_pr(pr, github_user=github_user, github_account=github_account, github_repo=github_repo)
+            for pr in prs]
+
+
+def fetch_easyblocks_from_prs(prs, github_user=None):
+    """Fetch patched easyblocks for multiple PRs (concurrently)."""
+    return fetch_files_from_prs(prs, github_user=github_user, github_repo=GITHUB_EASYBLOCKS_REPO)
+
+
+def fetch_easyconfigs_from_prs(prs, github_user=None):
+    """Fetch patched easyconfig files for multiple PRs (concurrently)."""
+    return fetch_files_from_prs(prs, github_user=github_user, github_repo=GITHUB_EASYCONFIGS_REPO)
+
+
 def fetch_files_from_commit(commit, files=None, path=None, github_account=None, github_repo=None):
     """
     Fetch files from a specific commit.
@@ -758,8 +953,20 @@ def fetch_files_from_commit(commit, files=None, path=None, github_account=None,
         files = det_patched_files(txt=diff_txt, omit_ab_prefix=True, github=True, filter_deleted=True)
         _log.debug("List of patched files for commit %s: %s", commit, files)
 
-    # download tarball for specific commit
-    repo_commit = download_repo(repo=github_repo, commit=commit, account=github_account)
+    # download tarball for specific commit (unless it is available in cache already)
+    cache_dir = det_github_files_cache_dir(github_account, github_repo, commit)
+    repo_commit = _read_github_files_cache(cache_dir) if cache_dir else None
+    if repo_commit is None:
+        # download into temporary directory, so it can be moved in place in cache (atomically) once it's complete
+        download_path = _create_github_files_download_dir(cache_dir) if cache_dir else None
+        try:
+            repo_commit = download_repo(repo=github_repo, commit=commit, account=github_account, path=download_path)
+        except EasyBuildError:
+            if download_path:
+                remove_dir(download_path)
+            raise
+        if download_path:
+            repo_commit = _write_github_files_cache(cache_dir, download_path, repo_commit)
 
     # symlink subdirectories of 'easybuild/easy{blocks,configs}' into path that gets added to robot search path
     mkdir(path, parents=True)
@@ -1339,8 +1546,8 @@ def push_branch_to_github(git_repo, target_account, target_repo, branch):
             )
 
 
-def is_patch_for(patch_name, ec):
-    """Check whether specified patch matches any patch in the provided EasyConfig instance."""
+def det_patch_names(ec):
+    """Determine names of all patch files used in the provided EasyConfig instance."""
     # Extract name from patch entry
     def get_name(patch):
         if isinstance(patch, (tuple, list)):
@@ -1372,32 +1579,37 @@ def is_patch_for(patch_name, ec):
                                                options.get('post_install_patches', []))
                 ))
 
-    return patch_name in patches
+    return patches
+
+
+def is_patch_for(patch_name, ec):
+    """Check whether specified patch matches any patch in the provided EasyConfig instance."""
+    return patch_name in det_patch_names(ec)
 
 
 def det_patch_specs(patch_paths, file_info, ec_dirs):
     """ Determine software names for patch files """
     print_msg("determining software names for patch files...")
-    patch_specs = []
+    soft_names = {}
     for patch_path in patch_paths:
-        soft_name = None
         patch_file = os.path.basename(patch_path)
 
         # consider patch lists of easyconfigs being provided
         for ec in file_info['ecs']:
             if is_patch_for(patch_file, ec):
-                soft_name = ec['name']
+                soft_names[patch_path] = ec['name']
                 break
 
-        if soft_name:
-            patch_specs.append((patch_path, soft_name))
-        else:
-            # fall back on scanning all eb files for patches
-            print("Matching easyconfig for %s not found on the first try:" % patch_path)
-            print("scanning all easyconfigs to determine where patch file belongs (this may take a while)...")
-            soft_name = find_software_name_for_patch(patch_file, ec_dirs)
+    # fall back on patch files used in all easyconfigs, for all remaining patch files at once
+    todo = [patch_path for patch_path in patch_paths if patch_path not in soft_names]
+    if todo:
+        print("Matching easyconfig for %s not found on the first try:" % ', '.join(todo))
+        print("checking patch files used in all easyconfigs to determine where patch files belong...")
+        found = find_software_names_for_patches([os.path.basename(patch_path) for patch_path in todo], ec_dirs)
+        for patch_path in todo:
+            soft_name = found.get(os.path.basename(patch_path))
             if soft_name:
-                patch_specs.append((patch_path, soft_name))
+                soft_names[patch_path] = soft_name
             else:
                 # still nothing found
                 raise EasyBuildError(
@@ -1405,22 +1617,73 @@ def det_patch_specs(patch_paths, file_info, ec_dirs):
                     exit_code=EasyBuildExit.OPTION_ERROR
                 )
 
-    return patch_specs
+    return [(patch_path, soft_names[patch_path]) for patch_path in patch_paths]
 
 
-def find_software_name_for_patch(patch_name, ec_dirs):
+def det_patch_index_path():
+    """
+    Determine location of patch index:
+    value for --patch-index-path if specified (an empty value disables the persistent patch index),
+    or in the EasyBuild cache directory (see det_cache_path).
     """
-    Scan all easyconfigs in the robot path(s) to determine which software a patch file belongs to
+    return det_cache_path('patch_index_path', PATCH_INDEX_FILENAME)
 
-    :param patch_name: name of the patch file
-    :param ec_dirs: list of directories to consider when looking for easyconfigs
-    :return: name of the software that this patch file belongs to (if found)
+
+def _read_patch_index(path):
+    """Read patch index from specified location (empty if it doesn't exist yet or is corrupt)."""
+    index = {}
+    if os.path.exists(path):
+        try:
+            with open(path) as fp:
+                index = json.load(fp)
+        except (OSError, ValueError) as err:
+            _log.warning("Failed to read patch index %s, ignoring it: %s", path, err)
+    return index
+
+
+def _write_patch_index(path, entries, removed):
     """
+    Add entries to patch index, and save it (atomically, so concurrent EasyBuild sessions don't see a partial file).
+
+    :param entries: new or updated entries, with easyconfig file paths as keys
+    :param removed: paths to easyconfig files which no longer exist
+    """
+    # pick up entries that were added by other EasyBuild sessions in the meantime
+    index = {ec_path: entry for (ec_path, entry) in _read_patch_index(path).items() if ec_path not in removed}
+    index.update(entries)
+
+    try:
+        write_json_file(path, index, sort_keys=True)
+    except EasyBuildError as err:
+        _log.warning("Failed to save patch index %s: %s", path, err)
+
+
+def _det_patch_index_entry(path):
+    """
+    Determine entry in patch index for specified easyconfig file:
+    list of 2-tuples with software name and name of patch file used in that easyconfig file
+    """
+    patches = []
+    # only easyconfig files that mention 'patches' are parsed
+    if 'patches' in read_file(path):
+        try:
+            for ec in process_easyconfig(path, validate=False, parse_only=True):
+                soft_name = ec['ec']['name']
+                patches.extend((soft_name, patch_name) for patch_name in nub(det_patch_names(ec['ec'])))
+        except EasyBuildError as err:
+            _log.warning("Ignoring easyconfig %s that fails to parse: %s", path, err)
+    return patches
+
 
-    soft_name = None
+def _det_easyconfig_stamps(ec_dirs):
+    """
+    Determine stamps (size + modification time) for all easyconfig files in specified directories
 
+    :param ec_dirs: list of directories to consider when looking for easyconfigs
+    :return: dict with paths to easyconfig files as keys, and [size, mtime] stamp as values
+    """
     ignore_dirs = build_option('ignore_dirs')
-    all_ecs = []
+    ec_stamps = {}
     for ec_dir in ec_dirs:
         for (dirpath, dirnames, filenames) in os.walk(ec_dir):
             # Exclude ignored dirs
@@ -1430,12 +1693,17 @@ def find_software_name_for_patch(patch_name, ec_dirs):
                 # TODO: In EasyBuild 5.x only check for '*.eb' files
                 if fn != 'TEMPLATE.eb' and os.path.splitext(fn)[1] not in ('.py', '.patch'):
                     path = os.path.join(dirpath, fn)
-                    rawtxt = read_file(path)
-                    if 'patches' in rawtxt:
-                        all_ecs.append(path)
+                    stat = os.stat(path)
+                    ec_stamps[path] = [stat.st_size, stat.st_mtime_ns]
+    return ec_stamps
+
 
-    # Usual patch names are <software>-<version>_fix_foo.patch
-    # So search those ECs first
+def _det_patch_ec_sort_key(patch_name):
+    """
+    Determine sort key function for paths to easyconfig files that may use specified patch file:
+    usual patch names are <software>-<version>_fix_foo.patch, so easyconfig files with a name starting with
+    <software>-<version> come first, then those starting with <software>, then all others (sorted by name)
+    """
     patch_stem = os.path.splitext(patch_name)[0]
     # Extract possible sw name and version according to above scheme
     # Those might be the same as the whole patch stem, which is OK
@@ -1450,25 +1718,139 @@ def find_software_name_for_patch(patch_name, ec_dirs):
             not filename.startswith(possible_sw_name),
             filename
         )
-    all_ecs.sort(key=ec_key)
 
-    nr_of_ecs = len(all_ecs)
-    for idx, path in enumerate(all_ecs):
-        if soft_name:
-            break
-        try:
-            ecs = process_easyconfig(path, validate=False)
-            for ec in ecs:
-                if is_patch_for(patch_name, ec['ec']):
-                    soft_name = ec['ec']['name']
-                    break
-        except EasyBuildError as err:
-            _log.warning("Ignoring easyconfig %s that fails to parse: %s", path, err)
+    return ec_key
+
+
+def update_patch_index(ec_dirs):
+    """
+    Update index of patch files used in all easyconfig files in specified directories;
+    only easyconfig files that were added or changed since the index was last updated are parsed.
+    The index is kept in memory, and is also saved to the location determined via det_patch_index_path (if any).
+
+    :param ec_dirs: list of directories to consider when looking for easyconfigs
+    :return: dict with paths to easyconfig files as keys, and list of (software name, patch name) tuples as values
+    """
+    index_path = det_patch_index_path()
+    if index_path and not PATCH_INDEX:
+        PATCH_INDEX.update(_read_patch_index(index_path))
+
+    ec_stamps = _det_easyconfig_stamps(ec_dirs)
+
+    todo = [path for (path, stamp) in ec_stamps.items() if PATCH_INDEX.get(path, {}).get('stamp') != stamp]
+
+    # drop entries for easyconfig files in specified directories that no longer exist
+    ec_dir_prefixes = tuple(os.path.join(ec_dir, '') for ec_dir in ec_dirs)
+    removed = [path for path in PATCH_INDEX if path.startswith(ec_dir_prefixes) and path not in ec_stamps]
+    for path in removed:
+        del PATCH_INDEX[path]
+
+    new_entries = {}
+    nr_of_ecs = len(todo)
+    for idx, path in enumerate(todo):
+        new_entries[path] = {'stamp': ec_stamps[path], 'patches': _det_patch_index_entry(path)}
         sys.stdout.write('\r%s of %s easyconfigs checked' % (idx + 1, nr_of_ecs))
         sys.stdout.flush()
+    if todo:
+        sys.stdout.write('\n')
+
+    PATCH_INDEX.update(new_entries)
+    if index_path and (new_entries or removed):
+        _write_patch_index(index_path, new_entries, removed)
+
+    return {path: [tuple(x) for x in PATCH_INDEX[path]['patches']] for path in ec_stamps}
+
+
+def scan_easyconfigs_for_patches(patch_names, ec_dirs):
+    """
+    Determine which software the specified patch files belong to, without using the patch index:
+    easyconfig files that are most likely to use a patch file (see _det_patch_ec_sort_key) are checked first,
+    and scanning stops as soon as a matching easyconfig file is found for each of the patch files.
+
+    :param patch_names: list of names of patch files
+    :param ec_dirs: list of directories to consider when looking for easyconfigs
+    :return: dict with names of patch files as keys, and name of the software they belong to as values
+             (only for patch files for which a matching easyconfig was found),
+             and dict with patch index entries for the easyconfig files that were checked
+    """
+    ec_stamps = _det_easyconfig_stamps(ec_dirs)
+
+    # only easyconfig files that mention 'patches' need to be parsed
+    entries = {}
+    all_ecs = []
+    for path in ec_stamps:
+        if 'patches' in read_file(path):
+            all_ecs.append(path)
+        else:
+            entries[path] = {'stamp': ec_stamps[path], 'patches': []}
+
+    res = {}
+    nr_of_ecs = len(all_ecs)
+    nr_checked = 0
+    for patch_name in patch_names:
+        for path in sorted(all_ecs, key=_det_patch_ec_sort_key(patch_name)):
+            if path not in entries:
+                entries[path] = {'stamp': ec_stamps[path], 'patches': _det_patch_index_entry(path)}
+                nr_checked += 1
+                sys.stdout.write('\r%s of %s easyconfigs checked' % (nr_checked, nr_of_ecs))
+                sys.stdout.flush()
+            soft_names = [soft_name for (soft_name, name) in entries[path]['patches'] if name == patch_name]
+            if soft_names:
+                res[patch_name] = soft_names[0]
+                break
+    if nr_checked:
+        sys.stdout.write('\n')
+
+    return res, entries
 
-    sys.stdout.write('\n')
-    return soft_name
+
+def find_software_names_for_patches(patch_names, ec_dirs):
+    """
+    Determine which software the specified patch files belong to,
+    using the index of patch files used in all easyconfigs in the robot path(s) (see update_patch_index).
+    If no index is available (yet), the easyconfig files are scanned instead (see scan_easyconfigs_for_patches),
+    and the entries for the easyconfig files that were checked are used to start the persistent index (if any).
+
+    :param patch_names: list of names of patch files
+    :param ec_dirs: list of directories to consider when looking for easyconfigs
+    :return: dict with names of patch files as keys, and name of the software they belong to as values
+             (only for patch files for which a matching easyconfig was found)
+    """
+    index_path = det_patch_index_path()
+    if not PATCH_INDEX and not (index_path and os.path.exists(index_path)):
+        res, entries = scan_easyconfigs_for_patches(patch_names, ec_dirs)
+        if index_path:
+            _write_patch_index(index_path, entries, [])
+        return res
+
+    index = update_patch_index(ec_dirs)
+
+    # collect easyconfigs that use each of the specified patch files
+    candidates = {patch_name: [] for patch_name in patch_names}
+    for path, patches in index.items():
+        for soft_name, patch_name in patches:
+            if patch_name in candidates:
+                candidates[patch_name].append((path, soft_name))
+
+    res = {}
+    for patch_name, ecs in candidates.items():
+        if ecs:
+            # prefer easyconfigs with a name that matches the name of the patch file (if multiple match)
+            ec_key = _det_patch_ec_sort_key(patch_name)
+            res[patch_name] = min(ecs, key=lambda ec: ec_key(ec[0]))[1]
+
+    return res
+
+
+def find_software_name_for_patch(patch_name, ec_dirs):
+    """
+    Determine which software a patch file belongs to, based on all easyconfigs in the robot path(s)
+
+    :param patch_name: name of the patch file
+    :param ec_dirs: list of directories to consider when looking for easyconfigs
+    :return: name of the software that this patch file belongs to (if found)
+    """
+    return find_software_names_for_patches([patch_name], ec_dirs).get(patch_name)
 
 
 def check_pr_eligible_to_merge(pr_data):
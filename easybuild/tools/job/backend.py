@@ -63,7 +63,7 @@ class JobBackend:
         pass
 
     @abstractmethod
-    def make_job(self, script, name, env_vars=None, hours=None, cores=None):
+    def make_job(self, script, name, env_vars=None, hours=None, cores=None, mem=None):
         """
         Create and return a `Job` object with the given parameters.
 
@@ -54,7 +54,7 @@ try:
         import gc3libs
     import gc3libs.exceptions
     from gc3libs import Application, Run, create_engine
-    from gc3libs.quantity import hours as hr
+    from gc3libs.quantity import MB, hours as hr
     from gc3libs.workflow import AbortOnError, DependentTaskCollection
 
     # inject EasyBuild logger into GC3Pie
@@ -157,7 +157,7 @@ class GC3Pie(JobBackend):
         # before polling again (in seconds)
         self.poll_interval = build_option('job_polling_interval')
 
-    def make_job(self, script, name, env_vars=None, hours=None, cores=None):
+    def make_job(self, script, name, env_vars=None, hours=None, cores=None, mem=None):
         """
         Create and return a job object with the given parameters.
 
@@ -171,10 +171,11 @@ class GC3Pie(JobBackend):
         key-value pairs of environment variables that should be passed
         on to the job.
 
-        Optional arguments *hours* and *cores* should be
+        Optional arguments *hours*, *cores* and *mem* should be
         integer values:
         - *hours* must be in the range 1 .. ``MAX_WALLTIME``;
-        - *cores* depends on which cluster the job is being run.
+        - *cores* depends on which cluster the job is being run;
+        - *mem* is the amount of memory to request (in MB).
         """
         named_args = {
             'jobname': name,  # job name in GC3Pie
@@ -213,6 +214,9 @@ class GC3Pie(JobBackend):
         else:
             self.log.warning("Number of cores to request not specified, falling back to GC3Pie default")
 
+        if mem:
+            named_args['requested_memory'] = mem * MB
+
         return Application(['/bin/sh', '-c', script], **named_args)
 
     def queue(self, job, dependencies=frozenset()):
@@ -183,21 +183,22 @@ class PbsPython(JobBackend):
 
     ppn = property(_get_ppn)
 
-    def make_job(self, script, name, env_vars=None, hours=None, cores=None):
+    def make_job(self, script, name, env_vars=None, hours=None, cores=None, mem=None):
         """Create and return a `PbsJob` object with the given parameters."""
-        return PbsJob(self, script, name, env_vars=env_vars, hours=hours, cores=cores, conn=self.conn, ppn=self.ppn)
+        return PbsJob(self, script, name, env_vars=env_vars, hours=hours, cores=cores, mem=mem, conn=self.conn,
+                      ppn=self.ppn)
 
 
 class PbsJob:
     """Interaction with TORQUE"""
 
     def __init__(self, server, script, name, env_vars=None,
-                 hours=None, cores=None, conn=None, ppn=None):
+                 hours=None, cores=None, mem=None, conn=None, ppn=None):
         """
         create a new Job to be submitted to PBS
         env_vars is a dictionary with key-value pairs of environment variables that should be passed on to the job
-        hours and cores should be integer values.
-        hours can be 1 - (max walltime), cores depends on which cluster it is being run.
+        hours, cores and mem should be integer values.
+        hours can be 1 - (max walltime), cores depends on which cluster it is being run, mem is specified in MB.
         """
         self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
 
@@ -234,11 +235,13 @@ class PbsJob:
             self.log.warning("number of requested cores (%s) was greater than available (%s) " % (cores, max_cores))
             cores = max_cores
 
-        # only allow cores and hours for now.
+        # only allow cores, hours and memory for now.
         self.resources = {
             'walltime': '%s:00:00' % hours,
             'nodes': '1:ppn=%s' % cores,
         }
+        if mem:
+            self.resources['mem'] = '%dmb' % mem
         # don't specify any queue name to submit to, use the default
         self.queue = None
         # job id of this job
@@ -31,11 +31,13 @@ Authors:
 """
 import os
 import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from easybuild.base import fancylogger
 from easybuild.tools import LooseVersion
 from easybuild.tools.build_log import EasyBuildError, print_msg
-from easybuild.tools.config import JOB_DEPS_TYPE_ABORT_ON_ERROR, JOB_DEPS_TYPE_ALWAYS_RUN, build_option
+from easybuild.tools.config import DEFAULT_JOB_SUBMIT_WORKERS, JOB_DEPS_TYPE_ABORT_ON_ERROR, JOB_DEPS_TYPE_ALWAYS_RUN
+from easybuild.tools.config import build_option
 from easybuild.tools.job.backend import JobBackend
 from easybuild.tools.filetools import which
 from easybuild.tools.run import run_shell_cmd
@@ -91,14 +93,25 @@ class Slurm(JobBackend):
         """
         Initialise the PySlurm job backend.
         """
+        self._queued = []
         self._submitted = []
 
     def queue(self, job, dependencies=frozenset()):
         """
         Add a job to the queue.
 
+        Jobs are only actually submitted when `complete()` is called.
+
         :param dependencies: jobs on which this job depends.
         """
+        self._queued.append((job, list(dependencies)))
+
+    def _submit(self, job, dependencies):
+        """
+        Submit job (with user hold in place) using 'sbatch'.
+
+        :param dependencies: jobs on which this job depends (which must already be submitted)
+        """
         submit_cmd = 'sbatch'
 
         if dependencies:
@@ -128,14 +141,49 @@ class Slurm(JobBackend):
         else:
             raise EasyBuildError("Failed to determine job ID from output of submission command: %s", cmd_res.output)
 
-        self._submitted.append(job)
+        return job
+
+    def _submit_queued(self):
+        """
+        Submit all queued jobs, running (up to --job-submit-workers) 'sbatch' commands concurrently.
+
+        A job is submitted as soon as all jobs it depends on have been submitted (and hence have a job ID).
+        """
+        max_workers = build_option('job_submit_workers') or DEFAULT_JOB_SUBMIT_WORKERS
+        self.log.info("Submitting %d jobs, using up to %d concurrent submissions", len(self._queued), max_workers)
+
+        pending = self._queued
+        self._queued = []
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as thread_pool:
+            while pending or running:
+                ready = [(job, deps) for (job, deps) in pending if all(d.jobid is not None for d in deps)]
+                for (job, deps) in ready:
+                    running[thread_pool.submit(self._submit, job, deps)] = job
+                ready_ids = set(id(job) for (job, _) in ready)
+                pending = [(job, deps) for (job, deps) in pending if id(job) not in ready_ids]
+
+                if not running:
+                    job_names = ', '.join(job.name for (job, _) in pending)
+                    raise EasyBuildError("Failed to submit jobs, dependencies can not be satisfied: %s", job_names)
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for task in done:
+                    del running[task]
+                    # raises error if submission failed
+                    task.result()
 
     def complete(self):
         """
         Complete a bulk job submission.
 
-        Release all user holds on submitted jobs, and disconnect from server.
+        Submit all queued jobs, release all user holds on submitted jobs, and disconnect from server.
         """
+        queued_jobs = [job for (job, _) in self._queued]
+        self._submit_queued()
+        self._submitted.extend(queued_jobs)
+
         job_ids = []
         for job in self._submitted:
             if job.job_specs['hold']:
@@ -148,16 +196,16 @@ class Slurm(JobBackend):
         submitted_jobs = '; '.join(["%s (%s): %s" % (job.name, job.module, job.jobid) for job in self._submitted])
         print_msg("List of submitted jobs (%d): %s" % (len(self._submitted), submitted_jobs), log=self.log)
 
-    def make_job(self, script, name, env_vars=None, hours=None, cores=None):
+    def make_job(self, script, name, env_vars=None, hours=None, cores=None, mem=None):
         """Create and return a job dict with the given parameters."""
-        return SlurmJob(script, name, env_vars=env_vars, hours=hours, cores=cores)
+        return SlurmJob(script, name, env_vars=env_vars, hours=hours, cores=cores, mem=mem)
 
 
 class SlurmJob:
     """Job class for SLURM jobs."""
 
-    def __init__(self, script, name, env_vars=None, hours=None, cores=None):
-        """Create a new Job to be submitted to SLURM."""
+    def __init__(self, script, name, env_vars=None, hours=None, cores=None, mem=None):
+        """Create a new Job to be submitted to SLURM (memory to request should be specified in MB)."""
         self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
 
         self.jobid = None
@@ -190,3 +238,6 @@ class SlurmJob:
             self.job_specs['ntasks'] = cores
         else:
             self.log.warning("Number of cores to request not specified, falling back to whatever Slurm does by default")
+
+        if mem:
+            self.job_specs['mem'] = '%dM' % mem
@@ -36,6 +36,7 @@ Authors:
 * Damian Alvarez (Forschungszentrum Juelich GmbH)
 """
 import copy
+import functools
 import itertools
 import os
 import re
@@ -51,11 +52,16 @@ from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.config import build_option, get_module_syntax, install_path
 from easybuild.tools.filetools import convert_name, mkdir, read_file, remove_file, resolve_path, symlink, write_file
 from easybuild.tools.modules import (ROOT_ENV_VAR_NAME_PREFIX, EnvironmentModules,
-                                     EnvironmentModulesC, Lmod, modules_tool)
+                                     EnvironmentModulesC, Lmod, module_file_stamp, modules_tool)
 from easybuild.tools.utilities import get_subclasses, nub, quote_str
 
 _log = fancylogger.getLogger('module_generator', fname=False)
 
+# cache for (direct) dependencies of module files, as specified via load statements
+# key: path to module file
+# value: tuple with stamp for module file (see module_file_stamp) and list of (direct) dependencies
+MODULE_DEPS_CACHE = {}
+
 
 def avail_module_generators():
     """
@@ -87,35 +93,70 @@ def module_load_regex(modfilepath):
         regex = ModuleGeneratorLua.LOAD_REGEX
     else:
         regex = ModuleGeneratorTcl.LOAD_REGEX
+    return _compile_load_regex(regex)
+
+
+@functools.lru_cache()
+def _compile_load_regex(regex):
+    """Compile regex to extract dependencies from module file (only once)."""
     return re.compile(regex, re.M)
 
 
-def dependencies_for(mod_name, modtool, depth=None):
+def module_file_deps(mod_filepath):
     """
-    Obtain a list of dependencies for the given module, determined recursively, up to a specified depth (optionally)
-    :param depth: recursion depth (default is None, which corresponds to infinite recursion depth)
+    Return list of (direct) dependencies for specified module file, as specified via load statements;
+    module files are only read again if they were changed since they were parsed.
     """
-    mod_filepath = modtool.modulefile_path(mod_name)
-    modtxt = read_file(mod_filepath)
-    loadregex = module_load_regex(mod_filepath)
-    mods = loadregex.findall(modtxt)
-
-    if depth is None or depth > 0:
-        if depth and depth > 0:
-            depth = depth - 1
-        # recursively determine dependencies for these dependency modules, until depth is non-positive
-        moddeps = [dependencies_for(mod, modtool, depth=depth) for mod in mods]
+    stamp = module_file_stamp(mod_filepath)
+    cached = MODULE_DEPS_CACHE.get(mod_filepath)
+    if cached is not None and stamp is not None and cached[0] == stamp:
+        deps = cached[1]
     else:
-        # ignore any deeper dependencies
-        moddeps = []
+        deps = module_load_regex(mod_filepath).findall(read_file(mod_filepath))
+        MODULE_DEPS_CACHE[mod_filepath] = (stamp, deps)
+
+    return list(deps)
 
-    # add dependencies of dependency modules only if they're not there yet
-    for moddepdeps in moddeps:
-        for dep in moddepdeps:
-            if dep not in mods:
-                mods.append(dep)
 
-    return mods
+def dependencies_for(mod_name, modtool, depth=None):
+    """
+    Obtain a list of dependencies for the given module, determined recursively, up to a specified depth (optionally)
+
+    Direct dependencies are listed first, followed by the dependencies of each of these (in order)
+    that are not listed yet. The dependency graph is built such that every module file is only parsed once,
+    and the list of dependencies for every module (and depth) is only determined once.
+
+    :param depth: recursion depth (default is None, which corresponds to infinite recursion depth)
+    """
+    # mapping of (module name, depth) to list of dependencies for that module
+    closures = {}
+
+    def closure(mod_name, depth):
+        """Determine list of dependencies for specified module, up to specified depth."""
+        key = (mod_name, depth)
+        if key in closures:
+            return closures[key]
+
+        # avoid infinite recursion in case of cyclic dependencies
+        closures[key] = []
+
+        mods = module_file_deps(modtool.modulefile_path(mod_name))
+
+        if depth is None or depth > 0:
+            if depth:
+                depth = depth - 1
+            # add dependencies of dependency modules only if they're not there yet
+            seen = set(mods)
+            for mod in mods[:]:
+                for dep in closure(mod, depth):
+                    if dep not in seen:
+                        seen.add(dep)
+                        mods.append(dep)
+
+        closures[key] = mods
+        return mods
+
+    return list(closure(mod_name, depth))
 
 
 def wrap_shell_vars(strng, wrap_prefix, wrap_suffix):
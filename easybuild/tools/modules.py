@@ -38,6 +38,8 @@ Authors:
 * David Brown (Pacific Northwest National Laboratory)
 """
 import glob
+import hashlib
+import json
 import os
 import re
 import shlex
@@ -51,7 +53,7 @@ from easybuild.tools.config import SEARCH_PATH_BIN_DIRS, SEARCH_PATH_HEADER_DIRS
 from easybuild.tools.config import build_option, get_modules_tool, install_path
 from easybuild.tools.environment import ORIG_OS_ENVIRON, restore_env, setvar, unset_env_vars
 from easybuild.tools.filetools import convert_name, dir_contains_files, mkdir, normalize_path, path_matches, read_file
-from easybuild.tools.filetools import which, write_file
+from easybuild.tools.filetools import det_cache_path, which, write_file, write_json_file
 from easybuild.tools.module_naming_scheme.mns import DEVEL_MODULE_SUFFIX
 from easybuild.tools.run import run_shell_cmd
 from easybuild.tools.systemtools import get_shared_lib_ext
@@ -127,6 +129,16 @@ OUTPUT_MATCHES = {
 MODULE_AVAIL_CACHE = {}
 MODULE_SHOW_CACHE = {}
 
+# name of directory (in repository path) in which output of 'module show' is cached across sessions,
+# with one JSON file per module file that specifies the output and the size/modification time of the module file
+MODULE_SHOW_CACHE_DIRNAME = 'module_show_cache'
+
+# cache for changes made to the environment by loading modules
+# key: tuple with $MODULEPATH, module command and tuple with list of modules + hash of environment before loading
+# value: tuple with dict of changed environment variables (None for undefined ones), list of module files
+#        that were loaded, and stamp for those module files (see ModulesTool.module_files_stamp)
+MODULE_LOAD_ENV_CACHE = {}
+
 # cache for modules tool version
 # cache key: module command
 # value: corresponding (validated) module version
@@ -590,6 +602,8 @@ class ModulesTool:
     MAX_VERSION = None
     # the regexp, should have a "version" group (multiline search)
     VERSION_REGEXP = None
+    # extensions of module files that are considered for a module name, in order of preference
+    MODULE_FILE_EXTENSIONS = ['']
     # modules tool user cache directory
     USER_CACHE_DIR = None
 
@@ -1126,9 +1140,70 @@ class ModulesTool:
                 self.prepend_module_path(full_mod_path, priority=priority)
 
         if not allow_reload:
-            modules = set(modules) - set(self.loaded_modules())
-        for mod in modules:
-            self.run_module('load', mod)
+            loaded_modules = self.loaded_modules()
+            modules = [mod for mod in modules if mod not in loaded_modules]
+
+        if modules:
+            self.load_modules_env(list(modules))
+
+    def module_files_stamp(self, mod_files):
+        """
+        Return stamp for specified module files, based on size and modification time of module files
+        and modification time of the directories they are located in (to detect addition of other module files).
+        """
+        stamp = []
+        for path in mod_files:
+            for path_to_check in (path, os.path.dirname(path)):
+                try:
+                    stat = os.stat(path_to_check)
+                    stamp.append((path_to_check, stat.st_size, stat.st_mtime_ns))
+                except OSError:
+                    stamp.append((path_to_check, None, None))
+        return stamp
+
+    def load_modules_env(self, modules):
+        """
+        Load specified modules with a single 'module load' command,
+        or by replaying the changes to the environment that were recorded when loading the same modules
+        in the same environment before (if enabled via --module-load-cache, and if none of the involved module files
+        or directories in $MODULEPATH were changed since).
+
+        :param modules: list of modules to load
+        """
+        use_cache = build_option('module_load_cache', default=False)
+
+        if use_cache:
+            env_hash = hashlib.sha256(repr(sorted(os.environ.items())).encode('utf-8')).hexdigest()
+            key = self.mk_module_cache_key((tuple(modules), env_hash))
+
+            if key in MODULE_LOAD_ENV_CACHE:
+                env_changes, stamp_paths, stamp = MODULE_LOAD_ENV_CACHE[key]
+                if self.module_files_stamp(stamp_paths) == stamp:
+                    self.log.debug("Replaying cached changes to environment for loading modules %s", modules)
+                    for env_var, value in env_changes.items():
+                        if value is None:
+                            os.environ.pop(env_var, None)
+                        else:
+                            os.environ[env_var] = value
+                    return
+
+                self.log.debug("Module files changed since loading modules %s, not using cached environment",
+                               modules)
+                del MODULE_LOAD_ENV_CACHE[key]
+
+            env_before = os.environ.copy()
+
+        self.run_module(['load'] + modules)
+
+        if use_cache:
+            env_changes = {var: None for var in env_before if var not in os.environ}
+            env_changes.update({var: val for (var, val) in os.environ.items() if env_before.get(var) != val})
+            # $_LMFILES_ specifies paths to all loaded module files (also for modules that are loaded indirectly);
+            # directories in $MODULEPATH are also checked, to detect modules added elsewhere that may be picked instead
+            stamp_paths = [x for x in os.environ.get('_LMFILES_', '').split(os.pathsep) if x]
+            stamp_paths.extend(x for x in os.environ.get('MODULEPATH', '').split(os.pathsep) if x)
+            MODULE_LOAD_ENV_CACHE[key] = (env_changes, stamp_paths, self.module_files_stamp(stamp_paths))
+            self.log.debug("Cached changes to environment for loading modules %s: %s", modules, env_changes)
 
     def unload(self, modules, log_changes=None, *, hide_output=None):
         """
@@ -1155,17 +1230,104 @@ class ModulesTool:
         """
         Run 'module show' for the specified module.
         """
-        key = self.mk_module_cache_key(mod_name)
-        if key in MODULE_SHOW_CACHE:
-            ans = MODULE_SHOW_CACHE[key]
-            self.log.debug("Found cached result for 'module show %s' with key '%s': %s", mod_name, key, ans)
-        else:
-            ans = self.run_module('show', mod_name, check_output=False, return_stderr=True,
-                                  check_exit_code=False)
-            MODULE_SHOW_CACHE[key] = ans
-            self.log.debug("Cached result for 'module show %s' with key '%s': %s", mod_name, key, ans)
+        return self.show_modules([mod_name])[mod_name]
 
-        return ans
+    def show_modules(self, mod_names, mod_files=None):
+        """
+        Obtain output of 'module show' for multiple modules at once.
+
+        Results are taken from the in-memory cache, or from the persistent 'module show' cache
+        if the module file can be located and was not changed since its 'module show' output was cached;
+        'module show' is only run for the remaining modules.
+
+        :param mod_names: list of module names
+        :param mod_files: dict with (known) paths to module files for specified modules
+        :return: dict with output of 'module show' for each of the specified modules
+        """
+        if mod_files is None:
+            mod_files = {}
+
+        cache_dir = det_module_show_cache_path()
+
+        res = {}
+        for mod_name in nub(mod_names):
+            key = self.mk_module_cache_key(mod_name)
+            if key in MODULE_SHOW_CACHE:
+                ans = MODULE_SHOW_CACHE[key]
+                self.log.debug("Found cached result for 'module show %s' with key '%s': %s", mod_name, key, ans)
+            else:
+                mod_file, ans = None, None
+                if cache_dir:
+                    mod_file = mod_files.get(mod_name) or self.locate_module_file(mod_name)
+                    if mod_file:
+                        ans = self.read_module_show_cache(cache_dir, mod_file)
+
+                if ans is None:
+                    # determine stamp for module file *before* running 'module show',
+                    # so a module file that is changed in the meantime doesn't result in a valid cache entry
+                    stamp = module_file_stamp(mod_file) if mod_file else None
+                    ans = self.run_module('show', mod_name, check_output=False, return_stderr=True,
+                                          check_exit_code=False)
+                    # only cache output that refers to the module file we located
+                    if stamp and mod_file in ans:
+                        self.write_module_show_cache(cache_dir, mod_file, stamp, ans)
+
+                MODULE_SHOW_CACHE[key] = ans
+                self.log.debug("Cached result for 'module show %s' with key '%s': %s", mod_name, key, ans)
+
+            res[mod_name] = ans
+
+        return res
+
+    def locate_module_file(self, mod_name):
+        """
+        Locate module file for specified (full) module name in current module paths, without running the modules tool.
+
+        :param mod_name: module name
+        :return: path to module file, or None if no module file for exactly this module name was found
+        """
+        for mod_path in curr_module_paths():
+            for ext in self.MODULE_FILE_EXTENSIONS:
+                path = os.path.join(mod_path, mod_name + ext)
+                if os.path.isfile(path):
+                    return path
+        return None
+
+    def module_show_cache_file(self, cache_dir, mod_file):
+        """Return path to file in persistent 'module show' cache for specified module file."""
+        key = '%s %s %s' % (self.COMMAND, self.version, mod_file)
+        return os.path.join(cache_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
+
+    def read_module_show_cache(self, cache_dir, mod_file):
+        """
+        Return output of 'module show' for specified module file from persistent 'module show' cache,
+        or None if there's no valid entry (because there's no entry yet, or because the module file was changed).
+        """
+        cache_file = self.module_show_cache_file(cache_dir, mod_file)
+        try:
+            with open(cache_file) as fp:
+                entry = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        if entry.get('path') == mod_file and entry.get('stamp') == module_file_stamp(mod_file):
+            self.log.debug("Found valid entry for module file %s in 'module show' cache: %s", mod_file, cache_file)
+            return entry.get('output')
+
+        self.log.debug("Module file %s changed, not using entry in 'module show' cache: %s", mod_file, cache_file)
+        return None
+
+    def write_module_show_cache(self, cache_dir, mod_file, stamp, output):
+        """
+        Add output of 'module show' for specified module file to persistent 'module show' cache
+        (atomically, so concurrent EasyBuild sessions don't see a partial file).
+        """
+        cache_file = self.module_show_cache_file(cache_dir, mod_file)
+        entry = {'path': mod_file, 'stamp': stamp, 'output': output}
+        try:
+            write_json_file(cache_file, entry)
+        except EasyBuildError as err:
+            self.log.warning("Failed to add entry for %s to 'module show' cache %s: %s", mod_file, cache_dir, err)
 
     def get_value_from_modulefile(self, mod_name, regex, strict=True):
         """
@@ -1360,6 +1522,20 @@ class ModulesTool:
 
         return loaded_modules
 
+    def loaded_module_files(self):
+        """
+        Return dict with paths to module files of loaded modules, based on $LOADEDMODULES and $_LMFILES_
+        (an empty dict is returned if these environment variables are not consistent with each other).
+        """
+        loaded_modules = [x for x in os.environ.get('LOADEDMODULES', '').split(os.pathsep) if x]
+        mod_files = [x for x in os.environ.get('_LMFILES_', '').split(os.pathsep) if x]
+
+        if len(loaded_modules) == len(mod_files):
+            return dict(zip(loaded_modules, mod_files))
+
+        self.log.debug("$LOADEDMODULES and $_LMFILES_ are not consistent, can't determine loaded module files")
+        return {}
+
     def check_loaded_modules(self):
         """
         Check whether any (EasyBuild-generated) modules are loaded already in the current session
@@ -1374,10 +1550,23 @@ class ModulesTool:
         if eb_module_keys:
             loaded_modules = self.loaded_modules()
 
+            # EasyBuild-generated module files define $EBROOT* environment variables in a way that can be
+            # picked up by reading the module file directly, so only run 'module show' for other loaded modules
+            mod_files = self.loaded_module_files()
+            mod_outputs = {}
+            for loaded_module in loaded_modules:
+                mod_file = mod_files.get(loaded_module)
+                txt = read_file(mod_file, log_error=False) if mod_file else None
+                if txt and ROOT_ENV_VAR_NAME_PREFIX in txt:
+                    mod_outputs[loaded_module] = txt
+
+            other_modules = [x for x in loaded_modules if x not in mod_outputs]
+            mod_outputs.update(self.show_modules(other_modules, mod_files=mod_files))
+
             # try to track down modules that define the $EBROOT* environment variables that were found
             loaded_eb_modules = []
             for loaded_module in loaded_modules:
-                out = self.show(loaded_module)
+                out = mod_outputs[loaded_module]
                 for key in eb_module_keys[:]:
                     if key in out:
                         loaded_eb_modules.append(loaded_module)
@@ -1934,6 +2123,8 @@ class Lmod(ModulesTool):
     VERSION_REGEXP = r"^Modules\s+based\s+on\s+Lua:\s+Version\s+(?P<version>\d\S*)\s"
 
     SHOW_HIDDEN_OPTION = '--show-hidden'
+    # Lmod picks Lua module file over Tcl module file in same directory
+    MODULE_FILE_EXTENSIONS = ['.lua', '']
 
     def __init__(self, *args, **kwargs):
         """Constructor, set lmod-specific class variable values."""
@@ -2290,10 +2481,29 @@ def modules_tool(mod_paths=None, testing=False) -> ModulesTool:
     return modules_tool_class(mod_paths=mod_paths, testing=testing)
 
 
+def module_file_stamp(path):
+    """Return stamp for specified module file, based on size and modification time (None if it doesn't exist)."""
+    try:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        return None
+
+
+def det_module_show_cache_path():
+    """
+    Determine location of persistent 'module show' cache:
+    value for --module-show-cache-path if specified (an empty value disables the persistent 'module show' cache),
+    or in the EasyBuild cache directory (see det_cache_path).
+    """
+    return det_cache_path('module_show_cache_path', MODULE_SHOW_CACHE_DIRNAME)
+
+
 def reset_module_caches():
     """Reset module caches."""
     MODULE_AVAIL_CACHE.clear()
     MODULE_SHOW_CACHE.clear()
+    MODULE_LOAD_ENV_CACHE.clear()
 
 
 def invalidate_module_caches_for(path):
@@ -2302,7 +2512,7 @@ def invalidate_module_caches_for(path):
         raise EasyBuildError("Non-existing path specified to invalidate module caches: %s", path)
 
     _log.debug("Invallidating module cache entries for path '%s'", path)
-    for cache, subcmd in [(MODULE_AVAIL_CACHE, 'avail'), (MODULE_SHOW_CACHE, 'show')]:
+    for cache, subcmd in [(MODULE_AVAIL_CACHE, 'avail'), (MODULE_SHOW_CACHE, 'show'), (MODULE_LOAD_ENV_CACHE, 'load')]:
         for key in list(cache.keys()):
             paths_in_key = '='.join(key[0].split('=')[1:]).split(os.pathsep)
             _log.debug("Paths for 'module %s' key '%s': %s", subcmd, key, paths_in_key)
@@ -31,14 +31,20 @@ Authors:
 * Kenneth Hoste (Ghent University)
 """
 
+import bisect
 import difflib
+import itertools
 import math
+import multiprocessing
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import build_option
 from easybuild.tools.filetools import read_file
-from easybuild.tools.systemtools import det_terminal_size
+from easybuild.tools.systemtools import det_terminal_size, get_avail_core_count
 
 
 SEP_WIDTH = 5
@@ -63,6 +69,18 @@ END_LONG_LINE = '...'
 # restrict displaying of differences to limited number of groups
 MAX_DIFF_GROUPS = 3
 
+# minimal similarity ratio for a removed and an added line to be shown as a changed line (cfr. difflib.Differ)
+CHANGED_LINE_CUTOFF = 0.75
+# number of lines to look ahead (in both files) when looking for changed lines in a block of differing lines
+CHANGED_LINE_WINDOW = 5
+# maximum amount of work (product of number of lines) to determine matching lines
+# in a block of lines that doesn't include any unique lines
+MAX_MATCH_WORK = 10000
+
+# regular expression to split lines in tokens (words, whitespace, other characters),
+# used to determine which parts of a changed line are different
+TOKEN_REGEX = re.compile(r'\w+|\s+|[^\w\s]')
+
 
 _log = fancylogger.getLogger('multidiff', fname=False)
 
@@ -244,55 +262,274 @@ class MultiDiff:
         return '\n'.join(output)
 
 
+def _unique_lines(lines, lo, hi):
+    """Return dict with lines that occur only once in lines[lo:hi], and their index."""
+    counts, idxs = {}, {}
+    for idx in range(lo, hi):
+        line = lines[idx]
+        counts[line] = counts.get(line, 0) + 1
+        idxs[line] = idx
+    return {line: idxs[line] for line, cnt in counts.items() if cnt == 1}
+
+
+def _longest_increasing_subsequence(pairs):
+    """
+    Determine longest subsequence of specified (i, j) pairs (sorted by i) for which j is increasing,
+    using patience sorting.
+    """
+    tails, tail_idxs, prev_idxs = [], [], [None] * len(pairs)
+    for idx, (_, j) in enumerate(pairs):
+        pos = bisect.bisect_left(tails, j)
+        if pos > 0:
+            prev_idxs[idx] = tail_idxs[pos - 1]
+        if pos == len(tails):
+            tails.append(j)
+            tail_idxs.append(idx)
+        else:
+            tails[pos] = j
+            tail_idxs[pos] = idx
+
+    res = []
+    idx = tail_idxs[-1] if tail_idxs else None
+    while idx is not None:
+        res.append(pairs[idx])
+        idx = prev_idxs[idx]
+
+    return res[::-1]
+
+
+def matching_lines(a, b):
+    """
+    Determine matching lines in specified lists of lines, using the patience diff algorithm:
+    lines that occur only once in both lists are used as anchors, and the blocks of lines in between
+    are processed in the same way; difflib.SequenceMatcher is only used for (small) blocks without unique lines.
+
+    :param a: list of lines
+    :param b: list of lines
+    :return: sorted list of (i, j) tuples for which a[i] and b[j] are matching lines
+    """
+    res = []
+    todo = [(0, len(a), 0, len(b))]
+    while todo:
+        alo, ahi, blo, bhi = todo.pop()
+
+        # common leading and trailing lines
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            res.append((alo, blo))
+            alo, blo = alo + 1, blo + 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi, bhi = ahi - 1, bhi - 1
+            res.append((ahi, bhi))
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        a_unique, b_unique = _unique_lines(a, alo, ahi), _unique_lines(b, blo, bhi)
+        pairs = sorted((idx, b_unique[line]) for (line, idx) in a_unique.items() if line in b_unique)
+        anchors = _longest_increasing_subsequence(pairs)
+        if anchors:
+            res.extend(anchors)
+            for (i1, j1), (i2, j2) in zip([(alo - 1, blo - 1)] + anchors, anchors + [(ahi, bhi)]):
+                todo.append((i1 + 1, i2, j1 + 1, j2))
+
+        elif (ahi - alo) * (bhi - blo) <= MAX_MATCH_WORK:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for (i, j, size) in matcher.get_matching_blocks():
+                res.extend((alo + i + k, blo + j + k) for k in range(size))
+
+    return sorted(res)
+
+
+def _line_ratio(line1, matcher, cutoff):
+    """
+    Determine similarity ratio of specified line and the line set as 2nd sequence in specified matcher
+    (0.0 if it is certainly lower than specified cutoff).
+    """
+    matcher.set_seq1(line1)
+    if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+        return 0.0
+    return matcher.ratio()
+
+
+def _plain_replace(a, alo, ahi, b, blo, bhi):
+    """Diff lines for replacing a[alo:ahi] with b[blo:bhi], without changed lines (cfr. difflib.Differ)."""
+    removed = [MINUS + SPACE + line for line in a[alo:ahi]]
+    added = [PLUS + SPACE + line for line in b[blo:bhi]]
+    if bhi - blo < ahi - alo:
+        return added + removed
+    else:
+        return removed + added
+
+
+def _changed_line(line1, line2):
+    """
+    Diff lines for changed line, with squigly lines indicating which tokens were changed.
+    """
+    if line1 == line2:
+        return [SPACE + SPACE + line1]
+
+    tokens1, tokens2 = TOKEN_REGEX.findall(line1), TOKEN_REGEX.findall(line2)
+    tags1, tags2 = [], []
+    for (tag, i1, i2, j1, j2) in difflib.SequenceMatcher(None, tokens1, tokens2, autojunk=False).get_opcodes():
+        len1 = sum(len(token) for token in tokens1[i1:i2])
+        len2 = sum(len(token) for token in tokens2[j1:j2])
+        if tag == 'equal':
+            tags1.append(SPACE * len1)
+            tags2.append(SPACE * len2)
+        elif tag == 'replace':
+            tags1.append(HAT * len1)
+            tags2.append(HAT * len2)
+        elif tag == 'delete':
+            tags1.append(MINUS * len1)
+        elif tag == 'insert':
+            tags2.append(PLUS * len2)
+
+    res = []
+    for (key, line, tags) in [(MINUS, line1, tags1), (PLUS, line2, tags2)]:
+        res.append(key + SPACE + line)
+        tags = ''.join(tags).rstrip()
+        if tags:
+            res.append(QUESTIONMARK + SPACE + tags)
+
+    return res
+
+
+def _replace(a, alo, ahi, b, blo, bhi):
+    """
+    Diff lines for replacing a[alo:ahi] with b[blo:bhi];
+    changed lines are only looked for in a limited window, to avoid that this becomes (very) expensive.
+    """
+    res = []
+    # cache matchers for lines in b, since setting the 2nd sequence is relatively expensive
+    matchers = {}
+    # start of lines that are not part of a changed line yet
+    pi, pj = alo, blo
+    i, j = alo, blo
+    while i < ahi and j < bhi:
+        best_ratio, best_pair = CHANGED_LINE_CUTOFF, None
+        for ii in range(i, min(i + CHANGED_LINE_WINDOW, ahi)):
+            for jj in range(j, min(j + CHANGED_LINE_WINDOW, bhi)):
+                if jj not in matchers:
+                    matchers[jj] = difflib.SequenceMatcher(None, b=b[jj])
+                ratio = _line_ratio(a[ii], matchers[jj], best_ratio)
+                if ratio > best_ratio or (best_pair is None and ratio == best_ratio):
+                    best_ratio, best_pair = ratio, (ii, jj)
+
+        if best_pair:
+            ii, jj = best_pair
+            res.extend(_plain_replace(a, pi, ii, b, pj, jj))
+            res.extend(_changed_line(a[ii], b[jj]))
+            pi, pj = i, j = ii + 1, jj + 1
+        else:
+            i, j = i + 1, j + 1
+
+    res.extend(_plain_replace(a, pi, ahi, b, pj, bhi))
+
+    return res
+
+
+def compare_lines(a, b):
+    """
+    Compare specified lists of lines, and yield diff lines in the same format as difflib.Differ.compare.
+
+    Matching lines are determined using the patience diff algorithm (see matching_lines),
+    which avoids the quadratic behaviour of difflib.Differ on long files.
+    """
+    ai, bj = 0, 0
+    for (i, j) in matching_lines(a, b) + [(len(a), len(b))]:
+        if ai < i and bj < j:
+            yield from _replace(a, ai, i, b, bj, j)
+        else:
+            yield from _plain_replace(a, ai, i, b, bj, j)
+
+        if i < len(a):
+            yield SPACE + SPACE + a[i]
+
+        ai, bj = i + 1, j + 1
+
+
+def diff_file(filepath, base_lines):
+    """
+    Determine diff for specified file compared to base lines.
+    :param filepath: path to file to compare with base
+    :param base_lines: base lines to compare to
+    :return: list of (line_no, diff_line, filename, squigly_line) tuples
+    """
+    lines = read_file(filepath).split('\n')
+    diff = compare_lines(lines, base_lines)
+    filename = os.path.basename(filepath)
+
+    # contruct map of line number to diff lines and mapping between diff lines
+    # example partial diff:
+    #
+    # - toolchain = {'name': 'goolfc', 'version': '2.6.10'}
+    # ?                       ^^^^^^               ^^^^^^
+    #
+    # + toolchain = {'name': 'goolf', 'version': '1.6.20'}
+    # ?                       ^^^^^               ^^^^^^
+    #
+    local_diff = {}
+    squigly_dict = {}
+    last_added = None
+    offset = 1
+    for (i, line) in enumerate(diff):
+        # diff line indicating changed characters on line above, a.k.a. a 'squigly' line
+        if line.startswith(QUESTIONMARK):
+            squigly_dict[last_added] = line
+            offset -= 1
+        # diff line indicating addition change
+        elif line.startswith(PLUS):
+            local_diff.setdefault(i + offset, []).append(line)
+            last_added = line
+        # diff line indicated removal change
+        elif line.startswith(MINUS):
+            local_diff.setdefault(i + offset, []).append(line)
+            last_added = line
+            offset -= 1
+
+    res = []
+    for line_no, lines in local_diff.items():
+        for line in lines:
+            res.append((line_no, line.rstrip(), filename, squigly_dict.get(line, '').rstrip()))
+
+    return res
+
+
 def multidiff(base, files, colored=True):
     """
     Generate a diff for multiple files, all compared to base.
+    Files are compared to base using a pool of worker processes if possible.
+
     :param base: base to compare with
     :param files: list of files to compare with base
     :param colored: boolean indicating whether a colored multi-diff should be generated
     :return: text with multidiff overview
     """
-    differ = difflib.Differ()
     base_lines = read_file(base).split('\n')
     mdiff = MultiDiff(os.path.basename(base), base_lines, files, colored=colored)
 
+    max_workers = min(len(files), get_avail_core_count())
+    use_workers = max_workers > 1
+    if use_workers and build_option('async_logging', default=False):
+        _log.info("Asynchronous logging is enabled, so comparing files in main process")
+        use_workers = False
+    if use_workers and 'fork' not in multiprocessing.get_all_start_methods():
+        _log.info("Worker processes can not be forked, so comparing files in main process")
+        use_workers = False
+
+    if use_workers:
+        _log.info("Comparing %d files with %s using %d worker processes", len(files), base, max_workers)
+        pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'))
+        try:
+            diffs = list(pool.map(diff_file, files, itertools.repeat(base_lines)))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    else:
+        diffs = [diff_file(filepath, base_lines) for filepath in files]
+
     # use the MultiDiff class to store the information
-    for filepath in files:
-        lines = read_file(filepath).split('\n')
-        diff = differ.compare(lines, base_lines)
-        filename = os.path.basename(filepath)
-
-        # contruct map of line number to diff lines and mapping between diff lines
-        # example partial diff:
-        #
-        # - toolchain = {'name': 'goolfc', 'version': '2.6.10'}
-        # ?                            -               ^   ^
-        #
-        # + toolchain = {'name': 'goolf', 'version': '1.6.20'}
-        # ?                                           ^   ^
-        #
-        local_diff = {}
-        squigly_dict = {}
-        last_added = None
-        offset = 1
-        for (i, line) in enumerate(diff):
-            # diff line indicating changed characters on line above, a.k.a. a 'squigly' line
-            if line.startswith(QUESTIONMARK):
-                squigly_dict[last_added] = line
-                offset -= 1
-            # diff line indicating addition change
-            elif line.startswith(PLUS):
-                local_diff.setdefault(i + offset, []).append((line, filename))
-                last_added = line
-            # diff line indicated removal change
-            elif line.startswith(MINUS):
-                local_diff.setdefault(i + offset, []).append((line, filename))
-                last_added = line
-                offset -= 1
-
-        # construct the multi-diff based on the constructed dict
-        for line_no, line_infos in local_diff.items():
-            for (line, filename) in line_infos:
-                mdiff.parse_line(line_no, line.rstrip(), filename, squigly_dict.get(line, '').rstrip())
+    for diff in diffs:
+        for (line_no, line, filename, squigly_line) in diff:
+            mdiff.parse_line(line_no, line, filename, squigly_line)
 
     return str(mdiff)
@@ -56,9 +56,11 @@ from easybuild.framework.easyconfig import EASYCONFIGS_PKG_SUBDIR
 from easybuild.framework.easyconfig.easyconfig import HAVE_AUTOPEP8
 from easybuild.framework.easyconfig.format.one import EB_FORMAT_EXTENSION
 from easybuild.framework.easyconfig.format.pyheaderconfigobj import build_easyconfig_constants_dict
+from easybuild.framework.easyconfig.style import STYLE_CHECK_CACHE_DIRNAME
 from easybuild.framework.easyconfig.tools import alt_easyconfig_paths, get_paths_for
 from easybuild.toolchains.compiler.systemcompiler import TC_CONSTANT_SYSTEM
 from easybuild.tools import LooseVersion, build_log, run  # build_log should always stay there, to ensure EasyBuildLog
+from easybuild.tools.build_history import BUILD_HISTORY_FILENAME
 from easybuild.tools.build_log import DEVEL_LOG_LEVEL, EasyBuildError, EasyBuildExit
 from easybuild.tools.build_log import init_logging, log_start, print_msg, print_warning, raise_easybuilderror
 from easybuild.tools.config import CHECKSUM_PRIORITY_CHOICES, DEFAULT_CHECKSUM_PRIORITY
@@ -66,12 +68,14 @@ from easybuild.tools.config import CONT_IMAGE_FORMATS, CONT_TYPES, DEFAULT_CONT_
 from easybuild.tools.config import DEFAULT_BRANCH, DEFAULT_DOWNLOAD_TIMEOUT
 from easybuild.tools.config import DEFAULT_ENV_FOR_SHEBANG, DEFAULT_ENVVAR_USERS_MODULES
 from easybuild.tools.config import DEFAULT_FORCE_DOWNLOAD, DEFAULT_INDEX_MAX_AGE, DEFAULT_JOB_BACKEND
-from easybuild.tools.config import DEFAULT_JOB_EB_CMD, DEFAULT_LOGFILE_FORMAT, DEFAULT_MAX_FAIL_RATIO_PERMS
+from easybuild.tools.config import DEFAULT_JOB_EB_CMD, DEFAULT_JOB_SUBMIT_WORKERS
+from easybuild.tools.config import DEFAULT_LOGFILE_FORMAT, DEFAULT_MAX_FAIL_RATIO_PERMS
 from easybuild.tools.config import DEFAULT_MAX_PARALLEL, DEFAULT_MINIMAL_BUILD_ENV, DEFAULT_MNS
 from easybuild.tools.config import DEFAULT_MOD_SEARCH_PATH_HEADERS, DEFAULT_MODULE_SYNTAX, DEFAULT_MODULES_TOOL
 from easybuild.tools.config import DEFAULT_MODULECLASSES, DEFAULT_PATH_SUBDIRS, DEFAULT_PKG_RELEASE, DEFAULT_PKG_TOOL
 from easybuild.tools.config import DEFAULT_PKG_TYPE, DEFAULT_PNS, DEFAULT_PREFIX, DEFAULT_EXTRA_SOURCE_URLS
-from easybuild.tools.config import DEFAULT_REPOSITORY, DEFAULT_WAIT_ON_LOCK_INTERVAL, DEFAULT_WAIT_ON_LOCK_LIMIT
+from easybuild.tools.config import DEFAULT_REPOSITORY, DEFAULT_REPOSITORY_COMMIT_INTERVAL
+from easybuild.tools.config import DEFAULT_WAIT_ON_LOCK_INTERVAL, DEFAULT_WAIT_ON_LOCK_LIMIT
 from easybuild.tools.config import DEFAULT_PR_TARGET_ACCOUNT, DEFAULT_FILTER_RPATH_SANITY_LIBS
 from easybuild.tools.config import EBROOT_ENV_VAR_ACTIONS, ERROR, FORCE_DOWNLOAD_CHOICES, GENERAL_CLASS, IGNORE
 from easybuild.tools.config import JOB_DEPS_TYPE_ABORT_ON_ERROR, JOB_DEPS_TYPE_ALWAYS_RUN, LOADED_MODULES_ACTIONS
@@ -88,24 +92,26 @@ from easybuild.tools.docs import list_easyblocks, list_toolchains
 from easybuild.tools.environment import restore_env, unset_env_vars
 from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, CHECKSUM_TYPES, expand_glob_paths, get_cwd
 from easybuild.tools.filetools import install_fake_vsc, move_file, which, is_parent_path
-from easybuild.tools.github import GITHUB_PR_DIRECTION_DESC, GITHUB_PR_ORDER_CREATED
+from easybuild.tools.github import GITHUB_FILES_CACHE_DIRNAME, GITHUB_PR_DIRECTION_DESC, GITHUB_PR_ORDER_CREATED
 from easybuild.tools.github import GITHUB_PR_STATE_OPEN, GITHUB_PR_STATES, GITHUB_PR_ORDERS, GITHUB_PR_DIRECTIONS
-from easybuild.tools.github import HAVE_GITHUB_API, HAVE_KEYRING, VALID_CLOSE_PR_REASONS
-from easybuild.tools.github import fetch_easyblocks_from_commit, fetch_easyblocks_from_pr, fetch_github_token
+from easybuild.tools.github import HAVE_GITHUB_API, HAVE_KEYRING, PATCH_INDEX_FILENAME, VALID_CLOSE_PR_REASONS
+from easybuild.tools.github import fetch_easyblocks_from_commit, fetch_easyblocks_from_prs, fetch_github_token
 from easybuild.tools.hooks import KNOWN_HOOKS
 from easybuild.tools.include import include_easyblocks, include_module_naming_schemes, include_toolchains
 from easybuild.tools.job.backend import avail_job_backends
 from easybuild.tools.modules import avail_modules_tools
 from easybuild.tools.module_generator import ModuleGeneratorLua, avail_module_generators
 from easybuild.tools.module_naming_scheme.utilities import avail_module_naming_schemes
-from easybuild.tools.modules import Lmod
+from easybuild.tools.modules import MODULE_SHOW_CACHE_DIRNAME, Lmod
 from easybuild.tools.robot import det_robot_path
 from easybuild.tools.run import run_shell_cmd
+from easybuild.tools.structured_log import STRUCTURED_LOG_FORMATS
 from easybuild.tools.package.utilities import avail_package_naming_schemes
+from easybuild.tools.toolchain.hierarchy import TOOLCHAIN_HIERARCHY_FILENAME
 from easybuild.tools.toolchain.compiler import DEFAULT_OPT_LEVEL, OPTARCH_MAP_CHAR, OPTARCH_SEP, Compiler
 from easybuild.tools.toolchain.toolchain import DEFAULT_SEARCH_PATH_CPP_HEADERS, DEFAULT_SEARCH_PATH_LINKER, SEARCH_PATH
 from easybuild.tools.toolchain.toolchain import SYSTEM_TOOLCHAIN_NAME
-from easybuild.tools.repository.repository import avail_repositories
+from easybuild.tools.repository.repository import REPOSITORY_JOURNAL_DIRNAME, avail_repositories
 from easybuild.tools.systemtools import DARWIN, UNKNOWN, check_python_version, get_cpu_architecture, get_cpu_family
 from easybuild.tools.systemtools import get_cpu_features, get_gpu_info, get_os_type, get_system_info
 from easybuild.tools.utilities import flatten
@@ -373,6 +379,8 @@ class EasyBuildOptions(GeneralOption):
             'amdgcn-capabilities': ("List of AMDGCN capabilities to use when building GPU software; "
                                     "values should be specified as gfx[xyz], as defined by the LLVM targets, "
                                     "for example: gfx1101,gfx90a,gfx1030", 'strlist', 'extend', None),
+            'async-logging': ("Write log records to log files in a separate thread, "
+                              "so logging does not block on writing to the log file", None, 'store_true', False),
             'backup-modules': ("Back up an existing module file, if any. "
                                "Auto-enabled when using --module-only or --skip",
                                None, 'store_true', None),  # default None to allow auto-enabling if not disabled
@@ -526,6 +534,9 @@ class EasyBuildOptions(GeneralOption):
             'module-cache-suffix': ("Suffix to add to the cache file name (before the extension) "
                                     "when updating the modules tool cache",
                                     None, 'store', None),
+            'module-load-cache': ("Cache changes made to the environment by loading modules, "
+                                  "and replay them when loading the same modules again in the same environment",
+                                  None, 'store_true', False),
             'module-only': ("Only generate module file(s); skip all steps except for %s" % ', '.join(MODULE_ONLY_STEPS),
                             None, 'store_true', False),
             'modules-tool-version-check': ("Check version of modules tool being used", None, 'store_true', True),
@@ -553,6 +564,10 @@ class EasyBuildOptions(GeneralOption):
                                           'choice', 'store_or_None', PYTHONPATH, PYTHON_SEARCH_PATH_TYPES),
             'pretend': (("Does the build/installation in a test directory located in $HOME/easybuildinstall"),
                         None, 'store_true', False, 'p'),
+            'profile-report': ("Print report on time and resources (CPU time, peak memory usage) spent per step, "
+                               "extension and shell command after each installation; a full profile is always "
+                               "written to a JSON and CSV file next to the log file",
+                               None, 'store_true', False),
             'read-only-installdir': ("Set read-only permissions on installation directory after installation",
                                      None, 'store_true', False),
             'remove-ghost-install-dirs': ("Remove ghost installation directories when --force or --rebuild is used, "
@@ -585,6 +600,9 @@ class EasyBuildOptions(GeneralOption):
                 "Git commit to use for the target software build (robot capabilities are automatically disabled)",
                 None, 'store', None),
             'sticky-bit': ("Set sticky bit on newly created directories", None, 'store_true', False),
+            'structured-log': ("Also write compressed structured log for installations, with index of steps and "
+                               "shell commands (incl. exit code and duration), using specified format",
+                               'choice', 'store_or_None', None, STRUCTURED_LOG_FORMATS),
             'strict-rpath-sanity-check': ("Perform strict RPATH sanity check, which involves unsetting "
                                           "$LD_LIBRARY_PATH before checking whether all required libraries are found",
                                           None, 'store_true', False),
@@ -628,6 +646,11 @@ class EasyBuildOptions(GeneralOption):
                                     None, "store_true", False,),
             'avail-repositories': ("Show all repository types (incl. non-usable)",
                                    None, "store_true", False,),
+            'build-history-path': ("Location of SQLite database with history of builds (build time, memory usage), "
+                                   "used to predict resources required for new builds "
+                                   "(default: %s in EasyBuild cache directory, $XDG_CACHE_HOME/easybuild); "
+                                   "an empty value disables the build history" % BUILD_HISTORY_FILENAME,
+                                   None, 'store', None, {'metavar': "PATH"}),
             'buildpath': ("Temporary build path", None, 'store', mk_full_default_path('buildpath')),
             'containerpath': ("Location where container recipe & image will be stored", None, 'store',
                               mk_full_default_path('containerpath')),
@@ -642,6 +665,15 @@ class EasyBuildOptions(GeneralOption):
             'failed-install-logs-path': ("Location where log files are copied if installation fails; "
                                          "an empty value disables copying of log files",
                                          None, 'store', None, {'metavar': "PATH"}),
+            'git-mirror-path': ("Location of (bare) mirrors of Git repositories that are used (and updated) when "
+                                "obtaining sources via 'git_config'; an empty value disables the use of mirrors",
+                                None, 'store', None, {'metavar': "PATH"}),
+            'github-files-cache-path': ("Location of directory in which files fetched from GitHub PRs (per PR head "
+                                        "commit and target branch commit) and commits are cached, to avoid "
+                                        "downloading them again "
+                                        "(default: %s in EasyBuild cache directory, $XDG_CACHE_HOME/easybuild); "
+                                        "an empty value disables the cache" % GITHUB_FILES_CACHE_DIRNAME,
+                                        None, 'store', None, {'metavar': "PATH"}),
             'hooks': ("Location of Python module with hook implementations", 'str', 'store', None),
             'ignore-dirs': ("Directory names to ignore when searching for files/dirs",
                             'strlist', 'store', ['.git', '.svn']),
@@ -672,6 +704,13 @@ class EasyBuildOptions(GeneralOption):
             'module-search-path-headers': ("Environment variable set by modules on load with search paths "
                                            "to header files", 'choice', 'store', DEFAULT_MOD_SEARCH_PATH_HEADERS,
                                            sorted(MOD_SEARCH_PATH_HEADERS.keys())),
+            'module-show-cache-path': ("Location of directory in which output of 'module show' is cached "
+                                       "per module file, which is used to avoid running 'module show' again "
+                                       "in every session for module files that did not change "
+                                       "(default: %s in EasyBuild cache directory, $XDG_CACHE_HOME/easybuild); "
+                                       "an empty value disables the persistent 'module show' cache" %
+                                       MODULE_SHOW_CACHE_DIRNAME,
+                                       None, 'store', None, {'metavar': "PATH"}),
             'module-syntax': ("Syntax to be used for module files", 'choice', 'store', DEFAULT_MODULE_SYNTAX,
                               sorted(avail_module_generators().keys())),
             'moduleclasses': (("Extend supported module classes "
@@ -687,6 +726,12 @@ class EasyBuildOptions(GeneralOption):
                             None, 'store', mk_full_default_path('packagepath')),
             'package-naming-scheme': ("Packaging naming scheme choice",
                                       'choice', 'store', DEFAULT_PNS, sorted(avail_package_naming_schemes().keys())),
+            'patch-index-path': ("Location of (JSON) file with index of patch files used in easyconfig files, "
+                                 "which is used to determine which software a patch file belongs to "
+                                 "(for --new-pr, --update-pr, ...) without parsing all easyconfig files again "
+                                 "(default: %s in EasyBuild cache directory, $XDG_CACHE_HOME/easybuild); "
+                                 "an empty value disables the persistent patch index" % PATCH_INDEX_FILENAME,
+                                 None, 'store', None, {'metavar': "PATH"}),
             'prefix': (("Change prefix for buildpath, installpath, sourcepath, sourcepath-data, and repositorypath "
                         "(used prefix for defaults %s)" % DEFAULT_PREFIX),
                        None, 'store', None),
@@ -694,6 +739,16 @@ class EasyBuildOptions(GeneralOption):
                                         None, 'store_true', False),
             'repository': ("Repository type, using repositorypath",
                            'choice', 'store', DEFAULT_REPOSITORY, sorted(avail_repositories().keys())),
+            'repository-commit-interval': ("Number of installations after which archived easyconfigs and patches "
+                                           "are committed (and pushed) at once to a version-controlled repository "
+                                           "(git, svn, hg); 0 means only at the end of the EasyBuild session",
+                                           'int', 'store', DEFAULT_REPOSITORY_COMMIT_INTERVAL),
+            'repository-journal-path': ("Location of directory with journals of changes to repository "
+                                        "that were not committed yet, which are committed in a later session "
+                                        "if EasyBuild exited before committing them "
+                                        "(default: %s in build path); "
+                                        "an empty value disables the journal" % REPOSITORY_JOURNAL_DIRNAME,
+                                        None, 'store', None, {'metavar': "PATH"}),
             'repositorypath': (("Repository path, used by repository "
                                 "(is passed as list of arguments to create the repository instance). "
                                 "For more info, use --avail-repositories."),
@@ -706,6 +761,11 @@ class EasyBuildOptions(GeneralOption):
                            None, 'store', mk_full_default_path('sourcepath')),
             'sourcepath-data': ("Path(s) to where data sources should be downloaded (string, colon-separated) "
                                 "(same as sourcepath if not specified)", None, 'store', None),
+            'style-check-cache-path': ("Location of directory with results of style checks for easyconfig files, "
+                                       "which is used to avoid checking unchanged easyconfig files again "
+                                       "(default: %s in EasyBuild cache directory, $XDG_CACHE_HOME/easybuild); "
+                                       "an empty value disables the style check cache" % STYLE_CHECK_CACHE_DIRNAME,
+                                       None, 'store', None, {'metavar': "PATH"}),
             'subdir-data': ("Installpath subdir for data",
                             None, 'store', DEFAULT_PATH_SUBDIRS['subdir_data']),
             'subdir-modules': ("Installpath subdir for modules", None, 'store', DEFAULT_PATH_SUBDIRS['subdir_modules']),
@@ -720,6 +780,12 @@ class EasyBuildOptions(GeneralOption):
                            None, 'store', None),
             'tmp-logdir': ("Log directory where temporary log files are stored", None, 'store', None),
             'tmpdir': ('Directory to use for temporary storage', None, 'store', None),
+            'toolchain-hierarchy-path': ("Location of (JSON) file with table of toolchain hierarchies, "
+                                         "which is used to avoid determining them again in every session "
+                                         "(default: %s in EasyBuild cache directory, $XDG_CACHE_HOME/easybuild); "
+                                         "an empty value disables the toolchain hierarchy table" %
+                                         TOOLCHAIN_HIERARCHY_FILENAME,
+                                         None, 'store', None, {'metavar': "PATH"}),
         })
 
         self.log.debug("config_options: descr %s opts %s" % (descr, opts))
@@ -931,6 +997,8 @@ class EasyBuildOptions(GeneralOption):
             'max-walltime': ("Maximum walltime for jobs (in hours)", 'int', 'store', 24),
             'output-dir': ("Output directory for jobs (default: current directory)", None, 'store', get_cwd()),
             'polling-interval': ("Interval between polls for status of jobs (in seconds)", float, 'store', 30.0),
+            'submit-workers': ("Maximum number of job submission commands (and source downloads before submitting "
+                               "jobs) to run concurrently", 'int', 'store', DEFAULT_JOB_SUBMIT_WORKERS),
             'target-resource': ("Target resource for jobs", None, 'store', None),
         })
 
@@ -1301,9 +1369,12 @@ class EasyBuildOptions(GeneralOption):
         # - the <path> could also specify the location of a *remote* (Git( repository,
         #   which can be done in variety of formats (git@<url>:<org>/<repo>), https://<url>, etc.)
         #   (see also https://github.com/easybuilders/easybuild-framework/issues/3892);
-        path_opt_names = ['buildpath', 'containerpath', 'failed_install_build_dirs_path', 'failed_install_logs_path',
-                          'git_working_dirs_path', 'installpath', 'installpath_modules', 'installpath_software',
-                          'installpath_data', 'prefix', 'packagepath', 'robot_paths', 'sourcepath', 'sourcepath_data']
+        path_opt_names = ['build_history_path', 'buildpath', 'containerpath', 'failed_install_build_dirs_path',
+                          'failed_install_logs_path', 'git_mirror_path', 'git_working_dirs_path',
+                          'github_files_cache_path', 'installpath', 'installpath_modules', 'installpath_software',
+                          'installpath_data', 'module_show_cache_path', 'prefix', 'packagepath', 'patch_index_path',
+                          'repository_journal_path', 'robot_paths', 'sourcepath', 'sourcepath_data',
+                          'style_check_cache_path', 'toolchain_hierarchy_path']
 
         for opt_name in path_opt_names:
             self._ensure_abs_path(opt_name)
@@ -1765,8 +1836,8 @@ def handle_include_easyblocks_from(options, log):
                     exit_code=EasyBuildExit.OPTION_ERROR
                 )
 
-            for easyblock_pr in easyblock_prs:
-                easyblocks_from_pr = fetch_easyblocks_from_pr(easyblock_pr)
+            # files for multiple PRs are fetched concurrently
+            for easyblock_pr, easyblocks_from_pr in zip(easyblock_prs, fetch_easyblocks_from_prs(easyblock_prs)):
                 included_from_pr = {os.path.basename(eb) for eb in easyblocks_from_pr}
 
                 if options.include_easyblocks:
@@ -1838,7 +1909,8 @@ def set_up_configuration(args=None, logfile=None, testing=False, silent=False, r
     # initialise logging for main
     log, logfile = init_logging(logfile, logtostdout=options.logtostdout,
                                 silent=(testing or options.terse or search_query or silent),
-                                colorize=options.color, tmp_logdir=options.tmp_logdir)
+                                colorize=options.color, tmp_logdir=options.tmp_logdir,
+                                asynchronous=options.async_logging)
 
     # log startup info (must be done after setting up logger)
     eb_cmd_line = eb_go.generate_cmd_line() + eb_go.args
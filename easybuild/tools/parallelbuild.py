@@ -35,19 +35,23 @@ Authors:
 * Stijn De Weirdt (Ghent University)
 * Bart Oldeman (McGill University, Calcul Quebec, Digital Research Alliance of Canada)
 """
-import math
+import heapq
+import multiprocessing
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 
 from easybuild.base import fancylogger
 from easybuild.framework.easyblock import get_easyblock_instance
 from easybuild.framework.easyconfig.easyconfig import ActiveMNS
+from easybuild.tools.build_history import ec_build_history_key, get_build_history, job_resources
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.config import build_option, get_repository, get_repositorypath
+from easybuild.tools.config import DEFAULT_JOB_SUBMIT_WORKERS, build_option, get_repository, get_repositorypath
 from easybuild.tools.filetools import get_cwd
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.job.backend import job_backend, JobBackend
 from easybuild.tools.repository.repository import init_repository
+from easybuild.tools.utilities import nub
 
 
 _log = fancylogger.getLogger('parallelbuild', fname=False)
@@ -87,6 +91,15 @@ def build_easyconfigs_in_parallel(build_command, easyconfigs, output_dir='easybu
     except RuntimeError as err:
         raise EasyBuildError("connection to server failed (%s: %s), can't submit jobs.", err.__class__.__name__, err)
 
+    # open build history once, it's used to determine resources to request for each job
+    build_history = get_build_history()
+    if build_history is not None:
+        easyconfigs = prioritise_easyconfigs(easyconfigs, build_history)
+
+    # obtain build stats for latest build in repository for all easyconfigs in one go,
+    # used to determine walltime to request when no build history is available
+    repo_buildstats = get_repo_buildstats(easyconfigs)
+
     # dependencies have already been resolved,
     # so one can linearly walk over the list and use previous job id's
     jobs = []
@@ -94,13 +107,13 @@ def build_easyconfigs_in_parallel(build_command, easyconfigs, output_dir='easybu
     # keep track of which job builds which module
     module_to_job = {}
 
-    for easyconfig in easyconfigs:
-        # this is very important, otherwise we might have race conditions
-        # e.g. GCC-4.5.3 finds cloog.tar.gz but it was incorrectly downloaded by GCC-4.6.3
-        # running this step here, prevents this
-        if prepare_first and not testing:
-            prepare_easyconfig(easyconfig)
+    # this is very important, otherwise we might have race conditions
+    # e.g. GCC-4.5.3 finds cloog.tar.gz but it was incorrectly downloaded by GCC-4.6.3
+    # running this step here, prevents this
+    if prepare_first and not testing:
+        prepare_easyconfigs(easyconfigs)
 
+    for easyconfig in easyconfigs:
         # convert <tweaked easyconfig.eb> to <original-easyconfig.eb --try-xxx> to avoid needing a shared tmpdir
         spec = easyconfig['spec']
         if spec in (tweak_map or {}):
@@ -108,7 +121,8 @@ def build_easyconfigs_in_parallel(build_command, easyconfigs, output_dir='easybu
 
         # the new job will only depend on already submitted jobs
         _log.info("creating job for ec: %s using %s" % (os.path.basename(easyconfig['spec']), spec))
-        new_job = create_job(active_job_backend, build_command, easyconfig, output_dir=output_dir, spec=spec)
+        new_job = create_job(active_job_backend, build_command, easyconfig, output_dir=output_dir, spec=spec,
+                             build_history=build_history, repo_buildstats=repo_buildstats)
 
         # filter out dependencies marked as external modules
         deps = [d for d in easyconfig['ec'].all_dependencies if not d.get('external_module', False)]
@@ -118,7 +132,7 @@ def build_easyconfigs_in_parallel(build_command, easyconfigs, output_dir='easybu
 
         # actually (try to) submit job
         active_job_backend.queue(new_job, job_deps)
-        _log.info("job %s for module %s has been submitted", new_job, new_job.module)
+        _log.info("job %s for module %s has been queued", new_job, new_job.module)
 
         # update dictionary
         module_to_job[new_job.module] = new_job
@@ -126,6 +140,9 @@ def build_easyconfigs_in_parallel(build_command, easyconfigs, output_dir='easybu
 
     active_job_backend.complete()
 
+    if build_history is not None:
+        build_history.close()
+
     return build_command if testing else jobs
 
 
@@ -172,7 +189,96 @@ def submit_jobs(ordered_ecs, cmd_line_opts, testing=False, prepare_first=True, t
                                          tweak_map=tweak_map, try_opts=try_opts_str)
 
 
-def create_job(job_backend, build_command, easyconfig, output_dir='easybuild-build', spec=''):
+def prioritise_easyconfigs(easyconfigs, build_history):
+    """
+    Reorder list of easyconfigs such that easyconfigs on the longest path of predicted build times
+    (i.e. the build time of the easyconfig itself plus that of the easyconfigs that depend on it) are handled first,
+    while still making sure that easyconfigs come after the easyconfigs for their dependencies.
+
+    :param easyconfigs: list of easyconfigs (as processed by process_easyconfig), ordered according to dependencies
+    :param build_history: BuildHistory instance to use to predict build time
+    """
+    mod_names = set(ec['full_mod_name'] for ec in easyconfigs)
+
+    deps, build_times, idx_by_name = {}, {}, {}
+    for idx, ec in enumerate(easyconfigs):
+        full_mod_name = ec['full_mod_name']
+        idx_by_name[full_mod_name] = idx
+        deps[full_mod_name] = set(_to_key(d) for d in ec['ec'].all_dependencies) & mod_names
+        prediction = build_history.predict(cores=build_option('job_cores'), **ec_build_history_key(ec['ec']))
+        build_times[full_mod_name] = prediction['build_time'] if prediction else 0
+
+    # determine which easyconfigs depend on each easyconfig
+    dependents = {full_mod_name: [] for full_mod_name in deps}
+    for full_mod_name, ec_deps in deps.items():
+        for dep in ec_deps:
+            dependents[dep].append(full_mod_name)
+
+    # determine length of longest path of predicted build times starting from each easyconfig;
+    # list of easyconfigs is ordered according to dependencies, so walk over it in reverse order
+    path_times = {}
+    for ec in reversed(easyconfigs):
+        full_mod_name = ec['full_mod_name']
+        dependent_times = [path_times[x] for x in dependents[full_mod_name] if x in path_times]
+        path_times[full_mod_name] = build_times[full_mod_name] + max(dependent_times + [0])
+
+    # heap of easyconfigs for which all dependencies are handled, with longest path of predicted build times first;
+    # index in list of easyconfigs is used as tie breaker, so original order is retained if there's no build history
+    nr_deps = {full_mod_name: len(ec_deps) for full_mod_name, ec_deps in deps.items()}
+    ready = [(-path_times[ec['full_mod_name']], idx) for idx, ec in enumerate(easyconfigs)
+             if not nr_deps[ec['full_mod_name']]]
+    heapq.heapify(ready)
+
+    res, done = [], set()
+    first_pending = 0
+    while len(done) < len(deps):
+        if ready:
+            idx = heapq.heappop(ready)[1]
+        else:
+            # no easyconfigs are ready (only if list of easyconfigs is not ordered according to dependencies),
+            # so pick first easyconfig that was not handled yet
+            while easyconfigs[first_pending]['full_mod_name'] in done:
+                first_pending += 1
+            idx = first_pending
+        ec = easyconfigs[idx]
+        full_mod_name = ec['full_mod_name']
+        if full_mod_name in done:
+            continue
+        done.add(full_mod_name)
+        res.append(ec)
+        for dependent in dependents[full_mod_name]:
+            nr_deps[dependent] -= 1
+            if not nr_deps[dependent]:
+                heapq.heappush(ready, (-path_times[dependent], idx_by_name[dependent]))
+
+    _log.info("Order of easyconfigs after prioritising based on predicted build time: %s",
+              [ec['full_mod_name'] for ec in res])
+    return res
+
+
+def get_repo_buildstats(easyconfigs):
+    """
+    Determine build stats for latest build in repository for specified easyconfigs,
+    using a single working copy of the repository and a single (batched) lookup.
+
+    :param easyconfigs: list of easyconfigs as processed by process_easyconfig
+    :return: dict with software name/easyconfig version tuples as keys and list of build stats as values
+    """
+    ec_tuples = nub([(ec['ec']['name'], det_full_ec_version(ec['ec'])) for ec in easyconfigs])
+
+    repo = init_repository(get_repository(), get_repositorypath())
+    try:
+        res = repo.get_buildstats_batch(ec_tuples)
+    finally:
+        repo.cleanup()
+
+    _log.debug("Found build stats in repository for %d out of %d easyconfigs",
+               len([x for x in res.values() if x]), len(ec_tuples))
+    return res
+
+
+def create_job(job_backend, build_command, easyconfig, output_dir='easybuild-build', spec='', build_history=None,
+               repo_buildstats=None):
     """
     Creates a job to build a *single* easyconfig.
 
@@ -181,6 +287,9 @@ def create_job(job_backend, build_command, easyconfig, output_dir='easybuild-bui
     :param easyconfig: easyconfig as processed by process_easyconfig
     :param output_dir: optional output path; --regtest-output-dir will be used inside the job with this variable
     :param spec: untweaked easyconfig name with optional --try-* options
+    :param build_history: BuildHistory instance to use to determine walltime & memory to request
+    :param repo_buildstats: build stats for latest builds in repository, as obtained via get_repo_buildstats
+                            (if None, the repository is queried for this easyconfig only)
 
     returns the job
     """
@@ -200,16 +309,26 @@ def create_job(job_backend, build_command, easyconfig, output_dir='easybuild-bui
         'spec': spec or easyconfig['spec'],
     }
 
-    # just use latest build stats
-    repo = init_repository(get_repository(), get_repositorypath())
-    buildstats = repo.get_buildstats(*ec_tuple)
-    extra = {}
-    if buildstats:
-        previous_time = buildstats[-1]['build_time']
-        extra['hours'] = int(math.ceil(previous_time * 2 / 60))
+    cores = build_option('job_cores')
 
-    if build_option('job_cores'):
-        extra['cores'] = build_option('job_cores')
+    # determine walltime & memory to request based on build history, if available;
+    # fall back to build stats for latest build in repository
+    prediction = None
+    if build_history is not None:
+        prediction = build_history.predict(cores=cores, **ec_build_history_key(easyconfig['ec']))
+    if prediction is None:
+        if repo_buildstats is None:
+            repo = init_repository(get_repository(), get_repositorypath())
+            buildstats = repo.get_buildstats(*ec_tuple)
+        else:
+            buildstats = repo_buildstats.get(ec_tuple)
+        if buildstats:
+            prediction = {'build_time': buildstats[-1]['build_time'], 'peak_rss_kb': None}
+
+    extra = job_resources(prediction)
+
+    if cores:
+        extra['cores'] = cores
 
     job = job_backend.make_job(command, name, **extra)
     job.module = easyconfig['ec'].full_mod_name
@@ -231,3 +350,52 @@ def prepare_easyconfig(ec):
         os.remove(easyblock_instance.logfile)
     except (OSError, EasyBuildError) as err:
         raise EasyBuildError("An error occurred while preparing %s: %s", ec, err)
+
+
+# easyconfigs being prepared in worker processes (see prepare_easyconfigs);
+# worker processes are forked, so they inherit this list, and only need to be passed an index
+_easyconfigs_to_prepare = []
+
+
+def _prepare_easyconfig_in_worker(idx):
+    """Prepare for building easyconfig with specified index in worker process, see prepare_easyconfigs."""
+    prepare_easyconfig(_easyconfigs_to_prepare[idx])
+
+
+def prepare_easyconfigs(easyconfigs):
+    """
+    Prepare for building specified easyconfigs (fetch sources), using up to --job-submit-workers worker processes.
+
+    Each worker process uses a separate log file (and structured log) for each easyconfig it prepares,
+    and concurrent downloads of the same source file are handled by download_file.
+
+    :param easyconfigs: list of easyconfigs (as processed by process_easyconfig)
+    """
+    global _easyconfigs_to_prepare
+
+    max_workers = min(len(easyconfigs), build_option('job_submit_workers') or DEFAULT_JOB_SUBMIT_WORKERS)
+
+    use_workers = max_workers > 1
+    if use_workers and build_option('async_logging', default=False):
+        _log.info("Asynchronous logging is enabled, so preparing easyconfigs in main process")
+        use_workers = False
+    if use_workers and 'fork' not in multiprocessing.get_all_start_methods():
+        _log.info("Worker processes can not be forked, so preparing easyconfigs in main process")
+        use_workers = False
+
+    if not use_workers:
+        for easyconfig in easyconfigs:
+            prepare_easyconfig(easyconfig)
+        return
+
+    _log.info("Preparing %d easyconfigs using %d worker processes", len(easyconfigs), max_workers)
+    _easyconfigs_to_prepare = easyconfigs
+    # worker processes are forked, so they inherit EasyBuild configuration
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('fork'))
+    try:
+        # raises error if preparing an easyconfig failed
+        for _ in pool.map(_prepare_easyconfig_in_worker, range(len(easyconfigs))):
+            pass
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        _easyconfigs_to_prepare = []
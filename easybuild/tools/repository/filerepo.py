@@ -38,17 +38,27 @@ Authors:
 * Ward Poelmans (Ghent University)
 * Fotis Georgatos (Uni.Lu, NTUA)
 """
+import fcntl
+import json
 import os
 import time
 
-from easybuild.framework.easyconfig.easyconfig import EasyConfig
 from easybuild.framework.easyconfig.format.one import EB_FORMAT_EXTENSION
+from easybuild.framework.easyconfig.parser import EasyConfigParser
 from easybuild.framework.easyconfig.tools import stats_to_str
-from easybuild.tools.filetools import copy_file, mkdir, read_file, write_file
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import copy_file, mkdir, read_file, write_file, write_json_file
 from easybuild.tools.repository.repository import Repository
 from easybuild.tools.version import VERBOSE_VERSION
 
 
+# name of build stats index file (in repository subdirectory),
+# which maps software name & installation version to build stats of archived easyconfig files
+BUILDSTATS_INDEX_FILENAME = 'buildstats_index.json'
+# suffix for lock file that is used to serialize updates of build stats index by concurrent EasyBuild sessions
+BUILDSTATS_INDEX_LOCK_SUFFIX = '.lock'
+
+
 class FileRepository(Repository):
     """Class for file repositories."""
 
@@ -110,6 +120,8 @@ class FileRepository(Repository):
         txt += statstxt
         write_file(dest, txt)
 
+        self.update_buildstats_index(name, version, (previous or []) + [stats])
+
         return dest
 
     def add_patch(self, patch, name):
@@ -124,19 +136,97 @@ class FileRepository(Repository):
         copy_file(patch, full_path)
         return full_path
 
-    def get_buildstats(self, name, ec_version):
+    def queue_commit(self, msg, paths):
         """
-        return the build statistics
+        Commit working copy, or postpone committing (see Repository.queue_commit);
+        the build stats index is always included in the changes
+        """
+        super().queue_commit(msg, paths + [self.buildstats_index_path()])
+
+    def buildstats_index_path(self):
+        """Return location of build stats index for this repository."""
+        return os.path.join(self.wc, self.subdir, BUILDSTATS_INDEX_FILENAME)
+
+    def read_buildstats_index(self):
+        """Read build stats index, if it exists (an empty index is used if the file is corrupt)."""
+        index = {}
+        path = self.buildstats_index_path()
+        if os.path.exists(path):
+            try:
+                with open(path) as fp:
+                    index = json.load(fp)
+            except (OSError, ValueError) as err:
+                self.log.warning("Failed to read build stats index %s, ignoring it: %s", path, err)
+        return index
+
+    def update_buildstats_index(self, name, version, buildstats):
+        """
+        Update entry for specified software name and installation version in build stats index
+        (atomically, so concurrent EasyBuild sessions don't see a partial file);
+        an exclusive lock is held while updating the index, so updates by concurrent EasyBuild sessions don't get lost
+
+        :param name: software name
+        :param version: software install version, incl. toolchain & versionsuffix
+        :param buildstats: list of build stats, as included in archived easyconfig
+        """
+        path = self.buildstats_index_path()
+        lock_path = path + BUILDSTATS_INDEX_LOCK_SUFFIX
+        try:
+            mkdir(os.path.dirname(path), parents=True)
+            with open(lock_path, 'a') as lock_fh:
+                try:
+                    fcntl.flock(lock_fh, fcntl.LOCK_EX)
+                except OSError as err:
+                    self.log.warning("Failed to lock %s, updating build stats index without lock: %s", lock_path, err)
+
+                # pick up entries that were added by other EasyBuild sessions in the meantime
+                index = self.read_buildstats_index()
+                index['%s/%s' % (name, version)] = buildstats
+                write_json_file(path, index, indent=1, sort_keys=True, default=str)
+        except (OSError, EasyBuildError) as err:
+            self.log.warning("Failed to update build stats index %s: %s", path, err)
+
+        return path
+
+    def get_buildstats_batch(self, ec_tuples):
         """
+        Return the build statistics for multiple software name/easyconfig version tuples at once;
+        the build stats index is read only once, archived easyconfigs are only parsed if no entry is found in the index
+
+        :param ec_tuples: list of tuples with software name and easyconfig version
+        :return: dict with software name/easyconfig version tuples as keys and list of build stats as values
+        """
+        index = self.read_buildstats_index()
+
+        res = {}
+        for (name, ec_version) in ec_tuples:
+            buildstats = index.get('%s/%s' % (name, ec_version))
+            if buildstats is None:
+                buildstats = self._parse_buildstats(name, ec_version)
+            else:
+                self.log.debug("Found build stats for %s v%s in build stats index", name, ec_version)
+            res[(name, ec_version)] = buildstats
+
+        return res
+
+    def _parse_buildstats(self, name, ec_version):
+        """Obtain build stats from archived easyconfig (without fully parsing it)."""
         full_path = os.path.join(self.wc, self.subdir, name)
         if not os.path.isdir(full_path):
             self.log.debug("module (%s) has not been found in the repo" % name)
             return []
 
-        dest = os.path.join(full_path, "%s.eb" % ec_version)
-        if not os.path.isfile(dest):
-            self.log.debug("version %s for %s has not been found in the repo" % (ec_version, name))
-            return []
+        # consider both the filename used by add_easyconfig and the legacy '<version>.eb' filename
+        for filename in ["%s-%s%s" % (name, ec_version, EB_FORMAT_EXTENSION), "%s.eb" % ec_version]:
+            dest = os.path.join(full_path, filename)
+            if os.path.isfile(dest):
+                return EasyConfigParser(dest).get_config_dict().get('buildstats')
 
-        eb = EasyConfig(dest, validate=False)
-        return eb['buildstats']
+        self.log.debug("version %s for %s has not been found in the repo" % (ec_version, name))
+        return []
+
+    def get_buildstats(self, name, ec_version):
+        """
+        return the build statistics
+        """
+        return self.get_buildstats_batch([(name, ec_version)])[(name, ec_version)]
@@ -76,6 +76,8 @@ class GitRepository(FileRepository):
                    "The 2nd argument is a path inside the repository where to save the files.")
 
     USABLE = HAVE_GIT
+    SHARED_WORKING_COPY = True
+    BATCHED_COMMITS = True
 
     @only_if_module_is_available('git', pkgname='GitPython')
     def __init__(self, *args):
@@ -147,6 +149,7 @@ class GitRepository(FileRepository):
         """
         path = super().add_easyconfig(cfg, name, version, stats, previous_stats)
         self.stage_file(path)
+        self.stage_file(self.buildstats_index_path())
         return path
 
     def add_patch(self, patch, name):
@@ -193,3 +196,4 @@ class GitRepository(FileRepository):
             remove_dir(self.wc)
         except IOError as err:
             raise EasyBuildError("Can't remove working copy %s: %s", self.wc, err)
+        self.initialized = False
@@ -77,6 +77,8 @@ class HgRepository(FileRepository):
                    "The 2nd argument is ignored.")
 
     USABLE = HAVE_HG
+    SHARED_WORKING_COPY = True
+    BATCHED_COMMITS = True
 
     def __init__(self, *args):
         """
@@ -150,6 +152,7 @@ class HgRepository(FileRepository):
         """
         path = super().add_easyconfig(cfg, name, version, stats, previous_stats)
         self.stage_file(path)
+        self.stage_file(self.buildstats_index_path())
         return path
 
     def add_patch(self, patch, name):
@@ -197,3 +200,4 @@ class HgRepository(FileRepository):
             remove_dir(self.wc)
         except IOError as err:
             raise EasyBuildError("Can't remove working copy %s: %s", self.wc, err)
+        self.initialized = False
@@ -36,12 +36,27 @@ Authors:
 * Ward Poelmans (Ghent University)
 * Fotis Georgatos (Uni.Lu, NTUA)
 """
+import atexit
+import glob
+import hashlib
+import json
+import os
+import socket
+
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import DEFAULT_REPOSITORY_COMMIT_INTERVAL, build_option, build_path
+from easybuild.tools.filetools import read_file, remove_file, write_file, write_json_file
 from easybuild.tools.utilities import get_subclasses, import_available_modules
 
 _log = fancylogger.getLogger('repository', fname=False)
 
+# name of directory (in build path) with journals of changes that were not committed to a repository yet
+REPOSITORY_JOURNAL_DIRNAME = 'repository_journal'
+
+# initialized repositories that share a working copy during this session, by repository name & path
+_shared_repositories = {}
+
 
 class Repository:
     """
@@ -52,6 +67,14 @@ class Repository:
 
     USABLE = True  # can the Repository be used?
 
+    # can a single working copy be shared across init_repository calls during an EasyBuild session?
+    # (avoids creating a new working copy each time, which can be expensive, e.g. a clone for git)
+    SHARED_WORKING_COPY = False
+
+    # can commits be batched (see --repository-commit-interval)?
+    # only relevant if committing involves more than writing files (e.g. pushing for git)
+    BATCHED_COMMITS = False
+
     def __init__(self, repo_path, subdir=''):
         """
         Initialize a repository. self.repo and self.subdir will be set.
@@ -63,12 +86,18 @@ class Repository:
         self.repo = repo_path
         self.wc = None
         self.initialized = False
+        # files & commit messages for changes that were not committed yet (if commits are batched)
+        self.pending_files = []
+        self.pending_msgs = []
+        self.flush_at_exit = False
 
     def init(self):
         """Prepare repository for use."""
         self.setup_repo()
         self.create_working_copy()
         self.initialized = True
+        if self.BATCHED_COMMITS:
+            self.replay_journals()
 
     def is_initialized(self):
         """Indicate whether repository was initialized."""
@@ -125,6 +154,118 @@ class Repository:
         # does nothing by default
         pass
 
+    def queue_commit(self, msg, paths):
+        """
+        Commit working copy, or postpone committing if commits are batched (see --repository-commit-interval);
+        pending changes are recorded in a journal, so they can be committed in a later session if needed
+
+        :param msg: commit message
+        :param paths: list of locations of files (in working copy) that were added to repository
+        """
+        # commit right away if EasyBuild configuration was not set up
+        interval = build_option('repository_commit_interval', default=None)
+        if interval is None:
+            interval = DEFAULT_REPOSITORY_COMMIT_INTERVAL
+
+        if not self.BATCHED_COMMITS or interval == 1:
+            self.commit(msg)
+        else:
+            # make sure pending changes are committed when EasyBuild exits,
+            # also when it exits early because an installation failed
+            if not self.flush_at_exit:
+                atexit.register(self.flush_commits_at_exit)
+                self.flush_at_exit = True
+
+            self.pending_files.extend(paths)
+            self.pending_msgs.append(msg)
+            if interval and len(self.pending_msgs) >= interval:
+                self.flush_commits()
+            else:
+                self.write_journal()
+
+    def flush_commits(self):
+        """Commit all pending changes to repository at once (and remove journal)."""
+        if self.pending_msgs:
+            self.log.info("Committing %d pending changes to repository", len(self.pending_msgs))
+            self.commit(', '.join(self.pending_msgs))
+            self.pending_files, self.pending_msgs = [], []
+
+            journal = self.journal_path()
+            if journal and os.path.exists(journal):
+                remove_file(journal)
+
+    def flush_commits_at_exit(self):
+        """Commit pending changes to repository (if any) and clean up working copy, when EasyBuild exits."""
+        if self.pending_msgs:
+            try:
+                self.flush_commits()
+                self.cleanup()
+            except EasyBuildError as err:
+                self.log.warning("Failed to commit pending changes to repository (see %s): %s",
+                                 self.journal_path(), err)
+
+    def journal_key(self):
+        """Return key for this repository, used in filenames of journals of pending changes."""
+        repo_spec = '%s:%s:%s' % (self.__class__.__name__, self.repo, self.subdir)
+        return hashlib.sha256(repo_spec.encode('utf-8')).hexdigest()[:16]
+
+    def journal_path(self, pid=None):
+        """
+        Return location of journal of pending changes for this repository & EasyBuild session (if any)
+
+        :param pid: process ID of EasyBuild session (default: current process)
+        """
+        journal_dir = det_repository_journal_path()
+        if journal_dir:
+            filename = '%s-%s-%s.json' % (self.journal_key(), socket.gethostname(), pid or os.getpid())
+            return os.path.join(journal_dir, filename)
+        return None
+
+    def write_journal(self):
+        """Write journal of pending changes, incl. contents of pending files (atomically)."""
+        path = self.journal_path()
+        if path is None:
+            return
+
+        journal = {
+            'msgs': self.pending_msgs,
+            'files': {os.path.relpath(p, self.wc): read_file(p) for p in self.pending_files if os.path.isfile(p)},
+        }
+        try:
+            write_json_file(path, journal)
+        except EasyBuildError as err:
+            self.log.warning("Failed to write journal of pending changes %s: %s", path, err)
+
+    def replay_journals(self):
+        """
+        Commit changes recorded in journals of EasyBuild sessions that ended before committing them;
+        only journals of sessions on the current host that are no longer running are considered.
+        """
+        current_journal = self.journal_path()
+        if current_journal is None:
+            return
+
+        prefix = '%s-%s-' % (self.journal_key(), socket.gethostname())
+        for journal in sorted(glob.glob(os.path.join(os.path.dirname(current_journal), prefix + '*.json'))):
+            pid = os.path.basename(journal)[len(prefix):-len('.json')]
+            if journal == current_journal or not pid.isdigit() or is_running(int(pid)):
+                continue
+
+            try:
+                entries = json.loads(read_file(journal))
+                msgs, files = entries['msgs'], entries['files']
+            except (EasyBuildError, KeyError, TypeError, ValueError) as err:
+                self.log.warning("Ignoring corrupt journal of pending changes %s: %s", journal, err)
+                continue
+
+            self.log.info("Committing %d pending changes from journal %s", len(msgs), journal)
+            for relpath, txt in sorted(files.items()):
+                path = os.path.join(self.wc, relpath)
+                write_file(path, txt)
+                self.stage_file(path)
+            self.commit(', '.join(msgs) + " (recovered from journal)")
+            remove_file(journal)
+
     def cleanup(self):
         """
         Clean up working copy.
@@ -137,6 +278,15 @@ class Repository:
         """
         raise NotImplementedError
 
+    def get_buildstats_batch(self, ec_tuples):
+        """
+        Get the build statistics for multiple software name/easyconfig version tuples at once
+
+        :param ec_tuples: list of tuples with software name and easyconfig version
+        :return: dict with software name/easyconfig version tuples as keys and list of build stats as values
+        """
+        return {(name, ec_version): self.get_buildstats(name, ec_version) for (name, ec_version) in ec_tuples}
+
 
 def avail_repositories(check_useable=True):
     """
@@ -153,12 +303,45 @@ def avail_repositories(check_useable=True):
     return class_dict
 
 
+def is_running(pid):
+    """Check whether process with specified process ID is (still) running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # process exists, but is owned by another user
+        pass
+    return True
+
+
+def det_repository_journal_path():
+    """
+    Determine location of directory with journals of changes that were not committed to a repository yet:
+    value for --repository-journal-path if specified (an empty value disables the journal),
+    or in the build path.
+    """
+    # build option is not defined if EasyBuild configuration was not set up, no journal is used then
+    path = build_option('repository_journal_path', default=False)
+    if path is None:
+        path = os.path.join(build_path(), REPOSITORY_JOURNAL_DIRNAME)
+
+    return path or None
+
+
 def init_repository(repository, repository_path):
     """Return an instance of the selected repository class."""
     inited_repo = None
     if isinstance(repository, Repository):
         inited_repo = repository
     elif isinstance(repository, str):
+        # reuse working copy that was already created during this session, if it wasn't cleaned up yet
+        shared_key = (repository, str(repository_path))
+        shared_repo = _shared_repositories.get(shared_key)
+        if shared_repo is not None and shared_repo.is_initialized():
+            _log.debug("Reusing working copy %s for %s repository at %s", shared_repo.wc, repository, repository_path)
+            return shared_repo
+
         repo = avail_repositories().get(repository)
         try:
             if isinstance(repository_path, str):
@@ -175,4 +358,8 @@ def init_repository(repository, repository_path):
         raise EasyBuildError("Unknown typo of repository spec: %s (type %s)", repo, type(repo))
 
     inited_repo.init()
+
+    if isinstance(repository, str) and inited_repo.SHARED_WORKING_COPY:
+        _shared_repositories[shared_key] = inited_repo
+
     return inited_repo
@@ -77,6 +77,8 @@ class SvnRepository(FileRepository):
                    "The 2nd argument is a path inside the repository where to save the files.")
 
     USABLE = HAVE_PYSVN
+    SHARED_WORKING_COPY = True
+    BATCHED_COMMITS = True
 
     @only_if_module_is_available('pysvn', url='http://pysvn.tigris.org/')
     def __init__(self, *args):
@@ -161,6 +163,7 @@ class SvnRepository(FileRepository):
         """
         path = super().add_easyconfig(cfg, name, version, stats, previous_stats)
         self.stage_file(path)
+        self.stage_file(self.buildstats_index_path())
         return path
 
     def add_patch(self, patch, name):
@@ -195,3 +198,4 @@ class SvnRepository(FileRepository):
             remove_dir(self.wc)
         except OSError as err:
             raise EasyBuildError("Can't remove working copy %s: %s", self.wc, err)
+        self.initialized = False
@@ -35,7 +35,7 @@ Authors:
 * Toon Willems (Ghent University)
 * Ward Poelmans (Ghent University)
 """
-import copy
+import logging
 import os
 import sys
 
@@ -48,7 +48,7 @@ from easybuild.tools.config import build_option
 from easybuild.tools.filetools import det_common_path_prefix, get_cwd, search_file
 from easybuild.tools.module_naming_scheme.easybuild_mns import EasyBuildMNS
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
-from easybuild.tools.utilities import flatten, nub
+from easybuild.tools.utilities import flatten
 
 
 _log = fancylogger.getLogger('tools.robot', fname=False)
@@ -155,33 +155,8 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
         ec_keys = [k for k in [mk_key(e) for e in easyconfigs] if k not in wrapper_deps]
         deps_for[(None, None)] = ([], ec_keys, [])
 
-    # iteratively expand list of dependencies
-    last_deps_for = None
-    while deps_for != last_deps_for:
-        last_deps_for = copy.deepcopy(deps_for)
-        # (Automake, _), [], [(Autoconf, _), (GCC, _)]
-        for (key, (build_deps, runtime_deps, multi_deps)) in last_deps_for.items():
-            # extend runtime dependencies with non-build dependencies of own runtime dependencies
-            # Autoconf
-            for dep in runtime_deps:
-                # [], [M4, GCC]
-                deps_for[key][1].extend(deps_for[dep][1])
-
-            # extend multi deps with non-build dependencies of own runtime dependencies
-            for deplist in multi_deps:
-                for dep in deplist:
-                    deps_for[key][2].extend(deps_for[dep][1])
-
-            # extend build dependencies with non-build dependencies of own build dependencies
-            for dep in build_deps:
-                deps_for[key][0].extend(deps_for[dep][1])
-
-            deps_for[key] = (sorted(nub(deps_for[key][0])), sorted(nub(deps_for[key][1])), multi_deps)
-
-            # also track reverse deps (except for ghost entry)
-            if key != (None, None):
-                for dep in build_deps + runtime_deps:
-                    dep_of.setdefault(dep, set()).add(key)
+    # expand lists of dependencies with transitive (non-build) dependencies
+    expand_deps_for(deps_for, dep_of, skip_dep_of=[(None, None)])
 
     def check_conflict(parent, dep1, dep2):
         """
@@ -220,16 +195,99 @@ def check_conflicts(easyconfigs, modtool, check_inter_ec_conflicts=True):
             lists_of_runtime_deps = [runtime_deps]
 
         for runtime_deps in lists_of_runtime_deps:
-            # also check whether module itself clashes with any of its dependencies
-            for i, dep1 in enumerate(build_deps + runtime_deps + [key]):
-                for dep2 in (build_deps + runtime_deps)[i + 1:]:
-                    # don't worry about conflicts between module itself and any of its build deps
-                    if dep1 != key or dep2 not in build_deps:
-                        res |= check_conflict(key, dep1, dep2)
+            for dep1, dep2 in det_conflicting_deps(key, build_deps, runtime_deps):
+                res |= check_conflict(key, dep1, dep2)
 
     return res
 
 
+def expand_deps_for(deps_for, dep_of, skip_dep_of=None):
+    """
+    Expand lists of dependencies with transitive non-build dependencies (in place).
+
+    The transitive closure is determined via a memoised depth-first search over an integer-indexed dependency graph.
+
+    :param deps_for: dict with (build deps, runtime deps, multi deps) tuple for (name, version) tuples as keys;
+                     build and runtime deps are extended with runtime deps of own build/runtime deps (recursively),
+                     and sorted; multi deps are left untouched
+    :param dep_of: dict with reverse dependencies, which is updated for the expanded lists of dependencies
+    :param skip_dep_of: list of keys to not track as reverse dependencies
+    """
+    keys = list(deps_for)
+    key_idx = {key: idx for (idx, key) in enumerate(keys)}
+    runtime_edges = [[key_idx[dep] for dep in deps_for[key][1]] for key in keys]
+
+    # determine (indices of) all runtime deps that are required (recursively) by each key
+    runtime_closure = [None] * len(keys)
+    for start_idx in range(len(keys)):
+        stack, in_progress = [start_idx], set()
+        while stack:
+            idx = stack[-1]
+            if runtime_closure[idx] is not None:
+                stack.pop()
+                continue
+
+            in_progress.add(idx)
+            todo = [dep_idx for dep_idx in runtime_edges[idx] if runtime_closure[dep_idx] is None]
+            if todo:
+                for dep_idx in todo:
+                    if dep_idx in in_progress:
+                        raise EasyBuildError("Cyclic dependency found involving %s and %s", keys[idx], keys[dep_idx])
+                stack.extend(todo)
+            else:
+                stack.pop()
+                in_progress.discard(idx)
+                direct_deps = runtime_edges[idx]
+                runtime_closure[idx] = frozenset(direct_deps).union(*[runtime_closure[i] for i in direct_deps])
+
+    skip_dep_of = skip_dep_of or []
+    for key, idx in key_idx.items():
+        build_deps, _, multi_deps = deps_for[key]
+
+        # build deps are extended with all runtime deps of build deps
+        build_dep_idxs = set()
+        for dep_idx in (key_idx[dep] for dep in build_deps):
+            build_dep_idxs.add(dep_idx)
+            build_dep_idxs.update(runtime_closure[dep_idx])
+
+        build_deps = sorted(keys[i] for i in build_dep_idxs)
+        runtime_deps = sorted(keys[i] for i in runtime_closure[idx])
+        deps_for[key] = (build_deps, runtime_deps, multi_deps)
+
+        if key not in skip_dep_of:
+            for dep in build_deps + runtime_deps:
+                dep_of.setdefault(dep, set()).add(key)
+
+
+def det_conflicting_deps(key, build_deps, runtime_deps):
+    """
+    Determine pairs of conflicting dependencies, i.e. dependencies with the same name but a different version.
+
+    Dependencies are bucketed by name, so only dependencies with the same name are compared with each other.
+    Pairs are returned in the order in which they appear in the combined list of build and runtime dependencies.
+
+    :param key: (name, version) tuple for software to which dependencies belong
+    :param build_deps: list of (name, version) tuples for build dependencies
+    :param runtime_deps: list of (name, version) tuples for runtime dependencies
+    """
+    all_deps = build_deps + runtime_deps
+
+    deps_by_name = {}
+    for idx, dep in enumerate(all_deps):
+        deps_by_name.setdefault(dep[0], []).append(idx)
+
+    conflicts = []
+    for idxs in deps_by_name.values():
+        for pos, idx1 in enumerate(idxs):
+            for idx2 in idxs[pos + 1:]:
+                dep1, dep2 = all_deps[idx1], all_deps[idx2]
+                # don't worry about conflicts between module itself and any of its build deps
+                if dep1[1] != dep2[1] and (dep1 != key or dep2 not in build_deps):
+                    conflicts.append((idx1, idx2))
+
+    return [(all_deps[idx1], all_deps[idx2]) for (idx1, idx2) in sorted(conflicts)]
+
+
 def dry_run(easyconfigs, modtool, short=False):
     """
     Compose dry run overview for supplied easyconfigs:
@@ -413,7 +471,7 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_erro
                 if candidates:
                     cand_dep = candidates[0]
                     # find easyconfig, might not find any
-                    _log.debug("Looking for easyconfig for %s" % str(cand_dep))
+                    _log.debug("Looking for easyconfig for %s", cand_dep)
                     # note: robot_find_easyconfig may return None
                     path = robot_find_easyconfig(cand_dep['name'], det_full_ec_version(cand_dep))
 
@@ -442,7 +500,7 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_erro
                             'spec': None,
                         })
                     else:
-                        _log.info("Robot: resolving dependency %s with %s" % (cand_dep, path))
+                        _log.info("Robot: resolving dependency %s with %s", cand_dep, path)
                         # build specs should not be passed down to resolved dependencies,
                         # to avoid that e.g. --try-toolchain trickles down into the used toolchain itself
                         hidden = cand_dep.get('hidden', False)
@@ -454,10 +512,10 @@ def resolve_dependencies(easyconfigs, modtool, retain_all_deps=False, raise_erro
                         for ec in processed_ecs:
                             if ec not in easyconfigs + additional:
                                 additional.append(ec)
-                                _log.debug("Added %s as dependency of %s" % (ec, entry))
-                else:
+                                _log.debug("Added %s as dependency of %s", ec, entry)
+                elif _log.isEnabledFor(logging.DEBUG):
                     mod_name = EasyBuildMNS().det_full_module_name(entry['ec'])
-                    _log.debug("No more candidate dependencies to resolve for %s" % mod_name)
+                    _log.debug("No more candidate dependencies to resolve for %s", mod_name)
 
             # add additional (new) easyconfigs to list of stuff to process
             easyconfigs.extend(additional)
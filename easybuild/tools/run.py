@@ -37,7 +37,9 @@ Authors:
 """
 import functools
 import inspect
+import io
 import locale
+import logging
 import os
 import re
 import shlex
@@ -64,8 +66,12 @@ except ImportError:
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, EasyBuildExit, CWD_NOTFOUND_ERROR
 from easybuild.tools.build_log import dry_run_msg, time_str_since
+from easybuild.tools.build_profile import get_build_profile, rusage_snapshot
 from easybuild.tools.config import build_option
+from easybuild.tools.error_excerpts import DEFAULT_MAX_EXCERPTS, extract_error_excerpts
+from easybuild.tools.error_excerpts import extract_error_excerpts_from_file
 from easybuild.tools.hooks import RUN_SHELL_CMD, load_hooks, run_hook
+from easybuild.tools.structured_log import LOG_SECTION_COMMAND, get_structured_log
 from easybuild.tools.output import COLOR_RED, COLOR_YELLOW, colorize, escape_for_rich, print_error
 from easybuild.tools.utilities import trace_msg
 
@@ -120,6 +126,23 @@ class RunShellCmdError(BaseException):
         msg = f"Shell command '{self.cmd_name}' failed!"
         super().__init__(msg, *args, **kwargs)
 
+    def error_excerpts(self, **kwargs):
+        """
+        Extract relevant error excerpts from output of failed shell command (see extract_error_excerpts).
+        Output files are used when available, which are read line by line rather than all at once.
+
+        :return: list of ErrorExcerpt instances, sorted by rank (highest first)
+        """
+        excerpts = []
+        for path, output in [(self.err_file, self.stderr), (self.out_file, self.output)]:
+            if path and os.path.exists(path):
+                excerpts.extend(extract_error_excerpts_from_file(path, **kwargs))
+            elif output:
+                excerpts.extend(extract_error_excerpts(io.StringIO(output), **kwargs))
+
+        excerpts.sort(key=lambda excerpt: excerpt.rank_key(), reverse=True)
+        return excerpts[:kwargs.get('max_excerpts', DEFAULT_MAX_EXCERPTS)]
+
     def print(self):
         """
         Report failed shell command for this RunShellCmdError instance
@@ -154,6 +177,16 @@ class RunShellCmdError(BaseException):
         if self.cmd_sh is not None:
             error_info.append(pad_4_spaces(f"interactive shell script  ->  {self.cmd_sh}", color=COLOR_YELLOW))
 
+        # include most relevant error lines in output of command (if any)
+        try:
+            excerpts = self.error_excerpts(max_excerpts=1)
+        except EasyBuildError as err:
+            _log.warning(f"Failed to extract error excerpts from output of failed shell command: {err}")
+            excerpts = None
+        if excerpts:
+            error_info.append(pad_4_spaces(f"{excerpts[0].category} error in output (line {excerpts[0].line_nr}):"))
+            error_info.extend(pad_4_spaces(' ' * 4 + line) for line in str(excerpts[0]).split('\n'))
+
         print_error('\n'.join(error_info), rich_highlight=False)
 
 
@@ -296,7 +329,11 @@ def _answer_question(stdout, proc, qa_patterns, qa_wait_patterns):
     space_line_break_pattern = r'[\s\n]+'
     space_line_break_regex = re.compile(space_line_break_pattern)
 
-    stdout_end = stdout.decode(errors='ignore')[-1000:]
+    # only decode tail of output if it is going to be logged
+    if _log.isEnabledFor(logging.DEBUG):
+        stdout_end = stdout.decode(errors='ignore')[-1000:]
+    else:
+        stdout_end = None
     for question, answers in qa_patterns:
         # first replace hard spaces by regular spaces, since they would mess up the join/split below
         question = question.replace(r'\ ', ' ')
@@ -307,7 +344,7 @@ def _answer_question(stdout, proc, qa_patterns, qa_wait_patterns):
         regex = re.compile(question.encode())
         res = regex.search(stdout)
         if res:
-            _log.debug(f"Found match for question pattern '{question}' at end of stdout: {stdout_end}")
+            _log.debug("Found match for question pattern '%s' at end of stdout: %s", question, stdout_end)
             # if answer is specified as a list, we take the first item as current answer,
             # and add it to the back of the list (so we cycle through answers)
             if isinstance(answers, list):
@@ -332,7 +369,7 @@ def _answer_question(stdout, proc, qa_patterns, qa_wait_patterns):
             match_found = True
             break
         else:
-            _log.debug(f"No match for question pattern '{question}' at end of stdout: {stdout_end}")
+            _log.debug("No match for question pattern '%s' at end of stdout: %s", question, stdout_end)
     else:
         _log.info("No match found for question patterns, considering question wait patterns")
         # if no match was found among question patterns,
@@ -347,14 +384,14 @@ def _answer_question(stdout, proc, qa_patterns, qa_wait_patterns):
             _log.debug(f"Checking for question wait pattern '{pattern}'...")
             if regex.search(stdout):
                 _log.info(f"Found match for question wait pattern '{pattern}'")
-                _log.debug(f"Found match for question wait pattern '{pattern}' at end of stdout: {stdout_end}")
+                _log.debug("Found match for question wait pattern '%s' at end of stdout: %s", pattern, stdout_end)
                 match_found = True
                 break
             else:
-                _log.debug(f"No match for question wait pattern '{pattern}' at end of stdout: {stdout_end}")
+                _log.debug("No match for question wait pattern '%s' at end of stdout: %s", pattern, stdout_end)
         else:
             _log.info("No match found for question wait patterns")
-            _log.debug(f"No match found in question (wait) patterns at end of stdout: {stdout_end}")
+            _log.debug("No match found in question (wait) patterns at end of stdout: %s", stdout_end)
 
     return match_found
 
@@ -512,131 +549,163 @@ def run_shell_cmd(cmd, fail_on_error=True, split_stderr=False, stdin=None, env=N
     stderr_handle = subprocess.PIPE if split_stderr else subprocess.STDOUT
     stdin_handle = subprocess.PIPE if stdin or qa_patterns else subprocess.DEVNULL
 
-    log_msg = f"Running {short_cmd_msg} in {work_dir}:\n\t{cmd_str}"
-    if thread_id:
-        log_msg += f" (via thread with ID {thread_id})"
-    _log.info(log_msg)
+    # log command output in a separate section of structured log (if one is being written);
+    # not done for commands running asynchronously, since their log messages may be interleaved with others
+    structured_log = get_structured_log()
+    if structured_log and not asynchronous:
+        structured_log_section = structured_log.start_section(LOG_SECTION_COMMAND, cmd_str)
+    else:
+        structured_log_section = None
 
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_handle, stdin=stdin_handle,
-                            cwd=work_dir, env=env, shell=shell, executable=executable)
+    try:
+        log_msg = f"Running {short_cmd_msg} in {work_dir}:\n\t{cmd_str}"
+        if thread_id:
+            log_msg += f" (via thread with ID {thread_id})"
+        _log.info(log_msg)
 
-    # 'input' value fed to subprocess.run must be a byte sequence
-    if stdin:
-        stdin = stdin.encode()
+        # take snapshot of resource usage, if a build profile is being collected
+        build_profile = get_build_profile()
+        if build_profile:
+            rusage_start = rusage_snapshot()
 
-    if stream_output or qa_patterns:
-        # enable non-blocking access to stdout, stderr, stdin
-        for channel in (proc.stdout, proc.stdin, proc.stderr):
-            if channel is not None:
-                os.set_blocking(channel.fileno(), False)
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_handle, stdin=stdin_handle,
+                                cwd=work_dir, env=env, shell=shell, executable=executable)
 
+        # 'input' value fed to subprocess.run must be a byte sequence
         if stdin:
-            proc.stdin.write(stdin)
-            proc.stdin.flush()
-            if not qa_patterns:
-                proc.stdin.close()
-
-        exit_code = None
-        stdout, stderr = b'', b''
-        check_interval_secs = 0.1
-        time_no_match = 0
-        prev_stdout = ''
-
-        while exit_code is None:
-            # collect output line by line, while checking for questions to answer (if qa_patterns is provided)
+            stdin = stdin.encode()
+
+        if stream_output or qa_patterns:
+            # enable non-blocking access to stdout, stderr, stdin
+            for channel in (proc.stdout, proc.stdin, proc.stderr):
+                if channel is not None:
+                    os.set_blocking(channel.fileno(), False)
+
+            if stdin:
+                proc.stdin.write(stdin)
+                proc.stdin.flush()
+                if not qa_patterns:
+                    proc.stdin.close()
+
+            log_stdout = _log.isEnabledFor(logging.DEBUG)
+            exit_code = None
+            stdout, stderr = b'', b''
+            check_interval_secs = 0.1
+            time_no_match = 0
+            prev_stdout = ''
+
+            while exit_code is None:
+                # collect output line by line, while checking for questions to answer (if qa_patterns is provided)
+                for line in iter(proc.stdout.readline, b''):
+                    if log_stdout:
+                        _log.debug("Captured stdout: %s", line.decode(errors='ignore').rstrip())
+                    stdout += line
+
+                # note: we assume that there won't be any questions in stderr output
+                if split_stderr:
+                    for line in iter(proc.stderr.readline, b''):
+                        stderr += line
+
+                if qa_patterns:
+                    # only check for question patterns if additional output is available
+                    # compared to last time a question was answered;
+                    # use empty list of question patterns if no extra output (except for whitespace) is available
+                    # we do always need to check for wait patterns though!
+                    active_qa_patterns = qa_patterns if stdout.strip() != prev_stdout else []
+
+                    if _answer_question(stdout, proc, active_qa_patterns, qa_wait_patterns):
+                        time_no_match = 0
+                        prev_stdout = stdout.strip()
+                    else:
+                        # this will only run if the for loop above was *not* stopped by the break statement
+                        time_no_match += check_interval_secs
+                        if time_no_match > qa_timeout:
+                            error_msg = "No matching questions found for current command output, "
+                            error_msg += f"giving up after {qa_timeout} seconds!"
+                            raise EasyBuildError(error_msg)
+                        _log.debug(f"{time_no_match:0.1f} seconds without match in output of interactive shell command")
+
+                time.sleep(check_interval_secs)
+
+                exit_code = proc.poll()
+
+            # collect last bit of output once processed has exited
             for line in iter(proc.stdout.readline, b''):
-                _log.debug(f"Captured stdout: {line.decode(errors='ignore').rstrip()}")
+                if log_stdout:
+                    _log.debug("Captured stdout: %s", line.decode(errors='ignore').rstrip())
                 stdout += line
-
-            # note: we assume that there won't be any questions in stderr output
             if split_stderr:
-                for line in iter(proc.stderr.readline, b''):
-                    stderr += line
-
-            if qa_patterns:
-                # only check for question patterns if additional output is available
-                # compared to last time a question was answered;
-                # use empty list of question patterns if no extra output (except for whitespace) is available
-                # we do always need to check for wait patterns though!
-                active_qa_patterns = qa_patterns if stdout.strip() != prev_stdout else []
-
-                if _answer_question(stdout, proc, active_qa_patterns, qa_wait_patterns):
-                    time_no_match = 0
-                    prev_stdout = stdout.strip()
-                else:
-                    # this will only run if the for loop above was *not* stopped by the break statement
-                    time_no_match += check_interval_secs
-                    if time_no_match > qa_timeout:
-                        error_msg = "No matching questions found for current command output, "
-                        error_msg += f"giving up after {qa_timeout} seconds!"
-                        raise EasyBuildError(error_msg)
-                    _log.debug(f"{time_no_match:0.1f} seconds without match in output of interactive shell command")
-
-            time.sleep(check_interval_secs)
-
-            exit_code = proc.poll()
-
-        # collect last bit of output once processed has exited
-        for line in iter(proc.stdout.readline, b''):
-            _log.debug(f"Captured stdout: {line.decode(errors='ignore').rstrip()}")
-            stdout += line
-        if split_stderr:
-            stderr += proc.stderr.read() or b''
-    else:
-        (stdout, stderr) = proc.communicate(input=stdin)
-
-    # return output as a regular string rather than a byte sequence (and non-UTF-8 characters get stripped out)
-    # getpreferredencoding normally gives 'utf-8' but can be ASCII (ANSI_X3.4-1968)
-    # for Python 3.6 and older with LC_ALL=C
-    encoding = locale.getpreferredencoding(False)
-    output = stdout.decode(encoding, 'ignore')
-    stderr = stderr.decode(encoding, 'ignore') if split_stderr else None
-
-    # store command output to temporary file(s)
-    if output_file:
-        try:
-            with open(cmd_out_fp, 'w') as fp:
-                fp.write(output)
-            if split_stderr:
-                with open(cmd_err_fp, 'w') as fp:
-                    fp.write(stderr)
-        except IOError as err:
-            raise EasyBuildError(f"Failed to dump command output to temporary file: {err}")
+                stderr += proc.stderr.read() or b''
+        else:
+            (stdout, stderr) = proc.communicate(input=stdin)
 
-    res = RunShellCmdResult(cmd=cmd_str, exit_code=proc.returncode, output=output, stderr=stderr,
-                            work_dir=work_dir, out_file=cmd_out_fp, err_file=cmd_err_fp, cmd_sh=cmd_sh,
-                            thread_id=thread_id, task_id=task_id)
+        if build_profile:
+            build_profile.add_command(cmd_str, rusage_start, exit_code=proc.returncode, work_dir=work_dir,
+                                      asynchronous=asynchronous)
 
-    if with_hooks:
-        run_hook_kwargs = {
-            'exit_code': res.exit_code,
-            'interactive': interactive,
-            'output': res.output,
-            'stderr': res.stderr,
-            'work_dir': res.work_dir,
-            'shell_cmd_result': res,
-            'fail_on_error': fail_on_error,
-            'hidden': hidden,
-        }
-        run_hook(RUN_SHELL_CMD, hooks, post_step_hook=True, args=[cmd], kwargs=run_hook_kwargs)
+        # return output as a regular string rather than a byte sequence (and non-UTF-8 characters get stripped out)
+        # getpreferredencoding normally gives 'utf-8' but can be ASCII (ANSI_X3.4-1968)
+        # for Python 3.6 and older with LC_ALL=C
+        encoding = locale.getpreferredencoding(False)
+        output = stdout.decode(encoding, 'ignore')
+        stderr = stderr.decode(encoding, 'ignore') if split_stderr else None
 
-    # log command output (unless command was successful and log_output_on_success is disabled)
-    if split_stderr:
-        log_msg = f"Output of {short_cmd_msg} (stdout only):\n{res.output}\n\n"
-        log_msg += f"Warnings and errors of {short_cmd_msg} (stderr only):\n{res.stderr}"
-    else:
-        log_msg = f"Output of {short_cmd_msg} (stdout + stderr):\n{res.output}"
-
-    cmd_type_msg = cmd_type_msg[:1].upper() + cmd_type_msg[1:]  # capitalize first letter
-    if res.exit_code == EasyBuildExit.SUCCESS:
-        _log.info(f"{short_cmd_msg} completed successfully")
-        if log_output_on_success:
-            _log.info(log_msg)
-    else:
-        _log.warning(f"{short_cmd_msg} FAILED (exit code {res.exit_code})")
-        _log.info(log_msg)
-        if fail_on_error:
-            raise_run_shell_cmd_error(res)
+        # store command output to temporary file(s)
+        if output_file:
+            try:
+                with open(cmd_out_fp, 'w') as fp:
+                    fp.write(output)
+                if split_stderr:
+                    with open(cmd_err_fp, 'w') as fp:
+                        fp.write(stderr)
+            except IOError as err:
+                raise EasyBuildError(f"Failed to dump command output to temporary file: {err}")
+
+        res = RunShellCmdResult(cmd=cmd_str, exit_code=proc.returncode, output=output, stderr=stderr,
+                                work_dir=work_dir, out_file=cmd_out_fp, err_file=cmd_err_fp, cmd_sh=cmd_sh,
+                                thread_id=thread_id, task_id=task_id)
+
+        if with_hooks:
+            run_hook_kwargs = {
+                'exit_code': res.exit_code,
+                'interactive': interactive,
+                'output': res.output,
+                'stderr': res.stderr,
+                'work_dir': res.work_dir,
+                'shell_cmd_result': res,
+                'fail_on_error': fail_on_error,
+                'hidden': hidden,
+            }
+            run_hook(RUN_SHELL_CMD, hooks, post_step_hook=True, args=[cmd], kwargs=run_hook_kwargs)
+
+        # log command output (unless command was successful and log_output_on_success is disabled);
+        # command output can be large, so leave formatting of log message to logger (only done when it is logged)
+        if split_stderr:
+            log_msg = "Output of %s (stdout only):\n%s\n\nWarnings and errors of %s (stderr only):\n%s"
+            log_args = (short_cmd_msg, res.output, short_cmd_msg, res.stderr)
+        else:
+            log_msg = "Output of %s (stdout + stderr):\n%s"
+            log_args = (short_cmd_msg, res.output)
+
+        cmd_type_msg = cmd_type_msg[:1].upper() + cmd_type_msg[1:]  # capitalize first letter
+        if res.exit_code == EasyBuildExit.SUCCESS:
+            _log.info(f"{short_cmd_msg} completed successfully")
+            if log_output_on_success:
+                _log.info(log_msg, *log_args)
+        else:
+            _log.warning(f"{short_cmd_msg} FAILED (exit code {res.exit_code})")
+            _log.info(log_msg, *log_args)
+    except BaseException:
+        # make sure that section for this command is ended, also when running it failed unexpectedly
+        if structured_log_section:
+            structured_log.end_section(structured_log_section, failed=True, work_dir=work_dir)
+        raise
+
+    if structured_log_section:
+        structured_log.end_section(structured_log_section, exit_code=res.exit_code, work_dir=work_dir)
+
+    if res.exit_code != EasyBuildExit.SUCCESS and fail_on_error:
+        raise_run_shell_cmd_error(res)
 
     # check that we still are in a sane environment after command execution
     # safeguard against commands that deleted the work dir or missbehaving filesystems
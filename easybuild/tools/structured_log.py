@@ -0,0 +1,416 @@
+# Copyright 2014-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Support for structured build logs: a compressed copy of the log of an installation,
+that consists of a sequence of independently compressed segments (one or more per step, extension and shell command),
+together with an index that specifies for each segment where it is located in the compressed log file,
+which step or shell command it corresponds to, and (for shell commands) the exit code and duration.
+
+This allows tools to directly retrieve the output of (for example) the shell command that failed,
+without having to read (and decompress) the whole log file.
+
+Each segment is a complete compressed stream, so the compressed log file as a whole can also be decompressed
+with standard tools (xz, zstd).
+"""
+import json
+import logging
+import lzma
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+
+try:
+    import zstandard
+    HAVE_ZSTANDARD = True
+except ImportError:
+    HAVE_ZSTANDARD = False
+
+
+_log = fancylogger.getLogger('structured_log', fname=False)
+
+STRUCTURED_LOG_XZ = 'xz'
+STRUCTURED_LOG_ZSTD = 'zstd'
+STRUCTURED_LOG_FORMATS = [STRUCTURED_LOG_XZ, STRUCTURED_LOG_ZSTD]
+STRUCTURED_LOG_EXTS = {
+    STRUCTURED_LOG_XZ: '.xz',
+    STRUCTURED_LOG_ZSTD: '.zst',
+}
+STRUCTURED_LOG_INDEX_SUFFIX = '.index'
+
+LOG_SECTION_COMMAND = 'command'
+LOG_SECTION_EXTENSION = 'extension'
+LOG_SECTION_LOG = 'log'
+LOG_SECTION_STEP = 'step'
+
+# structured log that is currently being written (if any)
+_active_structured_log = None
+
+
+def _compressor(log_format):
+    """Return compressor object for specified structured log format."""
+    if log_format == STRUCTURED_LOG_XZ:
+        # use a low preset, compressing log output should not slow down the installation
+        return lzma.LZMACompressor(format=lzma.FORMAT_XZ, preset=1)
+    if log_format == STRUCTURED_LOG_ZSTD:
+        if not HAVE_ZSTANDARD:
+            raise EasyBuildError("Python 'zstandard' package is required for structured logs in zstd format")
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    raise EasyBuildError("Unknown structured log format: %s (known formats: %s)",
+                         log_format, ', '.join(STRUCTURED_LOG_FORMATS))
+
+
+def _decompress(log_format, data):
+    """Decompress a segment of a structured log in specified format."""
+    if log_format == STRUCTURED_LOG_XZ:
+        return lzma.decompress(data, format=lzma.FORMAT_XZ)
+    if log_format == STRUCTURED_LOG_ZSTD:
+        if not HAVE_ZSTANDARD:
+            raise EasyBuildError("Python 'zstandard' package is required to read structured logs in zstd format")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    raise EasyBuildError("Unknown structured log format: %s", log_format)
+
+
+class StructuredLogSection:
+    """Section of a structured log (a step, a shell command, ...)."""
+
+    def __init__(self, kind, name):
+        """
+        Constructor for StructuredLogSection instance
+
+        :param kind: kind of section (see LOG_SECTION_* constants)
+        :param name: name of section (step name, shell command, ...)
+        """
+        self.kind = kind
+        self.name = name
+        self.start_time = time.time()
+        self.parts = 0
+
+
+class StructuredLog(logging.Handler):
+    """
+    Log handler that writes a structured log: log records are written to compressed segments,
+    and an entry is added to the index for every segment that is written.
+
+    A new segment is started whenever a section (step, shell command) is started or ended;
+    sections can be nested (a shell command that is run in a step), in which case the segment that follows
+    the end of the inner section is a new part of the outer section.
+    """
+
+    def __init__(self, logfile, log_format=STRUCTURED_LOG_XZ):
+        """
+        Constructor for StructuredLog instance
+
+        :param logfile: path to (regular) log file, used as prefix for paths to structured log + index
+        :param log_format: format of structured log (see STRUCTURED_LOG_FORMATS)
+        """
+        # check whether specified format is supported before creating any files
+        _compressor(log_format)
+        logging.Handler.__init__(self)
+
+        self.log_format = log_format
+        self.path = structured_log_path(logfile, log_format)
+        self.index_path = structured_log_index_path(logfile)
+
+        self.fh = open(self.path, 'ab')
+        self.index_fh = open(self.index_path, 'a')
+        # path to structured log is not included in the index, since log files may be moved (see move_logs)
+        self._write_index_entry(OrderedDict([('format', log_format)]))
+
+        self.sections = [StructuredLogSection(LOG_SECTION_LOG, os.path.basename(logfile))]
+        self._start_segment()
+
+    def _write_index_entry(self, entry):
+        """Add entry to index (one JSON document per line)."""
+        self.index_fh.write(json.dumps(entry) + '\n')
+        self.index_fh.flush()
+
+    def _start_segment(self):
+        """Start new segment for current section."""
+        self.compressor = _compressor(self.log_format)
+        self.segment_offset = self.fh.tell()
+        self.segment_size = 0
+        self.segment_start_time = time.time()
+
+    def _end_segment(self, section_end=False, **extra):
+        """
+        End current segment, and add an entry for it to the index.
+
+        :param section_end: whether this segment is the last part of the current section
+        :param extra: additional fields to include in index entry (only when section ends)
+        """
+        section = self.sections[-1]
+
+        # segments without any log records are only retained if they mark the end of a section
+        if self.segment_size or section_end:
+            if self.segment_size:
+                self.fh.write(self.compressor.flush())
+                self.fh.flush()
+
+            entry = OrderedDict([
+                ('kind', section.kind),
+                ('name', section.name),
+                ('part', section.parts),
+                ('depth', len(self.sections) - 1),
+                ('offset', self.segment_offset),
+                ('length', self.fh.tell() - self.segment_offset),
+                ('size', self.segment_size),
+                ('start_time', round(self.segment_start_time, 3)),
+            ])
+            if section_end:
+                entry['end'] = True
+                entry['duration'] = round(time.time() - section.start_time, 3)
+                entry.update(extra)
+            self._write_index_entry(entry)
+            section.parts += 1
+
+        # no more log records should be written to this segment
+        self.compressor = None
+        self.segment_offset = self.fh.tell()
+        self.segment_size = 0
+        self.segment_start_time = time.time()
+
+    def emit(self, record):
+        """Write formatted log record to current segment."""
+        try:
+            data = (self.format(record) + '\n').encode('utf-8', 'replace')
+            self.segment_size += len(data)
+            self.fh.write(self.compressor.compress(data))
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+    def start_section(self, kind, name):
+        """
+        Start new (nested) section of specified kind with specified name.
+
+        :return: StructuredLogSection instance, to be passed to end_section
+        """
+        section = StructuredLogSection(kind, name)
+        self.acquire()
+        try:
+            self._end_segment()
+            self.sections.append(section)
+            self._start_segment()
+        finally:
+            self.release()
+        return section
+
+    def end_section(self, section, **extra):
+        """
+        End specified section (and any sections nested in it that were not ended).
+
+        :param section: section to end (as returned by start_section)
+        :param extra: additional fields to include in index entry (exit_code, failed, ...)
+        """
+        self.acquire()
+        try:
+            if section in self.sections[1:]:
+                while self.sections[-1] is not section:
+                    self._end_segment(section_end=True)
+                    self.sections.pop()
+                self._end_segment(section_end=True, **extra)
+                self.sections.pop()
+                self._start_segment()
+            else:
+                _log.debug("Ignoring end of section '%s', not an active section", section.name)
+        finally:
+            self.release()
+
+    def close(self):
+        """End all sections, and close structured log and its index."""
+        self.acquire()
+        try:
+            if not self.fh.closed:
+                while len(self.sections) > 1:
+                    self._end_segment(section_end=True)
+                    self.sections.pop()
+                self._end_segment(section_end=True)
+                self.fh.close()
+                self.index_fh.close()
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
+
+def structured_log_path(logfile, log_format):
+    """Return path to structured log in specified format for specified log file."""
+    return logfile + STRUCTURED_LOG_EXTS[log_format]
+
+
+def structured_log_index_path(logfile):
+    """Return path to index of structured log for specified log file."""
+    return logfile + STRUCTURED_LOG_INDEX_SUFFIX
+
+
+def is_structured_log_file(path):
+    """Check whether specified path is a structured log file or index (based on file name)."""
+    suffixes = list(STRUCTURED_LOG_EXTS.values()) + [STRUCTURED_LOG_INDEX_SUFFIX]
+    return any(path.endswith(suffix) for suffix in suffixes)
+
+
+def start_structured_log(logfile, log_format=STRUCTURED_LOG_XZ):
+    """Start writing structured log for specified log file, and return it."""
+    global _active_structured_log
+    if _active_structured_log is not None:
+        stop_structured_log()
+
+    structured_log = StructuredLog(logfile, log_format=log_format)
+    log_fmt = fancylogger.FANCYLOG_LOGGING_FORMAT or fancylogger.DEFAULT_LOGGING_FORMAT
+    structured_log.setFormatter(logging.Formatter(log_fmt))
+    fancylogger.getLogger(fname=False, clsname=False).addHandler(structured_log)
+
+    _log.info("Writing structured log to %s (index: %s)", structured_log.path, structured_log.index_path)
+    _active_structured_log = structured_log
+    return structured_log
+
+
+def get_structured_log():
+    """Return structured log that is currently being written (None if no structured log is being written)."""
+    return _active_structured_log
+
+
+def stop_structured_log():
+    """Stop writing structured log, and return it."""
+    global _active_structured_log
+    structured_log, _active_structured_log = _active_structured_log, None
+    if structured_log is not None:
+        fancylogger.getLogger(fname=False, clsname=False).removeHandler(structured_log)
+        structured_log.close()
+    return structured_log
+
+
+@contextmanager
+def log_section(kind, name):
+    """
+    Context manager to put log records in a section of the structured log that is being written (if any).
+    If an exception occurs, the section is marked as failed.
+    """
+    structured_log = _active_structured_log
+    if structured_log is None:
+        yield
+    else:
+        section = structured_log.start_section(kind, name)
+        try:
+            yield
+        except BaseException:
+            structured_log.end_section(section, failed=True)
+            raise
+        else:
+            structured_log.end_section(section, failed=False)
+
+
+def read_structured_log_index(logfile):
+    """
+    Read index of structured log for specified log file.
+
+    :return: tuple with format of structured log, path to structured log and list of index entries
+             (or None if there is no structured log for the specified log file)
+    """
+    index_path = structured_log_index_path(logfile)
+    if not os.path.exists(index_path):
+        return None
+
+    log_format, entries = None, []
+    try:
+        with open(index_path) as fh:
+            for line in fh:
+                entry = json.loads(line)
+                if 'format' in entry:
+                    log_format = entry['format']
+                else:
+                    entries.append(entry)
+    except (IOError, OSError, ValueError) as err:
+        raise EasyBuildError("Failed to read index of structured log %s: %s", index_path, err)
+
+    if log_format is None:
+        raise EasyBuildError("No format specified in index of structured log %s", index_path)
+    if log_format not in STRUCTURED_LOG_EXTS:
+        raise EasyBuildError("Unknown format specified in index of structured log %s: %s", index_path, log_format)
+
+    return (log_format, structured_log_path(logfile, log_format), entries)
+
+
+def read_structured_log_segment(log_format, path, entry):
+    """Read (and decompress) the segment of the structured log that corresponds to specified index entry."""
+    if not entry['length']:
+        return ''
+    try:
+        with open(path, 'rb') as fh:
+            fh.seek(entry['offset'])
+            data = fh.read(entry['length'])
+    except (IOError, OSError) as err:
+        raise EasyBuildError("Failed to read segment from structured log %s: %s", path, err)
+
+    return _decompress(log_format, data).decode('utf-8', 'replace')
+
+
+def get_log_section_text(logfile, kind, name=None, failed_only=False, last=True):
+    """
+    Get text of (last or first) section of specified kind in structured log for specified log file
+    (without the text of sections nested in it).
+
+    :param logfile: path to (regular) log file
+    :param kind: kind of section (see LOG_SECTION_* constants)
+    :param name: name of section (None implies any name)
+    :param failed_only: only consider sections that failed (non-zero exit code, or marked as failed)
+    :param last: return last matching section (rather than first)
+    :return: text of section, or None if no structured log or no matching section was found
+    """
+    index = read_structured_log_index(logfile)
+    if index is None:
+        return None
+    log_format, path, entries = index
+
+    def is_match(entry):
+        """Check whether specified index entry matches requested kind and name."""
+        return entry['kind'] == kind and (name is None or entry['name'] == name)
+
+    # determine parts of matching sections, using the index entry for the last part of each section
+    sections, parts = [], {}
+    for entry in entries:
+        if is_match(entry):
+            key = (entry['depth'], entry['name'])
+            parts.setdefault(key, []).append(entry)
+            if entry.get('end'):
+                section_parts = parts.pop(key)
+                if not failed_only or entry.get('exit_code') or entry.get('failed'):
+                    sections.append(section_parts)
+
+    if not sections:
+        return None
+
+    section_parts = sections[-1] if last else sections[0]
+    return ''.join(read_structured_log_segment(log_format, path, entry) for entry in section_parts)
+
+
+def get_failed_command_output(logfile):
+    """
+    Get log text for last shell command that failed, from structured log for specified log file.
+
+    :return: log text for failed shell command (None if no structured log or no failed command was found)
+    """
+    return get_log_section_text(logfile, LOG_SECTION_COMMAND, failed_only=True)
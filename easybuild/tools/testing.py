@@ -39,6 +39,7 @@ import copy
 import os
 import re
 import sys
+from collections import deque
 from datetime import datetime
 from time import gmtime, strftime
 
@@ -48,17 +49,22 @@ from easybuild.framework.easyconfig.tools import process_easyconfig
 from easybuild.framework.easyconfig.tools import skip_available
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import find_easyconfigs, get_cwd, mkdir, read_file, write_file
+from easybuild.tools.error_excerpts import extract_error_excerpts, format_error_excerpts
+from easybuild.tools.filetools import find_easyconfigs, get_cwd, mkdir, write_file
 from easybuild.tools.github import GITHUB_EASYBLOCKS_REPO, GITHUB_EASYCONFIGS_REPO, create_gist, post_comment_in_issue
 from easybuild.tools.jenkins import aggregate_xml_in_dirs
 from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel
 from easybuild.tools.robot import resolve_dependencies
+from easybuild.tools.structured_log import get_failed_command_output
 from easybuild.tools.systemtools import UNKNOWN, get_gpu_info, get_system_info
 from easybuild.tools.version import FRAMEWORK_VERSION, EASYBLOCKS_VERSION
 
 
 _log = fancylogger.getLogger('testing', fname=False)
 
+# number of lines at the end of the log of a failed installation to include in gist
+GIST_LOG_TAIL_LINES = 500
+
 DEFAULT_EXCLUDE_FROM_TEST_REPORT_ENV_VAR_NAMES = [
     'KEY',
     'SECRET',
@@ -183,6 +189,36 @@ def session_state():
     }
 
 
+def det_partial_log(log_file, tail_lines=GIST_LOG_TAIL_LINES):
+    """
+    Determine partial log for specified log file: highest ranked error excerpts, followed by last part of log.
+    The log file is read line by line, so memory usage does not depend on the size of the log file.
+
+    :param log_file: path to log file
+    :param tail_lines: number of lines at the end of the log file to include
+    """
+    tail = deque(maxlen=tail_lines)
+
+    def read_lines(fh):
+        """Yield lines from specified file, while retaining last part in tail."""
+        for line in fh:
+            tail.append(line)
+            yield line
+
+    try:
+        with open(log_file, errors='replace') as fh:
+            excerpts = extract_error_excerpts(read_lines(fh))
+    except (IOError, OSError) as err:
+        raise EasyBuildError("Failed to read log file %s: %s", log_file, err)
+
+    partial_log = []
+    if excerpts:
+        partial_log.extend(["Error excerpts:", '', format_error_excerpts(excerpts), '', "Last part of log:", ''])
+    partial_log.append(''.join(tail).rstrip('\n'))
+
+    return '\n'.join(partial_log)
+
+
 def create_test_report(msg, ecs_with_res, init_session_state, pr_nrs=None, gist_log=False, easyblock_pr_nrs=None,
                        ec_parse_error=None):
     """
@@ -255,8 +291,18 @@ def create_test_report(msg, ecs_with_res, init_session_state, pr_nrs=None, gist_
 
                 # create gist for log file (if desired and available)
                 if gist_log and 'log_file' in ec_res:
-                    logtxt = read_file(ec_res['log_file'])
-                    partial_log_txt = '\n'.join(logtxt.split('\n')[-500:])
+                    partial_log_txt = det_partial_log(ec_res['log_file'])
+                    # also include output of failed shell command if it's available in structured log
+                    try:
+                        cmd_txt = get_failed_command_output(ec_res['log_file'])
+                    except EasyBuildError as err:
+                        _log.warning("Failed to determine output of failed shell command from structured log: %s",
+                                     err)
+                        cmd_txt = None
+                    if cmd_txt is not None:
+                        cmd_txt = '\n'.join(cmd_txt.rstrip('\n').split('\n')[-GIST_LOG_TAIL_LINES:])
+                        cmd_section = ["Output of failed shell command:", '', cmd_txt, '']
+                        partial_log_txt = '\n'.join(cmd_section + [partial_log_txt])
                     descr = "(partial) EasyBuild log for failed build of %s" % ec['spec']
 
                     if pr_nrs:
@@ -0,0 +1,197 @@
+# Copyright 2014-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Persistent table of toolchain hierarchies, to avoid having to determine them again in every EasyBuild session.
+
+Entries are keyed by name & version of the parent toolchain and whether toolchain capabilities are included,
+and are only used if the context in which they were determined (EasyBuild version, robot search path,
+available toolchains, hooks, ...) is unchanged, and if the lookups for the easyconfig files that were involved
+still yield the same result (and the easyconfig files were not changed since).
+"""
+import copy
+import json
+import os
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import build_option
+from easybuild.tools.filetools import det_cache_path, write_json_file
+from easybuild.tools.version import VERSION
+
+
+TOOLCHAIN_HIERARCHY_FILENAME = 'toolchain_hierarchy.json'
+
+# build options that affect how toolchain hierarchies are determined
+TOOLCHAIN_HIERARCHY_BUILD_OPTIONS = [
+    'add_system_to_minimal_toolchains',
+    'consider_archived_easyconfigs',
+    'filter_deps',
+    'robot_path',
+]
+
+_log = fancylogger.getLogger('tools.toolchain.hierarchy', fname=False)
+
+
+def ec_file_stamp(path):
+    """
+    Return stamp for specified easyconfig (or hooks) file, based on size and modification time
+    (None if it doesn't exist).
+    """
+    try:
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        return None
+
+
+def mk_toolchain_hierarchy_context(toolchains):
+    """
+    Create dict specifying the context in which a toolchain hierarchy is determined,
+    which must be unchanged for an entry in the toolchain hierarchy table to be valid.
+
+    :param toolchains: list of strings specifying available toolchains (name, subtoolchains, ...)
+    """
+    context = {
+        'easybuild_version': str(VERSION),
+        'toolchains': toolchains,
+    }
+    for key in TOOLCHAIN_HIERARCHY_BUILD_OPTIONS:
+        context[key] = build_option(key, default=None)
+
+    # hooks (in particular a parse hook) may affect the dependencies of the easyconfig files that are involved,
+    # so hooks file must be unchanged too
+    hooks = build_option('hooks', default=None)
+    context['hooks'] = [hooks, ec_file_stamp(hooks)] if hooks else None
+
+    # make sure context is consistent with what is read back from JSON file
+    return json.loads(json.dumps(context, default=str))
+
+
+class ToolchainHierarchyTable:
+    """Persistent table of toolchain hierarchies, stored as a JSON file."""
+
+    def __init__(self, path):
+        """
+        Create toolchain hierarchy table, using specified file.
+
+        :param path: location of JSON file in which toolchain hierarchies are stored
+        """
+        self.path = path
+        self.entries = self._read()
+
+    def _read(self):
+        """Read entries from file, if it exists (an empty table is used if the file is corrupt)."""
+        entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as fp:
+                    entries = json.load(fp)
+            except (OSError, ValueError) as err:
+                _log.warning("Failed to read toolchain hierarchy table %s, ignoring it: %s", self.path, err)
+        return entries
+
+    @staticmethod
+    def mk_key(toolchain, incl_capabilities):
+        """Create key for specified toolchain."""
+        return '%s/%s/%s' % (toolchain['name'], toolchain['version'], bool(incl_capabilities))
+
+    def get(self, toolchain, incl_capabilities, context, find_ec):
+        """
+        Return toolchain hierarchy for specified toolchain if a valid entry is available, None otherwise.
+
+        :param toolchain: dict with name/version of parent toolchain
+        :param incl_capabilities: whether toolchain capabilities are included in toolchain hierarchy
+        :param context: dict specifying context in which toolchain hierarchy is determined
+        :param find_ec: function to locate easyconfig file for specified name and version
+        """
+        entry = self.entries.get(self.mk_key(toolchain, incl_capabilities))
+        if entry is None:
+            return None
+
+        if entry['context'] != context:
+            _log.debug("Context for toolchain %s changed, not using toolchain hierarchy table entry", toolchain)
+            return None
+
+        for name, version, path, stamp in entry['lookups']:
+            if find_ec(name, version) != path or (path and ec_file_stamp(path) != stamp):
+                _log.debug("Easyconfig for %s v%s changed, not using toolchain hierarchy table entry for %s",
+                           name, version, toolchain)
+                return None
+
+        _log.debug("Found valid entry for toolchain %s in toolchain hierarchy table %s", toolchain, self.path)
+        return copy.deepcopy(entry['hierarchy'])
+
+    def add(self, toolchain, incl_capabilities, context, lookups, hierarchy):
+        """
+        Add toolchain hierarchy for specified toolchain, and save table.
+
+        :param toolchain: dict with name/version of parent toolchain
+        :param incl_capabilities: whether toolchain capabilities are included in toolchain hierarchy
+        :param context: dict specifying context in which toolchain hierarchy was determined
+        :param lookups: dict with (name, version) tuples as keys and paths to easyconfig files (or None) as values
+        :param hierarchy: toolchain hierarchy
+        """
+        lookups = [[name, version, path, ec_file_stamp(path) if path else None]
+                   for ((name, version), path) in sorted(lookups.items())]
+        entry = {
+            'context': context,
+            'lookups': lookups,
+            'hierarchy': copy.deepcopy(hierarchy),
+        }
+
+        # pick up entries that were added by other EasyBuild sessions in the meantime
+        self.entries.update(self._read())
+        self.entries[self.mk_key(toolchain, incl_capabilities)] = entry
+        self.save()
+
+    def save(self):
+        """Save toolchain hierarchy table (atomically, so concurrent EasyBuild sessions don't see a partial file)."""
+        try:
+            write_json_file(self.path, self.entries, indent=1, sort_keys=True)
+        except EasyBuildError as err:
+            _log.warning("Failed to save toolchain hierarchy table %s: %s", self.path, err)
+
+
+def det_toolchain_hierarchy_path():
+    """
+    Determine location of toolchain hierarchy table:
+    value for --toolchain-hierarchy-path if specified (an empty value disables the toolchain hierarchy table),
+    or in the EasyBuild cache directory (see det_cache_path).
+    """
+    return det_cache_path('toolchain_hierarchy_path', TOOLCHAIN_HIERARCHY_FILENAME)
+
+
+_TABLES = {}
+
+
+def get_toolchain_hierarchy_table():
+    """
+    Return ToolchainHierarchyTable instance for toolchain hierarchy table (or None if it's disabled).
+    """
+    path = det_toolchain_hierarchy_path()
+    if path:
+        if path not in _TABLES:
+            _TABLES[path] = ToolchainHierarchyTable(path)
+        return _TABLES[path]
+    return None
@@ -52,6 +52,7 @@ Authors:
 * Stijn De Weirdt (Ghent University)
 * Kenneth Hoste (Ghent University)
 """
+import bisect
 import copy
 import os
 import stat
@@ -61,7 +62,7 @@ import tempfile
 from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, dry_run_msg, print_warning
 from easybuild.tools.config import build_option, install_path
-from easybuild.tools.environment import setvar
+from easybuild.tools.environment import setvar, unset_env_vars
 from easybuild.tools.filetools import adjust_permissions, copy_file, find_eb_script, mkdir, read_file, which, write_file
 from easybuild.tools.module_generator import dependencies_for
 from easybuild.tools.modules import get_software_root, get_software_root_env_var_name
@@ -113,6 +114,40 @@ DEFAULT_SEARCH_PATH_CPP_HEADERS = "flags"
 DEFAULT_SEARCH_PATH_LINKER = "flags"
 
 
+class SearchPathIndex:
+    """
+    Index of the entries in a set of $*PATH environment variables,
+    to efficiently determine which entries are located in a particular directory.
+    """
+
+    def __init__(self, env_vars):
+        """
+        Create index of the entries in specified environment variables (in order).
+        :param env_vars: list of names of environment variables
+        """
+        self.env = tuple((key, os.getenv(key)) for key in env_vars)
+
+        entries = []
+        for key, val in self.env:
+            if val:
+                entries.extend(val.split(':'))
+            else:
+                _log.debug("$%s not defined, not used to find subdirectories of dependencies", key)
+
+        # all entries that start with a particular prefix form a contiguous range in the sorted list of entries,
+        # which can be found via bisection; position of entries is retained to return them in the original order
+        self.index = sorted((path, pos) for (pos, path) in enumerate(entries))
+        self.paths = [path for (path, _) in self.index]
+
+    def paths_under(self, prefix):
+        """
+        Return list of entries that start with specified prefix, in the order in which they appear.
+        """
+        start = bisect.bisect_left(self.paths, prefix)
+        end = bisect.bisect_left(self.paths, prefix + chr(sys.maxunicode), lo=start)
+        return [path for (path, _) in sorted(self.index[start:end], key=lambda x: x[1])]
+
+
 def is_system_toolchain(tc_name):
     """Return whether toolchain with specified name is a system toolchain or not."""
     return tc_name in [SYSTEM_TOOLCHAIN_NAME]
@@ -202,6 +237,14 @@ class Toolchain:
         self.toolchain_dep_mods = []
         self.cached_compilers = set()
 
+        # index for entries in $*PATH environment variables, and subdirectories of dependencies to retain
+        # for preprocessor paths (per dependency root, extra subdirectories and value of $*PATH environment variables)
+        self.search_path_index = None
+        self.dependency_header_dirs = {}
+
+        # snapshot of build environment defined by last full preparation of toolchain, see prepare()
+        self.prepared_snapshot = None
+
         if name is None:
             name = self.NAME
         if name is None:
@@ -875,6 +918,7 @@ class Toolchain:
     def reset(self):
         """Reset this toolchain instance."""
         self.variables_init()
+        self.prepared_snapshot = None
 
     def prepare(self, onlymod=None, deps=None, silent=False, loadmod=True,
                 rpath_filter_dirs=None, rpath_include_dirs=None, rpath_wrappers_dir=None):
@@ -900,11 +944,21 @@ class Toolchain:
         # do all dependencies have a toolchain version?
         if deps is None:
             deps = []
-        self.dependencies = self._check_dependencies(deps, check_modules=loadmod)
-        if not len(deps) == len(self.dependencies):
-            self.log.debug("dep %s (%s)" % (len(deps), deps))
-            self.log.debug("tc.dep %s (%s)" % (len(self.dependencies), self.dependencies))
-            raise EasyBuildError('Not all dependencies have a matching toolchain version')
+
+        # snapshot of earlier preparation of toolchain with same options and dependencies can be used
+        # (as long as the environment has not changed, see _reapply_prepared_snapshot)
+        snapshot_key = self._prepared_snapshot_key(onlymod, deps)
+        snapshot = self.prepared_snapshot
+        if snapshot and snapshot['key'] == snapshot_key and (snapshot['check_modules'] or not loadmod):
+            self.log.debug("Dependencies were already checked in earlier preparation of toolchain")
+            self.dependencies = copy.deepcopy(snapshot['dependencies'])
+        else:
+            snapshot = None
+            self.dependencies = self._check_dependencies(deps, check_modules=loadmod)
+            if not len(deps) == len(self.dependencies):
+                self.log.debug("dep %s (%s)" % (len(deps), deps))
+                self.log.debug("tc.dep %s (%s)" % (len(self.dependencies), self.dependencies))
+                raise EasyBuildError('Not all dependencies have a matching toolchain version')
 
         if loadmod:
             self._load_modules(silent=silent)
@@ -918,25 +972,34 @@ class Toolchain:
         else:
             trace_msg("defining build environment for %s/%s toolchain" % (self.name, self.version))
 
-            if not self.dry_run:
-                self._verify_toolchain()
+            if snapshot and self._reapply_prepared_snapshot(snapshot):
+                self.log.info("Build environment defined by reapplying snapshot of earlier preparation of toolchain")
+            else:
+                orig_environ = dict(os.environ)
 
-            # Generate the variables to be set
-            self._validate_search_path()
-            self.set_variables()
+                if not self.dry_run:
+                    self._verify_toolchain()
 
-            # set the variables
-            # onlymod can be comma-separated string of variables not to be set
-            if onlymod is True:
-                self.log.debug("prepare: do not set additional variables onlymod=%s", onlymod)
-                self.generate_vars()
-            else:
-                self.log.debug("prepare: set additional variables onlymod=%s", onlymod)
+                # Generate the variables to be set
+                self._validate_search_path()
+                self.set_variables()
 
-                # add linker and preprocessor paths of dependencies to self.vars
-                self._add_dependency_variables()
-                self.generate_vars()
-                self._setenv_variables(onlymod, verbose=not silent)
+                # set the variables
+                # onlymod can be comma-separated string of variables not to be set
+                if onlymod is True:
+                    self.log.debug("prepare: do not set additional variables onlymod=%s", onlymod)
+                    self.generate_vars()
+                else:
+                    self.log.debug("prepare: set additional variables onlymod=%s", onlymod)
+
+                    # add linker and preprocessor paths of dependencies to self.vars
+                    self._add_dependency_variables()
+                    self.generate_vars()
+                    self._setenv_variables(onlymod, verbose=not silent)
+
+                # no snapshot in dry run mode, since dry run output for defining build environment is always required
+                if not self.dry_run:
+                    self._create_prepared_snapshot(snapshot_key, loadmod, orig_environ)
 
         # consider f90cache first, since ccache can also wrap Fortran compilers
         for cache_tool in [F90CACHE, CCACHE]:
@@ -954,6 +1017,78 @@ class Toolchain:
             else:
                 self.log.info("Not putting RPATH wrappers in place, disabled via 'rpath' toolchain option")
 
+    def _prepared_snapshot_key(self, onlymod, deps):
+        """
+        Determine key for snapshot of prepared toolchain, based on onlymod, dependencies and toolchain options.
+        """
+        options = sorted(self.options.items(), key=lambda x: x[0])
+        return repr((onlymod, deps, options))
+
+    def _create_prepared_snapshot(self, key, check_modules, orig_environ):
+        """
+        Create snapshot of build environment defined by preparation of toolchain:
+        toolchain variables, and changes made to the environment.
+
+        :param key: key for snapshot, see _prepared_snapshot_key
+        :param check_modules: whether or not existence of modules for dependencies was checked
+        :param orig_environ: environment before build environment was defined
+        """
+        environ_delta = {}
+        for name, val in os.environ.items():
+            if orig_environ.get(name) != val:
+                environ_delta[name] = val
+        # environment variables that were undefined are marked with None
+        for name in orig_environ:
+            if name not in os.environ:
+                environ_delta[name] = None
+
+        self.prepared_snapshot = {
+            'key': key,
+            'check_modules': check_modules,
+            'dependencies': copy.deepcopy(self.dependencies),
+            'environ': orig_environ,
+            'environ_delta': environ_delta,
+            'search_path': copy.deepcopy(self.search_path),
+            'toolchain_dep_mods': copy.deepcopy(self.toolchain_dep_mods),
+            'variables': copy.deepcopy(self.variables),
+            'vars': copy.deepcopy(self.vars),
+        }
+        self.log.debug("Created snapshot of prepared toolchain, changes to environment: %s", environ_delta)
+
+    def _reapply_prepared_snapshot(self, snapshot):
+        """
+        Reapply snapshot of build environment defined by earlier preparation of toolchain,
+        if the environment has not changed since then (other than by the earlier preparation itself).
+
+        :param snapshot: snapshot of prepared toolchain, see _create_prepared_snapshot
+        :return: boolean indicating whether snapshot was reapplied
+        """
+        environ, environ_delta = snapshot['environ'], snapshot['environ_delta']
+
+        drifted = []
+        for key in nub(list(environ) + list(os.environ)):
+            val = os.environ.get(key)
+            if val != environ.get(key) and (key not in environ_delta or val != environ_delta[key]):
+                drifted.append(key)
+
+        if drifted:
+            self.log.info("Not reapplying snapshot of prepared toolchain, environment was changed: $%s",
+                          ', $'.join(sorted(drifted)))
+            return False
+
+        self.search_path = copy.deepcopy(snapshot['search_path'])
+        self.toolchain_dep_mods = copy.deepcopy(snapshot['toolchain_dep_mods'])
+        self.variables = copy.deepcopy(snapshot['variables'])
+        self.vars = copy.deepcopy(snapshot['vars'])
+
+        for key, val in sorted(environ_delta.items()):
+            if val is None:
+                unset_env_vars([key], verbose=False)
+            elif os.environ.get(key) != val:
+                setvar(key, val, verbose=False)
+
+        return True
+
     def comp_cache_compilers(self, cache_tool):
         """
         Determine list of relevant compilers for specified compiler caching tool.
@@ -1195,6 +1330,38 @@ class Toolchain:
             self._add_dependency_cpp_headers(dep_root, extra_dirs=cpp)
             self._add_dependency_linker_paths(dep_root, extra_dirs=ld)
 
+    def _get_search_path_index(self):
+        """
+        Return index for entries in $*PATH environment variables that are relevant for preprocessor paths;
+        index is only created again if one of these environment variables was changed.
+        """
+        env_vars = [y for x in SEARCH_PATH['cpp_headers'].values() for y in x if y.endswith('PATH')]
+        env = tuple((key, os.getenv(key)) for key in env_vars)
+        if self.search_path_index is None or self.search_path_index.env != env:
+            self.log.debug("Creating index for entries in $%s", ', $'.join(env_vars))
+            self.search_path_index = SearchPathIndex(env_vars)
+
+        return self.search_path_index
+
+    def _get_dependency_header_dirs(self, dep_root, extra_dirs):
+        """
+        Determine subdirectories of given dependency root directory to use as preprocessor paths:
+        subdirectories included in $*PATH environment variables, and extra subdirectories
+        """
+        index = self._get_search_path_index()
+
+        key = (dep_root, tuple(extra_dirs), index.env)
+        if key not in self.dependency_header_dirs:
+            # take into account all $*PATH environment variables for dependencies
+            matching_paths = index.paths_under(dep_root)
+            header_dirs = [os.path.relpath(p, dep_root) for p in matching_paths]
+            self.log.debug(f"Subdirectories of {dep_root} included in $*PATH environment variables: {header_dirs}")
+
+            # take into account extra_dirs + only retain unique entries
+            self.dependency_header_dirs[key] = unique_ordered_extend(header_dirs, extra_dirs)
+
+        return self.dependency_header_dirs[key]
+
     def _add_dependency_cpp_headers(self, dep_root, extra_dirs=None):
         """
         Append prepocessor paths for given dependency root directory
@@ -1202,24 +1369,9 @@ class Toolchain:
         if extra_dirs is None:
             extra_dirs = ()
 
-        for env_var in SEARCH_PATH['cpp_headers'][self.search_path['cpp_headers']]:
-            header_dirs = []
-            # take into account all $*PATH environment variables for dependencies
-            for key in [y for x in SEARCH_PATH['cpp_headers'].values() for y in x if y.endswith('PATH')]:
-                val = os.getenv(key)
-                if val:
-                    self.log.debug(f"${key} when determining subdirs of {dep_root} to retain for ${env_var}: {val}")
-                    paths = val.split(':')
-                    matching_paths = [p for p in paths if p.startswith(dep_root)]
-                    subdirs = [os.path.relpath(p, dep_root) for p in matching_paths]
-                    self.log.debug(f"Subdirectories of {dep_root} to add to ${env_var}: {subdirs}")
-                    header_dirs.extend(os.path.relpath(p, dep_root) for p in matching_paths)
-                else:
-                    self.log.debug(f"${key} not defined, not used to find subdirs of {dep_root} to use for ${env_var}")
-
-            # take into account extra_dirs + only retain unique entries
-            header_dirs = unique_ordered_extend(header_dirs, extra_dirs)
+        header_dirs = self._get_dependency_header_dirs(dep_root, extra_dirs)
 
+        for env_var in SEARCH_PATH['cpp_headers'][self.search_path['cpp_headers']]:
             self.log.info(f"Adding header paths to toolchain variable '{env_var}': {dep_root} (subdirs: {header_dirs})")
             self.variables.append_subdirs(env_var, dep_root, subdirs=header_dirs)
 
@@ -0,0 +1,181 @@
+# #
+# Copyright 2026-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for build history functionality
+"""
+import os
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.build_history import BUILD_HISTORY_FILENAME, BuildHistory, det_build_history_path
+from easybuild.tools.build_history import get_build_history, job_resources, record_build
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.build_profile import BuildProfile
+from easybuild.tools.config import update_build_option
+from easybuild.tools.filetools import det_cache_dir
+from easybuild.tools.systemtools import get_cpu_architecture
+
+
+class BuildHistoryTest(EnhancedTestCase):
+    """Tests for build history functionality."""
+
+    def test_build_history(self):
+        """Test adding builds to and querying build history."""
+        db_path = os.path.join(self.test_prefix, 'subdir', 'history.db')
+        build_history = BuildHistory(db_path)
+        self.assertExists(db_path)
+
+        self.assertEqual(build_history.get_builds(name='foo'), [])
+        self.assertEqual(build_history.predict('foo', '1.0', 'GCC/12.3.0'), None)
+
+        build_history.add_build('foo', '1.0', 'GCC/12.3.0', 100.0, arch='x86_64', cores=4, peak_rss_kb=2048,
+                                timestamp=1)
+        build_history.add_build('foo', '1.0', 'GCC/12.3.0', 120.0, arch='x86_64', cores=4, peak_rss_kb=1024,
+                                timestamp=2)
+        build_history.add_build('foo', '1.0', 'GCC/12.3.0', 300.0, arch='aarch64', cores=16, timestamp=3)
+        build_history.add_build('foo', '0.9', 'GCC/12.3.0', 1000.0, versionsuffix='-Python-3.11.3', arch='x86_64',
+                                cores=4, timestamp=4)
+        build_history.add_build('bar', '2.0', 'system/system', 10.0)
+
+        builds = build_history.get_builds(name='foo', arch='x86_64')
+        self.assertEqual([b['build_time'] for b in builds], [1000.0, 120.0, 100.0])
+        self.assertEqual(builds[1]['cores'], 4)
+        self.assertEqual(builds[1]['peak_rss_kb'], 1024)
+        self.assertEqual(builds[1]['toolchain'], 'GCC/12.3.0')
+        self.assertEqual(build_history.get_builds(limit=1, name='foo')[0]['version'], '0.9')
+        builds = build_history.get_builds(name='bar')
+        self.assertEqual(len(builds), 1)
+        self.assertEqual(builds[0]['arch'], get_cpu_architecture())
+        self.assertEqual(builds[0]['versionsuffix'], '')
+        self.assertEqual(builds[0]['cores'], None)
+
+        error_pattern = "Unknown key.* for build history: foo"
+        self.assertErrorRegex(EasyBuildError, error_pattern, build_history.get_builds, foo='bar')
+
+        # exact match
+        res = build_history.predict('foo', '1.0', 'GCC/12.3.0', arch='x86_64', cores=4)
+        expected = {
+            'build_time': 120.0,
+            'peak_rss_kb': 2048,
+            'key': ('name', 'version', 'versionsuffix', 'toolchain', 'arch', 'cores'),
+            'samples': 2,
+        }
+        self.assertEqual(res, expected)
+
+        # build time is scaled up when less cores are used, but never scaled down
+        res = build_history.predict('foo', '1.0', 'GCC/12.3.0', arch='aarch64', cores=4)
+        self.assertEqual(res['build_time'], 1200.0)
+        self.assertEqual(res['peak_rss_kb'], None)
+        self.assertEqual(res['key'], ('name', 'version', 'versionsuffix', 'toolchain', 'arch'))
+        res = build_history.predict('foo', '1.0', 'GCC/12.3.0', arch='x86_64', cores=8)
+        self.assertEqual(res['build_time'], 120.0)
+
+        # less specific matches are used if there are no builds for the same toolchain, version, arch
+        res = build_history.predict('foo', '1.0', 'GCC/13.2.0', arch='ppc64le')
+        self.assertEqual(res['build_time'], 300.0)
+        self.assertEqual(res['key'], ('name', 'version'))
+        self.assertEqual(res['samples'], 3)
+        res = build_history.predict('foo', '0.9', 'GCC/12.3.0', versionsuffix='-Python-3.11.3', arch='x86_64')
+        self.assertEqual(res['build_time'], 1000.0)
+        self.assertEqual(res['key'], ('name', 'version', 'versionsuffix', 'toolchain', 'arch'))
+        res = build_history.predict('foo', '2.0', 'GCC/13.2.0')
+        self.assertEqual(res['build_time'], 1000.0)
+        self.assertEqual(res['key'], ('name',))
+        self.assertEqual(res['samples'], 4)
+
+        build_history.close()
+
+        # build history is persistent
+        build_history = BuildHistory(db_path)
+        self.assertEqual(len(build_history.get_builds()), 5)
+        build_history.close()
+
+        # check resources for jobs
+        self.assertEqual(job_resources(None), {})
+        self.assertEqual(job_resources({'build_time': 10.0, 'peak_rss_kb': None}), {'hours': 1})
+        self.assertEqual(job_resources({'build_time': 3600.0, 'peak_rss_kb': 1024000}), {'hours': 2, 'mem': 2000})
+        res = job_resources({'build_time': 3600.0, 'peak_rss_kb': 1024000}, walltime_factor=3, mem_factor=1)
+        self.assertEqual(res, {'hours': 3, 'mem': 1000})
+
+    def test_build_history_path(self):
+        """Test determining location of build history database."""
+        # build history database is located in EasyBuild cache directory by default
+        default_path = os.path.join(self.test_prefix, 'cache', 'easybuild', BUILD_HISTORY_FILENAME)
+        self.assertEqual(det_build_history_path(), default_path)
+        self.assertEqual(det_build_history_path(), os.path.join(det_cache_dir(), BUILD_HISTORY_FILENAME))
+
+        db_path = os.path.join(self.test_prefix, 'history.db')
+        update_build_option('build_history_path', db_path)
+        self.assertEqual(det_build_history_path(), db_path)
+        build_history = get_build_history()
+        self.assertEqual(build_history.path, db_path)
+        build_history.close()
+
+        # empty value disables build history
+        update_build_option('build_history_path', '')
+        self.assertEqual(det_build_history_path(), None)
+        self.assertEqual(get_build_history(), None)
+
+    def test_record_build(self):
+        """Test record_build function."""
+        db_path = os.path.join(self.test_prefix, 'history.db')
+        update_build_option('build_history_path', db_path)
+
+        class FakeEasyConfig(dict):
+            parallel = 8
+
+        class FakeEasyBlock:
+            cfg = FakeEasyConfig(name='foo', version='1.0', versionsuffix='',
+                                 toolchain={'name': 'GCC', 'version': '12.3.0'})
+            build_profile = None
+
+        app = FakeEasyBlock()
+        record_build(app, {'build_time': 12.3})
+
+        app.build_profile = BuildProfile('foo/1.0')
+        start = {'time': 0, 'cpu_self': 0, 'cpu_children': 0, 'maxrss_children': 0}
+        app.build_profile._add_entry('step', 'configure', start, start)
+        end = {'time': 1, 'cpu_self': 0, 'cpu_children': 1, 'maxrss_children': 4096}
+        app.build_profile._add_entry('step', 'build', start, end)
+        record_build(app, {'build_time': 45.6})
+
+        build_history = BuildHistory(db_path)
+        builds = build_history.get_builds(name='foo', version='1.0', toolchain='GCC/12.3.0', cores=8)
+        self.assertEqual([(b['build_time'], b['peak_rss_kb']) for b in builds], [(45.6, 4096), (12.3, None)])
+        build_history.close()
+
+
+def suite(loader=None):
+    """ returns all the testcases in this module """
+    if loader:
+        return loader.loadTestsFromTestCase(BuildHistoryTest)
+    else:
+        return TestLoaderFiltered().loadTestsFromTestCase(BuildHistoryTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
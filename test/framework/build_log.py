@@ -35,7 +35,7 @@ from datetime import datetime, timedelta
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
 from unittest import TextTestRunner
 
-from easybuild.base.fancylogger import getLogger, logToFile, setLogFormat
+from easybuild.base.fancylogger import FancyQueueHandler, getLogger, logToFile, setLogFormat
 from easybuild.framework.easyconfig.tweak import tweak_one
 from easybuild.tools.build_log import (
     LOGGING_FORMAT, EasyBuildError, EasyBuildLog, dry_run_msg, dry_run_warning, init_logging, print_error,
@@ -244,6 +244,50 @@ class BuildLogTest(EnhancedTestCase):
         logtxt_regex = re.compile(r'^%s' % expected_logtxt, re.M)
         self.assertTrue(logtxt_regex.search(logtxt), "Pattern '%s' found in %s" % (logtxt_regex.pattern, logtxt))
 
+    def test_async_logging(self):
+        """Test logging to file via a separate thread."""
+        fd, tmplog = tempfile.mkstemp()
+        os.close(fd)
+
+        setLogFormat("%(name)s [%(levelname)s] :: %(message)s")
+
+        handler = logToFile(tmplog, enable=True, asynchronous=True)
+        self.assertIsInstance(handler, FancyQueueHandler)
+        log = getLogger('test_async_logging')
+        log.setLevelName('DEBUG')
+
+        # arguments are resolved when logging call is done, not when log record is written to file
+        items = ['foo']
+        log.info("items: %s", items)
+        items.append('bar')
+        log.debug("items: %s", items)
+        try:
+            raise ValueError("oops")
+        except ValueError:
+            log.exception("caught exception")
+
+        # flushing waits until all queued log records are written to file
+        handler.flush()
+        logtxt = read_file(tmplog)
+        prefix = 'fancyroot.test_async_logging'
+        self.assertIn("%s [INFO] :: items: ['foo']\n" % prefix, logtxt)
+        self.assertIn("%s [DEBUG] :: items: ['foo', 'bar']\n" % prefix, logtxt)
+        self.assertIn("caught exception", logtxt)
+        self.assertIn("ValueError: oops", logtxt)
+
+        # disabling logging to file stops the thread, after writing the remaining log records
+        log.info("last message")
+        logToFile(tmplog, enable=False)
+        self.assertEqual(handler.listener._thread, None)
+        self.assertTrue(read_file(tmplog).endswith("%s [INFO] :: last message\n" % prefix))
+
+        # asynchronous logging can also be enabled via init_logging
+        tmp_logfile = os.path.join(self.test_prefix, 'test_async.log')
+        log, logfile = init_logging(tmp_logfile, silent=True, asynchronous=True)
+        log.info("logged asynchronously")
+        stop_logging(logfile)
+        self.assertIn("logged asynchronously", read_file(tmp_logfile))
+
     def test_print_warning(self):
         """Test print_warning"""
         def run_check(args, silent=False, expected_stderr='', **kwargs):
@@ -0,0 +1,132 @@
+# #
+# Copyright 2026-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for build profile functionality
+"""
+import csv
+import io
+import json
+import os
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.build_profile import PROFILE_CSV_SUFFIX, PROFILE_ENTRY_COMMAND, PROFILE_ENTRY_EXTENSION
+from easybuild.tools.build_profile import PROFILE_ENTRY_STEP, PROFILE_JSON_SUFFIX, BuildProfile, get_build_profile
+from easybuild.tools.build_profile import start_build_profile, stop_build_profile
+from easybuild.tools.filetools import read_file
+from easybuild.tools.run import run_shell_cmd
+
+
+class BuildProfileTest(EnhancedTestCase):
+    """Tests for build profile functionality."""
+
+    def tearDown(self):
+        """Cleanup after test."""
+        stop_build_profile()
+        super().tearDown()
+
+    def test_build_profile(self):
+        """Test collecting of build profile."""
+        self.assertEqual(get_build_profile(), None)
+
+        # shell commands are not profiled if no build profile is being collected
+        run_shell_cmd("echo not-profiled", hidden=True)
+
+        profile = start_build_profile('test/1.0')
+        self.assertTrue(isinstance(profile, BuildProfile))
+        self.assertEqual(get_build_profile(), profile)
+
+        with profile.step('build'):
+            run_shell_cmd("echo build", hidden=True)
+            run_shell_cmd("exit 3", fail_on_error=False, hidden=True)
+        with profile.step('extensions'):
+            with profile.extension('ext1'):
+                # command that uses some CPU time
+                run_shell_cmd("python -c 'sum(range(10**6))'", hidden=True)
+        # steps that are run multiple times (iterations) are accumulated in summary
+        with profile.step('build'):
+            pass
+
+        self.assertEqual(stop_build_profile(), profile)
+        self.assertEqual(get_build_profile(), None)
+
+        cmds = profile.get_entries(PROFILE_ENTRY_COMMAND)
+        self.assertEqual([c['name'] for c in cmds], ["echo build", "exit 3", "python -c 'sum(range(10**6))'"])
+        self.assertEqual([c['step'] for c in cmds], ['build', 'build', 'extensions'])
+        self.assertEqual([c['extension'] for c in cmds], [None, None, 'ext1'])
+        self.assertEqual([c['exit_code'] for c in cmds], [0, 3, 0])
+        self.assertTrue(cmds[2]['cpu_time_children'] > 0)
+
+        exts = profile.get_entries(PROFILE_ENTRY_EXTENSION)
+        self.assertEqual([(e['name'], e['step']) for e in exts], [('ext1', 'extensions')])
+        self.assertTrue(exts[0]['wall_time'] >= cmds[2]['wall_time'])
+
+        steps = profile.get_entries(PROFILE_ENTRY_STEP)
+        self.assertEqual([s['name'] for s in steps], ['build', 'extensions', 'build'])
+        for entry in profile.entries:
+            self.assertTrue(entry['wall_time'] >= 0)
+            self.assertTrue(entry['cpu_time'] >= entry['cpu_time_children'] >= 0)
+
+        summary = profile.summary()
+        self.assertEqual(list(summary.keys()), ['build', 'extensions'])
+        self.assertEqual(sorted(summary['build'].keys()), ['cpu_time', 'peak_rss_kb', 'wall_time'])
+        self.assertAlmostEqual(summary['build']['wall_time'], steps[0]['wall_time'] + steps[2]['wall_time'], places=2)
+
+        # write profile to JSON + CSV files
+        path_prefix = os.path.join(self.test_prefix, 'easybuild-test-1.0')
+        paths = profile.write(path_prefix)
+        self.assertEqual(paths, [path_prefix + PROFILE_JSON_SUFFIX, path_prefix + PROFILE_CSV_SUFFIX])
+
+        profile_data = json.loads(read_file(paths[0]))
+        self.assertEqual(profile_data['name'], 'test/1.0')
+        self.assertEqual(len(profile_data['entries']), 7)
+        self.assertEqual(list(profile_data['summary'].keys()), ['build', 'extensions'])
+
+        rows = list(csv.DictReader(io.StringIO(read_file(paths[1]))))
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]['type'], PROFILE_ENTRY_COMMAND)
+        self.assertEqual(rows[0]['name'], 'echo build')
+        self.assertEqual(rows[-1]['type'], PROFILE_ENTRY_STEP)
+
+        # check (human-readable) report
+        report = profile.report(top=2)
+        self.assertTrue(report.startswith("Build profile for test/1.0:"))
+        self.assertIn("\n  - build: ", report)
+        self.assertIn("\n* most expensive extensions (top 1 of 1):\n  - ext1 [extensions step]: ", report)
+        self.assertIn("\n* most expensive commands (top 2 of 3):\n  - python -c", report)
+
+
+def suite(loader=None):
+    """ returns all the testcases in this module """
+    if loader:
+        return loader.loadTestsFromTestCase(BuildProfileTest)
+    else:
+        return TestLoaderFiltered().loadTestsFromTestCase(BuildProfileTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
@@ -38,6 +38,7 @@ import stat
 import sys
 import tempfile
 import textwrap
+import tracemalloc
 from collections import OrderedDict
 from easybuild.tools import LooseVersion
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
@@ -49,12 +50,15 @@ import easybuild.tools.github as gh
 import easybuild.tools.systemtools as st
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.constants import EXTERNAL_MODULE_MARKER
+from easybuild.framework.easyconfig.default import CUSTOM, DEFAULT_CONFIG
 from easybuild.framework.easyconfig.easyconfig import ActiveMNS, EasyConfig, create_paths, copy_easyconfigs
 from easybuild.framework.easyconfig.easyconfig import det_subtoolchain_version, fix_deprecated_easyconfigs
 from easybuild.framework.easyconfig.easyconfig import get_easyblock_class, get_module_path
-from easybuild.framework.easyconfig.easyconfig import letter_dir_for, process_easyconfig, resolve_template
+from easybuild.framework.easyconfig.easyconfig import letter_dir_for, process_easyconfig, process_easyconfigs
+from easybuild.framework.easyconfig.easyconfig import resolve_template
 from easybuild.framework.easyconfig.easyconfig import triage_easyconfig_params, verify_easyconfig_filename
 from easybuild.framework.easyconfig.licenses import License, LicenseGPLv3
+from easybuild.framework.easyconfig.parameters import EasyConfigParameters
 from easybuild.framework.easyconfig.parser import EasyConfigParser, fetch_parameters_from_easyconfig
 from easybuild.framework.easyconfig.templates import template_constant_dict, to_template_str
 from easybuild.framework.easyconfig.style import check_easyconfigs_style
@@ -2589,6 +2593,63 @@ class EasyConfigTest(EnhancedTestCase):
         res = subtest_quote_py_str('echo -e "key=val\nkey2=val2" >> "$TMP/db.conf"')
         self.assertEqual(res, '"""echo -e "key=val\nkey2=val2" >> "$TMP/db.conf\\""""')
 
+    def test_process_easyconfigs(self):
+        """Test processing multiple easyconfig files in parallel via process_easyconfigs."""
+        test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        ec_files = [os.path.join(test_ecs_dir, *x) for x in [
+            ('f', 'foss', 'foss-2018a.eb'),
+            ('g', 'GCC', 'GCC-6.4.0-2.28.eb'),
+            ('g', 'gompi', 'gompi-2018a.eb'),
+            ('t', 'toy', 'toy-0.0.eb'),
+            ('t', 'toy', 'toy-0.0-gompi-2018a-test.eb'),
+        ]]
+
+        def check_results(res):
+            """Compare results obtained with process_easyconfigs with result of process_easyconfig."""
+            self.assertEqual(len(res), len(ec_files))
+            for ec_file, ecs in zip(ec_files, res):
+                self.assertEqual(len(ecs), 1)
+                expected = process_easyconfig(ec_file)[0]
+                self.assertEqual(ecs[0]['spec'], ec_file)
+                self.assertEqual(ecs[0]['ec'].asdict(), expected['ec'].asdict())
+                for key in ['full_mod_name', 'short_mod_name', 'dependencies', 'builddependencies', 'hidden']:
+                    self.assertEqual(ecs[0][key], expected[key])
+
+        orig_get_avail_core_count = easyconfig.easyconfig.get_avail_core_count
+        easyconfig.easyconfig.get_avail_core_count = lambda: 3
+        try:
+            easyconfig.easyconfig._easyconfigs_cache.clear()
+            res = list(process_easyconfigs(ec_files))
+            # results obtained from worker processes are cached in main process
+            self.assertEqual(len(easyconfig.easyconfig._easyconfigs_cache), len(ec_files))
+            check_results(res)
+
+            # error in worker process is raised when corresponding result is requested
+            easyconfig.easyconfig._easyconfigs_cache.clear()
+            broken_ec = os.path.join(self.test_prefix, 'broken.eb')
+            write_file(broken_ec, read_file(ec_files[-1]).replace("version = '0.0'", "version = "))
+            results = process_easyconfigs(ec_files[:2] + [broken_ec] + ec_files[2:])
+            self.assertEqual(next(results)[0]['spec'], ec_files[0])
+            self.assertEqual(next(results)[0]['spec'], ec_files[1])
+            error_pattern = "Failed to process easyconfig %s" % broken_ec
+            self.assertErrorRegex(EasyBuildError, error_pattern, next, results)
+            results.close()
+
+            # parse hooks are run in main process
+            hooks_file = os.path.join(self.test_prefix, 'hooks.py')
+            write_file(hooks_file, textwrap.dedent("""
+                def parse_hook(ec):
+                    ec['versionsuffix'] = '-parse-hook'
+            """))
+            init_config(build_options={'hooks': hooks_file})
+            easyconfig.easyconfig._easyconfigs_cache.clear()
+            self.mock_stdout(True)
+            res = list(process_easyconfigs(ec_files))
+            self.mock_stdout(False)
+            self.assertEqual([ecs[0]['ec']['versionsuffix'] for ecs in res], ['-parse-hook'] * len(ec_files))
+        finally:
+            easyconfig.easyconfig.get_avail_core_count = orig_get_avail_core_count
+
     def test_dump(self):
         """Test EasyConfig's dump() method."""
         test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -3514,6 +3575,38 @@ class EasyConfigTest(EnhancedTestCase):
         self.assertEqual(ec1.template_values, ec2.template_values)
         self.assertFalse(ec1.template_values is ec2.template_values)
 
+        # easyconfig file should not be parsed again when copying
+        def fail_parse(*args, **kwargs):
+            raise AssertionError("easyconfig file should not be parsed again")
+
+        orig_parse = EasyConfig.parse
+        EasyConfig.parse = fail_parse
+        try:
+            ec3 = ec1.copy()
+        finally:
+            EasyConfig.parse = orig_parse
+        self.assertEqual(ec1, ec3)
+
+        # values of easyconfig parameters are shared until they are modified (copy-on-write)
+        self.assertIs(ec1._config.get_value('homepage'), ec3._config.get_value('homepage'))
+        ec3['versionsuffix'] = '-test'
+        self.assertEqual(ec1['versionsuffix'], '')
+        self.assertEqual(ec3['versionsuffix'], '-test')
+
+        with ec3.disable_templating():
+            ec3['sources'].append('extra.tar.gz')
+            ec3['checksums'][0] = 'no-checksum'
+        self.assertEqual(ec1['sources'], ['toy-0.0.tar.gz'])
+        self.assertEqual(ec3['sources'], ['toy-0.0.tar.gz', 'extra.tar.gz'])
+        self.assertNotEqual(ec1['checksums'][0], 'no-checksum')
+        self.assertEqual(ec3['checksums'][0], 'no-checksum')
+
+        # modifications in original instance should not affect copies either
+        ec1.get_ref('patches').append('test.patch')
+        self.assertEqual(ec1['patches'][-1], 'test.patch')
+        self.assertNotIn('test.patch', ec2['patches'])
+        self.assertNotIn('test.patch', ec3['patches'])
+
     def test_eq_hash(self):
         """Test comparing two EasyConfig instances."""
         test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -4354,6 +4447,204 @@ class EasyConfigTest(EnhancedTestCase):
             ec = EasyConfig(test_ec)
             self.assertTrue(ec.filename(), os.path.basename(test_ec))
 
+    def test_easyconfig_parameters(self):
+        """Test EasyConfigParameters store for easyconfig parameters."""
+        params = EasyConfigParameters()
+
+        self.assertIn('version', params)
+        self.assertNotIn('foo', params)
+        self.assertEqual(len(params), len(DEFAULT_CONFIG))
+        self.assertEqual(list(params), list(DEFAULT_CONFIG))
+        self.assertEqual(params['sources'], DEFAULT_CONFIG['sources'])
+        self.assertEqual(params['sources'][1:], DEFAULT_CONFIG['sources'][1:])
+        self.assertErrorRegex(KeyError, 'foo', params.__getitem__, 'foo')
+
+        # default values are only copied into store when obtained by reference
+        self.assertIs(params.get_value('sources'), DEFAULT_CONFIG['sources'][0])
+        self.assertFalse(params.is_set('sources'))
+        sources = params.get_ref('sources')
+        self.assertEqual(sources, [])
+        self.assertIsNot(sources, DEFAULT_CONFIG['sources'][0])
+        self.assertTrue(params.is_set('sources'))
+        sources.append('test.tar.gz')
+        self.assertIs(params['sources'][0], sources)
+        self.assertEqual(DEFAULT_CONFIG['sources'][0], [])
+
+        # setting values
+        params['version'][0] = '1.2.3'
+        self.assertEqual(params.get_value('version'), '1.2.3')
+        params.set_value('name', 'test')
+        self.assertEqual(params['name'][0], 'test')
+        self.assertErrorRegex(KeyError, 'foo', params.set_value, 'foo', 'bar')
+        error_pattern = "Only value of easyconfig parameter 'name' can be changed"
+        self.assertErrorRegex(EasyBuildError, error_pattern, params['name'].__setitem__, 1, 'help')
+
+        # adding extra easyconfig parameters
+        extra = {'foo': [['bar'], "help for foo", CUSTOM], 'version': ['0.0', "custom version", CUSTOM]}
+        params.update(extra)
+        self.assertEqual(len(params), len(DEFAULT_CONFIG) + 1)
+        self.assertEqual(list(params)[-1], 'foo')
+        self.assertEqual(params['foo'], extra['foo'])
+        self.assertEqual(params['version'][0], '0.0')
+        self.assertEqual(params['version'][1], "custom version")
+        params.get_ref('foo').append('baz')
+        self.assertEqual(params['foo'][0], ['bar', 'baz'])
+        self.assertEqual(extra['foo'][0], ['bar'])
+
+        del params['foo']
+        self.assertNotIn('foo', params)
+        del params['version']
+        self.assertEqual(params['version'], DEFAULT_CONFIG['version'])
+        error_pattern = "Can not remove default easyconfig parameter 'name'"
+        self.assertErrorRegex(EasyBuildError, error_pattern, params.__delitem__, 'name')
+
+        # values are shared with copies until they're modified (copy-on-write),
+        # except for values for which a reference was handed out
+        params_copy = params.copy()
+        self.assertIs(params_copy.get_value('name'), params.get_value('name'))
+        self.assertTrue(params.is_referenced('sources'))
+        self.assertFalse(params_copy.is_referenced('sources'))
+        self.assertIsNot(params_copy.get_value('sources'), sources)
+        sources.append('ignored.tar.gz')
+        self.assertEqual(params_copy.get_value('sources'), ['test.tar.gz'])
+        sources.remove('ignored.tar.gz')
+        params_copy.get_ref('sources').append('extra.tar.gz')
+        self.assertEqual(params.get_value('sources'), ['test.tar.gz'])
+        self.assertEqual(params_copy.get_value('sources'), ['test.tar.gz', 'extra.tar.gz'])
+        params.get_ref('sources').append('another.tar.gz')
+        self.assertEqual(params.get_value('sources'), ['test.tar.gz', 'another.tar.gz'])
+        self.assertEqual(params_copy.get_value('sources'), ['test.tar.gz', 'extra.tar.gz'])
+        params_copy.set_value('name', 'test_copy')
+        self.assertEqual(params.get_value('name'), 'test')
+
+        params_copy = copy.copy(params)
+        self.assertIs(params_copy.get_value('description'), params.get_value('description'))
+        params_copy = copy.deepcopy(params)
+        self.assertEqual(params_copy.get_value('sources'), params.get_value('sources'))
+        self.assertIsNot(params_copy.get_value('sources'), params.get_value('sources'))
+
+    def test_easyconfig_parameters_memory(self):
+        """Benchmark memory usage of easyconfig parameters for 5k parsed easyconfigs."""
+        test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        ec = EasyConfig(os.path.join(test_ecs_dir, 't', 'toy', 'toy-0.0.eb'))
+        values = {key: ec._config.get_value(key) for key in ec._config if ec._config.is_set(key)}
+
+        def measure(create, cnt):
+            """Measure memory allocated per instance created with specified function."""
+            tracemalloc.start()
+            start = tracemalloc.get_traced_memory()[0]
+            instances = [create() for _ in range(cnt)]
+            mem = tracemalloc.get_traced_memory()[0] - start
+            tracemalloc.stop()
+            del instances
+            return mem / cnt
+
+        def create_store():
+            """Create parameter store, and set values like when parsing an easyconfig file."""
+            params = EasyConfigParameters()
+            for key, value in values.items():
+                params.set_value(key, copy.deepcopy(value), owned=True)
+            return params
+
+        def create_dict():
+            """Create dictionary for easyconfig parameters with deep copy of default easyconfig parameters."""
+            params = copy.deepcopy(DEFAULT_CONFIG)
+            for key, value in values.items():
+                params.setdefault(key, [None, '', CUSTOM])[0] = copy.deepcopy(value)
+            return params
+
+        mem_store = measure(create_store, 5000)
+        # creating a deep copy of the default easyconfig parameters is a lot more expensive,
+        # so only do that for a small number of instances
+        mem_dict = measure(create_dict, 100)
+        self.assertTrue(mem_store * 5 < mem_dict, "%d bytes per instance vs %d" % (mem_store, mem_dict))
+
+    def test_resolved_values_cache(self):
+        """Test caching of values of easyconfig parameters with resolved templates."""
+        test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        ec = EasyConfig(os.path.join(test_ecs_dir, 't', 'toy', 'toy-0.0.eb'))
+
+        resolved = []
+        orig_resolve_template = easyconfig.easyconfig.resolve_template
+
+        def counting_resolve_template(value, *args, **kwargs):
+            """Keep track of values for which templates are resolved."""
+            resolved.append(value)
+            return orig_resolve_template(value, *args, **kwargs)
+
+        easyconfig.easyconfig.resolve_template = counting_resolve_template
+        try:
+            sources = ['%(name)s-%(version)s.tar.gz']
+            ec.set_value('sources', sources, owned=True)
+            self.assertEqual(ec['sources'], ['toy-0.0.tar.gz'])
+            self.assertEqual(resolved.count(sources), 1)
+
+            # cached value is used, but a copy is handed out so it can be modified safely
+            ec['sources'].append('extra.tar.gz')
+            self.assertEqual(ec['sources'], ['toy-0.0.tar.gz'])
+            self.assertEqual(resolved.count(sources), 1)
+
+            # changing value of easyconfig parameter invalidates cached value
+            sources = ['%(namelower)s-%(version)s.zip']
+            ec.set_value('sources', sources, owned=True)
+            self.assertEqual(ec['sources'], ['toy-0.0.zip'])
+            self.assertEqual(ec['sources'], ['toy-0.0.zip'])
+            self.assertEqual(resolved.count(sources), 1)
+
+            # changing template values invalidates cached value
+            ec.template_values['version'] = '1.2.3'
+            self.assertEqual(ec['sources'], ['toy-1.2.3.zip'])
+            self.assertEqual(resolved.count(sources), 2)
+            ec.generate_template_values()
+            self.assertEqual(ec['sources'], ['toy-0.0.zip'])
+            self.assertEqual(resolved.count(sources), 3)
+            ec.template_values = {'name': 'test', 'namelower': 'test', 'version': '1.0'}
+            self.assertEqual(ec['sources'], ['test-1.0.zip'])
+            self.assertEqual(resolved.count(sources), 4)
+            ec.generate_template_values()
+
+            # values that may be modified in place are not cached
+            with ec.disable_templating():
+                ec['sources'].append('%(name)s.patch')
+            self.assertEqual(ec['sources'], ['toy-0.0.zip', 'toy.patch'])
+            ec.get_ref('sources').append('%(version)s.txt')
+            self.assertEqual(ec['sources'], ['toy-0.0.zip', 'toy.patch', '0.0.txt'])
+
+            # values set via ec[key] = value may still be modified in place by the caller, so they're not cached
+            cmds = ['%(name)s-a']
+            ec['postinstallcmds'] = cmds
+            self.assertEqual(ec['postinstallcmds'], ['toy-a'])
+            cmds.append('%(version)s-b')
+            self.assertEqual(ec['postinstallcmds'], ['toy-a', '0.0-b'])
+
+            # immutable values are still cached
+            ec['versionsuffix'] = '-%(name)s'
+            self.assertEqual(ec['versionsuffix'], '-toy')
+            self.assertEqual(ec['versionsuffix'], '-toy')
+            self.assertEqual(resolved.count('-%(name)s'), 1)
+        finally:
+            easyconfig.easyconfig.resolve_template = orig_resolve_template
+
+        # template values keep track of changes
+        tmpl_values = ec.template_values
+        version = tmpl_values.version
+        tmpl_values['foo'] = 'bar'
+        self.assertEqual(tmpl_values.version, version + 1)
+        tmpl_values.update({'foo': 'baz'})
+        del tmpl_values['foo']
+        self.assertEqual(tmpl_values.version, version + 3)
+        self.assertEqual(copy.copy(tmpl_values), tmpl_values)
+        self.assertEqual(copy.deepcopy(tmpl_values).version, 0)
+
+        # alternative/deprecated templates are only determined once, until template values are changed
+        calls = []
+        tmpl_values.derived(calls.append)
+        tmpl_values.derived(calls.append)
+        self.assertEqual(len(calls), 1)
+        tmpl_values['foo'] = 'bar'
+        tmpl_values.derived(calls.append)
+        self.assertEqual(len(calls), 2)
+
     def test_get_ref(self):
         """Test get_ref method."""
         test_ecs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -0,0 +1,172 @@
+# #
+# Copyright 2026-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for extraction of error excerpts
+"""
+import os
+import sys
+import textwrap
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.error_excerpts import extract_error_excerpts, extract_error_excerpts_from_file
+from easybuild.tools.error_excerpts import format_error_excerpts
+from easybuild.tools.filetools import write_file
+from easybuild.tools.testing import det_partial_log
+
+
+BUILD_OUTPUT = textwrap.dedent("""
+    make[2]: Entering directory '/tmp/build'
+    gcc -O2 -c foo.c
+    warning: this is just a warning
+    gcc -O2 -c bar.c
+    bar.c:12:5: error: 'x' undeclared (first use in this function)
+       12 |     x = 1;
+          |     ^
+    make[2]: *** [Makefile:12: bar.o] Error 1
+    make[1]: Leaving directory '/tmp/build'
+    one
+    two
+    three
+    four
+    /usr/bin/ld: cannot find -lfoo: No such file or directory
+    collect2: error: ld returned 1 exit status
+""").lstrip()
+
+
+class ErrorExcerptsTest(EnhancedTestCase):
+    """Tests for extraction of error excerpts."""
+
+    def test_extract_error_excerpts(self):
+        """Test extract_error_excerpts function."""
+        lines = BUILD_OUTPUT.splitlines()
+        excerpts = extract_error_excerpts(lines)
+        self.assertEqual([(e.category, e.line_nr, e.first_line_nr) for e in excerpts],
+                         [('compiler', 5, 2), ('linker', 14, 12)])
+
+        # matching line in context after excerpt (make error) is merged into excerpt
+        self.assertEqual(excerpts[0].lines, lines[1:11])
+        self.assertEqual(excerpts[0].matches, 2)
+        self.assertEqual(excerpts[1].lines, lines[11:15])
+
+        # number of context lines can be controlled
+        excerpts = extract_error_excerpts(lines, context=0)
+        self.assertEqual([(e.category, e.line_nr) for e in excerpts], [('compiler', 5), ('linker', 14), ('make', 8)])
+        self.assertEqual(excerpts[0].lines, [lines[4]])
+        self.assertEqual(excerpts[1].lines, lines[13:15])
+
+        # only highest ranked excerpts are retained
+        excerpts = extract_error_excerpts(lines, context=0, max_excerpts=1)
+        self.assertEqual([(e.category, e.line_nr) for e in excerpts], [('compiler', 5)])
+
+        # excerpts are limited in size
+        excerpts = extract_error_excerpts(lines, max_lines=4)
+        self.assertTrue(all(len(e.lines) <= 4 for e in excerpts))
+
+        # context before matching line for excerpt that starts right after a full excerpt is retained
+        excerpts = extract_error_excerpts(lines, max_lines=4, max_excerpts=10)
+        self.assertEqual([(e.line_nr, e.first_line_nr) for e in excerpts], [(5, 2), (14, 11), (15, 12), (8, 6)])
+        self.assertEqual(excerpts[1].lines, lines[10:14])
+        self.assertEqual(excerpts[2].lines, lines[11:15])
+
+        # CMake, Meson, configure script and Python errors
+        tests = [
+            ("CMake Error at CMakeLists.txt:3 (find_package):", 'cmake'),
+            ("meson.build:10:0: ERROR: Dependency \"zlib\" not found", 'meson'),
+            ("configure: error: C compiler cannot create executables", 'configure'),
+            ("Traceback (most recent call last):", 'python'),
+            ("ModuleNotFoundError: No module named 'foo'", 'python'),
+            ("foo.f90:3:10:\n\n    3 | x = \n\nError: Syntax error in expression", 'compiler'),
+            ("something went wrong: Error 42", 'generic'),
+            # highest weighted pattern wins, regardless of position of match in line
+            ("foo.o: error: undefined reference to bar", 'linker'),
+            ("error: ld returned 1 exit status (collect2: error)", 'linker'),
+        ]
+        for txt, category in tests:
+            excerpts = extract_error_excerpts(txt.splitlines(), max_excerpts=1)
+            self.assertEqual(excerpts[0].category, category, "Category for '%s'" % txt)
+
+        self.assertEqual(extract_error_excerpts(["all good", "nothing to see here"]), [])
+
+        # custom error patterns
+        excerpts = extract_error_excerpts(lines, patterns=[('warning', r'^warning:', 1)])
+        self.assertEqual([(e.category, e.line_nr) for e in excerpts], [('warning', 3)])
+        error_pattern = "Failed to compile error patterns"
+        self.assertErrorRegex(EasyBuildError, error_pattern, extract_error_excerpts, lines, patterns=[('x', '(', 1)])
+
+    def test_extract_error_excerpts_large(self):
+        """Test extracting error excerpts from large input (single pass, bounded memory)."""
+        def gen_lines(cnt):
+            """Generate lots of lines of output, with an error every 1000 lines."""
+            for idx in range(cnt):
+                if idx % 1000 == 999:
+                    yield "file%d.c:1:1: error: oops\n" % idx
+                else:
+                    yield "compiling file%d.c\n" % idx
+
+        excerpts = extract_error_excerpts(gen_lines(100000), max_excerpts=3)
+        # first errors are ranked highest among errors of same kind
+        self.assertEqual([e.line_nr for e in excerpts], [1000, 2000, 3000])
+        self.assertEqual(len(excerpts[0].lines), 7)
+
+    def test_extract_error_excerpts_from_file(self):
+        """Test extract_error_excerpts_from_file and format_error_excerpts functions."""
+        out_file = os.path.join(self.test_prefix, 'out.txt')
+        write_file(out_file, BUILD_OUTPUT)
+
+        excerpts = extract_error_excerpts_from_file(out_file, context=1)
+        self.assertEqual([(e.category, e.line_nr) for e in excerpts], [('compiler', 5), ('linker', 14), ('make', 8)])
+
+        txt = format_error_excerpts(excerpts[:1], path=out_file)
+        expected = '\n'.join([
+            "compiler error at line 5 of %s:" % out_file,
+            "4: gcc -O2 -c bar.c",
+            "5: bar.c:12:5: error: 'x' undeclared (first use in this function)",
+            "6:    12 |     x = 1;",
+        ])
+        self.assertEqual(txt, expected)
+
+        error_pattern = "Failed to extract error excerpts from"
+        self.assertErrorRegex(EasyBuildError, error_pattern, extract_error_excerpts_from_file,
+                              os.path.join(self.test_prefix, 'nosuchfile.txt'))
+
+        # partial log for test reports includes error excerpts and last part of log
+        partial_log = det_partial_log(out_file, tail_lines=2)
+        self.assertTrue(partial_log.startswith("Error excerpts:\n\ncompiler error at line 5:\n"))
+        self.assertTrue(partial_log.endswith("Last part of log:\n\n" + '\n'.join(BUILD_OUTPUT.splitlines()[-2:])))
+
+
+def suite(loader=None):
+    """ returns all the testcases in this module """
+    if loader:
+        return loader.loadTestsFromTestCase(ErrorExcerptsTest)
+    else:
+        return TestLoaderFiltered().loadTestsFromTestCase(ErrorExcerptsTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
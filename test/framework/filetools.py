@@ -34,6 +34,8 @@ Unit tests for filetools.py
 import datetime
 import filecmp
 import glob
+import hashlib
+import http.server
 import logging
 import os
 import re
@@ -42,6 +44,7 @@ import stat
 import sys
 import tempfile
 import textwrap
+import threading
 import time
 import types
 from io import StringIO
@@ -50,6 +53,7 @@ from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_
 from unittest import TextTestRunner
 from urllib import request
 import easybuild.tools.filetools as ft
+import easybuild.tools.multidiff as md
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import IGNORE, ERROR, WARN, build_option, update_build_option
 from easybuild.tools.multidiff import multidiff
@@ -656,6 +660,193 @@ class FileToolsTest(EnhancedTestCase):
         self.assertExists(target_location)
         self.assertTrue(os.path.samefile(path, target_location))
 
+    def test_download_file_resume(self):
+        """Test resuming of interrupted downloads and computing of checksums while downloading in download_file."""
+        data = os.urandom(3 * 1024 ** 2)
+        requests_log = []
+        drop_cnt = [1]
+
+        class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+            """Handler for HTTP requests that supports range requests, and drops connections on request."""
+
+            def do_GET(self):
+                requests_log.append(self.headers.get('Range'))
+                offset = 0
+                range_header = self.headers.get('Range')
+                if range_header and self.headers.get('If-Range', '"v1"') == '"v1"':
+                    offset = int(re.match(r'bytes=([0-9]+)-$', range_header).group(1))
+                    self.send_response(206)
+                    self.send_header('Content-Range', 'bytes %d-%d/%d' % (offset, len(data) - 1, len(data)))
+                else:
+                    self.send_response(200)
+                self.send_header('Content-Length', str(len(data) - offset))
+                self.send_header('ETag', '"v1"')
+                self.end_headers()
+                if drop_cnt[0] > 0:
+                    # drop connection halfway through
+                    drop_cnt[0] -= 1
+                    self.wfile.write(data[offset:offset + (len(data) - offset) // 2])
+                    self.close_connection = True
+                else:
+                    self.wfile.write(data[offset:])
+
+            def log_message(self, *args, **kwargs):
+                pass
+
+        httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+
+        url = 'http://127.0.0.1:%d/test.bin' % httpd.server_address[1]
+        target = os.path.join(self.test_prefix, 'test.bin')
+        sha256 = hashlib.sha256(data).hexdigest()
+
+        # first attempt is interrupted, second attempt resumes download
+        with self.mocked_stdout_stderr():
+            res = ft.download_file('test.bin', url, target, initial_wait_time=0)
+        self.assertEqual(res, target)
+        self.assertEqual(ft.read_file(target, mode='rb'), data)
+        self.assertEqual(len(requests_log), 2)
+        self.assertEqual(requests_log[0], None)
+        self.assertEqual(requests_log[1], 'bytes=%d-' % (len(data) // 2))
+        self.assertEqual(glob.glob(target + '*'), [target])
+
+        # checksum was computed while downloading
+        self.assertEqual(ft.get_downloaded_file_checksum(target, 'sha256'), sha256)
+        self.assertEqual(ft.compute_checksum(target), sha256)
+        self.assertTrue(ft.verify_checksum(target, sha256))
+        self.assertEqual(ft.get_downloaded_file_checksum(target, 'md5'), None)
+
+        # checksum computed while downloading is no longer used when file is changed
+        ft.write_file(target, 'changed')
+        self.assertEqual(ft.get_downloaded_file_checksum(target, 'sha256'), None)
+        self.assertEqual(ft.compute_checksum(target), hashlib.sha256(b'changed').hexdigest())
+        ft.remove_file(target)
+
+        # partially downloaded file is retained when download fails, and used in next download
+        del requests_log[:]
+        drop_cnt[0] = 1
+        with self.mocked_stdout_stderr():
+            res = ft.download_file('test.bin', url, target, max_attempts=1, checksum_types=['md5', 'sha256'])
+        self.assertEqual(res, None)
+        self.assertNotExists(target)
+        part = target + ft.DOWNLOAD_PART_SUFFIX
+        self.assertEqual(ft.read_file(part, mode='rb'), data[:len(data) // 2])
+
+        with self.mocked_stdout_stderr():
+            res = ft.download_file('test.bin', url, target, checksum_types=['md5', 'sha256'])
+        self.assertEqual(res, target)
+        self.assertEqual(ft.read_file(target, mode='rb'), data)
+        self.assertEqual(requests_log, [None, 'bytes=%d-' % (len(data) // 2)])
+        self.assertNotExists(part)
+        self.assertEqual(ft.get_downloaded_file_checksum(target, 'sha256'), sha256)
+        self.assertEqual(ft.get_downloaded_file_checksum(target, 'md5'), hashlib.md5(data).hexdigest())
+
+        # partially downloaded file for a different URL is not used
+        ft.write_file(part, b'foo')
+        ft.write_file(target + ft.DOWNLOAD_PART_METADATA_SUFFIX, '{"url": "http://example.com", "validator": null}')
+        del requests_log[:]
+        with self.mocked_stdout_stderr():
+            res = ft.download_file('test.bin', url, target)
+        self.assertEqual(ft.read_file(target, mode='rb'), data)
+        self.assertEqual(requests_log, [None])
+        self.assertNotExists(target + ft.DOWNLOAD_PART_LOCK_SUFFIX)
+
+        # if another session is downloading the same file, its partially downloaded file is left untouched
+        ft.remove_file(target)
+        ft.write_file(part, b'foo')
+        ft.write_file(target + ft.DOWNLOAD_PART_METADATA_SUFFIX, '{"url": "%s", "validator": null}' % url)
+        lock_fh = ft._lock_partial_download(target)
+        self.assertTrue(lock_fh is not None)
+        self.assertEqual(ft._lock_partial_download(target), None)
+        del requests_log[:]
+        drop_cnt[0] = 1
+        with self.mocked_stdout_stderr():
+            res = ft.download_file('test.bin', url, target, max_attempts=1)
+        self.assertEqual(res, None)
+        with self.mocked_stdout_stderr():
+            res = ft.download_file('test.bin', url, target)
+        self.assertEqual(ft.read_file(target, mode='rb'), data)
+        self.assertEqual(requests_log, [None, None])
+        self.assertEqual(ft.read_file(part, mode='rb'), b'foo')
+        # uniquely named partially downloaded files are cleaned up
+        self.assertEqual(glob.glob(target + '.*' + ft.DOWNLOAD_PART_SUFFIX), [])
+        ft._unlock_partial_download(target, lock_fh)
+        self.assertNotExists(target + ft.DOWNLOAD_PART_LOCK_SUFFIX)
+
+    def test_write_json_file(self):
+        """Test write_json_file function."""
+        fp = os.path.join(self.test_prefix, 'subdir', 'test.json')
+        ft.write_json_file(fp, {'foo': [1, 2], 'bar': None}, sort_keys=True)
+        self.assertEqual(ft.read_file(fp), '{"bar": null, "foo": [1, 2]}')
+        ft.write_json_file(fp, {'foo': 'bar'})
+        self.assertEqual(ft.read_file(fp), '{"foo": "bar"}')
+
+        # file is left untouched (and no temporary files are left behind) if data can't be written
+        error_pattern = "Failed to write to .*/test.json"
+        self.assertErrorRegex(EasyBuildError, error_pattern, ft.write_json_file, fp, {'foo': object()})
+        self.assertEqual(ft.read_file(fp), '{"foo": "bar"}')
+        self.assertEqual(os.listdir(os.path.dirname(fp)), ['test.json'])
+
+    def test_det_cache_path(self):
+        """Test det_cache_dir and det_cache_path functions."""
+        cache_dir = os.path.join(self.test_prefix, 'cache', 'easybuild')
+        self.assertEqual(ft.det_cache_dir(), cache_dir)
+        del os.environ['XDG_CACHE_HOME']
+        self.assertEqual(ft.det_cache_dir(), os.path.join(os.path.expanduser('~'), '.cache', 'easybuild'))
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.test_prefix, 'cache')
+
+        self.assertEqual(ft.det_cache_path('patch_index_path', 'index.json'), os.path.join(cache_dir, 'index.json'))
+        update_build_option('patch_index_path', os.path.join(self.test_prefix, 'index.json'))
+        self.assertEqual(ft.det_cache_path('patch_index_path', 'index.json'),
+                         os.path.join(self.test_prefix, 'index.json'))
+        # empty value disables cache
+        update_build_option('patch_index_path', '')
+        self.assertEqual(ft.det_cache_path('patch_index_path', 'index.json'), None)
+
+    def test_prune_cache_dir(self):
+        """Test prune_cache_dir function."""
+        cache_dir = os.path.join(self.test_prefix, 'cache')
+        self.assertEqual(ft.prune_cache_dir(cache_dir), [])
+
+        old = time.time() - ft.DEFAULT_CACHE_MAX_AGE - 3600
+        for name in ('one', 'two', 'three'):
+            ft.write_file(os.path.join(cache_dir, name, 'foo.txt'), name)
+            if name != 'two':
+                os.utime(os.path.join(cache_dir, name), (old, old))
+
+        self.assertEqual(sorted(ft.prune_cache_dir(cache_dir)), [os.path.join(cache_dir, x) for x in ('one', 'three')])
+        self.assertEqual(sorted(os.listdir(cache_dir)), ['.last_pruned', 'two'])
+
+        # cache directory is pruned at most once a day
+        os.utime(os.path.join(cache_dir, 'two'), (old, old))
+        self.assertEqual(ft.prune_cache_dir(cache_dir), [])
+        os.utime(os.path.join(cache_dir, '.last_pruned'), (old, old))
+        self.assertEqual(ft.prune_cache_dir(cache_dir), [os.path.join(cache_dir, 'two')])
+
+        # cache entries can also be located in subdirectories
+        ft.write_file(os.path.join(cache_dir, 'a', 'b', 'foo.txt'), 'foo')
+        ft.write_file(os.path.join(cache_dir, 'a', 'c', 'bar.txt'), 'bar')
+        os.utime(os.path.join(cache_dir, 'a', 'b'), (old, old))
+        os.utime(os.path.join(cache_dir, '.last_pruned'), (old, old))
+        self.assertEqual(ft.prune_cache_dir(cache_dir, depth=2), [os.path.join(cache_dir, 'a', 'b')])
+        self.assertEqual(os.listdir(os.path.join(cache_dir, 'a')), ['c'])
+
+    def test_det_checksum_types(self):
+        """Test det_checksum_types function."""
+        sha256 = 'a' * 64
+        md5 = 'b' * 32
+        self.assertEqual(ft.det_checksum_types(None), ['sha256'])
+        self.assertEqual(ft.det_checksum_types([]), ['sha256'])
+        self.assertEqual(ft.det_checksum_types(md5), ['md5'])
+        self.assertEqual(ft.det_checksum_types([sha256, ('sha512', 'c' * 128)]), ['sha256', 'sha512'])
+        self.assertEqual(ft.det_checksum_types([(md5, sha256), {'foo.tar.gz': ('sha1', 'd' * 40)}]),
+                         ['md5', 'sha1', 'sha256'])
+        # checksum types that can't be computed while downloading are ignored
+        self.assertEqual(ft.det_checksum_types(('size', 123)), ['sha256'])
+
     def test_download_file_requests_fallback(self):
         """Test fallback to requests in download_file function."""
         url = 'https://raw.githubusercontent.com/easybuilders/easybuild-framework/master/README.rst'
@@ -1259,6 +1450,15 @@ class FileToolsTest(EnhancedTestCase):
         other_bar = [x for x in logs if x.startswith('bar') and x not in ['bar.log', 'bar.log.1', 'bar.log_1']][0]
         self.assertEqual(ft.read_file(os.path.join(self.test_prefix, other_bar)), 'bar')
 
+        # structured logs (which are already compressed) are not zipped
+        init_config(build_options={'zip_logs': 'gzip'})
+        fp = os.path.join(self.test_prefix, 'test3.log')
+        for suffix in ['', '.xz', '.index']:
+            ft.write_file(fp + suffix, 'test3' + suffix)
+        target_dir = os.path.join(self.test_prefix, 'target')
+        ft.move_logs(fp, os.path.join(target_dir, 'test3.log'))
+        self.assertEqual(sorted(os.listdir(target_dir)), ['test3.log.gz', 'test3.log.index', 'test3.log.xz'])
+
     def test_multidiff(self):
         """Test multidiff function."""
         test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
@@ -1321,6 +1521,85 @@ class FileToolsTest(EnhancedTestCase):
 
         self.assertEqual(lines[-1], "=====")
 
+    def test_multidiff_compare_lines(self):
+        """Test compare_lines function used by multidiff."""
+        lines = [
+            "name = 'toy'",
+            "version = '0.0'",
+            "toolchain = {'name': 'gompi', 'version': '2018a'}",
+            "sources = [SOURCE_TAR_GZ]",
+            "moduleclass = 'tools'",
+        ]
+        base_lines = [
+            "name = 'toy'",
+            "version = '0.1'",
+            "toolchain = SYSTEM",
+            "sources = [SOURCE_TAR_GZ]",
+            "patches = ['toy.patch']",
+            "moduleclass = 'tools'",
+        ]
+        expected = [
+            "  name = 'toy'",
+            "- version = '0.0'",
+            "?              ^",
+            "+ version = '0.1'",
+            "?              ^",
+            "- toolchain = {'name': 'gompi', 'version': '2018a'}",
+            "+ toolchain = SYSTEM",
+            "  sources = [SOURCE_TAR_GZ]",
+            "+ patches = ['toy.patch']",
+            "  moduleclass = 'tools'",
+        ]
+        self.assertEqual(list(md.compare_lines(lines, base_lines)), expected)
+
+        # changed tokens are highlighted as a whole
+        res = list(md.compare_lines(["    'dirs': ['lib'],"], ["    'dirs': ['bin', 'lib'],"]))
+        self.assertEqual(res, [
+            "-     'dirs': ['lib'],",
+            "+     'dirs': ['bin', 'lib'],",
+            "?               +++++++",
+        ])
+
+        # long lists of extensions with lots of similar lines are handled efficiently,
+        # and the diff covers all lines in both files
+        def exts_list_lines(versions):
+            res = ['exts_list = [']
+            for idx, version in enumerate(versions):
+                res.extend([
+                    "    ('ext%d', '%s', {" % (idx, version),
+                    "        'checksums': ['%s']," % (version * 64)[:64],
+                    '    }),',
+                ])
+            return res + [']']
+
+        lines = exts_list_lines(['1.%d' % (idx % 10) for idx in range(2000)])
+        base_lines = exts_list_lines(['1.%d' % ((idx + 1) % 10) for idx in range(2000)])
+        res = list(md.compare_lines(lines, base_lines))
+        self.assertEqual([line[2:] for line in res if line[0] in ' -'], lines)
+        self.assertEqual([line[2:] for line in res if line[0] in ' +'], base_lines)
+        self.assertEqual(len([line for line in res if line.startswith('  ')]), 2 + 2000)
+
+    def test_multidiff_parallel(self):
+        """Test multidiff using worker processes."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec = os.path.join(test_easyconfigs, 't', 'toy', 'toy-0.0.eb')
+        other_toy_ecs = [
+            os.path.join(test_easyconfigs, 't', 'toy', 'toy-0.0-deps.eb'),
+            os.path.join(test_easyconfigs, 't', 'toy', 'toy-0.0-gompi-2018a-test.eb'),
+            os.path.join(test_easyconfigs, 't', 'toy', 'toy-0.0-iter.eb'),
+        ]
+        expected = [multidiff(toy_ec, other_toy_ecs, colored=colored) for colored in (True, False)]
+        self.assertIn("5 - description = \"Toy C program, 100% %(name)s.\" (1/3) toy-0.0-iter.eb", expected[1])
+
+        orig_get_avail_core_count = md.get_avail_core_count
+        md.get_avail_core_count = lambda: 3
+        try:
+            res = [multidiff(toy_ec, other_toy_ecs, colored=colored) for colored in (True, False)]
+        finally:
+            md.get_avail_core_count = orig_get_avail_core_count
+
+        self.assertEqual(res, expected)
+
     def test_weld_paths(self):
         """Test weld_paths."""
         # works like os.path.join is there's no overlap
@@ -3370,6 +3649,115 @@ class FileToolsTest(EnhancedTestCase):
         self.assertErrorRegex(EasyBuildError, error_pattern, ft.get_source_tarball_from_git, *args)
         del git_config['unknown']
 
+    def test_get_source_tarball_from_git_mirror(self):
+        """Test get_source_tarball_from_git function in combination with --git-mirror-path."""
+
+        git_env = os.environ.copy()
+        git_env.update({
+            'GIT_AUTHOR_NAME': 'test',
+            'GIT_AUTHOR_EMAIL': 'test@example.com',
+            'GIT_COMMITTER_NAME': 'test',
+            'GIT_COMMITTER_EMAIL': 'test@example.com',
+        })
+
+        def git(cmd, work_dir):
+            """Run git command in specified directory."""
+            return run_shell_cmd('git ' + cmd, env=git_env, work_dir=work_dir, hidden=True).output.strip()
+
+        # create local repositories: 'main' repository with 'sub' repository as submodule (via relative URL)
+        repos_dir = os.path.join(self.test_prefix, 'repos')
+        sub_repo = os.path.join(repos_dir, 'sub.git')
+        main_repo = os.path.join(repos_dir, 'main.git')
+        for repo_dir in (sub_repo, main_repo):
+            ft.mkdir(repo_dir, parents=True)
+            git('init --quiet', repo_dir)
+            ft.write_file(os.path.join(repo_dir, os.path.basename(repo_dir) + '.txt'), 'test')
+            git('add --all', repo_dir)
+            git('commit --quiet -m init', repo_dir)
+
+        git(f"-c protocol.file.allow=always submodule add --quiet {sub_repo} sub", main_repo)
+        git('config --file .gitmodules submodule.sub.url ../sub.git', main_repo)
+        git('commit --quiet --all -m submodule', main_repo)
+        git('tag v1.0', main_repo)
+        first_commit = git('rev-list --max-parents=0 HEAD', main_repo)
+
+        mirror_path = os.path.join(self.test_prefix, 'mirrors')
+        init_config(build_options={'git_mirror_path': mirror_path})
+
+        main_mirror = ft.git_mirror_dir('file://' + main_repo + '/')
+        self.assertEqual(main_mirror, os.path.join(mirror_path, *main_repo.strip('/').split('/')))
+        sub_mirror = ft.git_mirror_dir('file://' + sub_repo)
+
+        target_dir = os.path.join(self.test_prefix, 'target')
+        git_config = {
+            'url': 'file://' + repos_dir,
+            'repo_name': 'main',
+            'tag': 'v1.0',
+            'recursive': True,
+        }
+        res = ft.get_source_tarball_from_git('test.tar.xz', target_dir, git_config)
+        self.assertEqual(res, os.path.join(target_dir, 'test.tar.xz'))
+        self.assertTrue(os.path.exists(os.path.join(main_mirror, 'HEAD')))
+        self.assertTrue(os.path.exists(os.path.join(sub_mirror, 'HEAD')))
+
+        extracted_dir = tempfile.mkdtemp(prefix='extracted_dir')
+        with self.mocked_stdout_stderr():
+            extracted_repo_dir = ft.extract_file(res, extracted_dir, change_into_dir=False)
+        self.assertTrue(os.path.isfile(os.path.join(extracted_repo_dir, 'main.git.txt')))
+        self.assertTrue(os.path.isfile(os.path.join(extracted_repo_dir, 'sub', 'sub.git.txt')))
+
+        # mirrors are used, so sources can be obtained while actual repositories are not available
+        ft.move_file(repos_dir, repos_dir + '.bak')
+        git_config['keep_git_dir'] = True
+        res = ft.get_source_tarball_from_git('test2.tar.xz', target_dir, git_config)
+        extracted_dir = tempfile.mkdtemp(prefix='extracted_dir')
+        with self.mocked_stdout_stderr():
+            extracted_repo_dir = ft.extract_file(res, extracted_dir, change_into_dir=False)
+        self.assertTrue(os.path.isfile(os.path.join(extracted_repo_dir, 'sub', 'sub.git.txt')))
+        # 'origin' remote points to actual repository, not to mirror
+        self.assertEqual(git('remote get-url origin', extracted_repo_dir), 'file://' + main_repo)
+
+        # mirror is updated when a commit that is not available yet in the mirror is requested
+        ft.move_file(repos_dir + '.bak', repos_dir)
+        ft.write_file(os.path.join(main_repo, 'new.txt'), 'new')
+        git('add new.txt', main_repo)
+        git('commit --quiet -m new', main_repo)
+        new_commit = git('rev-parse HEAD', main_repo)
+
+        del git_config['tag']
+        del git_config['keep_git_dir']
+        git_config['commit'] = new_commit
+        git_config['recurse_submodules'] = ['!sub']
+        res = ft.get_source_tarball_from_git('test3.tar.xz', target_dir, git_config)
+        extracted_dir = tempfile.mkdtemp(prefix='extracted_dir')
+        with self.mocked_stdout_stderr():
+            extracted_repo_dir = ft.extract_file(res, extracted_dir, change_into_dir=False)
+        self.assertTrue(os.path.isfile(os.path.join(extracted_repo_dir, 'new.txt')))
+        self.assertFalse(os.path.exists(os.path.join(extracted_repo_dir, 'sub', 'sub.git.txt')))
+
+        git_config['commit'] = first_commit
+        del git_config['recursive']
+        del git_config['recurse_submodules']
+        res = ft.get_source_tarball_from_git('test4.tar.xz', target_dir, git_config)
+        extracted_dir = tempfile.mkdtemp(prefix='extracted_dir')
+        with self.mocked_stdout_stderr():
+            extracted_repo_dir = ft.extract_file(res, extracted_dir, change_into_dir=False)
+        self.assertEqual(sorted(os.listdir(extracted_repo_dir)), ['main.git.txt'])
+
+        # check dry run output
+        init_config(build_options={'extended_dry_run': True, 'git_mirror_path': mirror_path})
+        with self.mocked_stdout_stderr():
+            ft.get_source_tarball_from_git('test5.tar.xz', target_dir, git_config)
+            stdout = self.get_stdout()
+        patterns = [
+            r'running shell command "git clone --no-checkout %s"' % main_mirror,
+            r'running shell command "git remote set-url origin file://%s"' % main_repo,
+            r'running shell command "git checkout %s"' % first_commit,
+        ]
+        for pattern in patterns:
+            regex = re.compile(pattern)
+            self.assertTrue(regex.search(stdout), "Pattern '%s' found in: %s" % (regex.pattern, stdout))
+
     def test_make_archive(self):
         """Test for make_archive method"""
         # create fake directories and files to be archived
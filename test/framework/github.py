@@ -30,18 +30,25 @@ Unit tests for talking to GitHub.
 """
 import base64
 import functools
+import http.server
+import io
+import json
 import os
 import random
 import re
 import sys
+import tarfile
 import textwrap
+import threading
+import time
 import unittest
 from string import ascii_letters
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from time import gmtime
-from unittest import TextTestRunner
+from unittest import TextTestRunner, mock
 from urllib.request import HTTPError, URLError
 
+import easybuild.framework.easyconfig.easyconfig
 import easybuild.tools.testing
 from easybuild.base.rest import RestClient
 from easybuild.framework.easyconfig.easyconfig import EasyConfig
@@ -54,7 +61,7 @@ from easybuild.tools.github import GITHUB_EASYCONFIGS_REPO, GITHUB_EASYBLOCKS_RE
 from easybuild.tools.github import VALID_CLOSE_PR_REASONS
 from easybuild.tools.github import det_pr_title, fetch_easyconfigs_from_commit, fetch_files_from_commit
 from easybuild.tools.github import is_patch_for, pick_default_branch
-from easybuild.tools.testing import create_test_report, post_pr_test_report, session_state
+from easybuild.tools.testing import create_test_report, det_partial_log, post_pr_test_report, session_state
 import easybuild.tools.github as gh
 
 try:
@@ -100,6 +107,109 @@ def ignore_rate_limit_in_pr(test_item):
     return skip_wrapper
 
 
+class GitHubStandIn:
+    """
+    Local HTTP server that mimics the GitHub endpoints used to fetch files from PRs and commits
+    (GitHub API, repository archives & raw files), so these can be tested offline.
+
+    Use as a context manager, which also makes the github module use this server instead of GitHub.
+    """
+
+    def __init__(self):
+        """Initialise stand-in: no repositories, branches or PRs, no requests received yet."""
+        # branches per (account, repo): name -> (commit SHA, dict with files)
+        self.branches = {}
+        # PRs per (account, repo): PR number -> (PR data, diff)
+        self.pulls = {}
+        # paths of all received requests
+        self.requests = []
+        self.server = None
+        self.patchers = []
+
+    def add_branch(self, account, repo, name, sha, files):
+        """Add branch with specified files (dict with relative paths as keys and contents as values)."""
+        self.branches.setdefault((account, repo), {})[name] = (sha, files)
+
+    def add_pr(self, account, repo, pr, base, head_sha, diff, state='open', merged=False):
+        """Add PR that targets specified base branch, with specified diff."""
+        pr_data = {
+            'base': {'ref': base},
+            'diff_url': '%s/%s/%s/pull/%s.diff' % (gh.GITHUB_URL, account, repo, pr),
+            'head': {'sha': head_sha},
+            'merged': merged,
+            'number': pr,
+            'state': state,
+        }
+        self.pulls.setdefault((account, repo), {})[pr] = (pr_data, diff)
+
+    def handle(self, path, headers):
+        """Determine response for GET request for specified path: tuple with status code and body."""
+        self.requests.append(path)
+        parts = path.split('?')[0].strip('/').split('/')
+
+        if parts[:1] == ['repos'] and len(parts) == 4 and parts[3] == 'branches':
+            branches = self.branches.get((parts[1], parts[2]), {})
+            return 200, json.dumps([{'name': b, 'commit': {'sha': sha}} for (b, (sha, _)) in branches.items()])
+
+        if parts[:1] == ['repos'] and len(parts) == 5 and parts[3] == 'pulls':
+            pr_data, diff = self.pulls.get((parts[1], parts[2]), {}).get(int(parts[4]), (None, None))
+            if pr_data is None:
+                return 404, '{}'
+            elif 'diff' in headers.get('Accept', ''):
+                return 200, diff
+            return 200, json.dumps(pr_data)
+
+        if len(parts) == 4 and parts[2] == 'archive' and parts[3].endswith('.tar.gz'):
+            # archives can be downloaded for both branch names and commit SHAs
+            account, repo, ref = parts[0], parts[1], parts[3][:-len('.tar.gz')]
+            branches = self.branches.get((account, repo), {})
+            files = ([files for (name, (sha, files)) in branches.items() if ref in (name, sha)] + [None])[0]
+            if files is None:
+                return 404, ''
+            data = io.BytesIO()
+            with tarfile.open(fileobj=data, mode='w:gz') as tar:
+                for relpath, txt in files.items():
+                    info = tarfile.TarInfo('%s-%s/%s' % (repo, ref, relpath))
+                    info.size = len(txt.encode())
+                    tar.addfile(info, io.BytesIO(txt.encode()))
+            return 200, data.getvalue()
+
+        return 404, ''
+
+    def __enter__(self):
+        """Start server in a separate thread, and make github module use it."""
+        stand_in = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = stand_in.handle(self.path, self.headers)
+                body = body if isinstance(body, bytes) else body.encode()
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        url = 'http://127.0.0.1:%d' % self.server.server_port
+        for name in ('GITHUB_API_URL', 'GITHUB_RAW', 'GITHUB_URL'):
+            self.patchers.append(mock.patch.object(gh, name, url))
+        for patcher in self.patchers:
+            patcher.start()
+        return self
+
+    def __exit__(self, *args):
+        """Stop server, and restore GitHub URLs in github module."""
+        for patcher in self.patchers:
+            patcher.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+
 class GithubTest(EnhancedTestCase):
     """ small test for The github package
     This should not be to much, since there is an hourly limit of request
@@ -122,6 +232,8 @@ class GithubTest(EnhancedTestCase):
 
         self.orig_testing_create_gist = easybuild.tools.testing.create_gist
 
+        gh.PATCH_INDEX.clear()
+
     def tearDown(self):
         """Cleanup after running test."""
         easybuild.tools.testing.create_gist = self.orig_testing_create_gist
@@ -527,6 +639,100 @@ class GithubTest(EnhancedTestCase):
         res = gh.fetch_easyblocks_from_pr(12345, tmpdir)
         self.assertEqual(sorted(pr12345_files), sorted(res))
 
+    def test_fetch_files_from_prs(self):
+        """Test fetching files from multiple PRs concurrently, with cache of fetched files (offline)."""
+        cache_path = os.path.join(self.test_prefix, 'cache')
+        init_config(build_options={
+            'github_files_cache_path': cache_path,
+            'pr_target_account': gh.GITHUB_EB_MAIN,
+        })
+        gh.fetch_files_from_pr.clear_cache()
+
+        account, repo = gh.GITHUB_EB_MAIN, gh.GITHUB_EASYCONFIGS_REPO
+        toy_ec = os.path.join('easybuild', 'easyconfigs', 't', 'toy', 'toy-0.0.eb')
+
+        def new_ec_diff(name, version):
+            """Create diff for PR that adds an easyconfig file."""
+            ec_path = '/'.join(['easybuild', 'easyconfigs', name[0], name, '%s-%s.eb' % (name, version)])
+            return '\n'.join([
+                'diff --git a/%s b/%s' % (ec_path, ec_path),
+                'new file mode 100644',
+                '--- /dev/null',
+                '+++ b/%s' % ec_path,
+                '@@ -0,0 +1,2 @@',
+                "+name = '%s'" % name,
+                "+version = '%s'" % version,
+                '',
+            ])
+
+        with GitHubStandIn() as stand_in:
+            stand_in.add_branch(account, repo, 'develop', '1' * 40, {toy_ec: "name = 'toy'\nversion = '0.0'\n"})
+            stand_in.add_pr(account, repo, 1, 'develop', 'a' * 40, new_ec_diff('toy', '1.0'))
+            stand_in.add_pr(account, repo, 2, 'develop', 'b' * 40, new_ec_diff('bar', '2.0'))
+
+            with mock.patch.object(gh, 'GITHUB_MAX_CONCURRENT_FETCHES', 2):
+                with self.mocked_stdout_stderr():
+                    res = gh.fetch_easyconfigs_from_prs([1, 2])
+            self.assertEqual([[os.path.basename(p) for p in files] for files in res],
+                             [['toy-1.0.eb'], ['bar-2.0.eb']])
+            self.assertEqual(read_file(res[0][0]), "name = 'toy'\nversion = '1.0'\n")
+            # files fetched in worker processes are also cached in memory
+            self.assertEqual(len(gh.fetch_files_from_pr._cache), 2)
+
+            # target branch with PR patch applied is cached per PR head commit and target branch commit
+            for sha in ('a' * 40, 'b' * 40):
+                cache_dir = os.path.join(cache_path, account, repo, sha + '-' + '1' * 40)
+                self.assertExists(os.path.join(cache_dir, gh.GITHUB_FILES_CACHE_METADATA))
+            self.assertEqual(len([x for x in stand_in.requests if '/archive/' in x]), 2)
+
+            # PRs that did not change are not downloaded again, also not in another session
+            gh.fetch_files_from_pr.clear_cache()
+            stand_in.requests = []
+            stand_in.add_pr(account, repo, 2, 'develop', 'c' * 40, new_ec_diff('bar', '3.0'))
+            with self.mocked_stdout_stderr():
+                res = gh.fetch_easyconfigs_from_prs([1, 2])
+            self.assertEqual([[os.path.basename(p) for p in files] for files in res],
+                             [['toy-1.0.eb'], ['bar-3.0.eb']])
+            self.assertEqual(len([x for x in stand_in.requests if '/archive/' in x]), 1)
+            self.assertEqual(sorted(x for x in stand_in.requests if '/pulls/' in x),
+                             ['/repos/%s/%s/pulls/%d' % (account, repo, pr) for pr in (1, 2, 2)])
+
+            # PRs are downloaded again when target branch was changed, since PR patch is applied on top of it
+            gh.fetch_files_from_pr.clear_cache()
+            stand_in.requests = []
+            stand_in.branches[(account, repo)].clear()
+            stand_in.add_branch(account, repo, 'develop', '2' * 40, {toy_ec: "name = 'toy'\nversion = '0.1'\n"})
+            with self.mocked_stdout_stderr():
+                gh.fetch_easyconfigs_from_prs([1])
+            self.assertEqual(stand_in.requests.count('/%s/%s/archive/%s.tar.gz' % (account, repo, '2' * 40)), 1)
+            self.assertExists(os.path.join(cache_path, account, repo, 'a' * 40 + '-' + '2' * 40))
+
+            # cached files which were not used for a while are removed
+            old = time.time() - 31 * 24 * 3600
+            for sha in ('a' * 40, 'b' * 40):
+                os.utime(os.path.join(cache_path, account, repo, sha + '-' + '1' * 40), (old, old))
+            os.utime(os.path.join(cache_path, '.last_pruned'), (old, old))
+            gh.fetch_files_from_pr.clear_cache()
+            with self.mocked_stdout_stderr():
+                gh.fetch_easyconfigs_from_prs([1])
+            self.assertExists(os.path.join(cache_path, account, repo, 'a' * 40 + '-' + '2' * 40))
+            self.assertNotExists(os.path.join(cache_path, account, repo, 'a' * 40 + '-' + '1' * 40))
+            self.assertNotExists(os.path.join(cache_path, account, repo, 'b' * 40 + '-' + '1' * 40))
+            self.assertExists(os.path.join(cache_path, account, repo, 'c' * 40 + '-' + '1' * 40))
+
+            # files fetched for a specific commit are also cached
+            stand_in.requests = []
+            for idx in range(2):
+                path = os.path.join(self.test_prefix, 'commit%d' % idx)
+                res = fetch_files_from_commit('2' * 40, files=[toy_ec], path=path)
+                self.assertEqual(read_file(res[0]), "name = 'toy'\nversion = '0.1'\n")
+            self.assertEqual(stand_in.requests, ['/%s/%s/archive/%s.tar.gz' % (account, repo, '2' * 40)])
+            cache_dir = os.path.join(cache_path, account, repo, '2' * 40)
+            self.assertExists(os.path.join(cache_dir, gh.GITHUB_FILES_CACHE_METADATA))
+            # no leftover temporary download directories
+            self.assertEqual(sorted(os.listdir(os.path.dirname(cache_dir))),
+                             ['2' * 40, 'a' * 40 + '-' + '2' * 40, 'c' * 40 + '-' + '1' * 40])
+
     @ignore_rate_limit_in_pr
     def test_fetch_files_from_commit(self):
         """Test fetch_files_from_commit function."""
@@ -780,6 +986,88 @@ class GithubTest(EnhancedTestCase):
         self.assertEqual(gh.find_software_name_for_patch('test.patch', [self.test_prefix]), None)
         self.mock_stdout(False)
 
+    def test_github_patch_index(self):
+        """Test index of patch files used in easyconfigs."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        ec_dir = os.path.join(self.test_prefix, 'easyconfigs')
+        toy_ec = os.path.join(ec_dir, 'toy-0.0.eb')
+        write_file(toy_ec, read_file(os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb')))
+        write_file(os.path.join(ec_dir, 'gzip-1.4.eb'), read_file(os.path.join(test_ecs, 'g', 'gzip', 'gzip-1.4.eb')))
+
+        index_path = os.path.join(self.test_prefix, 'patch_index.json')
+        init_config(build_options={
+            'patch_index_path': index_path,
+            'silent': True,
+            'valid_module_classes': module_classes(),
+            'validate': False,
+        })
+        self.assertEqual(gh.det_patch_index_path(), index_path)
+
+        patch_names = ['toy-0.0_fix-silly-typo-in-printf-statement.patch', 'toy-extra.txt', 'test.patch']
+        expected = {
+            'toy-0.0_fix-silly-typo-in-printf-statement.patch': 'toy',
+            'toy-extra.txt': 'toy',
+        }
+        with self.mocked_stdout_stderr():
+            self.assertEqual(gh.find_software_names_for_patches(patch_names, [ec_dir]), expected)
+            stdout = self.get_stdout()
+        # only easyconfig files that mention 'patches' are parsed
+        self.assertIn("1 of 1 easyconfigs checked", stdout)
+        self.assertExists(index_path)
+        gzip_ec = os.path.join(ec_dir, 'gzip-1.4.eb')
+        self.assertEqual(sorted(gh._read_patch_index(index_path)), [gzip_ec, toy_ec])
+
+        # easyconfig files are not parsed again if they did not change, also not in a new session
+        for clear_index in (False, True):
+            if clear_index:
+                gh.PATCH_INDEX.clear()
+            with mock.patch('easybuild.tools.github.process_easyconfig') as mocked_process_easyconfig:
+                with self.mocked_stdout_stderr():
+                    self.assertEqual(gh.find_software_names_for_patches(patch_names, [ec_dir]), expected)
+                    stdout = self.get_stdout()
+            mocked_process_easyconfig.assert_not_called()
+            self.assertEqual(stdout, '')
+
+        # only easyconfig files that were changed are parsed again, removed easyconfig files are dropped
+        write_file(toy_ec, "\npatches = ['test.patch']", append=True)
+        easybuild.framework.easyconfig.easyconfig._easyconfigs_cache.clear()
+        with self.mocked_stdout_stderr():
+            res = gh.find_software_names_for_patches(patch_names, [ec_dir])
+            stdout = self.get_stdout()
+        self.assertEqual(res, {'test.patch': 'toy'})
+        self.assertIn("1 of 1 easyconfigs checked", stdout)
+        self.assertEqual(gh.find_software_name_for_patch('test.patch', [ec_dir]), 'toy')
+
+        os.remove(toy_ec)
+        self.assertEqual(gh.find_software_names_for_patches(patch_names, [ec_dir]), {})
+        self.assertEqual(list(gh.PATCH_INDEX), [gzip_ec])
+
+        # without (persistent) index, easyconfig files are scanned until a match is found for all patch files,
+        # starting with those with a name that matches the name of the patch file
+        write_file(toy_ec, read_file(os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb')))
+        bar_ec = os.path.join(ec_dir, 'bar-0.0.eb')
+        write_file(bar_ec, read_file(os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb')))
+        patch_names = ['toy-0.0_fix-silly-typo-in-printf-statement.patch']
+        for index_path in ('', os.path.join(self.test_prefix, 'new_patch_index.json')):
+            gh.PATCH_INDEX.clear()
+            easybuild.framework.easyconfig.easyconfig._easyconfigs_cache.clear()
+            update_build_option('patch_index_path', index_path)
+            with self.mocked_stdout_stderr():
+                res = gh.find_software_names_for_patches(patch_names, [ec_dir])
+                stdout = self.get_stdout()
+            self.assertEqual(res, {patch_names[0]: 'toy'})
+            self.assertEqual(stdout.split('\r')[-1], "1 of 2 easyconfigs checked\n")
+            self.assertEqual(gh.PATCH_INDEX, {})
+
+        # index is started with entries for easyconfig files that were checked, other ones are added later
+        self.assertEqual(sorted(gh._read_patch_index(index_path)), [gzip_ec, toy_ec])
+        with self.mocked_stdout_stderr():
+            res = gh.find_software_names_for_patches(patch_names, [ec_dir])
+            stdout = self.get_stdout()
+        self.assertEqual(res, {patch_names[0]: 'toy'})
+        self.assertIn("1 of 1 easyconfigs checked", stdout)
+        self.assertEqual(sorted(gh._read_patch_index(index_path)), [bar_ec, gzip_ec, toy_ec])
+
     def test_github_det_commit_status(self):
         """Test det_commit_status function."""
 
@@ -1412,7 +1700,10 @@ class GithubTest(EnhancedTestCase):
             self.assertNotIn(pattern.lower(), res['full'])
 
         # mock create_gist function, we don't want to actually create a gist every time we run this test...
-        def fake_create_gist(*args, **kwargs):
+        gists = []
+
+        def fake_create_gist(txt, fn, **kwargs):
+            gists.append((fn, txt))
             return 'https://gist.github.com/%s/test' % GITHUB_TEST_ACCOUNT
 
         easybuild.tools.testing.create_gist = fake_create_gist
@@ -1431,6 +1722,38 @@ class GithubTest(EnhancedTestCase):
 
         self.assertIn("**SUCCESS** _test.eb_", res['overview'])
 
+        # gist for failed build includes error excerpts and last part of log
+        self.assertEqual(len(gists), 1)
+        fn, txt = gists[0]
+        self.assertEqual(fn, 'fail_partial.log')
+        self.assertEqual(txt, det_partial_log(logfile))
+        self.assertIn("Bazel failed with: error", txt)
+
+        # output of failed shell command in structured log (if available) is included as well
+        orig_get_failed_command_output = easybuild.tools.testing.get_failed_command_output
+        easybuild.tools.testing.get_failed_command_output = lambda _: "running 'bazel build'\nbazel exited\n"
+        try:
+            create_test_report("just a test", ecs_with_res, init_session_state, pr_nrs=[123], gist_log=True)
+        finally:
+            easybuild.tools.testing.get_failed_command_output = orig_get_failed_command_output
+        self.assertEqual(len(gists), 2)
+        expected = '\n'.join([
+            "Output of failed shell command:",
+            '',
+            "running 'bazel build'",
+            "bazel exited",
+            '',
+            det_partial_log(logfile),
+        ])
+        self.assertEqual(gists[1][1], expected)
+
+        # problems with structured log don't prevent creating test report, log file is still used
+        write_file(logfile + '.index', 'not a valid index')
+        res = create_test_report("just a test", ecs_with_res, init_session_state, pr_nrs=[123], gist_log=True)
+        self.assertIn("https://gist.github.com/%s/test" % GITHUB_TEST_ACCOUNT, res['full'])
+        self.assertEqual(len(gists), 3)
+        self.assertEqual(gists[2][1], det_partial_log(logfile))
+
     def test_is_patch_for(self):
         """Test for is_patch_for function."""
         ectxt = '\n'.join([
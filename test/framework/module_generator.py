@@ -36,6 +36,7 @@ import tempfile
 from unittest import TextTestRunner, TestSuite
 
 from easybuild.framework.easyconfig.tools import process_easyconfig
+import easybuild.tools.module_generator as mg
 from easybuild.tools import LooseVersion, config
 from easybuild.tools.filetools import mkdir, read_file, remove_file, write_file
 from easybuild.tools.module_generator import ModuleGeneratorLua, ModuleGeneratorTcl, dependencies_for, wrap_shell_vars
@@ -1755,6 +1756,73 @@ class ModuleGeneratorTest(EnhancedTestCase):
             ]
             self.assertEqual(dependencies_for('test/1.2.3', self.modtool), expected)
 
+    def test_dependencies_for_graph(self):
+        """Test dependencies_for function on diamond-shaped dependency graph, without modules tool."""
+        mod_dir = os.path.join(self.test_prefix, 'modules')
+        ext = self.MODULE_GENERATOR_CLASS.MODULE_FILE_EXTENSION
+
+        test_mods = {
+            'top/1.0': ['one/1.0', 'two/1.0'],
+            'one/1.0': ['zlib/1.2', 'GCCcore/12.3.0'],
+            'two/1.0': ['binutils/2.40', 'zlib/1.2'],
+            'zlib/1.2': ['GCCcore/12.3.0'],
+            'binutils/2.40': ['zlib/1.2', 'GCCcore/12.3.0'],
+            'GCCcore/12.3.0': [],
+        }
+
+        def write_mod_file(mod_name, deps):
+            """Write module file that loads specified dependencies."""
+            if self.MODULE_GENERATOR_CLASS == ModuleGeneratorLua:
+                txt = '\n'.join(['-- %s' % mod_name] + ['load("%s")' % dep for dep in deps])
+            else:
+                txt = '\n'.join(['#%Module'] + ['module load %s' % dep for dep in deps])
+            write_file(os.path.join(mod_dir, mod_name + ext), txt)
+
+        for mod_name, deps in test_mods.items():
+            write_mod_file(mod_name, deps)
+
+        class FakeModulesTool:
+            """Fake modules tool, which only knows how to locate module files."""
+            def __init__(self):
+                self.located = []
+
+            def modulefile_path(self, mod_name):
+                self.located.append(mod_name)
+                return os.path.join(mod_dir, mod_name + ext)
+
+        modtool = FakeModulesTool()
+        expected = ['one/1.0', 'two/1.0', 'zlib/1.2', 'GCCcore/12.3.0', 'binutils/2.40']
+        self.assertEqual(dependencies_for('top/1.0', modtool), expected)
+        # every module file is only located once
+        self.assertEqual(sorted(modtool.located), sorted(test_mods))
+
+        self.assertEqual(dependencies_for('top/1.0', modtool, depth=0), ['one/1.0', 'two/1.0'])
+        self.assertEqual(dependencies_for('top/1.0', modtool, depth=1), expected)
+        self.assertEqual(dependencies_for('zlib/1.2', modtool), ['GCCcore/12.3.0'])
+
+        # module files are not read again when they're not changed
+        read_paths = []
+        orig_read_file = mg.read_file
+
+        def fake_read_file(path, *args, **kwargs):
+            read_paths.append(path)
+            return orig_read_file(path, *args, **kwargs)
+
+        mg.read_file = fake_read_file
+        try:
+            dependencies_for('top/1.0', modtool)
+        finally:
+            mg.read_file = orig_read_file
+        self.assertEqual(read_paths, [])
+
+        # changes to module files are picked up
+        write_mod_file('top/1.0', ['GCCcore/12.3.0'])
+        self.assertEqual(dependencies_for('top/1.0', modtool), ['GCCcore/12.3.0'])
+
+        # cyclic dependencies don't result in infinite recursion
+        write_mod_file('GCCcore/12.3.0', ['top/1.0'])
+        self.assertEqual(dependencies_for('top/1.0', modtool), ['GCCcore/12.3.0', 'top/1.0'])
+
     def test_det_installdir(self):
         """Test det_installdir method."""
 
@@ -44,6 +44,7 @@ from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig.easyconfig import EasyConfig
 from easybuild.tools import LooseVersion
 from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.environment import restore_env
 from easybuild.tools.filetools import adjust_permissions, copy_file, copy_dir, mkdir
 from easybuild.tools.filetools import read_file, remove_dir, remove_file, symlink, write_file
 from easybuild.tools.modules import EnvironmentModules, EnvironmentModulesC, EnvironmentModulesTcl, Lmod, NoModulesTool
@@ -1202,6 +1203,164 @@ class ModulesTest(EnhancedTestCase):
         self.assertEqual(mod.MODULE_AVAIL_CACHE, {})
         self.assertEqual(mod.MODULE_SHOW_CACHE, {})
 
+    def test_module_load_cache(self):
+        """Test caching of changes made to environment by loading modules."""
+        reset_module_caches()
+
+        mod_file = os.path.join(self.test_prefix, 'modules', 'test', '1.0')
+        write_file(mod_file, '#%Module')
+
+        load_cmds = []
+        orig_run_module = self.modtool.run_module
+
+        def fake_run_module(*args, **kwargs):
+            """Fake 'module load' command: only changes environment."""
+            if args[0][0] != 'load':
+                return orig_run_module(*args, **kwargs)
+            load_cmds.append(args[0])
+            os.environ['EBROOTTEST'] = '/software/test/1.0'
+            os.environ['_LMFILES_'] = mod_file
+            if 'TEST_UNSET_ME' in os.environ:
+                del os.environ['TEST_UNSET_ME']
+
+        self.modtool.run_module = fake_run_module
+        other_mod_path = os.path.join(self.test_prefix, 'other_modules')
+        mkdir(other_mod_path)
+        os.environ['MODULEPATH'] = os.pathsep.join([other_mod_path, os.path.join(self.test_prefix, 'modules')])
+        os.environ['TEST_UNSET_ME'] = 'foo'
+        init_env = os.environ.copy()
+
+        # caching is disabled by default
+        for _ in range(2):
+            self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 2)
+        self.assertEqual(mod.MODULE_LOAD_ENV_CACHE, {})
+        load_cmds.clear()
+
+        # initial environment is determined after updating configuration, since that also changes environment
+        restore_env(init_env)
+        init_config(build_options={'module_load_cache': True})
+        init_env = os.environ.copy()
+
+        # all modules are loaded with a single 'module load' command
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(load_cmds, [['load', 'test/1.0', 'dep/2.0']])
+        self.assertEqual(len(mod.MODULE_LOAD_ENV_CACHE), 1)
+        self.assertEqual(os.environ['EBROOTTEST'], '/software/test/1.0')
+        self.assertNotIn('TEST_UNSET_ME', os.environ)
+
+        # loading same modules in same environment replays changes to environment without running 'module load'
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 1)
+        self.assertEqual(os.environ['EBROOTTEST'], '/software/test/1.0')
+        self.assertEqual(os.environ['_LMFILES_'], mod_file)
+        self.assertNotIn('TEST_UNSET_ME', os.environ)
+
+        # different environment or different list of modules implies that modules are really loaded
+        self.modtool.load(['test/1.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 2)
+        self.modtool.load(['test/1.0', 'dep/2.0'])
+        self.assertEqual(len(load_cmds), 3)
+
+        # changes to module files are detected
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 3)
+        write_file(mod_file, '#%Module\nsetenv FOO bar')
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 4)
+        write_file(os.path.join(self.test_prefix, 'modules', 'test', '2.0'), '#%Module')
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 5)
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 5)
+
+        # addition of modules in other directories in $MODULEPATH is detected too
+        write_file(os.path.join(other_mod_path, 'test', '1.0'), '#%Module')
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 6)
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 6)
+
+        # caching can be disabled
+        init_config(build_options={'module_load_cache': False})
+        self.modtool.load(['test/1.0', 'dep/2.0'], purge=True, init_env=init_env)
+        self.assertEqual(len(load_cmds), 7)
+
+        reset_module_caches()
+        self.assertEqual(mod.MODULE_LOAD_ENV_CACHE, {})
+
+    def test_module_show_cache(self):
+        """Test persistent cache for output of 'module show', and use of it in check_loaded_modules."""
+        reset_module_caches()
+
+        mod_dir = os.path.join(self.test_prefix, 'modules')
+        test_mod_file = os.path.join(mod_dir, 'test', '1.0')
+        write_file(test_mod_file, '#%Module\nsetenv EBROOTTEST /software/test/1.0')
+        other_mod_file = os.path.join(mod_dir, 'other', '1.0')
+        write_file(other_mod_file, '#%Module\nsetenv FOO bar')
+        os.environ['MODULEPATH'] = mod_dir
+
+        show_cmds = []
+
+        def fake_run_module(*args, **kwargs):
+            """Fake 'module show' command."""
+            show_cmds.append(args[1])
+            mod_file = os.path.join(mod_dir, args[1])
+            if os.path.exists(mod_file):
+                return '%s:\n\n%s' % (mod_file, read_file(mod_file))
+            return "ERROR: Unable to locate a modulefile for '%s'" % args[1]
+
+        self.modtool.run_module = fake_run_module
+
+        cache_dir = os.path.join(self.test_prefix, 'module_show_cache')
+        init_config(build_options={'module_show_cache_path': cache_dir})
+
+        res = self.modtool.show_modules(['test/1.0', 'other/1.0', 'nosuchmodule/1.0'])
+        self.assertEqual(sorted(res), ['nosuchmodule/1.0', 'other/1.0', 'test/1.0'])
+        self.assertTrue(res['test/1.0'].startswith(test_mod_file + ':'))
+        self.assertEqual(show_cmds, ['test/1.0', 'other/1.0', 'nosuchmodule/1.0'])
+        # only output for existing module files is cached persistently
+        self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+        # in-memory cache is used for 'show' in same session
+        self.assertEqual(self.modtool.show('test/1.0'), res['test/1.0'])
+        self.assertEqual(len(show_cmds), 3)
+
+        # persistent cache is used in a new session, for module files that were not changed
+        reset_module_caches()
+        res_bis = self.modtool.show_modules(['test/1.0', 'other/1.0'])
+        self.assertEqual(res_bis, {'test/1.0': res['test/1.0'], 'other/1.0': res['other/1.0']})
+        self.assertEqual(len(show_cmds), 3)
+
+        reset_module_caches()
+        write_file(other_mod_file, '#%Module\nsetenv FOO baz')
+        self.assertIn('setenv FOO baz', self.modtool.show('other/1.0'))
+        self.assertEqual(show_cmds[3:], ['other/1.0'])
+
+        # module file for loaded EasyBuild-generated module is read directly in check_loaded_modules
+        reset_module_caches()
+        os.environ['EBROOTTEST'] = '/software/test/1.0'
+        os.environ['LOADEDMODULES'] = os.pathsep.join(['other/1.0', 'test/1.0'])
+        os.environ['_LMFILES_'] = os.pathsep.join([other_mod_file, test_mod_file])
+        self.modtool.loaded_modules = lambda: ['other/1.0', 'test/1.0']
+        self.assertEqual(self.modtool.loaded_module_files(), {'other/1.0': other_mod_file, 'test/1.0': test_mod_file})
+
+        init_config(build_options={'detect_loaded_modules': 'warn', 'module_show_cache_path': cache_dir})
+        self.mock_stderr(True)
+        self.modtool.check_loaded_modules()
+        stderr = self.get_stderr()
+        self.mock_stderr(False)
+        self.assertIn("* test/1.0", stderr)
+        self.assertNotIn("* other/1.0", stderr)
+        # 'module show' is not run for 'other/1.0' either, since cached output is still valid
+        self.assertEqual(len(show_cmds), 4)
+
+        # persistent cache can be disabled
+        reset_module_caches()
+        init_config(build_options={'module_show_cache_path': ''})
+        self.modtool.show('test/1.0')
+        self.assertEqual(show_cmds[4:], ['test/1.0'])
+
     def test_module_use_unuse(self):
         """Test 'module use' and 'module unuse'."""
         test_dir1 = os.path.join(self.test_prefix, 'one')
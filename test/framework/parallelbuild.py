@@ -35,15 +35,19 @@ from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_
 from unittest import TextTestRunner
 
 from easybuild.framework.easyconfig.tools import process_easyconfig
-from easybuild.tools import config
+from easybuild.tools import config, parallelbuild
+from easybuild.tools.build_history import get_build_history
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import get_module_syntax, update_build_option
-from easybuild.tools.filetools import adjust_permissions, mkdir, read_file, remove_dir, which, write_file
+from easybuild.tools.filetools import adjust_permissions, mkdir, read_file, remove_dir, remove_file, which, write_file
 from easybuild.tools.job import pbs_python
 from easybuild.tools.job.pbs_python import PbsPython
+from easybuild.tools.job.slurm import Slurm
 from easybuild.tools.options import parse_options
-from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel, submit_jobs
+from easybuild.tools.parallelbuild import build_easyconfigs_in_parallel, prepare_easyconfigs, prioritise_easyconfigs
+from easybuild.tools.parallelbuild import submit_jobs
 from easybuild.tools.robot import resolve_dependencies
+from easybuild.tools.toolchain.toolchain import SYSTEM_TOOLCHAIN_NAME
 
 
 # test GC3Pie configuration with large resource specs
@@ -361,9 +365,15 @@ class ParallelBuildTest(EnhancedTestCase):
             'job_cores': 3,
             'job_max_walltime': 5,
             'force': True,
+            'build_history_path': os.path.join(self.test_prefix, 'build_history.db'),
         }
         init_config(args=['--job-backend=Slurm'], build_options=build_options)
 
+        # walltime & memory to request are determined based on build history (if available)
+        build_history = get_build_history()
+        build_history.add_build('gzip', '1.5', 'foss/2018a', 5000.0, cores=3, peak_rss_kb=1024000)
+        build_history.close()
+
         easyconfigs = process_easyconfig(test_ec) + process_easyconfig(foss_ec)
         ordered_ecs = resolve_dependencies(easyconfigs, self.modtool)
         self.mock_stdout(True)
@@ -383,11 +393,198 @@ class ParallelBuildTest(EnhancedTestCase):
             'nodes': 1,
             'ntasks': 3,
             'output': 'gzip-1.5-foss-2018a-%j.out',
-            'time': 300,  # 60*5 (unit is minutes)
+            'mem': '2000M',  # 2 * peak memory usage in build history (unit is MB)
+            'time': 180,  # 2 * build time in build history, rounded up to hours (unit is minutes)
             'wrap': "echo '%s'" % test_ec,
         }
         self.assertEqual(jobs[1].job_specs, expected)
 
+        # without build history, max. walltime is requested
+        self.assertEqual(jobs[0].job_specs['time'], 300)  # 60*5 (unit is minutes)
+        self.assertNotIn('mem', jobs[0].job_specs)
+
+    def test_prioritise_easyconfigs(self):
+        """Test prioritise_easyconfigs function."""
+
+        def spec(name):
+            return {'name': name, 'version': '1.0', 'versionsuffix': '',
+                    'toolchain': {'name': SYSTEM_TOOLCHAIN_NAME, 'version': ''}}
+
+        class FakeEasyConfig(dict):
+            """Minimal easyconfig, with only what is required to prioritise easyconfigs."""
+            def __init__(self, name, deps):
+                super().__init__(spec(name))
+                self.all_dependencies = [spec(dep) for dep in deps]
+
+        class FakeBuildHistory:
+            """Build history that predicts a fixed build time for each software name."""
+            def __init__(self, build_times):
+                self.build_times = build_times
+
+            def predict(self, name, **_):
+                build_time = self.build_times.get(name)
+                return None if build_time is None else {'build_time': build_time, 'peak_rss_kb': None}
+
+        def fake_ecs(specs):
+            return [{'ec': FakeEasyConfig(name, deps), 'full_mod_name': '%s/1.0' % name} for (name, deps) in specs]
+
+        def prioritised_names(specs, build_times):
+            ecs = prioritise_easyconfigs(fake_ecs(specs), FakeBuildHistory(build_times))
+            return [ec['ec']['name'] for ec in ecs]
+
+        # easyconfigs ordered according to dependencies: b depends on a, e depends on c
+        specs = [('a', []), ('c', []), ('d', []), ('b', ['a']), ('e', ['c'])]
+
+        # without build history, original order is retained
+        self.assertEqual(prioritised_names(specs, {}), ['a', 'c', 'd', 'b', 'e'])
+
+        # easyconfigs on longest path of predicted build times come first, but always after their dependencies
+        build_times = {'a': 1, 'b': 100, 'c': 1, 'd': 5, 'e': 50}
+        self.assertEqual(prioritised_names(specs, build_times), ['a', 'b', 'c', 'e', 'd'])
+        build_times = {'a': 1, 'b': 10, 'c': 1, 'd': 50, 'e': 5}
+        self.assertEqual(prioritised_names(specs, build_times), ['d', 'a', 'b', 'c', 'e'])
+
+        # if no easyconfig is ready (cyclic dependencies), first easyconfig that was not handled yet is picked
+        specs = [('x', ['y']), ('y', ['x']), ('z', ['y'])]
+        self.assertEqual(prioritised_names(specs, {'z': 100}), ['x', 'y', 'z'])
+
+        # large numbers of easyconfigs are handled efficiently
+        specs = [('ec%d' % idx, ['ec%d' % (idx - 1)] if idx else []) for idx in range(20000)]
+        self.assertEqual(prioritised_names(specs, {}), [name for (name, _) in specs])
+
+    def test_prepare_easyconfigs(self):
+        """Test preparing easyconfigs (fetching sources) before submitting jobs, in worker processes."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        toy_ec = os.path.join(test_ecs, 't', 'toy', 'toy-0.0.eb')
+        toy_ec_txt = read_file(toy_ec)
+
+        easyconfigs = []
+        for idx in range(3):
+            test_ec = os.path.join(self.test_prefix, 'toy-0.0-test%d.eb' % idx)
+            write_file(test_ec, toy_ec_txt + "\nversionsuffix = '-test%d'" % idx)
+            easyconfigs.extend(process_easyconfig(test_ec))
+
+        # keep track of which process prepares which easyconfig
+        pids_log = os.path.join(self.test_prefix, 'pids.log')
+        orig_prepare_easyconfig = parallelbuild.prepare_easyconfig
+
+        def log_prepare_easyconfig(ec):
+            orig_prepare_easyconfig(ec)
+            write_file(pids_log, '%s %s\n' % (ec['ec']['versionsuffix'], os.getpid()), append=True)
+
+        def prepared_by():
+            res = dict(line.split(' ') for line in read_file(pids_log).strip().split('\n'))
+            remove_file(pids_log)
+            return res
+
+        parallelbuild.prepare_easyconfig = log_prepare_easyconfig
+        try:
+            update_build_option('job_submit_workers', 2)
+            prepare_easyconfigs(easyconfigs)
+            pids = prepared_by()
+            self.assertEqual(sorted(pids), ['-test0', '-test1', '-test2'])
+            self.assertNotIn(str(os.getpid()), pids.values())
+
+            # easyconfigs are prepared in main process if only a single worker can be used
+            update_build_option('job_submit_workers', 1)
+            prepare_easyconfigs(easyconfigs)
+            self.assertEqual(set(prepared_by().values()), {str(os.getpid())})
+        finally:
+            parallelbuild.prepare_easyconfig = orig_prepare_easyconfig
+
+        # errors that occur in worker processes are passed to main process
+        update_build_option('job_submit_workers', 2)
+        test_ec = os.path.join(self.test_prefix, 'toy-0.0-nosuchsource.eb')
+        write_file(test_ec, toy_ec_txt + "\nsources = ['nosuchsource.tar.gz']")
+        easyconfigs[1] = process_easyconfig(test_ec)[0]
+        error_pattern = "An error occurred while preparing .*nosuchsource.tar.gz"
+        with self.mocked_stdout_stderr():
+            self.assertErrorRegex(EasyBuildError, error_pattern, prepare_easyconfigs, easyconfigs)
+
+    def test_slurm_bulk_submission(self):
+        """Test bulk submission of jobs with Slurm backend, using fake 'sbatch' and 'scontrol' commands."""
+
+        sbatch_log = os.path.join(self.test_prefix, 'sbatch.log')
+        scontrol_log = os.path.join(self.test_prefix, 'scontrol.log')
+
+        # fake 'sbatch' that determines job ID based on job name, and logs submitted jobs
+        sbatch = os.path.join(self.test_prefix, 'bin', 'sbatch')
+        write_file(sbatch, '\n'.join([
+            "#!/bin/bash",
+            "if [[ $1 == '--version' ]]; then",
+            "    echo 'slurm 23.02'",
+            "    exit 0",
+            "fi",
+            "for arg in \"$@\"; do",
+            "    if [[ $arg =~ ^job([0-9]+)$ ]]; then",
+            "        jobid=$((100 + BASH_REMATCH[1]))",
+            "    fi",
+            "done",
+            "echo \"$jobid $@\" >> %s" % sbatch_log,
+            "echo \"Submitted batch job $jobid\"",
+        ]))
+        scontrol = os.path.join(self.test_prefix, 'bin', 'scontrol')
+        write_file(scontrol, '#!/bin/bash\necho "$@" >> %s' % scontrol_log)
+        for cmd in (sbatch, scontrol):
+            adjust_permissions(cmd, stat.S_IXUSR, add=True)
+
+        os.environ['PATH'] = os.path.pathsep.join([os.path.join(self.test_prefix, 'bin'), os.getenv('PATH')])
+
+        update_build_option('job_max_walltime', 24)
+        update_build_option('job_submit_workers', 3)
+
+        backend = Slurm()
+        backend.init()
+
+        jobs = {}
+        for idx in range(1, 7):
+            jobs[idx] = backend.make_job("echo %d" % idx, 'job%d' % idx, hours=1, cores=2)
+            jobs[idx].module = 'mod%d' % idx
+
+        job_deps = {
+            2: [1],
+            3: [1],
+            4: [2, 3],
+            6: [4],
+        }
+        for idx in sorted(jobs):
+            backend.queue(jobs[idx], dependencies=[jobs[x] for x in job_deps.get(idx, [])])
+
+        # jobs are only submitted when complete is called
+        self.assertNotExists(sbatch_log)
+        self.assertEqual([j.jobid for j in jobs.values()], [None] * 6)
+
+        self.mock_stdout(True)
+        backend.complete()
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+
+        self.assertEqual([j.jobid for j in jobs.values()], ['101', '102', '103', '104', '105', '106'])
+        self.assertIn("List of submitted jobs (6): job1 (mod1): 101; job2 (mod2): 102; ", stdout)
+
+        self.assertEqual(jobs[1].job_specs.get('dependency'), None)
+        self.assertEqual(jobs[4].job_specs['dependency'], 'afterok:102:103')
+        self.assertEqual(jobs[6].job_specs['dependency'], 'afterok:104')
+        for job in jobs.values():
+            self.assertEqual(job.job_specs['hold'], True)
+
+        # each job is submitted once, and only after the jobs it depends on
+        submitted = [line.split(' ')[0] for line in read_file(sbatch_log).strip().split('\n')]
+        self.assertEqual(sorted(submitted), ['101', '102', '103', '104', '105', '106'])
+        for idx, deps in job_deps.items():
+            for dep in deps:
+                self.assertTrue(submitted.index(str(100 + dep)) < submitted.index(str(100 + idx)))
+
+        # all holds are released at once
+        self.assertEqual(read_file(scontrol_log), "release 101 102 103 104 105 106\n")
+
+        # error is raised if dependencies can not be satisfied
+        backend.init()
+        job = backend.make_job("echo 7", 'job7', hours=1, cores=2)
+        backend.queue(job, dependencies=[backend.make_job("echo 8", 'job8')])
+        error_pattern = "Failed to submit jobs, dependencies can not be satisfied: job7"
+        self.assertErrorRegex(EasyBuildError, error_pattern, backend.complete)
+
 
 def suite(loader=None):
     """ returns all the testcases in this module """
@@ -27,17 +27,20 @@ Unit tests for repository.py.
 
 @author: Toon Willems (Ghent University)
 """
+import json
 import os
 import re
 import shutil
 import sys
 import tempfile
+import threading
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
 from unittest import TextTestRunner, mock
 
 from easybuild.framework.easyconfig.parser import EasyConfigParser
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import read_file
+from easybuild.tools.config import update_build_option
+from easybuild.tools.filetools import read_file, remove_dir, write_file
 from easybuild.tools.repository.filerepo import FileRepository
 from easybuild.tools.repository.gitrepo import GitRepository
 from easybuild.tools.repository.svnrepo import SvnRepository
@@ -165,6 +168,142 @@ class RepositoryTest(EnhancedTestCase):
         path = repo.add_easyconfig(toy_eb_file, 'test', '1.0', {'time': 1.23, 'size': 123}, [{'time': 0.9, 'size': 2}])
         check_ec(path, [{'time': 0.9, 'size': 2}, {'time': 1.23, 'size': 123}])
 
+    def test_get_buildstats(self):
+        """Test obtaining build stats from repository, via build stats index or archived easyconfigs."""
+        repo = init_repository('FileRepository', self.path)
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs')
+        toy_eb_file = os.path.join(test_easyconfigs, 'test_ecs', 't', 'toy', 'toy-0.0.eb')
+
+        self.assertEqual(repo.get_buildstats('toy', '0.0'), [])
+
+        repo.add_easyconfig(toy_eb_file, 'toy', '0.0', {'build_time': 12.3}, None)
+        repo.add_easyconfig(toy_eb_file, 'foo', '1.0', {'build_time': 4.5}, [{'build_time': 6.7}])
+        index_path = os.path.join(self.path, 'buildstats_index.json')
+        self.assertEqual(repo.buildstats_index_path(), index_path)
+        self.assertExists(index_path)
+
+        expected = {
+            ('toy', '0.0'): [{'build_time': 12.3}],
+            ('foo', '1.0'): [{'build_time': 6.7}, {'build_time': 4.5}],
+            ('bar', '2.0'): [],
+        }
+        # build stats index is only read once, archived easyconfigs are not parsed if index has an entry
+        with mock.patch('easybuild.tools.repository.filerepo.EasyConfigParser') as mocked_parser:
+            with mock.patch.object(repo, 'read_buildstats_index', wraps=repo.read_buildstats_index) as mocked_read:
+                self.assertEqual(repo.get_buildstats_batch(list(expected)), expected)
+        self.assertEqual(mocked_read.call_count, 1)
+        mocked_parser.assert_not_called()
+
+        self.assertEqual(repo.get_buildstats('foo', '1.0'), [{'build_time': 6.7}, {'build_time': 4.5}])
+
+        # fall back to parsing archived easyconfig if there's no (usable) build stats index
+        write_file(index_path, "this is not JSON")
+        self.assertEqual(repo.get_buildstats_batch(list(expected)), expected)
+        os.remove(index_path)
+        self.assertEqual(repo.get_buildstats_batch(list(expected)), expected)
+
+        # concurrent updates of build stats index don't get lost
+        def update_index(idx):
+            for cnt in range(10):
+                repo.update_buildstats_index('test%d' % idx, str(cnt), [{'build_time': cnt}])
+
+        threads = [threading.Thread(target=update_index, args=(idx,)) for idx in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        index = repo.read_buildstats_index()
+        self.assertEqual(len(index), 80)
+        self.assertEqual(index['test7/9'], [{'build_time': 9}])
+
+        # a working copy is only shared for repositories that support it
+        self.assertFalse(repo is init_repository('FileRepository', self.path))
+        with mock.patch.object(FileRepository, 'SHARED_WORKING_COPY', True):
+            repo = init_repository('FileRepository', self.path)
+            self.assertTrue(repo is init_repository('FileRepository', self.path))
+            repo.initialized = False
+            self.assertFalse(repo is init_repository('FileRepository', self.path))
+
+    def test_batched_commits(self):
+        """Test batching of commits to repository, incl. journal of pending changes."""
+        commits = []
+
+        class TestRepository(FileRepository):
+            """Test repository that keeps track of commits."""
+            BATCHED_COMMITS = True
+
+            def stage_file(self, path):
+                pass
+
+            def commit(self, msg=None):
+                commits.append(msg)
+
+        journal_dir = os.path.join(self.test_prefix, 'journal')
+        update_build_option('repository_journal_path', journal_dir)
+        update_build_option('repository_commit_interval', 2)
+
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs')
+        toy_eb_file = os.path.join(test_easyconfigs, 'test_ecs', 't', 'toy', 'toy-0.0.eb')
+
+        repo = TestRepository(self.path)
+        repo.init()
+        journal = repo.journal_path()
+        self.assertEqual(os.path.dirname(journal), journal_dir)
+
+        # first commit is postponed, pending changes are recorded in journal
+        path = repo.add_easyconfig(toy_eb_file, 'toy', '0.0', {'build_time': 1.0}, None)
+        repo.queue_commit("Built toy/0.0", [path])
+        self.assertEqual(commits, [])
+        self.assertExists(journal)
+        entries = json.loads(read_file(journal))
+        self.assertEqual(entries['msgs'], ["Built toy/0.0"])
+        self.assertEqual(sorted(entries['files']), ['buildstats_index.json', os.path.join('toy', 'toy-0.0.eb')])
+
+        # pending changes are committed at once when commit interval is reached, journal is removed
+        path = repo.add_easyconfig(toy_eb_file, 'foo', '1.0', {'build_time': 2.0}, None)
+        repo.queue_commit("Built foo/1.0", [path])
+        self.assertEqual(commits, ["Built toy/0.0, Built foo/1.0"])
+        self.assertNotExists(journal)
+
+        # with a commit interval of 0, changes are only committed when flushing pending commits,
+        # which is also done when EasyBuild exits (even if an installation failed)
+        update_build_option('repository_commit_interval', 0)
+        repo.queue_commit("Built toy/0.0", [path])
+        self.assertEqual(len(commits), 1)
+        self.assertExists(journal)
+        self.assertTrue(repo.flush_at_exit)
+        repo.flush_commits_at_exit()
+        self.assertEqual(commits[1:], ["Built toy/0.0"])
+        self.assertNotExists(journal)
+        repo.flush_commits_at_exit()
+        self.assertEqual(len(commits), 2)
+
+        repo.init()
+        repo.queue_commit("Built foo/1.0", [path])
+        self.assertEqual(len(commits), 2)
+        repo.flush_commits()
+        self.assertEqual(commits[2:], ["Built foo/1.0"])
+
+        # journal left behind by an EasyBuild session that is no longer running is committed when initialising
+        repo.queue_commit("Built foo/1.0", [path])
+        dead_journal = repo.journal_path(pid=99999999)
+        os.rename(journal, dead_journal)
+        # mimic EasyBuild session that was killed before committing pending changes
+        repo.pending_files, repo.pending_msgs = [], []
+        remove_dir(self.path)
+
+        repo = TestRepository(self.path)
+        repo.init()
+        self.assertEqual(commits[3:], ["Built foo/1.0 (recovered from journal)"])
+        self.assertExists(os.path.join(self.path, 'foo', 'foo-1.0.eb'))
+        self.assertNotExists(dead_journal)
+
+        # commits are not postponed for repositories that do not support batching
+        repo = init_repository('FileRepository', self.path)
+        with mock.patch.object(FileRepository, 'commit') as mocked_commit:
+            repo.queue_commit("Built toy/0.0", [path])
+        mocked_commit.assert_called_once_with("Built toy/0.0")
+
     def tearDown(self):
         """Clean up after test."""
         super().tearDown()
@@ -33,6 +33,7 @@ import re
 import shutil
 import sys
 import tempfile
+import time
 from copy import deepcopy
 from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
@@ -40,6 +41,8 @@ from unittest import TextTestRunner
 import easybuild.framework.easyconfig.easyconfig as ecec
 import easybuild.tools.build_log
 import easybuild.tools.robot as robot
+import easybuild.tools.toolchain.hierarchy as tc_hierarchy
+from easybuild.base import fancylogger
 from easybuild.framework.easyconfig.easyconfig import process_easyconfig, EasyConfig
 from easybuild.framework.easyconfig.tools import alt_easyconfig_paths, find_resolved_modules, parse_easyconfigs
 from easybuild.framework.easyconfig.tweak import tweak
@@ -50,7 +53,7 @@ from easybuild.tools import config, modules
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import module_classes
 from easybuild.tools.configobj import ConfigObj
-from easybuild.tools.filetools import copy_file, mkdir, read_file, write_file
+from easybuild.tools.filetools import copy_dir, copy_file, mkdir, read_file, write_file
 from easybuild.tools.github import fetch_github_token
 from easybuild.tools.module_naming_scheme.utilities import det_full_ec_version
 from easybuild.tools.modules import invalidate_module_caches_for, reset_module_caches
@@ -610,6 +613,61 @@ class RobotTest(EnhancedTestCase):
         self.assertEqual(res[1]['full_mod_name'], 'test/123')
         self.assertEqual(res[0]['full_mod_name'], 'somedep/4.5.6')
 
+    def test_resolve_dependencies_debug_logging(self):
+        """Benchmark resolving dependencies with and without debug logging."""
+        init_config(build_options={'robot_path': None, 'validate': False})
+
+        # long chain of easyconfigs that each depend on the next one (in reverse order, to maximize work)
+        cnt = 100
+        ecs = []
+        for idx in range(cnt):
+            deps = []
+            if idx + 1 < cnt:
+                deps.append({'name': 'dep%d' % (idx + 1), 'version': '1.0', 'versionsuffix': '',
+                             'toolchain': {'name': 'system', 'version': 'system'}, 'system': True, 'hidden': False,
+                             'full_mod_name': 'dep%d/1.0' % (idx + 1)})
+            ecs.append({
+                'ec': {'name': 'dep%d' % idx, 'version': '1.0', 'versionsuffix': '',
+                       'toolchain': {'name': 'system', 'version': 'system'}},
+                'spec': 'dep%d-1.0.eb' % idx,
+                'short_mod_name': 'dep%d/1.0' % idx,
+                'full_mod_name': 'dep%d/1.0' % idx,
+                'dependencies': deps,
+                'parsed': True,
+            })
+
+        timings, logtxts, results = {}, {}, {}
+        orig_level = fancylogger.getLogger().getEffectiveLevel()
+        try:
+            for debug in (False, True):
+                if debug:
+                    fancylogger.setLogLevelDebug()
+                else:
+                    fancylogger.setLogLevelInfo()
+                with self.log_to_testlogfile():
+                    start = time.time()
+                    res = resolve_dependencies(deepcopy(ecs), self.modtool)
+                    timings[debug] = time.time() - start
+                logtxts[debug] = read_file(self.logfile)
+                results[debug] = [ec['full_mod_name'] for ec in res]
+        finally:
+            fancylogger.setLogLevel(orig_level)
+
+        expected = ['dep%d/1.0' % idx for idx in reversed(range(cnt))]
+        self.assertEqual(results[False], expected)
+        self.assertEqual(results[True], expected)
+
+        # (large) debug log messages are only formatted and written with debug logging enabled
+        self.assertNotIn("easyconfigs before resolving deps", logtxts[False])
+        self.assertIn("easyconfigs before resolving deps", logtxts[True])
+        self.assertIn("Dependency resolution complete", logtxts[False])
+        self.assertGreater(len(logtxts[True]), len(logtxts[False]) * 100)
+
+        # resolving dependencies without debug logging should not be slower than with debug logging,
+        # allow for some noise in timings since this is a small benchmark
+        self.assertLess(timings[False], timings[True] * 2 + 1,
+                        "timings (debug off/on): %.3fs / %.3fs" % (timings[False], timings[True]))
+
     def test_det_easyconfig_paths(self):
         """Test det_easyconfig_paths function (without --from-pr)."""
         fd, dummylogfn = tempfile.mkstemp(prefix='easybuild-dummy', suffix='.log')
@@ -1036,6 +1094,97 @@ class RobotTest(EnhancedTestCase):
         error_msg = "Multiple versions of GCC found in dependencies of toolchain gompi: 4.6.4, 6.4.0-2.28"
         self.assertErrorRegex(EasyBuildError, error_msg, get_toolchain_hierarchy, tc)
 
+    def test_toolchain_hierarchy_table(self):
+        """Test use of persistent toolchain hierarchy table by get_toolchain_hierarchy."""
+        test_ecs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        robot_path = os.path.join(self.test_prefix, 'ecs')
+        copy_dir(test_ecs, robot_path)
+        table_path = os.path.join(self.test_prefix, 'tc_hierarchy.json')
+        init_config(build_options={
+            'robot_path': robot_path,
+            'toolchain_hierarchy_path': table_path,
+            'valid_module_classes': module_classes(),
+        })
+        self.assertEqual(tc_hierarchy.det_toolchain_hierarchy_path(), table_path)
+
+        foss = {'name': 'foss', 'version': '2018a'}
+        expected = [
+            {'name': 'GCC', 'version': '6.4.0-2.28'},
+            {'name': 'golf', 'version': '2018a'},
+            {'name': 'gompi', 'version': '2018a'},
+            {'name': 'foss', 'version': '2018a'},
+        ]
+        get_toolchain_hierarchy.clear()
+        self.assertEqual(get_toolchain_hierarchy(foss), expected)
+        self.assertExists(table_path)
+        table = tc_hierarchy.ToolchainHierarchyTable(table_path)
+        # toolchain hierarchies for subtoolchains are determined (and stored) too when parsing easyconfig files
+        self.assertEqual(sorted(table.entries), ['GCC/6.4.0-2.28/False', 'foss/2018a/False', 'gompi/2018a/False'])
+        self.assertEqual(table.entries['foss/2018a/False']['hierarchy'], expected)
+
+        # easyconfig files are not parsed again when toolchain hierarchy is found in table (e.g. in a new session)
+        orig_process_easyconfig = ecec.process_easyconfig
+
+        def fail_process_easyconfig(*args, **kwargs):
+            raise EasyBuildError("easyconfig files should not be parsed")
+
+        ecec.process_easyconfig = fail_process_easyconfig
+        try:
+            get_toolchain_hierarchy.clear()
+            self.assertEqual(get_toolchain_hierarchy(foss), expected)
+
+            # entry is not used anymore if easyconfig file involved in toolchain hierarchy was changed
+            gompi_ec = os.path.join(robot_path, 'g', 'gompi', 'gompi-2018a.eb')
+            write_file(gompi_ec, "\n# changed", append=True)
+            get_toolchain_hierarchy.clear()
+            self.assertErrorRegex(EasyBuildError, "should not be parsed", get_toolchain_hierarchy, foss)
+
+            # same when context changes, e.g. different configuration
+            ecec.process_easyconfig = orig_process_easyconfig
+            get_toolchain_hierarchy.clear()
+            self.assertEqual(get_toolchain_hierarchy(foss), expected)
+            ecec.process_easyconfig = fail_process_easyconfig
+            get_toolchain_hierarchy.clear()
+            self.assertEqual(get_toolchain_hierarchy(foss), expected)
+
+            init_config(build_options={
+                'add_system_to_minimal_toolchains': True,
+                'robot_path': robot_path,
+                'toolchain_hierarchy_path': table_path,
+                'valid_module_classes': module_classes(),
+            })
+            get_toolchain_hierarchy.clear()
+            self.assertErrorRegex(EasyBuildError, "should not be parsed", get_toolchain_hierarchy, foss)
+
+            # a parse hook may change dependencies, so entry is not used anymore if hooks file is changed
+            hooks_file = os.path.join(self.test_prefix, 'hooks.py')
+            write_file(hooks_file, "def parse_hook(ec):\n    pass\n")
+            init_config(build_options={
+                'hooks': hooks_file,
+                'robot_path': robot_path,
+                'toolchain_hierarchy_path': table_path,
+                'valid_module_classes': module_classes(),
+            })
+            get_toolchain_hierarchy.clear()
+            self.assertErrorRegex(EasyBuildError, "should not be parsed", get_toolchain_hierarchy, foss)
+            ecec.process_easyconfig = orig_process_easyconfig
+            get_toolchain_hierarchy.clear()
+            self.assertEqual(get_toolchain_hierarchy(foss), expected)
+            ecec.process_easyconfig = fail_process_easyconfig
+            get_toolchain_hierarchy.clear()
+            self.assertEqual(get_toolchain_hierarchy(foss), expected)
+
+            write_file(hooks_file, "def parse_hook(ec):\n    ec['dependencies'] = []\n")
+            get_toolchain_hierarchy.clear()
+            self.assertErrorRegex(EasyBuildError, "should not be parsed", get_toolchain_hierarchy, foss)
+        finally:
+            ecec.process_easyconfig = orig_process_easyconfig
+
+        # an empty value disables the toolchain hierarchy table
+        init_config(build_options={'robot_path': robot_path, 'toolchain_hierarchy_path': ''})
+        self.assertEqual(tc_hierarchy.det_toolchain_hierarchy_path(), None)
+        self.assertEqual(tc_hierarchy.get_toolchain_hierarchy_table(), None)
+
     def test_find_resolved_modules(self):
         """Test find_resolved_modules function."""
         nodeps = {
@@ -1315,6 +1464,45 @@ class RobotTest(EnhancedTestCase):
         sqlite = bar.dependencies()[3]
         self.assertEqual(det_full_ec_version(sqlite), '3.8.10.2-foss-2018a')
 
+    def test_robot_find_subtoolchains_for_deps(self):
+        """Test robot_find_subtoolchains_for_deps."""
+        test_easyconfigs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'easyconfigs', 'test_ecs')
+        init_config(build_options={'robot_path': test_easyconfigs})
+
+        foss = {'name': 'foss', 'version': '2018a'}
+        deps = [
+            {'name': 'gzip', 'version': '1.5', 'versionsuffix': '', 'toolchain': foss},
+            {'name': 'gzip', 'version': '1.4', 'versionsuffix': '', 'toolchain': foss},
+            {'name': 'SQLite', 'version': '3.8.10.2', 'versionsuffix': '', 'toolchain': foss, 'hidden': False},
+        ]
+
+        exist_calls = []
+
+        class FakeModtool:
+            """Fake modules tool, which keeps track of checks for existence of modules."""
+            def available(self):
+                return []
+
+            def exist(self, mod_names, **kwargs):
+                exist_calls.append(mod_names)
+                return [mod_name == 'SQLite/3.8.10.2-GCC-6.4.0-2.28' for mod_name in mod_names]
+
+        modtool = FakeModtool()
+        get_toolchain_hierarchy.clear()
+
+        res = ecec.robot_find_subtoolchains_for_deps(deps, modtool)
+        self.assertEqual(res, [foss, None, {'name': 'GCC', 'version': '6.4.0-2.28'}])
+        self.assertEqual(res, [robot_find_subtoolchain_for_dep(dep, modtool) for dep in deps])
+        self.assertEqual(exist_calls, [])
+
+        # existence of modules for candidate subtoolchains is checked in one go for all dependencies
+        res = ecec.robot_find_subtoolchains_for_deps(deps, modtool, parent_first=True)
+        self.assertEqual(res, [foss, None, foss])
+        self.assertEqual(len(exist_calls), 1)
+        self.assertIn('SQLite/3.8.10.2-GCC-6.4.0-2.28', exist_calls[0])
+        self.assertIn('gzip/1.5-foss-2018a', exist_calls[0])
+        self.assertEqual(res, [robot_find_subtoolchain_for_dep(dep, modtool, parent_first=True) for dep in deps])
+
     def test_robot_find_subtoolchain_for_dep_ecs_vs_mods(self):
         """
         Test behaviour of robot_find_subtoolchain_for_dep
@@ -1518,6 +1706,57 @@ class RobotTest(EnhancedTestCase):
         # use of multi_deps should not result in false positives in check_conflicts
         self.assertFalse(check_conflicts(ecs, self.modtool))
 
+    def test_check_conflicts_scaling(self):
+        """Test determining transitive dependencies and conflicts for check_conflicts on large synthetic graphs."""
+        # long chain of runtime dependencies: each node depends (transitively) on all nodes after it
+        cnt = 1000
+        keys = [('dep%d' % i, '1.0') for i in range(cnt)]
+        deps_for = {key: ([], keys[idx + 1:idx + 2], []) for idx, key in enumerate(keys)}
+        deps_for[('top', '1.0')] = ([keys[cnt // 2]], [keys[0]], [])
+        dep_of = {}
+        robot.expand_deps_for(deps_for, dep_of)
+
+        self.assertEqual(deps_for[keys[0]], ([], sorted(keys[1:]), []))
+        self.assertEqual(deps_for[keys[-2]], ([], [keys[-1]], []))
+        self.assertEqual(deps_for[keys[-1]], ([], [], []))
+        self.assertEqual(deps_for[('top', '1.0')], (sorted(keys[cnt // 2:]), sorted(keys), []))
+        self.assertEqual(len(dep_of[keys[-1]]), cnt)
+        self.assertEqual(dep_of[keys[1]], {keys[0], ('top', '1.0')})
+
+        # build deps are extended with runtime deps of build deps, but not with build deps of build deps
+        deps_for = {
+            ('app', '1.0'): ([('tool', '1.0')], [('lib', '1.0')], []),
+            ('tool', '1.0'): ([('cmake', '1.0')], [('zlib', '1.0')], []),
+            ('lib', '1.0'): ([], [('zlib', '1.1')], []),
+            ('cmake', '1.0'): ([], [], []),
+            ('zlib', '1.0'): ([], [], []),
+            ('zlib', '1.1'): ([], [], []),
+        }
+        robot.expand_deps_for(deps_for, {})
+        self.assertEqual(deps_for[('app', '1.0')], ([('tool', '1.0'), ('zlib', '1.0')],
+                                                    [('lib', '1.0'), ('zlib', '1.1')], []))
+
+        # cyclic dependencies are reported
+        deps_for = {('a', '1'): ([], [('b', '1')], []), ('b', '1'): ([], [('a', '1')], [])}
+        self.assertErrorRegex(EasyBuildError, "Cyclic dependency", robot.expand_deps_for, deps_for, {})
+
+        # conflicts are determined by bucketing dependencies by name, but reported in order
+        build_deps = [('dep%d' % i, '1.0') for i in range(cnt)] + [('foo', '1.0')]
+        runtime_deps = [('foo', '2.0'), ('bar', '1.0'), ('dep0', '2.0'), ('foo', '1.0')]
+        res = robot.det_conflicting_deps(('top', '1.0'), build_deps, runtime_deps)
+        expected = [
+            (('dep0', '1.0'), ('dep0', '2.0')),
+            (('foo', '1.0'), ('foo', '2.0')),
+            (('foo', '2.0'), ('foo', '1.0')),
+        ]
+        self.assertEqual(res, expected)
+
+        # software itself can not conflict with its build dependencies
+        res = robot.det_conflicting_deps(('foo', '1.0'), [('foo', '1.0'), ('foo', '2.0')], [])
+        self.assertEqual(res, [])
+        res = robot.det_conflicting_deps(('foo', '1.0'), [('foo', '2.0')], [('foo', '1.0')])
+        self.assertEqual(res, [(('foo', '2.0'), ('foo', '1.0'))])
+
     def test_robot_archived_easyconfigs(self):
         """Test whether robot can pick up archived easyconfigs when asked."""
 
@@ -120,6 +120,33 @@ class RunTest(EnhancedTestCase):
                 stderr = re_clr.sub('', stderr)
                 self.assertRegex(stderr, pattern)
 
+        # most relevant error lines in output of command are included
+        out_file = os.path.join(self.test_prefix, 'out.txt')
+        output = '\n'.join([
+            "compiling foo.c",
+            "foo.c:1:2: error: expected ';' before '}' token",
+            "make: *** [Makefile:2: foo.o] Error 1",
+        ])
+        write_file(out_file, output)
+        cmd = res._asdict()
+        cmd.update({'output': output, 'out_file': out_file})
+        err = RunShellCmdError(RunShellCmdResult(**cmd), err.caller_info)
+
+        excerpts = err.error_excerpts()
+        self.assertEqual([(e.category, e.line_nr) for e in excerpts], [('compiler', 2)])
+
+        with self.mocked_stdout_stderr():
+            err.print()
+            stderr = self.get_stderr()
+        stderr = re_clr.sub('', stderr)
+        self.assertIn("compiler error in output (line 2):", stderr)
+        self.assertIn("2: foo.c:1:2: error: expected ';' before '}' token", stderr)
+
+        # in-memory output is used if output file is not available
+        cmd['out_file'] = None
+        err = RunShellCmdError(RunShellCmdResult(**cmd), err.caller_info)
+        self.assertEqual([(e.category, e.line_nr) for e in err.error_excerpts()], [('compiler', 2)])
+
     def test_get_output_from_process(self):
         """Test for get_output_from_process utility function."""
 
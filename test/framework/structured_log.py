@@ -0,0 +1,219 @@
+# #
+# Copyright 2026-2026 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+# #
+"""
+Unit tests for structured logs
+"""
+import lzma
+import os
+import sys
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+from unittest import TextTestRunner
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import move_logs, write_file
+from easybuild.tools.run import run_shell_cmd
+from easybuild.tools.structured_log import HAVE_ZSTANDARD, LOG_SECTION_COMMAND, LOG_SECTION_LOG, LOG_SECTION_STEP
+from easybuild.tools.structured_log import StructuredLog
+from easybuild.tools.structured_log import get_failed_command_output, get_log_section_text, get_structured_log
+from easybuild.tools.structured_log import is_structured_log_file, log_section, read_structured_log_index
+from easybuild.tools.structured_log import start_structured_log, stop_structured_log
+
+
+class StructuredLogTest(EnhancedTestCase):
+    """Tests for structured logs."""
+
+    def setUp(self):
+        """Set up test."""
+        super().setUp()
+        self.orig_log_level = fancylogger.getLogger().getEffectiveLevel()
+        fancylogger.setLogLevelInfo()
+
+    def tearDown(self):
+        """Cleanup after test."""
+        stop_structured_log()
+        fancylogger.setLogLevel(self.orig_log_level)
+        super().tearDown()
+
+    def test_structured_log(self):
+        """Test writing and reading of structured log."""
+        logfile = os.path.join(self.test_prefix, 'easybuild-test.log')
+        write_file(logfile, '')
+        log = fancylogger.getLogger('test_structured_log', fname=False)
+
+        self.assertEqual(get_structured_log(), None)
+        self.assertEqual(read_structured_log_index(logfile), None)
+        self.assertEqual(get_failed_command_output(logfile), None)
+
+        # nothing happens when no structured log is being written
+        with log_section(LOG_SECTION_STEP, 'configure'):
+            run_shell_cmd("echo not-in-structured-log", hidden=True)
+
+        structured_log = start_structured_log(logfile)
+        self.assertIsInstance(structured_log, StructuredLog)
+        self.assertEqual(get_structured_log(), structured_log)
+        self.assertEqual(structured_log.path, logfile + '.xz')
+        self.assertEqual(structured_log.index_path, logfile + '.index')
+
+        log.info("before any step")
+        with log_section(LOG_SECTION_STEP, 'configure'):
+            log.info("configuring")
+            run_shell_cmd("echo configure-output", hidden=True)
+            log.info("configured")
+            run_shell_cmd("echo build-error-output && exit 3", fail_on_error=False, hidden=True)
+        try:
+            with log_section(LOG_SECTION_STEP, 'build'):
+                log.info("building")
+                raise EasyBuildError("build failed")
+        except EasyBuildError:
+            pass
+        log.info("after all steps")
+
+        self.assertEqual(stop_structured_log(), structured_log)
+        self.assertEqual(get_structured_log(), None)
+
+        log_format, path, entries = read_structured_log_index(logfile)
+        self.assertEqual(log_format, 'xz')
+        self.assertEqual(path, logfile + '.xz')
+
+        sections = [(e['kind'], e['name'], e['part'], e['depth'], e.get('end', False)) for e in entries]
+        expected = [
+            ('log', 'easybuild-test.log', 0, 0, False),
+            ('step', 'configure', 0, 1, False),
+            ('command', "echo configure-output", 0, 2, True),
+            ('step', 'configure', 1, 1, False),
+            ('command', "echo build-error-output && exit 3", 0, 2, True),
+            ('step', 'configure', 2, 1, True),
+            ('step', 'build', 0, 1, True),
+            ('log', 'easybuild-test.log', 1, 0, True),
+        ]
+        self.assertEqual(sections, expected)
+        self.assertEqual([e['exit_code'] for e in entries if e['kind'] == LOG_SECTION_COMMAND], [0, 3])
+        self.assertEqual([e['failed'] for e in entries if e['kind'] == LOG_SECTION_STEP and e.get('end')],
+                         [False, True])
+        for entry in entries:
+            if entry.get('end'):
+                self.assertTrue(entry['duration'] >= 0)
+
+        # segments are independently compressed, and can be read separately
+        txt = get_log_section_text(logfile, LOG_SECTION_STEP, name='configure')
+        self.assertIn("configuring", txt)
+        self.assertIn("configured", txt)
+        self.assertNotIn("configure-output", txt)
+
+        txt = get_log_section_text(logfile, LOG_SECTION_COMMAND, last=False)
+        self.assertIn("shell command (stdout + stderr):\nconfigure-output", txt)
+        self.assertNotIn("build-error-output", txt)
+
+        txt = get_log_section_text(logfile, LOG_SECTION_STEP, failed_only=True)
+        self.assertIn("building", txt)
+        self.assertEqual(get_log_section_text(logfile, LOG_SECTION_STEP, name='install'), None)
+
+        txt = get_failed_command_output(logfile)
+        self.assertIn("FAILED (exit code 3)", txt)
+        self.assertIn("build-error-output", txt)
+        self.assertNotIn("configure-output", txt)
+
+        # structured log as a whole is a valid xz file
+        with lzma.open(logfile + '.xz', 'rt') as fh:
+            txt = fh.read()
+        for msg in ["before any step", "configuring", "configure-output", "build-error-output", "after all steps"]:
+            self.assertIn(msg, txt)
+        self.assertNotIn("not-in-structured-log", txt)
+
+        self.assertTrue(is_structured_log_file(logfile + '.xz'))
+        self.assertTrue(is_structured_log_file(logfile + '.index'))
+        self.assertFalse(is_structured_log_file(logfile))
+
+        error_pattern = "Unknown structured log format: foo"
+        self.assertErrorRegex(EasyBuildError, error_pattern, start_structured_log, logfile, log_format='foo')
+        if not HAVE_ZSTANDARD:
+            error_pattern = "Python 'zstandard' package is required"
+            self.assertErrorRegex(EasyBuildError, error_pattern, start_structured_log, logfile, log_format='zstd')
+
+    def test_structured_log_move_logs(self):
+        """Test reading structured log after log files were moved."""
+        logfile = os.path.join(self.test_prefix, 'easybuild-test-abc123.log')
+        write_file(logfile, '')
+        log = fancylogger.getLogger('test_structured_log_move_logs', fname=False)
+
+        start_structured_log(logfile)
+        with log_section(LOG_SECTION_STEP, 'build'):
+            log.info("building")
+            run_shell_cmd("echo build-error-output && exit 3", fail_on_error=False, hidden=True)
+        stop_structured_log()
+
+        # log files are moved to a different location (with a different name) at the end of an installation
+        target_logfile = os.path.join(self.test_prefix, 'software', 'test', '1.0', 'easybuild', 'easybuild-test.log')
+        move_logs(logfile, target_logfile)
+        self.assertNotExists(logfile + '.xz')
+
+        log_format, path, _ = read_structured_log_index(target_logfile)
+        self.assertEqual(log_format, 'xz')
+        self.assertEqual(path, target_logfile + '.xz')
+
+        txt = get_failed_command_output(target_logfile)
+        self.assertIn("FAILED (exit code 3)", txt)
+        self.assertIn("build-error-output", txt)
+        self.assertIn("building", get_log_section_text(target_logfile, LOG_SECTION_STEP, name='build'))
+
+    def test_structured_log_command_error(self):
+        """Test that section for shell command is ended in structured log when running it fails unexpectedly."""
+        logfile = os.path.join(self.test_prefix, 'easybuild-test.log')
+        write_file(logfile, '')
+        log = fancylogger.getLogger('test_structured_log_command_error', fname=False)
+
+        structured_log = start_structured_log(logfile)
+        with log_section(LOG_SECTION_STEP, 'configure'):
+            error_pattern = "No matching questions found for current command output"
+            self.assertErrorRegex(EasyBuildError, error_pattern, run_shell_cmd, "echo 'question?'; read answer",
+                                  qa_patterns=[('not-asked', 'answer')], qa_timeout=1, hidden=True)
+            self.assertEqual([s.kind for s in structured_log.sections], [LOG_SECTION_LOG, LOG_SECTION_STEP])
+            log.info("after failed command")
+        stop_structured_log()
+
+        _, _, entries = read_structured_log_index(logfile)
+        cmd_entries = [e for e in entries if e['kind'] == LOG_SECTION_COMMAND]
+        self.assertEqual(len(cmd_entries), 1)
+        self.assertTrue(cmd_entries[0]['end'])
+        self.assertTrue(cmd_entries[0]['failed'])
+        self.assertNotIn('exit_code', cmd_entries[0])
+
+        self.assertIn("read answer", get_failed_command_output(logfile))
+        self.assertNotIn("after failed command", get_failed_command_output(logfile))
+        self.assertIn("after failed command", get_log_section_text(logfile, LOG_SECTION_STEP, name='configure'))
+
+
+def suite(loader=None):
+    """ returns all the testcases in this module """
+    if loader:
+        return loader.loadTestsFromTestCase(StructuredLogTest)
+    else:
+        return TestLoaderFiltered().loadTestsFromTestCase(StructuredLogTest, sys.argv[1:])
+
+
+if __name__ == '__main__':
+    res = TextTestRunner(verbosity=1).run(suite())
+    sys.exit(len(res.failures))
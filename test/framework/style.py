@@ -29,13 +29,17 @@ Style tests for easyconfig files.
 """
 
 import glob
+import json
 import os
 import sys
-from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered
+import time
+from test.framework.utilities import EnhancedTestCase, TestLoaderFiltered, init_config
 from unittest import TextTestRunner
 
 from easybuild.base import fancylogger
 from easybuild.framework.easyconfig.style import _eb_check_trailing_whitespace, check_easyconfigs_style
+from easybuild.framework.easyconfig.style import check_easyconfigs_style_per_file, style_check_cache_key
+from easybuild.tools.filetools import read_file, write_file
 
 try:
     import pycodestyle  # noqa
@@ -61,6 +65,90 @@ class StyleTest(EnhancedTestCase):
 
         self.assertEqual(result, 0, "No code style errors (and/or warnings) found.")
 
+    def test_style_check_cache(self):
+        """Test checking easyconfigs for style in parallel, with results being cached."""
+        if 'pycodestyle' not in sys.modules:
+            print("Skipping test_style_check_cache pycodestyle is not available")
+            return
+
+        test_ecs = []
+        for idx in range(6):
+            test_ec = os.path.join(self.test_prefix, 'test%d.eb' % idx)
+            write_file(test_ec, "name = 'test'\nversion = '%d'\n" % idx)
+            test_ecs.append(test_ec)
+        # introduce style problem in one easyconfig file
+        write_file(test_ecs[3], "version  = '3'\n", append=True)
+
+        cache_dir = os.path.join(self.test_prefix, 'style_check_cache')
+        init_config(build_options={'style_check_cache_path': cache_dir})
+
+        self.mock_stdout(True)
+        self.assertEqual(check_easyconfigs_style(test_ecs, verbose=True), 1)
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertIn(test_ecs[3] + ":3:8: E221", stdout)
+        self.assertIn("1       E221 multiple spaces before operator", stdout)
+
+        results = check_easyconfigs_style_per_file(test_ecs)
+        self.assertEqual([res['errors'] for res in results], [0, 0, 0, 1, 0, 0])
+        self.assertEqual(results[3]['counters'], {'E221': 1})
+        self.assertIn(test_ecs[3] + ":3:8: E221 multiple spaces before operator", results[3]['output'])
+
+        # there's one cache file per easyconfig file (per style check configuration),
+        # location of easyconfig file is not included in cache files
+        keys = [style_check_cache_key(ec) for ec in test_ecs]
+        cache_files = [os.path.join(cache_dir, key + '.json') for key in keys]
+        self.assertTrue(all(os.path.exists(cache_file) for cache_file in cache_files))
+        # first style check was done in verbose mode, which results in different cache entries
+        self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.json'))), 12)
+        self.assertNotIn(test_ecs[3], read_file(cache_files[3]))
+        self.assertIn(":3:8: E221 multiple spaces before operator", read_file(cache_files[3]))
+
+        # cached results are used for unchanged easyconfig files
+        for idx, cache_file in enumerate(cache_files):
+            entry = json.loads(read_file(cache_file))
+            entry['output'] = 'CACHED %d' % idx
+            write_file(cache_file, json.dumps(entry))
+        write_file(test_ecs[3], "name = 'test'\nversion = '3'\n")
+
+        results = check_easyconfigs_style_per_file(test_ecs)
+        self.assertEqual([res['errors'] for res in results], [0] * 6)
+        for idx, res in enumerate(results):
+            if idx == 3:
+                self.assertEqual(res['output'], '')
+            else:
+                self.assertEqual(res['output'], 'CACHED %d' % idx)
+
+        # cached results are also used for copies of easyconfig files in another location
+        test_ec_copy = os.path.join(self.test_prefix, 'pr', 'test3.eb')
+        write_file(test_ec_copy, "name = 'test'\nversion = '3'\nversion  = '3'\n")
+        results = check_easyconfigs_style_per_file([test_ec_copy])
+        self.assertEqual(results[0]['output'], 'CACHED 3')
+        os.remove(cache_files[3])
+        results = check_easyconfigs_style_per_file([test_ec_copy])
+        self.assertIn(test_ec_copy + ":3:8: E221 multiple spaces before operator", results[0]['output'])
+
+        # cache entries that were not used for a while are removed
+        old = time.time() - 31 * 24 * 3600
+        for cache_file in cache_files[:4]:
+            os.utime(cache_file, (old, old))
+        os.utime(os.path.join(cache_dir, '.last_pruned'), (old, old))
+        write_file(test_ecs[0], "name = 'test'\nversion = '0'\n# changed\n")
+        check_easyconfigs_style_per_file(test_ecs)
+        # outdated entry for changed easyconfig file is removed
+        self.assertNotExists(cache_files[0])
+        self.assertExists(os.path.join(cache_dir, style_check_cache_key(test_ecs[0]) + '.json'))
+        # entry for easyconfig file in pull request is removed
+        self.assertNotExists(cache_files[3])
+        # entries that are used are retained
+        self.assertExists(cache_files[1])
+        self.assertExists(cache_files[2])
+
+        # style check cache can be disabled
+        init_config(build_options={'style_check_cache_path': ''})
+        results = check_easyconfigs_style_per_file(test_ecs)
+        self.assertEqual([res['output'] for res in results], [''] * 6)
+
     def test_check_trailing_whitespace(self):
         """Test for trailing whitespace check."""
         if 'pycodestyle' not in sys.modules:
@@ -42,7 +42,9 @@ from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.options import set_tmpdir
 
 import test.framework.asyncprocess as a
+import test.framework.build_history as bh
 import test.framework.build_log as bl
+import test.framework.build_profile as bp
 import test.framework.config as c
 import test.framework.containers as ct
 import test.framework.easyblock as b
@@ -53,6 +55,7 @@ import test.framework.easyconfigversion as ev
 import test.framework.easystack as es
 import test.framework.ebconfigobj as ebco
 import test.framework.environment as env
+import test.framework.error_excerpts as ee
 import test.framework.docs as d
 import test.framework.filetools as f
 import test.framework.format_convert as f_c
@@ -73,6 +76,7 @@ import test.framework.repository as r
 import test.framework.robot as robot
 import test.framework.run as run
 import test.framework.style as st
+import test.framework.structured_log as sl
 import test.framework.systemtools as s
 import test.framework.toolchain as tc
 import test.framework.toolchainvariables as tcv
@@ -113,7 +117,7 @@ except EasyBuildError as err:
 # call suite() for each module and then run them all
 # note: make sure the options unit tests run first, to avoid running some of them with a readily initialized config
 tests = [gen, d, bl, o, r, ef, ev, ebco, ep, e, mg, m, mt, f, run, a, robot, b, v, g, tcv, tc, t, c, s, lic, f_c,
-         tw, p, i, pkg, env, et, st, h, ct, lib, u, es, ou]
+         tw, p, i, pkg, env, et, st, h, ct, lib, u, es, ou, bp, bh, sl, ee]
 
 
 class EasyBuildFrameworkTestSuite(unittest.TestSuite):
@@ -55,7 +55,7 @@ from easybuild.tools.modules import EnvironmentModules
 from easybuild.tools.run import run_shell_cmd
 from easybuild.tools.systemtools import get_shared_lib_ext
 from easybuild.tools.toolchain.mpi import get_mpi_cmd_template
-from easybuild.tools.toolchain.toolchain import env_vars_external_module, RPATH_WRAPPERS_SUBDIR
+from easybuild.tools.toolchain.toolchain import env_vars_external_module, RPATH_WRAPPERS_SUBDIR, SearchPathIndex
 from easybuild.tools.toolchain.utilities import get_toolchain, search_toolchain
 from easybuild.toolchains.compiler.clang import Clang
 
@@ -449,6 +449,9 @@ class ToolchainTest(EnhancedTestCase):
 
     def test_prepare_iterate(self):
         """Test preparing of toolchain in iterative context."""
+        # use short $TMPDIR, to avoid that it gets changed when preparing OpenMPI 2.x
+        os.environ['TMPDIR'] = '/tmp'
+
         tc = self.get_toolchain('foss', version='2018a')
         tc.set_options({'usempi': True})
 
@@ -456,9 +459,15 @@ class ToolchainTest(EnhancedTestCase):
             tc.prepare()
         self.check_vars_foss_usempi(tc)
 
-        # without a reset, the value is wrong...
+        # without a reset, build environment from earlier preparation is reapplied if environment was not changed
         with self.mocked_stdout_stderr():
-            tc.prepare()
+            tc.prepare(loadmod=False)
+        self.check_vars_foss_usempi(tc)
+
+        # without a reset, the value is wrong if build environment is defined again...
+        os.environ['EBROOTFOO'] = self.test_prefix
+        with self.mocked_stdout_stderr():
+            tc.prepare(loadmod=False)
         self.assertFalse(tc.get_variable('MPICC') == 'mpicc')
 
         tc.reset()
@@ -1007,6 +1016,114 @@ class ToolchainTest(EnhancedTestCase):
             self.assertErrorRegex(EasyBuildError, error_pattern, tc.prepare)
         self.modtool.purge()
 
+    def test_dependency_header_dirs(self):
+        """Test determining subdirectories of dependencies to use as preprocessor paths."""
+        dep1 = os.path.join(self.test_prefix, 'dep1')
+        dep2 = os.path.join(self.test_prefix, 'dep2')
+        for subdir in [os.path.join(dep1, 'include'), os.path.join(dep1, 'include', 'dep1'),
+                       os.path.join(dep2, 'include'), os.path.join(dep2, 'extra')]:
+            mkdir(subdir, parents=True)
+
+        os.environ['CPATH'] = ':'.join([os.path.join(dep2, 'include'), os.path.join(dep1, 'include', 'dep1')])
+        os.environ['C_INCLUDE_PATH'] = os.path.join(dep1, 'include')
+        os.environ['CPLUS_INCLUDE_PATH'] = ':'.join([os.path.join(dep1, 'include', 'dep1'), '/usr/include'])
+        if 'OBJC_INCLUDE_PATH' in os.environ:
+            del os.environ['OBJC_INCLUDE_PATH']
+
+        index = SearchPathIndex(['CPATH', 'C_INCLUDE_PATH', 'CPLUS_INCLUDE_PATH', 'OBJC_INCLUDE_PATH'])
+        expected = [os.path.join(dep1, 'include', 'dep1'), os.path.join(dep1, 'include'),
+                    os.path.join(dep1, 'include', 'dep1')]
+        self.assertEqual(index.paths_under(dep1), expected)
+        self.assertEqual(index.paths_under(os.path.join(dep2, 'include')), [os.path.join(dep2, 'include')])
+        self.assertEqual(index.paths_under('/usr'), ['/usr/include'])
+        self.assertEqual(index.paths_under(os.path.join(self.test_prefix, 'dep3')), [])
+
+        tc = self.get_toolchain('foss', version='2018a')
+        tc.search_path['cpp_headers'] = 'cpath'
+
+        self.assertEqual(tc._get_dependency_header_dirs(dep1, ()), ['include/dep1', 'include'])
+        self.assertEqual(tc._get_dependency_header_dirs(dep2, ('extra', 'include')), ['include', 'extra'])
+
+        tc._add_dependency_cpp_headers(dep1)
+        tc._add_dependency_cpp_headers(dep2, extra_dirs=['extra'])
+        expected = [os.path.join(dep1, 'include', 'dep1'), os.path.join(dep1, 'include'),
+                    os.path.join(dep2, 'include'), os.path.join(dep2, 'extra')]
+        self.assertEqual(sorted(str(tc.variables['CPATH']).split(':')), sorted(expected))
+
+        # index is only created again when environment changes, results are cached
+        index = tc.search_path_index
+        tc._get_dependency_header_dirs(dep1, ())
+        self.assertIs(tc.search_path_index, index)
+        self.assertEqual(len(tc.dependency_header_dirs), 3)
+
+        os.environ['C_INCLUDE_PATH'] = os.path.join(dep2, 'extra')
+        self.assertEqual(tc._get_dependency_header_dirs(dep1, ()), ['include/dep1'])
+        self.assertEqual(tc._get_dependency_header_dirs(dep2, ()), ['include', 'extra'])
+        self.assertFalse(tc.search_path_index is index)
+        self.assertEqual(len(tc.dependency_header_dirs), 5)
+
+    def test_prepare_snapshot(self):
+        """Test reapplying snapshot of earlier preparation of toolchain."""
+        tc = self.get_toolchain('GCC', version='6.4.0-2.28')
+        tc.set_options({'pic': True})
+
+        set_variables_calls = []
+        orig_set_variables = tc.set_variables
+
+        def set_variables():
+            set_variables_calls.append(True)
+            orig_set_variables()
+
+        tc.set_variables = set_variables
+
+        with self.mocked_stdout_stderr():
+            tc.prepare()
+        self.assertEqual(len(set_variables_calls), 1)
+        self.assertTrue(tc.prepared_snapshot)
+        cflags = os.environ['CFLAGS']
+        self.assertIn('-fPIC', cflags.split())
+        self.assertEqual(os.environ['EBVARCFLAGS'], cflags)
+
+        # build environment is reapplied from snapshot when toolchain is prepared again in same environment,
+        # environment variables that were unset and changes to toolchain variables are undone
+        del os.environ['CFLAGS']
+        del os.environ['EBVARCFLAGS']
+        tc.variables.nappend('CFLAGS', 'foo')
+        with self.mocked_stdout_stderr():
+            tc.prepare(loadmod=False)
+        self.assertEqual(len(set_variables_calls), 1)
+        self.assertEqual(os.environ['CFLAGS'], cflags)
+        self.assertEqual(os.environ['EBVARCFLAGS'], cflags)
+        self.assertEqual(tc.get_variable('CFLAGS'), cflags)
+        self.assertFalse(tc.variables is tc.prepared_snapshot['variables'])
+
+        # build environment is defined again when environment was changed
+        os.environ['EBROOTFOO'] = self.test_prefix
+        with self.mocked_stdout_stderr():
+            tc.prepare(loadmod=False)
+        self.assertEqual(len(set_variables_calls), 2)
+        self.assertIn('-fPIC', os.environ['CFLAGS'].split())
+
+        # snapshot of last preparation is used
+        with self.mocked_stdout_stderr():
+            tc.prepare(loadmod=False)
+        self.assertEqual(len(set_variables_calls), 2)
+
+        # ... or when toolchain options are changed
+        tc.reset()
+        tc.options['pic'] = False
+        with self.mocked_stdout_stderr():
+            tc.prepare(loadmod=False)
+        self.assertEqual(len(set_variables_calls), 3)
+        self.assertNotIn('-fPIC', os.environ['CFLAGS'].split())
+
+        # ... or when modules for dependencies should be checked, but this was not done for the snapshot
+        with self.mocked_stdout_stderr():
+            tc.prepare()
+        self.assertEqual(len(set_variables_calls), 4)
+
+        self.modtool.purge()
+
     def test_search_path_linker(self):
         """Test functionality behind search-path-linker option"""
         linker_mode = {
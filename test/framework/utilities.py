@@ -132,6 +132,8 @@ class EnhancedTestCase(TestCase):
         os.environ['EASYBUILD_BUILDPATH'] = self.test_buildpath
         self.test_installpath = tempfile.mkdtemp()
         os.environ['EASYBUILD_INSTALLPATH'] = self.test_installpath
+        # make sure that persistent caches are not created in home directory
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.test_prefix, 'cache')
 
         # make sure that the tests only pick up easyconfigs provided with the tests
         os.environ['EASYBUILD_ROBOT_PATHS'] = os.path.join(testdir, 'easyconfigs', 'test_ecs')